@@ -0,0 +1,58 @@
+#
+# Compare evaluating the residuals of a DAE model with separate evaluators for the
+# rhs and algebraic equations, and with a single (fused) evaluator
+#
+import pybamm
+import numpy as np
+import timeit
+
+# load model
+model = pybamm.lithium_ion.DFN()
+
+# create geometry
+geometry = model.default_geometry
+
+# load parameter values and process model and geometry
+param = model.default_parameter_values
+param.process_model(model)
+param.process_geometry(geometry)
+
+# set mesh
+mesh = pybamm.Mesh(geometry, model.default_submesh_types, model.default_var_pts)
+
+# discretise model
+disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+disc.process_model(model)
+
+# simplify the rhs and algebraic equations together, as in the solver setup
+simp = pybamm.Simplification()
+rhs = simp.simplify(model.concatenated_rhs)
+algebraic = simp.simplify(model.concatenated_algebraic)
+
+separate = [pybamm.EvaluatorPython(rhs), pybamm.EvaluatorPython(algebraic)]
+fused = pybamm.EvaluatorPython([rhs, algebraic])
+
+y = model.concatenated_initial_conditions
+ydot = np.zeros(y.shape[0])
+mass_matrix = model.mass_matrix.entries
+
+
+def separate_residuals():
+    rhs_eval = separate[0].evaluate(0, y)
+    alg_eval = separate[1].evaluate(0, y)
+    return np.concatenate((rhs_eval[:, 0], alg_eval[:, 0])) - mass_matrix @ ydot
+
+
+def fused_residuals():
+    rhs_eval, alg_eval = fused.evaluate(0, y)
+    return np.concatenate((rhs_eval[:, 0], alg_eval[:, 0])) - mass_matrix @ ydot
+
+
+np.testing.assert_allclose(separate_residuals(), fused_residuals())
+number = 200
+for name, function in [
+    ("separate evaluators", separate_residuals),
+    ("fused evaluator", fused_residuals),
+]:
+    time = min(timeit.repeat(function, number=number, repeat=5)) / number
+    print("{}: {:.1f} us per residual evaluation".format(name, time * 1e6))
@@ -0,0 +1,46 @@
+#
+# Compare the python and native callbacks of the IDAKLU solver
+#
+import pybamm
+import numpy as np
+
+pybamm.set_logging_level("INFO")
+
+t_eval = np.linspace(0, 0.2, 100)
+for model in [
+    pybamm.lithium_ion.SPM(),
+    pybamm.lithium_ion.SPMe(),
+    pybamm.lithium_ion.DFN(),
+]:
+    # create geometry
+    geometry = model.default_geometry
+
+    # load parameter values and process model and geometry
+    param = model.default_parameter_values
+    param.process_model(model)
+    param.process_geometry(geometry)
+
+    # set mesh
+    mesh = pybamm.Mesh(geometry, model.default_submesh_types, model.default_var_pts)
+
+    # discretise model
+    disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+    disc.process_model(model)
+
+    # solve model with each kind of callbacks
+    solutions = {}
+    for callbacks in ["python", "native"]:
+        solver = pybamm.IDAKLU(atol=1e-8, rtol=1e-8, callbacks=callbacks)
+        solutions[callbacks] = solver.solve(model, t_eval)
+
+    # compare
+    difference = np.max(np.abs(solutions["native"].y - solutions["python"].y))
+    print("{} (max difference {:.2e})".format(model.name, difference))
+    for callbacks, solution in solutions.items():
+        print(
+            "    {} callbacks: set-up time {}, solve time {}".format(
+                callbacks,
+                pybamm.Timer().format(solution.set_up_time),
+                pybamm.Timer().format(solution.solve_time),
+            )
+        )
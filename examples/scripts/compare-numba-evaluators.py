@@ -0,0 +1,58 @@
+#
+# Compare evaluating the rhs and jacobian of models with python code and with
+# functions compiled with numba
+#
+import pybamm
+import timeit
+
+for model in [
+    pybamm.lithium_ion.SPM(),
+    pybamm.lithium_ion.SPMe(),
+    pybamm.lithium_ion.DFN(),
+]:
+    # create geometry
+    geometry = model.default_geometry
+
+    # load parameter values and process model and geometry
+    param = model.default_parameter_values
+    param.process_model(model)
+    param.process_geometry(geometry)
+
+    # set mesh
+    mesh = pybamm.Mesh(geometry, model.default_submesh_types, model.default_var_pts)
+
+    # discretise model
+    disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+    disc.process_model(model)
+
+    # simplify the rhs and algebraic equations and the jacobian, as in the solvers
+    simp = pybamm.Simplification()
+    rhs = simp.simplify(model.concatenated_rhs)
+    algebraic = simp.simplify(model.concatenated_algebraic)
+    y0 = model.concatenated_initial_conditions[:, 0]
+    y = pybamm.StateVector(slice(0, y0.size))
+    jac = simp.simplify(pybamm.SparseStack(rhs.jac(y), algebraic.jac(y)))
+
+    print(model.name)
+    for name, symbol, number in [
+        ("residuals", [rhs, algebraic], 200),
+        ("jacobian", jac, 20),
+    ]:
+        timer = pybamm.Timer()
+        python_evaluator = pybamm.EvaluatorPython(symbol)
+        numba_evaluator = pybamm.EvaluatorNumba(symbol)
+        # the numba function is compiled the first time it is evaluated
+        numba_evaluator.evaluate(0, y0)
+        set_up_time = timer.time()
+        for evaluator in [python_evaluator, numba_evaluator]:
+            time = min(
+                timeit.repeat(
+                    lambda: evaluator.evaluate(0, y0), number=number, repeat=5
+                )
+            )
+            print(
+                "    {} with {}: {:.1f} us per evaluation".format(
+                    name, type(evaluator).__name__, time / number * 1e6
+                )
+            )
+        print("    (set-up time {})".format(timer.format(set_up_time)))
@@ -0,0 +1,55 @@
+#
+# Compare the CVODE (with the KLU sparse linear solver) and scipy BDF solvers on the
+# SPMe, with increasingly fine particle meshes
+#
+import pybamm
+import numpy as np
+
+t_eval = np.linspace(0, 0.15, 100)
+var = pybamm.standard_spatial_vars
+for particle_points in [10, 50, 200]:
+    model = pybamm.lithium_ion.SPMe()
+
+    # create geometry
+    geometry = model.default_geometry
+
+    # load parameter values and process model and geometry
+    param = model.default_parameter_values
+    param.process_model(model)
+    param.process_geometry(geometry)
+
+    # set mesh, with fine particles
+    var_pts = model.default_var_pts
+    var_pts.update({var.r_n: particle_points, var.r_p: particle_points})
+    mesh = pybamm.Mesh(geometry, model.default_submesh_types, var_pts)
+
+    # discretise model
+    disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+    disc.process_model(model)
+
+    # solve model with each solver
+    solvers = {"scipy BDF": pybamm.ScipySolver(method="BDF", rtol=1e-6, atol=1e-6)}
+    if not pybamm.have_idaklu():
+        solvers["CVODE KLU"] = pybamm.CVODEKLU(rtol=1e-6, atol=1e-6)
+    solutions = {name: solver.solve(model, t_eval) for name, solver in solvers.items()}
+
+    # compare
+    print(
+        "{} with {} points in each particle ({} states)".format(
+            model.name, particle_points, model.concatenated_initial_conditions.size
+        )
+    )
+    for name, solution in solutions.items():
+        difference = np.max(np.abs(solution.y - solutions["scipy BDF"].y))
+        print(
+            "    {}: set-up time {}, solve time {}, {} steps, {} jacobian "
+            "evaluations, {} (max difference {:.2e})".format(
+                name,
+                pybamm.Timer().format(solution.set_up_time),
+                pybamm.Timer().format(solution.solve_time),
+                solution.stats["steps"],
+                solution.stats["jacobian evaluations"],
+                solution.termination,
+                difference,
+            )
+        )
@@ -0,0 +1,83 @@
+#
+# Time the passes that rebuild expression trees (setting parameters, discretisation,
+# simplification, Jacobian and conversion to python) against the depth and the
+# number of nodes of the trees
+#
+import pybamm
+from collections import OrderedDict
+
+param = pybamm.ParameterValues({"p{}".format(i): 1.0 + i for i in range(7)})
+y = pybamm.StateVector(slice(0, 1))
+
+
+def time_passes(expr, param, disc, y):
+    "Time the passes on `expr`, with each pass applied to the output of the previous"
+    times = OrderedDict()
+    timer = pybamm.Timer()
+    expr = param.process_symbol(expr)
+    times["parameters"] = timer.time()
+    timer.reset()
+    expr = disc.process_symbol(expr)
+    times["discretisation"] = timer.time()
+    timer.reset()
+    expr = expr.simplify()
+    times["simplification"] = timer.time()
+    timer.reset()
+    jac = expr.jac(y)
+    times["jacobian"] = timer.time()
+    timer.reset()
+    pybamm.find_symbols(jac, OrderedDict(), OrderedDict())
+    times["find_symbols"] = timer.time()
+    return times
+
+
+# chains of alternating functions and multiplications, as deep as they are long
+print("Deep trees")
+for depth in [100, 1000, 10000]:
+    x = pybamm.Variable("x")
+    disc = pybamm.Discretisation()
+    disc.y_slices = {x.id: [slice(0, 1)]}
+    expr = x
+    for i in range(depth):
+        if i % 2:
+            expr = pybamm.exp(expr)
+        else:
+            expr = expr * pybamm.Parameter("p{}".format(i % 7))
+    times = time_passes(expr, param, disc, y)
+    print(
+        "    depth {}: ".format(depth)
+        + ", ".join("{} {:.3f} s".format(k, v) for k, v in times.items())
+    )
+
+# models, whose trees are wide rather than deep
+print("Models")
+for model in [pybamm.lithium_ion.SPM(), pybamm.lithium_ion.DFN()]:
+    times = OrderedDict()
+    timer = pybamm.Timer()
+    geometry = model.default_geometry
+    param = model.default_parameter_values
+    param.process_model(model)
+    param.process_geometry(geometry)
+    times["parameters"] = timer.time()
+    timer.reset()
+    mesh = pybamm.Mesh(geometry, model.default_submesh_types, model.default_var_pts)
+    disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+    disc.process_model(model)
+    times["discretisation"] = timer.time()
+    timer.reset()
+    expr = pybamm.NumpyConcatenation(
+        model.concatenated_rhs, model.concatenated_algebraic
+    ).simplify()
+    times["simplification"] = timer.time()
+    timer.reset()
+    y = pybamm.StateVector(slice(0, model.concatenated_initial_conditions.size))
+    jac = expr.jac(y)
+    times["jacobian"] = timer.time()
+    timer.reset()
+    pybamm.find_symbols(jac, OrderedDict(), OrderedDict())
+    times["find_symbols"] = timer.time()
+    nodes = len(list(expr.pre_order())) + len(list(jac.pre_order()))
+    print(
+        "    {} ({} nodes): ".format(model.name, nodes)
+        + ", ".join("{} {:.3f} s".format(k, v) for k, v in times.items())
+    )
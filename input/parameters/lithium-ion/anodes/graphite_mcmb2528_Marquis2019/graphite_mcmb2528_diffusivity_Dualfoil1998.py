@@ -1,4 +1,5 @@
 import autograd.numpy as np
+import pybamm
 
 
 def graphite_mcmb2528_diffusivity_Dualfoil1998(sto, T, T_inf, E_D_s, R_g):
@@ -36,3 +37,17 @@ def graphite_mcmb2528_diffusivity_Dualfoil1998(sto, T, T_inf, E_D_s, R_g):
     # either simplifications or how sto is passed into this function.
     # See #547
     return D_ref * arrhenius + 0 * sto
+
+
+def graphite_mcmb2528_diffusivity_Dualfoil1998_derivative(sto, T, T_inf, E_D_s, R_g):
+    """
+    Derivative of :func:`graphite_mcmb2528_diffusivity_Dualfoil1998` with respect to the
+    stochiometry, which is zero as the diffusivity is constant.
+    """
+    return 0 * sto
+
+
+pybamm.register_derivative(
+    graphite_mcmb2528_diffusivity_Dualfoil1998,
+    graphite_mcmb2528_diffusivity_Dualfoil1998_derivative,
+)
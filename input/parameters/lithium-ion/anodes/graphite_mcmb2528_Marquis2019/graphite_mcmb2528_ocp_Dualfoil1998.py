@@ -1,4 +1,5 @@
 import autograd.numpy as np
+import pybamm
 
 
 def graphite_mcmb2528_ocp_Dualfoil1998(sto):
@@ -27,3 +28,33 @@ def graphite_mcmb2528_ocp_Dualfoil1998(sto):
     )
 
     return u_eq
+
+
+def graphite_mcmb2528_ocp_Dualfoil1998_derivative(sto):
+    """
+    Derivative of :func:`graphite_mcmb2528_ocp_Dualfoil1998` with respect to the
+    stochiometry.
+    """
+
+    def dtanh(a, b, c):
+        # derivative of a * tanh((sto - b) / c)
+        return a / c * (1 - np.tanh((sto - b) / c) ** 2)
+
+    du_eq = (
+        -180.0 * np.exp(-120.0 * sto)
+        + dtanh(0.0351, 0.286, 0.083)
+        - dtanh(0.0045, 0.849, 0.119)
+        - dtanh(0.035, 0.9233, 0.05)
+        - dtanh(0.0147, 0.5, 0.034)
+        - dtanh(0.102, 0.194, 0.142)
+        - dtanh(0.022, 0.9, 0.0164)
+        - dtanh(0.011, 0.124, 0.0226)
+        + dtanh(0.0155, 0.105, 0.029)
+    )
+
+    return du_eq
+
+
+pybamm.register_derivative(
+    graphite_mcmb2528_ocp_Dualfoil1998, graphite_mcmb2528_ocp_Dualfoil1998_derivative
+)
@@ -1,4 +1,5 @@
 import autograd.numpy as np
+import pybamm
 
 
 def lico2_diffusivity_Dualfoil1998(sto, T, T_inf, E_D_s, R_g):
@@ -36,3 +37,17 @@ def lico2_diffusivity_Dualfoil1998(sto, T, T_inf, E_D_s, R_g):
     # either simplifications or how sto is passed into this function.
     # See #547
     return D_ref * arrhenius + 0 * sto
+
+
+def lico2_diffusivity_Dualfoil1998_derivative(sto, T, T_inf, E_D_s, R_g):
+    """
+    Derivative of :func:`lico2_diffusivity_Dualfoil1998` with respect to the
+    stochiometry, which is zero as the diffusivity is constant.
+    """
+    return 0 * sto
+
+
+pybamm.register_derivative(
+    lico2_diffusivity_Dualfoil1998,
+    lico2_diffusivity_Dualfoil1998_derivative,
+)
@@ -1,4 +1,5 @@
 import autograd.numpy as np
+import pybamm
 
 
 def lico2_ocp_Dualfoil1998(sto):
@@ -37,3 +38,30 @@ def lico2_ocp_Dualfoil1998(sto):
     )
 
     return u_eq
+
+
+def lico2_ocp_Dualfoil1998_derivative(sto):
+    """
+    Derivative of :func:`lico2_ocp_Dualfoil1998` with respect to the stochiometry.
+    """
+
+    stretch = 1.062
+    sto = stretch * sto
+
+    def dtanh(a, b, c):
+        # derivative of a * tanh(b + c * sto)
+        return a * c * (1 - np.tanh(b + c * sto) ** 2)
+
+    du_eq = (
+        dtanh(0.07645, 30.834, -54.4806)
+        + dtanh(2.1581, 52.294, -50.294)
+        - dtanh(0.14169, 11.0923, -19.8543)
+        + dtanh(0.2051, 1.4684, -5.4888)
+        + dtanh(0.2531, 0.56478 / 0.1316, -1 / 0.1316)
+        - dtanh(0.02167, -0.525 / 0.006, 1 / 0.006)
+    )
+
+    return stretch * du_eq
+
+
+pybamm.register_derivative(lico2_ocp_Dualfoil1998, lico2_ocp_Dualfoil1998_derivative)
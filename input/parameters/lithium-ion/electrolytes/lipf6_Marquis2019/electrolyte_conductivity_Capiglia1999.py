@@ -1,4 +1,5 @@
 import autograd.numpy as np
+import pybamm
 
 
 def electrolyte_conductivity_Capiglia1999(c_e, T, T_inf, E_k_e, R_g):
@@ -41,3 +42,26 @@ def electrolyte_conductivity_Capiglia1999(c_e, T, T_inf, E_k_e, R_g):
     arrhenius = np.exp(E_k_e / R_g * (1 / T_inf - 1 / T))
 
     return sigma_e * arrhenius
+
+
+def electrolyte_conductivity_Capiglia1999_derivative(c_e, T, T_inf, E_k_e, R_g):
+    """
+    Derivative of :func:`electrolyte_conductivity_Capiglia1999` with respect to the
+    concentration.
+    """
+
+    dsigma_e = (
+        1.9101
+        - 2 * 1.052 * (c_e / 1000)
+        + 3 * 0.1554 * (c_e / 1000) ** 2
+    ) / 1000
+
+    arrhenius = np.exp(E_k_e / R_g * (1 / T_inf - 1 / T))
+
+    return dsigma_e * arrhenius
+
+
+pybamm.register_derivative(
+    electrolyte_conductivity_Capiglia1999,
+    electrolyte_conductivity_Capiglia1999_derivative,
+)
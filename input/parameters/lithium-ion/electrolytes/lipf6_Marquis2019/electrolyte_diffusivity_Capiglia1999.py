@@ -1,4 +1,5 @@
 import autograd.numpy as np
+import pybamm
 
 
 def electrolyte_diffusivity_Capiglia1999(c_e, T, T_inf, E_D_e, R_g):
@@ -36,3 +37,21 @@ def electrolyte_diffusivity_Capiglia1999(c_e, T, T_inf, E_D_e, R_g):
     arrhenius = np.exp(E_D_e / R_g * (1 / T_inf - 1 / T))
 
     return D_c_e * arrhenius
+
+
+def electrolyte_diffusivity_Capiglia1999_derivative(c_e, T, T_inf, E_D_e, R_g):
+    """
+    Derivative of :func:`electrolyte_diffusivity_Capiglia1999` with respect to the
+    concentration.
+    """
+
+    dD_c_e = -0.65 / 1000 * 5.34e-10 * np.exp(-0.65 * c_e / 1000)
+    arrhenius = np.exp(E_D_e / R_g * (1 / T_inf - 1 / T))
+
+    return dD_c_e * arrhenius
+
+
+pybamm.register_derivative(
+    electrolyte_diffusivity_Capiglia1999,
+    electrolyte_diffusivity_Capiglia1999_derivative,
+)
@@ -65,8 +65,10 @@ from .settings import settings
 #
 from .expression_tree.symbol import (
     Symbol,
+    stable_hash,
     domain_size,
     create_object_of_size,
+    create_object_of_shape,
     evaluate_for_shape_using_domain,
 )
 from .expression_tree.binary_operators import (
@@ -128,6 +130,7 @@ from .expression_tree.unary_operators import (
 from .expression_tree.functions import *
 from .expression_tree.interpolant import Interpolant
 from .expression_tree.parameter import Parameter, FunctionParameter
+from .expression_tree.input_parameter import InputParameter
 from .expression_tree.broadcasts import Broadcast, PrimaryBroadcast, FullBroadcast
 from .expression_tree.scalar import Scalar
 from .expression_tree.variable import Variable
@@ -150,6 +153,7 @@ from .expression_tree.exceptions import (
     UndefinedOperationError,
     GeometryError,
 )
+from .expression_tree.traversal import post_order_rewrite
 from .expression_tree.simplify import (
     Simplification,
     simplify_if_constant,
@@ -159,10 +163,16 @@ from .expression_tree.simplify import (
 from .expression_tree.jacobian import Jacobian
 from .expression_tree.evaluate import (
     find_symbols,
+    dummy_evaluate,
     id_to_python_variable,
+    eliminate_common_subexpressions,
     to_python,
     EvaluatorPython,
+    EvaluatorNumba,
+    have_numba,
 )
+from .expression_tree.tape import Tape
+from .expression_tree.intern_table import InternTable
 
 #
 # Model classes
@@ -255,15 +265,17 @@ from .spatial_methods.scikit_finite_element import ScikitFiniteElement
 # Solver classes
 #
 from .solvers.solution import Solution
+from .solvers.disk_cache import DiskCache
 from .solvers.base_solver import BaseSolver
 from .solvers.ode_solver import OdeSolver
+from .solvers.newton import newton_root
 from .solvers.dae_solver import DaeSolver
 from .solvers.scipy_solver import ScipySolver
 from .solvers.scikits_dae_solver import ScikitsDaeSolver
 from .solvers.scikits_ode_solver import ScikitsOdeSolver
 from .solvers.scikits_ode_solver import have_scikits_odes
 from .solvers.algebraic_solver import AlgebraicSolver
-from .solvers.idaklu_solver import IDAKLU, have_idaklu
+from .solvers.idaklu_solver import IDAKLU, CVODEKLU, have_idaklu
 
 
 #
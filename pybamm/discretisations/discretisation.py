@@ -129,6 +129,7 @@ class Discretisation(object):
             model_disc.use_jacobian = model.use_jacobian
             model_disc.use_simplify = model.use_simplify
             model_disc.use_to_python = model.use_to_python
+            model_disc.convert_to_format = model.convert_to_format
 
         model_disc.bcs = self.bcs
 
@@ -526,7 +527,8 @@ class Discretisation(object):
         """
         # create state vector to differentiate with respect to
         y = pybamm.StateVector(slice(0, np.size(model.concatenated_initial_conditions)))
-        # set up Jacobian object, for re-use of dict
+        # set up Jacobian object, so that the subtrees that are shared between the
+        # equations are only differentiated once
         jacobian = pybamm.Jacobian()
 
         # calculate Jacobian of rhs by equation
@@ -546,6 +548,11 @@ class Discretisation(object):
             )
             jac_algebraic_eqn_dict[eqn_key] = jacobian.jac(eqn, y)
         jac_algebraic = self._concatenate_in_order(jac_algebraic_eqn_dict, sparse=True)
+        pybamm.logger.debug(
+            "Jacobian: {} cache hits, {} misses".format(
+                jacobian.hits, jacobian.misses
+            )
+        )
 
         # full Jacobian
         if model.rhs.keys() and model.algebraic.keys():
@@ -604,32 +611,41 @@ class Discretisation(object):
             Discretised symbol
 
         """
-        try:
-            return self._discretised_symbols[symbol.id]
-        except KeyError:
-            discretised_symbol = self._process_symbol(symbol)
-            self._discretised_symbols[symbol.id] = discretised_symbol
-            discretised_symbol.test_shape()
-            return discretised_symbol
+        return pybamm.post_order_rewrite(
+            symbol,
+            self._process_symbol,
+            self._discretised_symbols,
+            enter=self._check_tabs,
+        )
 
-    def _process_symbol(self, symbol):
-        """ See :meth:`Discretisation.process_symbol()`. """
+    def _check_tabs(self, symbol):
+        """
+        If boundary conditions are provided on tabs, check them for the domain of
+        `symbol`. Called on each symbol before its children are discretised.
+        """
+        if symbol.domain != [] and self.bcs:
+            key_id = list(self.bcs.keys())[0]
+            if any("tab" in side for side in list(self.bcs[key_id].keys())):
+                self.bcs[key_id] = self.check_tab_conditions(symbol, self.bcs[key_id])
+
+    def _process_symbol(self, symbol, disc_children):
+        """
+        See :meth:`Discretisation.process_symbol()`. `disc_children` are the
+        discretised children of `symbol`.
+        """
+        discretised_symbol = self._discretise_symbol(symbol, disc_children)
+        discretised_symbol.test_shape()
+        return discretised_symbol
+
+    def _discretise_symbol(self, symbol, disc_children):
+        """ See :meth:`Discretisation._process_symbol()`. """
 
         if symbol.domain != []:
             spatial_method = self.spatial_methods[symbol.domain[0]]
-            # If boundary conditions are provided, need to check for BCs on tabs
-            if self.bcs:
-                key_id = list(self.bcs.keys())[0]
-                if any("tab" in side for side in list(self.bcs[key_id].keys())):
-                    self.bcs[key_id] = self.check_tab_conditions(
-                        symbol, self.bcs[key_id]
-                    )
 
         if isinstance(symbol, pybamm.BinaryOperator):
-            # Pre-process children
             left, right = symbol.children
-            disc_left = self.process_symbol(left)
-            disc_right = self.process_symbol(right)
+            disc_left, disc_right = disc_children
             if symbol.domain == []:
                 return symbol.__class__(disc_left, disc_right)
             else:
@@ -639,7 +655,7 @@ class Discretisation(object):
 
         elif isinstance(symbol, pybamm.UnaryOperator):
             child = symbol.child
-            disc_child = self.process_symbol(child)
+            disc_child = disc_children[0]
             if child.domain != []:
                 child_spatial_method = self.spatial_methods[child.domain[0]]
 
@@ -713,7 +729,6 @@ class Discretisation(object):
                 return symbol._unary_new_copy(disc_child)
 
         elif isinstance(symbol, pybamm.Function):
-            disc_children = [self.process_symbol(child) for child in symbol.children]
             return symbol._function_new_copy(disc_children)
 
         elif isinstance(symbol, pybamm.Variable):
@@ -727,10 +742,7 @@ class Discretisation(object):
             return spatial_method.spatial_variable(symbol)
 
         elif isinstance(symbol, pybamm.Concatenation):
-            new_children = [self.process_symbol(child) for child in symbol.children]
-            new_symbol = spatial_method.concatenation(new_children)
-
-            return new_symbol
+            return spatial_method.concatenation(disc_children)
 
         else:
             # Backup option: return new copy of the object
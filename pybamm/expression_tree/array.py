@@ -1,6 +1,7 @@
 #
 # NumpyArray class
 #
+import hashlib
 import numpy as np
 import pybamm
 from scipy.sparse import issparse, csr_matrix
@@ -22,7 +23,7 @@ class Array(pybamm.Symbol):
     auxiliary_domainds : dict, optional
         dictionary of auxiliary domains, defaults to empty dict
     entries_string : str
-        String representing the entries (slow to recalculate when copying)
+        Digest of the entries (slow to recalculate when copying)
 
     *Extends:* :class:`Symbol`
     """
@@ -65,21 +66,34 @@ class Array(pybamm.Symbol):
     @entries_string.setter
     def entries_string(self, value):
         # We must include the entries in the hash, since different arrays can be
-        # indistinguishable by class, name and domain alone
-        # Slightly different syntax for sparse and non-sparse matrices
+        # indistinguishable by class, name and domain alone. The digest covers all the
+        # entries (and the shape and type), so that it is the same in every process
         if value is not None:
             self._entries_string = value
         else:
             entries = self._entries
             if issparse(entries):
-                self._entries_string = str(entries.__dict__)
+                matrix = entries
+                if matrix.format not in ["csr", "csc"]:
+                    matrix = matrix.tocsr()
+                arrays = [matrix.data, matrix.indices, matrix.indptr]
+                description = (entries.format, entries.shape)
             else:
-                self._entries_string = entries.tostring()
+                arrays = [entries]
+                description = ("dense", entries.shape)
+            digest = hashlib.blake2b(
+                repr(description + tuple(str(a.dtype) for a in arrays)).encode()
+            )
+            for array in arrays:
+                digest.update(np.ascontiguousarray(array).tobytes())
+            self._entries_string = digest.hexdigest()
 
     def set_id(self):
         """ See :meth:`pybamm.Symbol.set_id()`. """
-        self._id = hash(
-            (self.__class__, self.name, self.entries_string) + tuple(self.domain)
+        self._id = pybamm.stable_hash(
+            (self.__class__, self.name, self.entries_string)
+            + tuple(self.domain)
+            + tuple([(k, tuple(v)) for k, v in self.auxiliary_domains.items()])
         )
 
     def _jac(self, variable):
@@ -98,6 +112,6 @@ class Array(pybamm.Symbol):
             self.entries_string,
         )
 
-    def _base_evaluate(self, t=None, y=None):
+    def _base_evaluate(self, t=None, y=None, u=None):
         """ See :meth:`pybamm.Symbol._base_evaluate()`. """
         return self._entries
@@ -131,12 +131,9 @@ class BinaryOperator(pybamm.Symbol):
                 )
             )
 
-    def new_copy(self):
-        """ See :meth:`pybamm.Symbol.new_copy()`. """
-
-        # process children
-        new_left = self.left.new_copy()
-        new_right = self.right.new_copy()
+    def _copy_with_children(self, children):
+        """ See :meth:`pybamm.Symbol._copy_with_children()`. """
+        new_left, new_right = children
 
         # make new symbol, ensure domain(s) remain the same
         out = self.__class__(new_left, new_right)
@@ -145,27 +142,27 @@ class BinaryOperator(pybamm.Symbol):
 
         return out
 
-    def evaluate(self, t=None, y=None, known_evals=None):
+    def evaluate(self, t=None, y=None, u=None, known_evals=None):
         """ See :meth:`pybamm.Symbol.evaluate()`. """
         if known_evals is not None:
             id = self.id
             try:
                 return known_evals[id], known_evals
             except KeyError:
-                left, known_evals = self.left.evaluate(t, y, known_evals)
-                right, known_evals = self.right.evaluate(t, y, known_evals)
+                left, known_evals = self.left.evaluate(t, y, u, known_evals)
+                right, known_evals = self.right.evaluate(t, y, u, known_evals)
                 value = self._binary_evaluate(left, right)
                 known_evals[id] = value
                 return value, known_evals
         else:
-            left = self.left.evaluate(t, y)
-            right = self.right.evaluate(t, y)
+            left = self.left.evaluate(t, y, u)
+            right = self.right.evaluate(t, y, u)
             return self._binary_evaluate(left, right)
 
     def evaluate_for_shape(self):
         """ See :meth:`pybamm.Symbol.evaluate_for_shape()`. """
-        left = self.children[0].evaluate_for_shape()
-        right = self.children[1].evaluate_for_shape()
+        left = self.children[0].shape_placeholder()
+        right = self.children[1].shape_placeholder()
         return self._binary_evaluate(left, right)
 
     def _binary_jac(self, left_jac, right_jac):
@@ -237,6 +234,22 @@ class Power(BinaryOperator):
         return self.__class__(left, right)
 
 
+def additive_shape_placeholders(left, right):
+    """
+    Placeholders of the children of an addition or a subtraction, from which its
+    shape is found (see :meth:`pybamm.Symbol.shape_placeholder()`). Sparse matrices
+    can only be added to scalars that are zero, so the placeholders of scalars that
+    are added to sparse matrices are zero instead of NaN.
+    """
+    left = left.shape_placeholder()
+    right = right.shape_placeholder()
+    if issparse(left) and isinstance(right, numbers.Number):
+        right = 0
+    elif issparse(right) and isinstance(left, numbers.Number):
+        left = 0
+    return left, right
+
+
 class Addition(BinaryOperator):
     """A node in the expression tree representing an addition operator
 
@@ -259,6 +272,10 @@ class Addition(BinaryOperator):
         """ See :meth:`pybamm.BinaryOperator._binary_evaluate()`. """
         return left + right
 
+    def evaluate_for_shape(self):
+        """ See :meth:`pybamm.Symbol.evaluate_for_shape()`. """
+        return self._binary_evaluate(*additive_shape_placeholders(*self.children))
+
     def _binary_simplify(self, left, right):
         """
         See :meth:`pybamm.BinaryOperator._binary_simplify()`.
@@ -307,6 +324,10 @@ class Subtraction(BinaryOperator):
         """ See :meth:`pybamm.BinaryOperator._binary_evaluate()`. """
         return left - right
 
+    def evaluate_for_shape(self):
+        """ See :meth:`pybamm.Symbol.evaluate_for_shape()`. """
+        return self._binary_evaluate(*additive_shape_placeholders(*self.children))
+
     def _binary_simplify(self, left, right):
         """
         See :meth:`pybamm.BinaryOperator._binary_simplify()`.
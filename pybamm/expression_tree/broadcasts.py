@@ -105,7 +105,7 @@ class Broadcast(pybamm.SpatialOperator):
         Returns a vector of NaNs to represent the shape of a Broadcast.
         See :meth:`pybamm.Symbol.evaluate_for_shape_using_domain()`
         """
-        child_eval = self.children[0].evaluate_for_shape()
+        child_eval = self.children[0].shape_placeholder()
         vec = pybamm.evaluate_for_shape_using_domain(self.domain)
 
         if self.broadcast_type == "primary":
@@ -146,7 +146,7 @@ class PrimaryBroadcast(Broadcast):
         Returns a vector of NaNs to represent the shape of a Broadcast.
         See :meth:`pybamm.Symbol.evaluate_for_shape_using_domain()`
         """
-        child_eval = self.children[0].evaluate_for_shape()
+        child_eval = self.children[0].shape_placeholder()
         vec = pybamm.evaluate_for_shape_using_domain(self.domain)
         return np.outer(child_eval, vec).reshape(-1, 1)
 
@@ -178,7 +178,7 @@ class FullBroadcast(Broadcast):
         Returns a vector of NaNs to represent the shape of a Broadcast.
         See :meth:`pybamm.Symbol.evaluate_for_shape_using_domain()`
         """
-        child_eval = self.children[0].evaluate_for_shape()
+        child_eval = self.children[0].shape_placeholder()
         vec = pybamm.evaluate_for_shape_using_domain(
             self.domain, self.auxiliary_domains
         )
@@ -4,7 +4,7 @@
 import copy
 import numpy as np
 import pybamm
-from scipy.sparse import vstack
+from scipy.sparse import csr_matrix, vstack
 from collections import defaultdict
 
 
@@ -52,26 +52,27 @@ class Concatenation(pybamm.Symbol):
         else:
             return self.concatenation_function(children_eval)
 
-    def evaluate(self, t=None, y=None, known_evals=None):
+    def evaluate(self, t=None, y=None, u=None, known_evals=None):
         """ See :meth:`pybamm.Symbol.evaluate()`. """
-        children = self.cached_children
+        children = self.children
         if known_evals is not None:
             if self.id not in known_evals:
                 children_eval = [None] * len(children)
                 for idx, child in enumerate(children):
-                    children_eval[idx], known_evals = child.evaluate(t, y, known_evals)
+                    children_eval[idx], known_evals = child.evaluate(
+                        t, y, u, known_evals
+                    )
                 known_evals[self.id] = self._concatenation_evaluate(children_eval)
             return known_evals[self.id], known_evals
         else:
             children_eval = [None] * len(children)
             for idx, child in enumerate(children):
-                children_eval[idx] = child.evaluate(t, y)
+                children_eval[idx] = child.evaluate(t, y, u)
             return self._concatenation_evaluate(children_eval)
 
-    def new_copy(self):
-        """ See :meth:`pybamm.Symbol.new_copy()`. """
-        new_children = [child.new_copy() for child in self.children]
-        return self._concatenation_new_copy(new_children)
+    def _copy_with_children(self, children):
+        """ See :meth:`pybamm.Symbol._copy_with_children()`. """
+        return self._concatenation_new_copy(children)
 
     def _concatenation_new_copy(self, children):
         """ See :meth:`pybamm.Symbol.new_copy()`. """
@@ -96,7 +97,7 @@ class Concatenation(pybamm.Symbol):
             # Default: use np.concatenate
             concatenation_function = self.concatenation_function or np.concatenate
             return concatenation_function(
-                [child.evaluate_for_shape() for child in self.children]
+                [child.shape_placeholder() for child in self.children]
             )
 
 
@@ -133,7 +134,7 @@ class NumpyConcatenation(Concatenation):
 
     def _concatenation_jac(self, children_jacs):
         """ See :meth:`pybamm.Concatenation.concatenation_jac()`. """
-        children = self.cached_children
+        children = self.children
         if len(children) == 0:
             return pybamm.Scalar(0)
         else:
@@ -214,7 +215,7 @@ class DomainConcatenation(Concatenation):
 
             # create disc of domain => slice for each child
             self._children_slices = [
-                self.create_slices(child) for child in self.cached_children
+                self.create_slices(child) for child in self.children
             ]
         else:
             self._mesh = copy.copy(copy_this._mesh)
@@ -327,3 +328,11 @@ class SparseStack(Concatenation):
         super().__init__(
             *children, name="sparse stack", check_domain=False, concat_fun=vstack
         )
+
+    def evaluate_for_shape(self):
+        """ See :meth:`pybamm.Symbol.evaluate_for_shape` """
+        # the placeholders of the children may be dense, which vstack does not accept
+        # on their own
+        return vstack(
+            [csr_matrix(child.shape_placeholder()) for child in self.children]
+        )
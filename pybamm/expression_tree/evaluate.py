@@ -4,9 +4,37 @@
 import pybamm
 
 # need numpy imported for code generated in EvaluatorPython
-import numpy as np  # noqa: F401
-import scipy.sparse  # noqa: F401
+import autograd.numpy as anp
+import hashlib
+import importlib.util
+import inspect
+import json
+import numbers
+import numpy as np
+import os
+import pickle
+import scipy.sparse
+import re
+import sys
 from collections import OrderedDict
+from .tape import (
+    CONSTANT,
+    TIME,
+    INPUT,
+    STATE,
+    UNARY,
+    BINARY,
+    LINEAR,
+    SCATTER,
+    REDUCE,
+    PPOLY,
+    UNARY_FUNCTIONS,
+    BINARY_OPERATORS,
+    REDUCTIONS,
+)
+
+# numba is optional, and only imported when an EvaluatorNumba is created
+numba_spec = importlib.util.find_spec("numba")
 
 
 def id_to_python_variable(symbol_id, constant=False):
@@ -16,18 +44,18 @@ def id_to_python_variable(symbol_id, constant=False):
     """
 
     if constant:
-        var_format = "self.const_{:05d}"
+        var_format = "const_{:05d}"
     else:
-        var_format = "self.var_{:05d}"
+        var_format = "var_{:05d}"
 
     # Need to replace "-" character to make them valid python variable names
     return var_format.format(symbol_id).replace("-", "m")
 
 
-def find_symbols(symbol, constant_symbols, variable_symbols):
+def find_symbols(symbol, constant_symbols, variable_symbols, known_evals=None):
     """
     This function converts an expression tree to a dictionary of node id's and strings
-    specifying valid python code to calculate that nodes value, given y and t.
+    specifying valid python code to calculate that nodes value, given y, t and u.
 
     The function distinguishes between nodes that represent constant nodes in the tree
     (e.g. a pybamm.Matrix), and those that are variable (e.g. subtrees that contain
@@ -48,29 +76,94 @@ def find_symbols(symbol, constant_symbols, variable_symbols):
         The output dictionary of constant symbol ids to lines of code
 
     variable_symbol: collections.OrderedDict
-        The output dictionary of variable (with y or t) symbol ids to lines of code
+        The output dictionary of variable (with y, t or u) symbol ids to lines of code
+
+    known_evals: dict, optional
+        The values of the nodes of the tree from a dummy evaluation (see
+        :func:`dummy_evaluate`), used to emit only the operation that matches the types
+        (sparse or not) of the children of a node. If not given, the generated code
+        checks the types of the children every time it runs.
 
     """
-    if symbol.is_constant():
-        constant_symbols[symbol.id] = symbol.evaluate()
-        return
-
-    # process children recursively
-    for child in symbol.children:
-        find_symbols(child, constant_symbols, variable_symbols)
-
-    # calculate the variable names that will hold the result of calculating the
-    # children variables
-    children_vars = [
-        id_to_python_variable(child.id, child.is_constant())
-        for child in symbol.children
-    ]
+
+    def children(symbol):
+        # constant subtrees are evaluated as a whole
+        if symbol.is_constant():
+            return []
+        return symbol.children
+
+    def visit(symbol, children_vars):
+        if symbol.is_constant():
+            constant_symbols[symbol.id] = symbol.evaluate()
+            return id_to_python_variable(symbol.id, True)
+        variable_symbols[symbol.id] = symbol_to_python(
+            symbol, children_vars, constant_symbols, known_evals
+        )
+        return id_to_python_variable(symbol.id)
+
+    pybamm.post_order_rewrite(symbol, visit, children=children)
+
+
+def symbol_to_python(symbol, children_vars, constant_symbols, known_evals=None):
+    """
+    Line of python code that calculates the value of a (non-constant) node, given the
+    names of the variables that hold the values of its children. See
+    :func:`find_symbols`.
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol`
+        The node to convert
+    children_vars : list of str
+        The names of the variables holding the values of the children of `symbol`
+    constant_symbols : collections.OrderedDict
+        The dictionary of constant symbol ids to values, which the function handles
+        of :class:`pybamm.Function` nodes are added to
+    known_evals : dict, optional
+        The values of the nodes of the tree from a dummy evaluation (see
+        :func:`find_symbols`)
+
+    Returns
+    -------
+    str
+        The line of code
+    """
+
+    if isinstance(symbol, pybamm.BinaryOperator) and known_evals is not None:
+        # Multiplication, Division and Inner need special handling for scipy sparse
+        # matrices: emit the line for the types of the children
+        left_sparse, right_sparse = [
+            scipy.sparse.issparse(known_evals[child.id]) for child in symbol.children
+        ]
+    else:
+        left_sparse = right_sparse = None
 
     if isinstance(symbol, pybamm.BinaryOperator):
-        # Multiplication and Division need special handling for scipy sparse matrices
-        # TODO: we can pass through a dummy y and t to get the type and then hardcode
-        # the right line, avoiding these checks
-        if isinstance(symbol, pybamm.Multiplication):
+        # Multiplication and Division need special handling for scipy sparse matrices.
+        # If the types of the children are not known, they are checked at run time
+        if isinstance(symbol, pybamm.Multiplication) and left_sparse is not None:
+            if left_sparse:
+                symbol_str = "scipy.sparse.csr_matrix({0}.multiply({1}))"
+            elif right_sparse:
+                symbol_str = "scipy.sparse.csr_matrix({1}.multiply({0}))"
+            else:
+                symbol_str = "{0} * {1}"
+            symbol_str = symbol_str.format(children_vars[0], children_vars[1])
+        elif isinstance(symbol, pybamm.Division) and left_sparse is not None:
+            if left_sparse:
+                symbol_str = "scipy.sparse.csr_matrix({0}.multiply(1/{1}))"
+            else:
+                symbol_str = "{0} / {1}"
+            symbol_str = symbol_str.format(children_vars[0], children_vars[1])
+        elif isinstance(symbol, pybamm.Inner) and left_sparse is not None:
+            if left_sparse:
+                symbol_str = "{0}.multiply({1})"
+            elif right_sparse:
+                symbol_str = "{1}.multiply({0})"
+            else:
+                symbol_str = "{0} * {1}"
+            symbol_str = symbol_str.format(children_vars[0], children_vars[1])
+        elif isinstance(symbol, pybamm.Multiplication):
             symbol_str = (
                 "scipy.sparse.csr_matrix({0}.multiply({1})) "
                 "if scipy.sparse.issparse({0}) else "
@@ -175,27 +268,227 @@ def find_symbols(symbol, constant_symbols, variable_symbols):
     elif isinstance(symbol, pybamm.Time):
         symbol_str = "t"
 
+    # Input parameters are looked up by name in the dictionary of inputs
+    elif isinstance(symbol, pybamm.InputParameter):
+        symbol_str = "u[{!r}]".format(symbol.name)
+
     else:
         raise NotImplementedError(
             "Not implemented for a symbol of type '{}'".format(type(symbol))
         )
 
-    variable_symbols[symbol.id] = symbol_str
+    return symbol_str
+
+
+def dummy_evaluate(symbols):
+    """
+    Evaluate symbols with a dummy state vector (of ones) and dummy inputs, to find the
+    values of all the nodes of their trees. The values are only used for their types
+    (sparse or not), which do not depend on t, y or u.
+
+    Parameters
+    ----------
+    symbols : list of :class:`pybamm.Symbol`
+        The symbols to evaluate
+
+    Returns
+    -------
+    dict or None
+        Dictionary of node ids to values (see :meth:`pybamm.Symbol.evaluate`), or None
+        if the symbols cannot be evaluated
+    """
+    y_size = 0
+    for symbol in symbols:
+        for node in symbol.pre_order():
+            if isinstance(node, pybamm.StateVector):
+                y_size = max(y_size, len(node.evaluation_array))
+    y = np.ones((y_size, 1))
+    known_evals = {}
+    try:
+        with np.errstate(all="ignore"):
+            for symbol in symbols:
+                symbol.evaluate(0, y, "shape test", known_evals)
+    except (NotImplementedError, TypeError, ValueError):
+        # e.g. the tree contains nodes that cannot be evaluated
+        return None
+    return known_evals
+
+
+# names of the variables and constants in the generated code
+python_variable_regex = re.compile(r"\b(?:var|const)_[0-9m]+\b")
 
 
-def to_python(symbol, debug=False):
+def constant_key(value):
+    """
+    Key identifying the value of a constant node, such that constants with equal keys
+    can be replaced by a single constant in the generated code
+    """
+    if scipy.sparse.issparse(value):
+        csr = value.tocsr()
+        return (
+            "sparse",
+            value.format,
+            value.shape,
+            csr.dtype.str,
+            csr.data.tobytes(),
+            csr.indices.tobytes(),
+            csr.indptr.tobytes(),
+        )
+    elif isinstance(value, np.ndarray):
+        return ("array", value.shape, value.dtype.str, value.tobytes())
+    elif isinstance(value, numbers.Number):
+        return ("number", type(value), repr(value))
+    else:
+        # e.g. the function handle of a pybamm.Function
+        return ("object", id(value))
+
+
+def eliminate_common_subexpressions(
+    symbols, constant_values, variable_symbols, report=None
+):
+    """
+    Common subexpression and dead code elimination for the code generated by
+    :func:`find_symbols`. Nodes with different ids can still compute the same value
+    (e.g. identical subtrees with different domains, the same matrix created twice,
+    state vectors that select the same entries of y, or `a + b` and `b + a`), in which
+    case only the first of them is kept and the others refer to it. Lines whose value
+    is not needed to evaluate `symbols` are removed.
+
+    Parameters
+    ----------
+    symbols : list of :class:`pybamm.Symbol`
+        The symbols whose values the generated code evaluates
+    constant_values : collections.OrderedDict
+        Dictionary of constant symbol ids to values, as created by `find_symbols`
+    variable_symbols : collections.OrderedDict
+        Dictionary of variable symbol ids to lines of code, as created by
+        `find_symbols`
+    report : dict, optional
+        If given, filled with the number of lines and constants before and after the
+        elimination, and an estimate of the number of floating point operations saved
+        per evaluation (the number of entries computed by the eliminated lines)
+
+    Returns
+    -------
+    collections.OrderedDict
+        The remaining constants
+    collections.OrderedDict
+        The remaining lines of code. Symbols whose lines were eliminated are assigned
+        the value of the line they duplicate if they are in `symbols`
+    """
+    nodes = {}
+    for symbol in symbols:
+        for node in symbol.pre_order():
+            nodes[node.id] = node
+
+    outputs = [
+        id_to_python_variable(symbol.id, symbol.is_constant()) for symbol in symbols
+    ]
+
+    # merge equal constants, except the outputs, which are returned under their own
+    # names
+    renames = {}
+    constants_by_key = {}
+    unique_constants = OrderedDict()
+    for symbol_id, value in constant_values.items():
+        name = id_to_python_variable(symbol_id, True)
+        key = constant_key(value)
+        if key in constants_by_key and name not in outputs:
+            renames[name] = constants_by_key[key]
+        else:
+            constants_by_key.setdefault(key, name)
+            unique_constants[symbol_id] = value
+
+    def rename(match):
+        return renames.get(match.group(0), match.group(0))
+
+    # merge lines that compute the same value, in order, so that the children of a
+    # line have already been renamed
+    lines_by_key = {}
+    unique_lines = OrderedDict()
+    eliminated = []
+    for symbol_id, line in variable_symbols.items():
+        name = id_to_python_variable(symbol_id)
+        line = python_variable_regex.sub(rename, line)
+        symbol = nodes.get(symbol_id)
+        if isinstance(symbol, (pybamm.Addition, pybamm.Multiplication, pybamm.Inner)):
+            # commutative operators: the order of the children does not matter
+            key = (
+                symbol.__class__,
+                tuple(sorted(set(python_variable_regex.findall(line)))),
+            )
+        elif isinstance(symbol, pybamm.StateVector):
+            # the same entries of y can be selected with evaluation arrays of
+            # different lengths
+            indices = np.flatnonzero(symbol.evaluation_array)
+            key = (pybamm.StateVector, tuple(indices))
+            if (
+                name not in outputs
+                and len(indices) > 0
+                and np.all(np.diff(indices) == 1)
+            ):
+                # select contiguous entries with a slice, which does not copy y
+                line = "y[{}:{}]".format(indices[0], indices[-1] + 1)
+        else:
+            key = line
+        if key in lines_by_key:
+            renames[name] = lines_by_key[key]
+            eliminated.append(symbol_id)
+        else:
+            lines_by_key[key] = name
+            unique_lines[symbol_id] = line
+
+    # symbols whose own line was eliminated take the value of the remaining one
+    for symbol in symbols:
+        if symbol.id not in unique_lines and symbol.id not in unique_constants:
+            name = id_to_python_variable(symbol.id, symbol.is_constant())
+            unique_lines[symbol.id] = renames[name]
+
+    # remove the lines and constants that are not needed
+    live = set(outputs)
+    live_lines = OrderedDict()
+    for symbol_id, line in reversed(list(unique_lines.items())):
+        if id_to_python_variable(symbol_id) in live:
+            live_lines[symbol_id] = line
+            live.update(python_variable_regex.findall(line))
+    live_lines = OrderedDict(reversed(list(live_lines.items())))
+    live_constants = OrderedDict(
+        (symbol_id, value)
+        for symbol_id, value in unique_constants.items()
+        if id_to_python_variable(symbol_id, True) in live
+    )
+
+    if report is not None:
+        report["lines"] = len(variable_symbols)
+        report["lines after elimination"] = len(live_lines)
+        report["constants"] = len(constant_values)
+        report["constants after elimination"] = len(live_constants)
+        report["flops saved"] = int(
+            sum(np.prod(nodes[symbol_id].shape) for symbol_id in eliminated)
+        )
+
+    return live_constants, live_lines
+
+
+def to_python(symbol, debug=False, report=None):
     """
     This function converts an expression tree into a dict of constant input values, and
-    valid python code that acts like the tree's :func:`pybamm.Symbol.evaluate` function
+    valid python code that acts like the tree's :func:`pybamm.Symbol.evaluate` function.
+    The code is optimised by :func:`eliminate_common_subexpressions`.
 
     Parameters
     ----------
-    symbol : :class:`pybamm.Symbol`
-        The symbol to convert to python code
+    symbol : :class:`pybamm.Symbol` or list of :class:`pybamm.Symbol`
+        The symbol to convert to python code. If a list of symbols is given, the code
+        evaluates all of them, and subtrees that they share are only evaluated once
 
     debug : bool
         If set to True, the function also emits debug code
 
+    report : dict, optional
+        If given, filled with the statistics of the common subexpression elimination
+        (see :func:`eliminate_common_subexpressions`)
+
     Returns
     -------
     collections.OrderedDict:
@@ -205,10 +498,20 @@ def to_python(symbol, debug=False):
         valid python code that will evaluate all the variable nodes in the tree.
 
     """
+    symbols = list(symbol) if isinstance(symbol, (list, tuple)) else [symbol]
+
+    # find the types of the nodes, so that the generated code does not need to check
+    # them
+    known_evals = dummy_evaluate(symbols)
 
     constant_values = OrderedDict()
     variable_symbols = OrderedDict()
-    find_symbols(symbol, constant_values, variable_symbols)
+    for sym in symbols:
+        find_symbols(sym, constant_values, variable_symbols, known_evals)
+
+    constant_values, variable_symbols = eliminate_common_subexpressions(
+        symbols, constant_values, variable_symbols, report
+    )
 
     line_format = "{} = {}"
 
@@ -235,13 +538,18 @@ def to_python(symbol, debug=False):
 class EvaluatorPython:
     """
     Converts a pybamm expression tree into pure python code that will calculate the
-    result of calling `evaluate(t, y)` on the given expression tree.
+    result of calling `evaluate(t, y, u)` on the given expression tree. The code is
+    compiled into a function, in which the nodes of the tree are local variables and
+    the constants are global variables.
 
     Parameters
     ----------
 
-    symbol : :class:`pybamm.Symbol`
-        The symbol to convert to python code
+    symbol : :class:`pybamm.Symbol` or list of :class:`pybamm.Symbol`
+        The symbol to convert to python code. If a list of symbols is given (e.g. the
+        rhs and algebraic equations of a model), `evaluate` returns a tuple with the
+        value of each symbol, and subtrees that the symbols share are only evaluated
+        once
 
 
     """
@@ -249,28 +557,102 @@ class EvaluatorPython:
     def __init__(self, symbol):
         constants, self._variable_function = pybamm.to_python(symbol, debug=False)
 
-        # store all the constant symbols in the tree as internal variables of this
-        # object
-        for symbol_id, value in constants.items():
-            setattr(
-                self, id_to_python_variable(symbol_id, True).replace("self.", ""), value
-            )
-
         # calculate the final variable that will output the result of calling `evaluate`
         # on `symbol`
-        self._result_var = id_to_python_variable(symbol.id, symbol.is_constant())
+        if isinstance(symbol, (list, tuple)):
+            self._result_var = "({},)".format(
+                ", ".join(
+                    id_to_python_variable(sym.id, sym.is_constant()) for sym in symbol
+                )
+            )
+        else:
+            self._result_var = id_to_python_variable(symbol.id, symbol.is_constant())
 
-        # compile the generated python code
-        self._variable_compiled = compile(
-            self._variable_function, self._result_var, "exec"
+        # define a function that executes the generated python code, with all the
+        # constant symbols in the tree as global variables
+        lines = self._variable_function.split("\n") if self._variable_function else []
+        lines.append("return " + self._result_var)
+        self.source = "def evaluate(t, y, u):\n" + "\n".join(
+            "    " + line for line in lines
         )
-
-        # compile the line that will return the output of `evaluate`
-        self._return_compiled = compile(
-            self._result_var, "return" + self._result_var, "eval"
+        self.constants = OrderedDict(
+            (id_to_python_variable(symbol_id, True), value)
+            for symbol_id, value in constants.items()
         )
+        self._compile()
 
-    def evaluate(self, t=None, y=None, known_evals=None):
+    def _compile(self):
+        namespace = {"np": np, "scipy": scipy}
+        namespace.update(self.constants)
+        exec(compile(self.source, "EvaluatorPython", "exec"), namespace)
+        self._evaluate = namespace["evaluate"]
+
+    def save(self, directory, name):
+        """
+        Save the evaluator to files in `directory`, from which :meth:`load` recreates
+        it without converting the expression tree again. The source is saved in
+        `name`.py, the constant arrays (dense or sparse) in `name`.npz and any other
+        constants (e.g. functions) are pickled to `name`.pkl, so this raises an error
+        if they cannot be pickled
+        """
+        arrays = {}
+        objects = {}
+        for constant_name, value in self.constants.items():
+            if isinstance(value, np.ndarray) and value.dtype != object:
+                arrays[constant_name] = value
+            elif isinstance(value, (scipy.sparse.csr_matrix, scipy.sparse.csc_matrix)):
+                arrays[constant_name + "__" + value.format] = np.array(value.shape)
+                arrays[constant_name + "__data"] = value.data
+                arrays[constant_name + "__indices"] = value.indices
+                arrays[constant_name + "__indptr"] = value.indptr
+            else:
+                objects[constant_name] = value
+        # pickle first, as it is the step that can fail
+        with open(os.path.join(directory, name + ".pkl"), "wb") as f:
+            _ConstantsPickler(f, pickle.HIGHEST_PROTOCOL).dump(
+                (list(self.constants.keys()), objects)
+            )
+        np.savez(os.path.join(directory, name + ".npz"), **arrays)
+        with open(os.path.join(directory, name + ".py"), "w") as f:
+            f.write(self.source)
+
+    @classmethod
+    def load(cls, directory, name):
+        """
+        Load an evaluator saved by :meth:`save`
+        """
+        with open(os.path.join(directory, name + ".pkl"), "rb") as f:
+            constant_names, objects = _ConstantsUnpickler(f).load()
+        with np.load(os.path.join(directory, name + ".npz")) as arrays:
+            arrays = dict(arrays)
+        with open(os.path.join(directory, name + ".py")) as f:
+            source = f.read()
+
+        constants = OrderedDict()
+        for constant_name in constant_names:
+            if constant_name in objects:
+                constants[constant_name] = objects[constant_name]
+            elif constant_name in arrays:
+                constants[constant_name] = arrays[constant_name]
+            else:
+                matrix_format = "csr" if constant_name + "__csr" in arrays else "csc"
+                matrix_class = getattr(scipy.sparse, matrix_format + "_matrix")
+                constants[constant_name] = matrix_class(
+                    (
+                        arrays[constant_name + "__data"],
+                        arrays[constant_name + "__indices"],
+                        arrays[constant_name + "__indptr"],
+                    ),
+                    shape=tuple(arrays[constant_name + "__" + matrix_format]),
+                )
+
+        evaluator = cls.__new__(cls)
+        evaluator.source = source
+        evaluator.constants = constants
+        evaluator._compile()
+        return evaluator
+
+    def evaluate(self, t=None, y=None, u=None, known_evals=None):
         """
         Acts as a drop-in replacement for :func:`pybamm.Symbol.evaluate`
         """
@@ -278,11 +660,468 @@ class EvaluatorPython:
         if y is not None and y.ndim == 1:
             y = y.reshape(-1, 1)
 
-        # execute code
-        exec(self._variable_compiled)
+        result = self._evaluate(t, y, u)
+
+        # don't need known_evals, but need to reproduce Symbol.evaluate signature
+        if known_evals is not None:
+            return result, known_evals
+        else:
+            return result
+
+
+class _ConstantsPickler(pickle.Pickler):
+    """
+    Pickles the constants of an :class:`EvaluatorPython`, including the numpy
+    functions wrapped by autograd (which cannot be pickled by their qualified name),
+    as references to the functions of autograd.numpy
+    """
+
+    def persistent_id(self, obj):
+        if getattr(obj, "_is_autograd_primitive", False):
+            if getattr(anp, obj.__name__, None) is obj:
+                return obj.__name__
+        return None
+
+
+class _ConstantsUnpickler(pickle.Unpickler):
+    def persistent_load(self, name):
+        return getattr(anp, name)
+
+
+def have_numba():
+    return numba_spec is not None
+
+
+# templates of the code evaluating an entry of a tape instruction, given the entries of
+# its operands
+_unary_templates = {name: "np." + name + "({})" for name in UNARY_FUNCTIONS}
+_unary_templates.update({"identity": "{}", "negative": "-{}", "absolute": "abs({})"})
+_binary_templates = {
+    "add": "{} + {}",
+    "subtract": "{} - {}",
+    "multiply": "{} * {}",
+    "divide": "{} / {}",
+    "power": "{} ** {}",
+}
+
+
+def _evaluate_ppoly(c, offset, x):
+    """
+    Evaluate the piecewise polynomial stored in `c` from `offset`, in the format used
+    by the tape (number of intervals, order, extrapolate, breakpoints, coefficients)
+    """
+    number_of_intervals = int(c[offset])
+    order = int(c[offset + 1])
+    breakpoints = offset + 3
+    coefficients = breakpoints + number_of_intervals + 1
+    if c[offset + 2] == 0 and (
+        x < c[breakpoints] or x > c[breakpoints + number_of_intervals]
+    ):
+        return np.nan
+    # find the last interval starting at or before x, by bisection
+    low = 0
+    high = number_of_intervals - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if c[breakpoints + middle] <= x:
+            low = middle
+        else:
+            high = middle - 1
+    dx = x - c[breakpoints + low]
+    result = 0.0
+    for m in range(order):
+        result = result * dx + c[coefficients + m * number_of_intervals + low]
+    return result
+
+
+class EvaluatorNumba:
+    """
+    Compiles a pybamm expression tree with numba, into a function that will calculate
+    the result of calling `evaluate(t, y, u)` on the given expression tree.
+
+    The tree is first lowered to a :class:`pybamm.Tape`, in which sparse values (e.g. a
+    jacobian) have a fixed sparsity pattern. Each instruction of the tape is then
+    written as a loop over the entries of its result: the product of a sparse matrix
+    and a vector becomes a loop over the nonzero entries of the matrix, and chains of
+    elementwise operations whose intermediate results are not used anywhere else are
+    fused into a single loop. The function is compiled when it is first evaluated.
+
+    Parameters
+    ----------
+
+    symbol : :class:`pybamm.Symbol` or list of :class:`pybamm.Symbol`
+        The symbol to compile. If a list of symbols is given, `evaluate` returns a
+        tuple with the value of each symbol, as for :class:`EvaluatorPython`
+
+    """
+
+    block_size = 50
+
+    def __init__(self, symbol):
+        if not have_numba():
+            raise ImportError("numba is not installed")
+
+        self._is_list = isinstance(symbol, (list, tuple))
+        symbols = list(symbol) if self._is_list else [symbol]
+        self.tape = pybamm.Tape(symbols)
+        self.source = self._generate_source()
+        self._uses_ppoly = bool(PPOLY in self.tape.instructions[:, 0])
+        self.indices = self.tape.indices
+        self.input_names = list(self.tape.input_names)
+        self._outputs = [
+            (output_type, pattern.shape, pattern.indptr, pattern.indices)
+            for output_type, pattern in zip(
+                self.tape._output_types, self.tape.output_patterns
+            )
+        ]
+        self._compile()
+
+    def _compile(self, filename=None):
+        """
+        Compile the generated source, or the module in `filename` (see :meth:`save`),
+        in which case numba also caches the compiled functions next to the module
+        """
+        import numba
+
+        if filename is None:
+            namespace = {"np": np}
+            exec(compile(self.source, "EvaluatorNumba", "exec"), namespace)
+            if self._uses_ppoly:
+                namespace["_evaluate_ppoly"] = _evaluate_ppoly
+        else:
+            # numba's cache refers to the functions by the name of their module, so
+            # the module is registered under a name that is unique to its file
+            module_name = "pybamm_evaluator_numba_{}".format(
+                hashlib.blake2b(os.path.abspath(filename).encode()).hexdigest()[:16]
+            )
+            spec = importlib.util.spec_from_file_location(module_name, filename)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+            namespace = module.__dict__
+        jit = numba.njit(error_model="numpy", cache=filename is not None)
+        if self._uses_ppoly:
+            namespace["_evaluate_ppoly"] = jit(namespace["_evaluate_ppoly"])
+        for number in range(self.number_of_blocks):
+            name = "block_{}".format(number)
+            namespace[name] = jit(namespace[name])
+        self._evaluate = jit(namespace["evaluate"])
+
+    def save(self, directory, name):
+        """
+        Save the evaluator to files in `directory`, from which :meth:`load` recreates
+        it: the generated code is saved as a module in `name`.py, the constants and
+        indices in `name`.npz and the description of the outputs in `name`.json
+        """
+        arrays = {"constants": self.constants, "indices": self.indices}
+        outputs = []
+        for number, (output_type, shape, indptr, indices) in enumerate(self._outputs):
+            outputs.append([output_type, list(shape)])
+            arrays["indptr_{}".format(number)] = indptr
+            arrays["indices_{}".format(number)] = indices
+        np.savez(os.path.join(directory, name + ".npz"), **arrays)
+        with open(os.path.join(directory, name + ".json"), "w") as f:
+            json.dump(
+                {
+                    "is_list": self._is_list,
+                    "input_names": self.input_names,
+                    "outputs": outputs,
+                    "number_of_blocks": self.number_of_blocks,
+                    "uses_ppoly": self._uses_ppoly,
+                },
+                f,
+            )
+        module = ["import numpy as np", "", ""]
+        if self._uses_ppoly:
+            module += [inspect.getsource(_evaluate_ppoly), ""]
+        with open(os.path.join(directory, name + ".py"), "w") as f:
+            f.write("\n".join(module) + self.source + "\n")
+
+    @classmethod
+    def load(cls, directory, name):
+        """
+        Load an evaluator saved by :meth:`save`. The functions are compiled from the
+        saved module, so numba reuses the compiled code that it cached next to the
+        module when the evaluator was first used
+        """
+        with open(os.path.join(directory, name + ".json")) as f:
+            metadata = json.load(f)
+        with np.load(os.path.join(directory, name + ".npz")) as arrays:
+            arrays = dict(arrays)
+        filename = os.path.join(directory, name + ".py")
+        with open(filename) as f:
+            source = f.read()
+
+        evaluator = cls.__new__(cls)
+        evaluator._is_list = metadata["is_list"]
+        evaluator.input_names = metadata["input_names"]
+        evaluator.number_of_blocks = metadata["number_of_blocks"]
+        evaluator._uses_ppoly = metadata["uses_ppoly"]
+        evaluator.source = source
+        evaluator.constants = arrays["constants"]
+        evaluator.indices = arrays["indices"]
+        evaluator._outputs = [
+            (
+                output_type,
+                tuple(shape),
+                arrays["indptr_{}".format(number)],
+                arrays["indices_{}".format(number)],
+            )
+            for number, (output_type, shape) in enumerate(metadata["outputs"])
+        ]
+        evaluator._compile(filename)
+        return evaluator
+
+    def _generate_source(self):
+        """Write the instructions of the tape as python code that numba can compile"""
+        tape = self.tape
+        instructions = tape.instructions
+        sizes = tape.register_sizes
+
+        # The registers are stored in the work array `w`, and the constant registers
+        # (and the coefficients of the instructions) in the array `c`. Each register
+        # is followed by a zero slot, as in the tape
+        self._locations = {}
+        self._coefficient_offsets = {}
+        constants = []
+        work_size = 0
+        constants_size = 0
+        for opcode, out, a, _, n, i0, _, c0, parameter in instructions:
+            if opcode == CONSTANT:
+                self._locations[out] = ("c", constants_size)
+                constants.append(tape.coefficients[c0 : c0 + n])
+                constants.append(np.zeros(1))
+                constants_size += n + 1
+            elif (
+                opcode == UNARY
+                and UNARY_FUNCTIONS[parameter] == "identity"
+                and n == sizes[a]
+                and self._index(i0, n) == ("contiguous", 0)
+            ):
+                # a copy of a whole register, which can be read in place
+                self._locations[out] = self._locations[a]
+            else:
+                if out not in self._locations:
+                    self._locations[out] = ("w", work_size)
+                    work_size += sizes[out] + 1
+                if c0 >= 0:
+                    if opcode == LINEAR:
+                        number_of_coefficients = n
+                    else:
+                        # piecewise polynomial
+                        intervals, order = tape.coefficients[c0 : c0 + 2].astype(int)
+                        number_of_coefficients = 4 + intervals * (order + 1)
+                    self._coefficient_offsets[c0] = constants_size
+                    constants.append(
+                        tape.coefficients[c0 : c0 + number_of_coefficients]
+                    )
+                    constants_size += number_of_coefficients
+        self.constants = np.concatenate([np.zeros(0)] + constants)
+
+        # The result of an elementwise instruction is fused into the instruction that
+        # uses it if that is its only use, and that instruction reads it entry by entry
+        uses = {}
+        read_entrywise = set()
+        for opcode, out, a, b, n, i0, i1, _, _ in instructions:
+            if opcode not in [UNARY, BINARY, LINEAR, SCATTER, REDUCE, PPOLY]:
+                continue
+            operands = [(a, i0), (b, i1)] if opcode == BINARY else [(a, i0)]
+            for register, index in operands:
+                uses[register] = uses.get(register, 0) + 1
+                if (
+                    opcode in [UNARY, BINARY]
+                    and self._locations[out] != self._locations[register]
+                    and n == sizes[register]
+                    and self._index(index, n) == ("contiguous", 0)
+                ):
+                    read_entrywise.add(register)
+        for register in tape.outputs:
+            uses[register] = uses.get(register, 0) + 1
+            read_entrywise.discard(register)
+        self._fused = {}
+
+        statements = []
+        for opcode, out, a, b, n, i0, i1, c0, parameter in instructions:
+            if opcode == CONSTANT:
+                continue
+            elif opcode == TIME:
+                statements.append(["{} = t".format(self._entry(out, ("constant", 0)))])
+            elif opcode == INPUT:
+                statements.append(
+                    ["{} = u[{}]".format(self._entry(out, ("constant", 0)), parameter)]
+                )
+            elif opcode in [STATE, UNARY, BINARY]:
+                if self._locations[out] == self._locations.get(a) and opcode == UNARY:
+                    # copy read in place
+                    continue
+                elif opcode == STATE:
+                    value = "y[{}]".format(_address(0, self._index(i0, n)))
+                elif opcode == UNARY:
+                    value = _unary_templates[UNARY_FUNCTIONS[parameter]].format(
+                        self._operand(a, i0, n)
+                    )
+                else:
+                    value = _binary_templates[BINARY_OPERATORS[parameter]].format(
+                        self._operand(a, i0, n), self._operand(b, i1, n)
+                    )
+                if uses.get(out) == 1 and out in read_entrywise:
+                    self._fused[out] = value
+                else:
+                    statements.append(
+                        _loop(
+                            n,
+                            "{} = {}".format(
+                                self._entry(out, ("contiguous", 0)), value
+                            ),
+                        )
+                    )
+            elif opcode == LINEAR:
+                # loop over the nonzero entries of the matrix
+                coefficients = ("contiguous", self._coefficient_offsets[c0])
+                statements.append(
+                    _loop(
+                        n,
+                        "{} += c[{}] * {}".format(
+                            self._entry(out, self._index(i1, n)),
+                            _address(0, coefficients),
+                            self._entry(a, self._index(i0, n)),
+                        ),
+                    )
+                )
+            elif opcode == SCATTER:
+                statements.append(
+                    _loop(
+                        n,
+                        "{} = {}".format(
+                            self._entry(out, self._index(i1, n)),
+                            self._entry(a, self._index(i0, n)),
+                        ),
+                    )
+                )
+            elif opcode == REDUCE:
+                index = self._index(i0, n)
+                statements.append(
+                    ["acc = " + self._entry(a, index, k="0")]
+                    + _loop(
+                        n,
+                        "acc = {}(acc, {})".format(
+                            REDUCTIONS[parameter], self._entry(a, index)
+                        ),
+                        start=1,
+                    )
+                    + ["{} = acc".format(self._entry(out, ("constant", 0)))]
+                )
+            elif opcode == PPOLY:
+                statements.append(
+                    _loop(
+                        n,
+                        "{} = _evaluate_ppoly(c, {}, {})".format(
+                            self._entry(out, ("contiguous", 0)),
+                            self._coefficient_offsets[c0],
+                            self._entry(a, self._index(i0, n)),
+                        ),
+                    )
+                )
+
+        # numba's compilation time grows faster than linearly with the length of a
+        # function, so the statements are split into blocks of about `block_size`
+        # lines, each compiled as a separate function
+        blocks = [[]]
+        for statement in statements:
+            if len(blocks[-1]) >= self.block_size:
+                blocks.append([])
+            blocks[-1].extend(statement)
+        self.number_of_blocks = len(blocks)
+        source = []
+        evaluate = [
+            "def evaluate(t, y, u, I, c):",
+            "    w = np.zeros({})".format(work_size),
+        ]
+        for number, block in enumerate(blocks):
+            source.append("def block_{}(t, y, u, I, c, w):".format(number))
+            source += ["    " + line for line in block] + ["    return"]
+            evaluate.append("    block_{}(t, y, u, I, c, w)".format(number))
+
+        outputs = []
+        for register in tape.outputs:
+            array, offset = self._locations[register]
+            outputs.append(
+                "{}[{}:{}].copy()".format(array, offset, offset + sizes[register])
+            )
+        evaluate.append("    return ({},)".format(", ".join(outputs)))
+        return "\n".join(source + evaluate)
+
+    def _index(self, offset, n):
+        """
+        Describe the index array of length n starting at `offset` in the indices of
+        the tape, so that contiguous and constant indices can be written directly
+        """
+        indices = self.tape.indices[offset : offset + n]
+        if n > 0 and np.array_equal(indices, indices[0] + np.arange(n)):
+            return ("contiguous", indices[0])
+        elif n > 0 and np.all(indices == indices[0]):
+            return ("constant", indices[0])
+        return ("indices", offset)
+
+    def _entry(self, register, index, k="k"):
+        """Code reading (or writing) an entry of a register"""
+        array, offset = self._locations[register]
+        return "{}[{}]".format(array, _address(offset, index, k))
+
+    def _operand(self, register, offset, n):
+        """Code reading an operand of an elementwise instruction"""
+        if register in self._fused:
+            return "(" + self._fused[register] + ")"
+        return self._entry(register, self._index(offset, n))
+
+    def evaluate(self, t=None, y=None, u=None, known_evals=None):
+        """
+        Acts as a drop-in replacement for :func:`pybamm.Symbol.evaluate`
+        """
+        t = np.nan if t is None else float(t)
+        y = np.zeros(0) if y is None else np.ascontiguousarray(y, dtype=float)
+        inputs = np.array([u[name] for name in self.input_names], dtype=float)
+        data = self._evaluate(t, y.reshape(-1), inputs, self.indices, self.constants)
+        result = [
+            _output_value(output_data, *output)
+            for output_data, output in zip(data, self._outputs)
+        ]
+        result = tuple(result) if self._is_list else result[0]
 
         # don't need known_evals, but need to reproduce Symbol.evaluate signature
         if known_evals is not None:
-            return eval(self._return_compiled), known_evals
+            return result, known_evals
         else:
-            return eval(self._return_compiled)
+            return result
+
+
+def _output_value(data, output_type, shape, indptr, indices):
+    """Value of an output of an :class:`EvaluatorNumba`, given its entries"""
+    if output_type == "sparse":
+        return scipy.sparse.csr_matrix((data, indices, indptr), shape=shape)
+    elif output_type == "number":
+        return data[0]
+    else:
+        return data.reshape(shape)
+
+
+def _address(offset, index, k="k"):
+    """
+    Code for the position of the k-th entry of an index (see EvaluatorNumba._index)
+    in an array, starting at `offset`
+    """
+    kind, value = index
+    if kind == "contiguous":
+        return "{} + {}".format(offset + value, k) if offset + value else k
+    elif kind == "constant":
+        return str(offset + value)
+    elif offset:
+        return "{} + I[{} + {}]".format(offset, value, k)
+    return "I[{} + {}]".format(value, k)
+
+
+def _loop(n, line, start=0):
+    if n == 1 and start == 0:
+        return [re.sub(r"\bk\b", "0", line)]
+    loop_range = "{}, {}".format(start, n) if start else str(n)
+    return ["for k in range({}):".format(loop_range), "    " + line]
@@ -2,11 +2,75 @@
 # Function classes and methods
 #
 import autograd
+import autograd.numpy as anp
 import numpy as np
 import pybamm
 from inspect import signature
 
 
+class _ElementwiseGrad(object):
+    """
+    The elementwise derivative of a function with respect to its `argnum`-th argument,
+    computed by autograd. Unlike the function returned by
+    :func:`autograd.elementwise_grad`, it can be pickled, e.g. to save an evaluator
+    (see :meth:`pybamm.EvaluatorPython.save`)
+    """
+
+    def __init__(self, function, argnum=0):
+        self.function = function
+        self.argnum = argnum
+        self._grad = autograd.elementwise_grad(function, argnum)
+        self.__name__ = self._grad.__name__
+
+    def __call__(self, *args):
+        return self._grad(*args)
+
+    def __reduce__(self):
+        return (self.__class__, (self.function, self.argnum))
+
+
+# Closed-form partial derivatives of functions, indexed by function. Each entry is a
+# tuple with, for each argument of the function, a function that takes the children
+# of a Function node and returns the symbol of the partial derivative (or None)
+_derivatives = {}
+
+
+def register_derivative(function, *derivatives):
+    """
+    Declare the derivatives of a function (e.g. a function from a parameter set), so
+    that a :class:`pybamm.Function` of `function` is differentiated by calling these
+    derivatives, instead of differentiating `function` with autograd every time the
+    derivative is evaluated.
+
+    **Example**
+
+    >>> import pybamm
+    >>> def ocp(sto):
+    ...     return 4 - sto ** 2
+    >>> def ocp_derivative(sto):
+    ...     return -2 * sto
+    >>> pybamm.register_derivative(ocp, ocp_derivative)
+    >>> sto = pybamm.Scalar(3)
+    >>> pybamm.Function(ocp, sto).diff(sto).evaluate()
+    -6.0
+
+    Parameters
+    ----------
+    function : callable
+        The function whose derivatives are declared
+    derivatives : callable or None
+        The partial derivatives of `function` with respect to each of its arguments,
+        in order. Each derivative takes the same arguments as `function`. Arguments
+        whose derivative is None (or not given) are differentiated with autograd
+    """
+    _derivatives[function] = tuple(
+        None
+        if derivative is None
+        else (lambda *children, d=derivative: Function(d, *children))
+        for derivative in derivatives
+    )
+
+
 class Function(pybamm.Symbol):
     """A node in the expression tree representing an arbitrary function
 
@@ -14,8 +78,8 @@ class Function(pybamm.Symbol):
     ----------
     function : method
         A function can have 0 or many inputs. If no inputs are given, self.evaluate()
-        simply returns func(). Otherwise, self.evaluate(t, y) returns
-        func(child0.evaluate(t, y), child1.evaluate(t, y), etc).
+        simply returns func(). Otherwise, self.evaluate(t, y, u) returns
+        func(child0.evaluate(t, y, u), child1.evaluate(t, y, u), etc).
     children : :class:`pybamm.Symbol`
         The children nodes to apply the function to
     derivative : str, optional
@@ -54,6 +118,22 @@ class Function(pybamm.Symbol):
             auxiliary_domains=auxiliary_domains,
         )
 
+    def set_id(self):
+        """See :meth:`pybamm.Symbol.set_id()`."""
+        # The id must depend on the function, since nodes of different functions can
+        # have the same name
+        self._id = pybamm.stable_hash(
+            (
+                self.__class__,
+                self.name,
+                self.function,
+                self.derivative,
+            )
+            + tuple([child.id for child in self.children])
+            + tuple(self.domain)
+            + tuple([(k, tuple(v)) for k, v in self.auxiliary_domains.items()])
+        )
+
     def get_children_domains(self, children_list):
         """Obtains the unique domain of the children. If the
         children have different domains then raise an error"""
@@ -82,10 +162,12 @@ class Function(pybamm.Symbol):
             children = self.orphans
             partial_derivatives = [None] * len(children)
             for i, child in enumerate(self.children):
-                # if variable appears in the function,use autograd to differentiate
-                # function, and apply chain rule
+                # if variable appears in the function, differentiate the function
+                # with respect to this child, and apply chain rule
                 if variable.id in [symbol.id for symbol in child.pre_order()]:
-                    partial_derivatives[i] = self._diff(children) * child.diff(variable)
+                    partial_derivatives[i] = self._function_diff(
+                        children, i
+                    ) * child.diff(variable)
 
             # remove None entries
             partial_derivatives = list(filter(None, partial_derivatives))
@@ -98,8 +180,23 @@ class Function(pybamm.Symbol):
 
     def _diff(self, children):
         """ See :meth:`pybamm.Symbol._diff()`. """
+        return self._function_diff(children, 0)
+
+    def _function_diff(self, children, idx):
+        """
+        Derivative of the function with respect to its `idx`-th argument, applied to
+        `children`. Closed-form derivatives (see :func:`pybamm.register_derivative`)
+        are used if they are known, and autograd otherwise.
+        """
         if self.derivative == "autograd":
-            return Function(autograd.elementwise_grad(self.function), *children)
+            try:
+                derivative = _derivatives[self.function][idx]
+            except (KeyError, IndexError, TypeError):
+                # TypeError: the function cannot be hashed
+                derivative = None
+            if derivative is not None:
+                return derivative(*children)
+            return Function(_ElementwiseGrad(self.function, idx), *children)
         elif self.derivative == "derivative":
             # keep using "derivative" as derivative
             return pybamm.Function(
@@ -118,7 +215,7 @@ class Function(pybamm.Symbol):
             children = self.orphans
             for i, child in enumerate(children):
                 if not child.evaluates_to_number():
-                    jac_fun = self._diff(children) * children_jacs[i]
+                    jac_fun = self._function_diff(children, i) * children_jacs[i]
                     jac_fun.domain = []
                     if jacobian is None:
                         jacobian = jac_fun
@@ -127,19 +224,19 @@ class Function(pybamm.Symbol):
 
         return jacobian
 
-    def evaluate(self, t=None, y=None, known_evals=None):
+    def evaluate(self, t=None, y=None, u=None, known_evals=None):
         """ See :meth:`pybamm.Symbol.evaluate()`. """
         if known_evals is not None:
             if self.id not in known_evals:
                 evaluated_children = [None] * len(self.children)
                 for i, child in enumerate(self.children):
                     evaluated_children[i], known_evals = child.evaluate(
-                        t, y, known_evals
+                        t, y, u, known_evals
                     )
                 known_evals[self.id] = self._function_evaluate(evaluated_children)
             return known_evals[self.id], known_evals
         else:
-            evaluated_children = [child.evaluate(t, y) for child in self.children]
+            evaluated_children = [child.evaluate(t, y, u) for child in self.children]
             return self._function_evaluate(evaluated_children)
 
     def evaluate_for_shape(self):
@@ -147,7 +244,7 @@ class Function(pybamm.Symbol):
         Default behaviour: has same shape as all child
         See :meth:`pybamm.Symbol.evaluate_for_shape()`
         """
-        evaluated_children = [child.evaluate_for_shape() for child in self.children]
+        evaluated_children = [child.shape_placeholder() for child in self.children]
         return self._function_evaluate(evaluated_children)
 
     def _function_evaluate(self, evaluated_children):
@@ -156,10 +253,9 @@ class Function(pybamm.Symbol):
         else:
             return self.function(*evaluated_children)
 
-    def new_copy(self):
-        """ See :meth:`pybamm.Symbol.new_copy()`. """
-        children_copy = [child.new_copy() for child in self.children]
-        return self._function_new_copy(children_copy)
+    def _copy_with_children(self, children):
+        """ See :meth:`pybamm.Symbol._copy_with_children()`. """
+        return self._function_new_copy(children)
 
     def _function_new_copy(self, children):
         """Returns a new copy of the function.
@@ -228,6 +324,10 @@ class SpecificFunction(Function):
         """ See :meth:`pybamm.Function._function_new_copy()` """
         return self.__class__(*children)
 
+    def _function_diff(self, children, idx):
+        """ See :meth:`pybamm.Function._function_diff()` """
+        return self._diff(children)
+
     def _function_simplify(self, simplified_children):
         """ See :meth:`pybamm.Function._function_simplify()` """
         return self.__class__(*simplified_children)
@@ -337,3 +437,29 @@ class Sinh(SpecificFunction):
 def sinh(child):
     " Returns hyperbolic sine function of child. "
     return Sinh(child)
+
+
+def _register_numpy_derivative(name, derivative):
+    """
+    Register the closed-form derivative of a numpy function (and of its autograd
+    version), as a function of the child of a :class:`pybamm.Function`
+    """
+    for module in [np, anp]:
+        _derivatives[getattr(module, name)] = (derivative,)
+
+
+_register_numpy_derivative("exp", lambda x: exp(x))
+_register_numpy_derivative("log", lambda x: 1 / x)
+_register_numpy_derivative("log10", lambda x: 1 / (x * np.log(10)))
+_register_numpy_derivative("sin", lambda x: cos(x))
+_register_numpy_derivative("cos", lambda x: -sin(x))
+_register_numpy_derivative("tan", lambda x: 1 + Function(np.tan, x) ** 2)
+_register_numpy_derivative("sinh", lambda x: cosh(x))
+_register_numpy_derivative("cosh", lambda x: sinh(x))
+_register_numpy_derivative("tanh", lambda x: 1 - Function(np.tanh, x) ** 2)
+_register_numpy_derivative("arcsinh", lambda x: 1 / Function(np.sqrt, x ** 2 + 1))
+_register_numpy_derivative("arctan", lambda x: 1 / (x ** 2 + 1))
+_register_numpy_derivative("sqrt", lambda x: 1 / (2 * Function(np.sqrt, x)))
+_register_numpy_derivative("abs", lambda x: Function(np.sign, x))
+_register_numpy_derivative("absolute", lambda x: Function(np.sign, x))
+_register_numpy_derivative("sign", lambda x: pybamm.Scalar(0))
@@ -0,0 +1,64 @@
+#
+# Interning (hash-consing) of expression tree nodes
+#
+import weakref
+
+
+class InternTable(object):
+    """
+    Table of expression tree nodes, indexed by their ids, used to share structurally
+    identical subexpressions: when interning is on (see :attr:`pybamm.settings`), a
+    node that is created with a child that has the same id as a node of the table is
+    given the node of the table instead, so that identical subexpressions (e.g. the
+    same parameter combinations, built by different submodels) are stored once.
+
+    The table only holds weak references, so that the nodes that are no longer used
+    are freed.
+
+    **Example**
+
+    >>> import pybamm
+    >>> pybamm.settings.intern_table = pybamm.InternTable()
+    >>> a = pybamm.Parameter("a") + 1
+    >>> b = pybamm.Parameter("a") + 1
+    >>> (2 * a).children[1] is (2 * b).children[1]
+    True
+    >>> pybamm.settings.intern_table = None
+
+    Attributes
+    ----------
+    hits : int
+        Number of nodes that were replaced by a (shared) node of the table
+    misses : int
+        Number of nodes that were added to the table
+    """
+
+    def __init__(self):
+        self._symbols = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def intern(self, symbol):
+        """
+        Return the node of the table with the same id as `symbol`, or add `symbol`
+        to the table (and return it) if there is no such node
+        """
+        try:
+            existing = self._symbols[symbol.id]
+        except KeyError:
+            self._symbols[symbol.id] = symbol
+            self.misses += 1
+            return symbol
+        if existing is not symbol:
+            self.hits += 1
+        return existing
+
+    def __len__(self):
+        """Number of nodes in the table"""
+        return len(self._symbols)
+
+    def clear(self):
+        """Remove all the nodes from the table and reset the counters"""
+        self._symbols.clear()
+        self.hits = 0
+        self.misses = 0
@@ -5,14 +5,38 @@ import pybamm
 
 
 class Jacobian(object):
+    """
+    Calculate Jacobians of expression trees, storing the Jacobians of all the nodes
+    so that subtrees that are shared (within a tree, or between the trees that are
+    differentiated with the same object, e.g. the equations of a model) are only
+    differentiated once.
+
+    Parameters
+    ----------
+    known_jacs : dict, optional
+        Dictionary of node ids to known Jacobians, which is updated with the new
+        Jacobians
+
+    Attributes
+    ----------
+    hits : int
+        Number of times that the Jacobian of a node was found in the known Jacobians
+        instead of being calculated
+    misses : int
+        Number of Jacobians of nodes that were calculated
+    """
+
     def __init__(self, known_jacs=None):
-        self._known_jacs = known_jacs or {}
+        self._known_jacs = {} if known_jacs is None else known_jacs
+        self.hits = 0
+        self.misses = 0
 
     def jac(self, symbol, variable):
         """
-        This function recurses down the tree, computing the Jacobian using
-        the Jacobians defined in classes derived from pybamm.Symbol. E.g. the
-        Jacobian of a 'pybamm.Multiplication' is computed via the product rule.
+        This function goes down the tree (see :func:`pybamm.post_order_rewrite`),
+        computing the Jacobian using the Jacobians defined in classes derived from
+        pybamm.Symbol. E.g. the Jacobian of a 'pybamm.Multiplication' is computed via
+        the product rule.
         If the Jacobian of a symbol has already been calculated, the stored value
         is returned.
         Note: The Jacobian is the derivative of a symbol with respect to a (slice of)
@@ -31,21 +55,26 @@ class Jacobian(object):
             Symbol representing the Jacobian
         """
 
-        try:
-            return self._known_jacs[symbol.id]
-        except KeyError:
-            jac = self._jac(symbol, variable)
-            self._known_jacs[symbol.id] = jac
-            return jac
+        # looking up the Jacobian of the symbol
+        self.hits += 1
+        return pybamm.post_order_rewrite(
+            symbol,
+            lambda symbol, children_jacs: self._jac(symbol, variable, children_jacs),
+            self._known_jacs,
+        )
 
-    def _jac(self, symbol, variable):
-        """ See :meth:`Jacobian.jac()`. """
+    def _jac(self, symbol, variable, children_jacs):
+        """
+        See :meth:`Jacobian.jac()`. `children_jacs` are the Jacobians of the
+        children of `symbol`.
+        """
+        # Each Jacobian that is calculated is the first lookup of that Jacobian
+        # (in jac, or by its parent), and all the other lookups are hits
+        self.misses += 1
+        self.hits += len(children_jacs) - 1
 
         if isinstance(symbol, pybamm.BinaryOperator):
-            left, right = symbol.children
-            # process children
-            left_jac = self.jac(left, variable)
-            right_jac = self.jac(right, variable)
+            left_jac, right_jac = children_jacs
             # Need to treat outer differently. If the left child of an Outer
             # evaluates to number then we need to return a matrix of zeros
             # of the correct size, which requires variable.evaluation_array
@@ -57,19 +86,14 @@ class Jacobian(object):
                 jac = symbol._binary_jac(left_jac, right_jac)
 
         elif isinstance(symbol, pybamm.UnaryOperator):
-            child_jac = self.jac(symbol.child, variable)
             # _unary_jac defined in derived classes for specific rules
-            jac = symbol._unary_jac(child_jac)
+            jac = symbol._unary_jac(children_jacs[0])
 
         elif isinstance(symbol, pybamm.Function):
-            children_jacs = [None] * len(symbol.children)
-            for i, child in enumerate(symbol.children):
-                children_jacs[i] = self.jac(child, variable)
             # _function_jac defined in function class
             jac = symbol._function_jac(children_jacs)
 
         elif isinstance(symbol, pybamm.Concatenation):
-            children_jacs = [child.jac(variable) for child in symbol.cached_children]
             jac = symbol._concatenation_jac(children_jacs)
 
         else:
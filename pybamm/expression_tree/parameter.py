@@ -68,10 +68,11 @@ class FunctionParameter(pybamm.Symbol):
 
     def set_id(self):
         """See :meth:`pybamm.Symbol.set_id` """
-        self._id = hash(
+        self._id = pybamm.stable_hash(
             (self.__class__, self.name, self.diff_variable)
             + tuple([child.id for child in self.children])
             + tuple(self.domain)
+            + tuple([(k, tuple(v)) for k, v in self.auxiliary_domains.items()])
         )
 
     def get_children_domains(self, children_list):
@@ -99,9 +100,9 @@ class FunctionParameter(pybamm.Symbol):
         # when the parameters are set
         return FunctionParameter(self.name, *self.orphans, diff_variable=variable)
 
-    def new_copy(self):
-        """ See :meth:`pybamm.Symbol.new_copy()`. """
-        return self._function_parameter_new_copy(self.orphans)
+    def _copy_with_children(self, children):
+        """ See :meth:`pybamm.Symbol._copy_with_children()`. """
+        return self._function_parameter_new_copy(children)
 
     def _function_parameter_new_copy(self, children):
         """Returns a new copy of the function parameter.
@@ -123,4 +124,4 @@ class FunctionParameter(pybamm.Symbol):
         Returns the sum of the evaluated children
         See :meth:`pybamm.Symbol.evaluate_for_shape()`
         """
-        return sum(child.evaluate_for_shape() for child in self.children)
+        return sum(child.shape_placeholder() for child in self.children)
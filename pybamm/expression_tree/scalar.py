@@ -46,11 +46,11 @@ class Scalar(pybamm.Symbol):
         """ See :meth:`pybamm.Symbol.set_id()`. """
         # We must include the value in the hash, since different scalars can be
         # indistinguishable by class, name and domain alone
-        self._id = hash(
+        self._id = pybamm.stable_hash(
             (self.__class__, self.name) + tuple(self.domain) + tuple(str(self._value))
         )
 
-    def _base_evaluate(self, t=None, y=None):
+    def _base_evaluate(self, t=None, y=None, u=None):
         """ See :meth:`pybamm.Symbol._base_evaluate()`. """
         return self._value
 
@@ -2,6 +2,7 @@
 # Simplify a symbol
 #
 import pybamm
+import copy
 
 import autograd.numpy as np
 import numbers
@@ -554,9 +555,10 @@ class Simplification(object):
 
     def simplify(self, symbol):
         """
-        This function recurses down the tree, applying any simplifications defined in
-        classes derived from pybamm.Symbol. E.g. any expression multiplied by a
-        pybamm.Scalar(0) will be simplified to a pybamm.Scalar(0).
+        This function goes down the tree (see :func:`pybamm.post_order_rewrite`),
+        applying any simplifications defined in classes derived from pybamm.Symbol.
+        E.g. any expression multiplied by a pybamm.Scalar(0) will be simplified to a
+        pybamm.Scalar(0).
         If a symbol has already been simplified, the stored value is returned.
 
         Parameters
@@ -570,42 +572,35 @@ class Simplification(object):
         Simplified symbol
         """
 
-        try:
-            return self._simplified_symbols[symbol.id]
-        except KeyError:
-            simplified_symbol = self._simplify(symbol)
-            self._simplified_symbols[symbol.id] = simplified_symbol
+        return pybamm.post_order_rewrite(
+            symbol, self._simplify, self._simplified_symbols
+        )
 
-            return simplified_symbol
-
-    def _simplify(self, symbol):
-        """ See :meth:`Simplification.simplify()`. """
+    def _simplify(self, symbol, simplified_children):
+        """
+        See :meth:`Simplification.simplify()`. `simplified_children` are the
+        simplified children of `symbol`.
+        """
+        # simplify removes the domains, from a copy so that other trees that share
+        # the symbol are unchanged
+        symbol = copy.copy(symbol)
         symbol.domain = []
         symbol.auxiliary_domains = {}
 
         if isinstance(symbol, pybamm.BinaryOperator):
-            left, right = symbol.children
-            # process children
-            new_left = self.simplify(left)
-            new_right = self.simplify(right)
             # _binary_simplify defined in derived classes for specific rules
-            new_symbol = symbol._binary_simplify(new_left, new_right)
+            new_symbol = symbol._binary_simplify(*simplified_children)
 
         elif isinstance(symbol, pybamm.UnaryOperator):
-            new_child = self.simplify(symbol.child)
             # _unary_simplify defined in derived classes for specific rules
-            new_symbol = symbol._unary_simplify(new_child)
+            new_symbol = symbol._unary_simplify(simplified_children[0])
 
         elif isinstance(symbol, pybamm.Function):
-            simplified_children = [None] * len(symbol.children)
-            for i, child in enumerate(symbol.children):
-                simplified_children[i] = self.simplify(child)
             # _function_simplify defined in function class
             new_symbol = symbol._function_simplify(simplified_children)
 
         elif isinstance(symbol, pybamm.Concatenation):
-            new_children = [self.simplify(child) for child in symbol.children]
-            new_symbol = symbol._concatenation_simplify(new_children)
+            new_symbol = symbol._concatenation_simplify(simplified_children)
 
         else:
             # Backup option: return new copy of the object
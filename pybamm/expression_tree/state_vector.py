@@ -98,12 +98,13 @@ class StateVector(pybamm.Symbol):
 
     def set_id(self):
         """ See :meth:`pybamm.Symbol.set_id()` """
-        self._id = hash(
-            (self.__class__, self.name, tuple(self.evaluation_array))
+        self._id = pybamm.stable_hash(
+            (self.__class__, self.name, bytes(self.evaluation_array))
             + tuple(self.domain)
+            + tuple([(k, tuple(v)) for k, v in self.auxiliary_domains.items()])
         )
 
-    def _base_evaluate(self, t=None, y=None):
+    def _base_evaluate(self, t=None, y=None, u=None):
         """ See :meth:`pybamm.Symbol._base_evaluate()`. """
         if y is None:
             raise TypeError("StateVector cannot evaluate input 'y=None'")
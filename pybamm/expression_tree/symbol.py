@@ -4,10 +4,159 @@
 import pybamm
 
 import anytree
+import hashlib
 import numbers
-import copy
+import types
+import weakref
 import autograd.numpy as np
 from anytree.exporter import DotExporter
+from scipy.sparse import csr_matrix
+
+
+def stable_hash(value):
+    """
+    Hash of a value that is the same in every python process, unlike the built-in
+    `hash`, which is randomised for strings. The value can be made of classes, strings,
+    bytes, numbers, None, symbols (hashed by their id), numpy arrays, (nested) tuples,
+    lists, dicts and sets of these, and functions. Python functions are hashed from
+    their code, default arguments and closures, builtin functions, numpy ufuncs and
+    modules from their names, and other objects (e.g. the splines of
+    :class:`pybamm.Interpolant`) from the state with which they are pickled. Used to
+    set the ids of the symbols (see :meth:`Symbol.set_id`), and to identify functions
+    in the keys of :class:`pybamm.DiskCache`.
+
+    Returns
+    -------
+    int
+        A signed 64-bit integer
+
+    Raises
+    ------
+    TypeError
+        If the value contains an object that cannot be hashed
+    """
+    parts = []
+    _serialise(value, parts)
+    digest = hashlib.blake2b(b"".join(parts), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+# Digests of the functions and other objects serialised from their contents, which
+# are cached as these can be large (e.g. the data of an interpolant), and the ids of
+# the objects being serialised, to stop at objects that refer to themselves
+_object_digests = weakref.WeakKeyDictionary()
+_objects_in_progress = set()
+
+
+def _serialise(value, parts):
+    """Append an unambiguous serialisation of the value to the list of bytes"""
+    if isinstance(value, (tuple, list)):
+        parts.append(b"(%d:" % len(value))
+        for item in value:
+            _serialise(item, parts)
+        return
+    elif isinstance(value, (dict, set, frozenset)):
+        # serialise the items separately, so that their order does not matter
+        items = value.items() if isinstance(value, dict) else value
+        serialised = []
+        for item in items:
+            item_parts = []
+            _serialise(item, item_parts)
+            serialised.append(b"".join(item_parts))
+        parts.append(b"{%d:" % len(serialised))
+        parts.extend(sorted(serialised))
+        return
+    elif isinstance(value, np.ndarray) and value.dtype != object:
+        tag = b"a"
+        data = "{} {}".format(value.dtype.str, value.shape).encode()
+        data += b":" + np.ascontiguousarray(value).tobytes()
+    elif isinstance(value, np.ndarray):
+        parts.append(b"o" + repr(value.shape).encode())
+        _serialise(value.ravel().tolist(), parts)
+        return
+    elif isinstance(value, bytes):
+        tag, data = b"b", value
+    elif isinstance(value, str):
+        tag, data = b"s", value.encode()
+    elif isinstance(value, type):
+        tag, data = b"c", "{}.{}".format(value.__module__, value.__qualname__).encode()
+    elif isinstance(value, Symbol):
+        tag, data = b"i", str(value.id).encode()
+    elif value is None or isinstance(value, numbers.Number):
+        tag, data = b"n", repr(value).encode()
+    elif isinstance(value, slice):
+        tag, data = b"l", repr(value).encode()
+    elif isinstance(value, (types.ModuleType, types.BuiltinFunctionType, np.ufunc)):
+        tag = b"g"
+        data = "{}.{}".format(
+            getattr(value, "__module__", None),
+            getattr(value, "__qualname__", value.__name__),
+        ).encode()
+    else:
+        tag, data = b"f", _object_digest(value)
+    parts.append(tag + b"%d:" % len(data))
+    parts.append(data)
+
+
+def _object_digest(value):
+    """
+    Digest of a function, or of another object, from its contents (see
+    :func:`stable_hash`). The digests are cached, so functions and objects must not be
+    modified after they are hashed.
+    """
+    try:
+        return _object_digests[value]
+    except (KeyError, TypeError):
+        # TypeError: the object cannot be weakly referenced or is not hashable
+        pass
+    if id(value) in _objects_in_progress:
+        return b"cycle"
+    _objects_in_progress.add(id(value))
+    try:
+        parts = []
+        if isinstance(value, types.CodeType):
+            contents = (
+                "code",
+                value.co_code,
+                value.co_consts,
+                value.co_names,
+                value.co_varnames,
+            )
+        elif isinstance(value, types.FunctionType):
+            contents = (
+                "function",
+                value.__module__,
+                value.__qualname__,
+                value.__code__,
+                value.__defaults__,
+                value.__kwdefaults__,
+                tuple(cell.cell_contents for cell in value.__closure__ or ()),
+            )
+        elif isinstance(value, types.MethodType):
+            contents = ("method", value.__func__, value.__self__)
+        else:
+            try:
+                reduced = value.__reduce_ex__(4)
+            except Exception:
+                raise TypeError("Cannot hash {!r}".format(value))
+            if isinstance(reduced, str):
+                # pickled by reference to a global
+                contents = ("global", getattr(value, "__module__", None), reduced)
+            else:
+                # the iterators of list and dict items are consumed
+                contents = ("object", type(value)) + tuple(
+                    list(item) if hasattr(item, "__next__") else item
+                    for item in reduced
+                )
+        _serialise(contents, parts)
+    finally:
+        _objects_in_progress.discard(id(value))
+    digest = hashlib.blake2b(b"".join(parts), digest_size=16).digest()
+    try:
+        _object_digests[value] = digest
+    except TypeError:
+        pass
+    return digest
 
 
 def domain_size(domain):
@@ -17,7 +166,7 @@ def domain_size(domain):
     Empty domain has size 1.
     If the domain falls within the list of standard battery domains, the size is read
     from a dictionary of standard domain sizes. Otherwise, the hash of the domain string
-    is used to generate a `random` domain size.
+    is used to generate a `random` domain size (which is the same in every process).
     """
     fixed_domain_sizes = {
         "current collector": 3,
@@ -34,7 +183,7 @@ def domain_size(domain):
     elif all(dom in fixed_domain_sizes for dom in domain):
         size = sum(fixed_domain_sizes[dom] for dom in domain)
     else:
-        size = sum(hash(dom) % 100 for dom in domain)
+        size = sum(stable_hash(dom) % 100 for dom in domain)
     return size
 
 
@@ -46,6 +195,19 @@ def create_object_of_size(size, typ="vector"):
         return np.nan * np.ones((size, size))
 
 
+def create_object_of_shape(shape):
+    """
+    Return object, consisting of NaNs, of the given shape. Matrices are returned as
+    sparse matrices of zeros instead, to avoid creating large dense matrices.
+    """
+    if shape == ():
+        return np.nan
+    elif len(shape) == 2 and shape[1] > 1:
+        return csr_matrix(shape)
+    else:
+        return np.nan * np.ones(shape)
+
+
 def evaluate_for_shape_using_domain(domain, auxiliary_domains=None, typ="vector"):
     """
     Return a vector of the appropriate shape, based on the domain.
@@ -61,16 +223,21 @@ def evaluate_for_shape_using_domain(domain, auxiliary_domains=None, typ="vector"
     return create_object_of_size(_domain_size * _auxiliary_domain_sizes, typ)
 
 
-class Symbol(anytree.NodeMixin):
+class Symbol(object):
     """Base node class for the expression tree
 
+    Nodes are not modified once they are part of a tree, so a node can be shared by
+    several parents (and several trees): expression "trees" are directed acyclic
+    graphs, in which common subexpressions are stored once.
+
     Parameters
     ----------
 
     name : str
         name for the node
     children : iterable :class:`Symbol`, optional
-        children to attach to this node, default to an empty list
+        children of this node (stored as a tuple, without copying them), default to
+        no children
     domain : iterable of str, or str
         list of domains over which the node is valid (empty list indicates the symbol
         is valid over all domains)
@@ -85,8 +252,23 @@ class Symbol(anytree.NodeMixin):
 
     """
 
+    # attributes of every node, stored in slots; subclasses keep their own attributes
+    # in the instance dictionary
+    __slots__ = [
+        "_name",
+        "_children",
+        "_domain",
+        "_auxiliary_domains",
+        "_id",
+        "_symbol_classes",
+        "_constant",
+        "_saved_shape",
+        "_saved_evaluates_to_number",
+        "__dict__",
+        "__weakref__",
+    ]
+
     def __init__(self, name, children=None, domain=None, auxiliary_domains=None):
-        super(Symbol, self).__init__()
         self.name = name
 
         if children is None:
@@ -101,16 +283,15 @@ class Symbol(anytree.NodeMixin):
             if isinstance(dom, str):
                 auxiliary_domains[level] = [dom]
 
-        for child in children:
-            # copy child before adding
-            # this also adds copy.copy(child) to self.children
-            copy.copy(child).parent = self
-
-        # cache children
-        self.cached_children = super(Symbol, self).children
+        # share the children with identical nodes of other trees
+        intern_table = pybamm.settings.intern_table
+        if intern_table is not None:
+            children = [intern_table.intern(child) for child in children]
+        self._children = tuple(children)
+        self.set_structural_flags()
 
         # Set auxiliary domains
-        self.auxiliary_domains = auxiliary_domains
+        self._auxiliary_domains = auxiliary_domains
         # Set domain (and hence id)
         self.domain = domain
 
@@ -127,13 +308,12 @@ class Symbol(anytree.NodeMixin):
     @property
     def children(self):
         """
-        returns the cached children of this node.
-
-        Note: it is assumed that children of a node are not modified after initial
-        creation
+        returns the children of this node, as a tuple.
 
+        Note: the children are shared with any other node (or tree) they belong to,
+        so they must not be modified
         """
-        return self.cached_children
+        return self._children
 
     @property
     def name(self):
@@ -165,8 +345,21 @@ class Symbol(anytree.NodeMixin):
             raise TypeError("Domain: argument domain is not iterable")
         else:
             self._domain = domain
-            # Update id since domain has changed
+            # Update id (and shape) since domain has changed
             self.set_id()
+            self.clear_saved_shape()
+
+    @property
+    def auxiliary_domains(self):
+        """dictionary of auxiliary domains (see :class:`Symbol`)"""
+        return self._auxiliary_domains
+
+    @auxiliary_domains.setter
+    def auxiliary_domains(self, auxiliary_domains):
+        self._auxiliary_domains = auxiliary_domains
+        # Update id (and shape) since auxiliary domains have changed
+        self.set_id()
+        self.clear_saved_shape()
 
     def get_children_auxiliary_domains(self, children):
         "Combine auxiliary domains from children, at all levels"
@@ -193,18 +386,35 @@ class Symbol(anytree.NodeMixin):
     def id(self):
         return self._id
 
+    def set_structural_flags(self):
+        """
+        Set the classes of the nodes of the tree, from those of the children, so that
+        they are found once per node rather than by searching the tree on every call
+        (see :meth:`has_symbol_of_classes()` and :meth:`is_constant()`)
+        """
+        symbol_classes = frozenset([type(self)]).union(
+            *[child._symbol_classes for child in self.children]
+        )
+        # reuse the set of a child if it is the same, to save memory
+        for child in self.children:
+            if child._symbol_classes == symbol_classes:
+                symbol_classes = child._symbol_classes
+                break
+        self._symbol_classes = symbol_classes
+
     def set_id(self):
         """
         Set the immutable "identity" of a variable (e.g. for identifying y_slices).
 
         This is identical to what we'd put in a __hash__ function
         However, implementing __hash__ requires also implementing __eq__,
-        which would then mess with loop-checking in the anytree module.
+        which would then change how nodes are compared.
 
         Hashing can be slow, so we set the id when we create the node, and hence only
-        need to hash once.
+        need to hash once. The id of a node is computed from the ids of its children,
+        and is the same in every python process (see :func:`pybamm.stable_hash`).
         """
-        self._id = hash(
+        self._id = stable_hash(
             (self.__class__, self.name)
             + tuple([child.id for child in self.children])
             + tuple(self.domain)
@@ -214,16 +424,26 @@ class Symbol(anytree.NodeMixin):
     @property
     def orphans(self):
         """
-        Returning new copies of the children, with parents removed to avoid corrupting
-        the expression tree internal data
+        Returning new copies of the children, which can be modified without corrupting
+        the expression tree (or any other tree that shares the children). Only the
+        children themselves are copied: their own children are shared, and are
+        copied by `orphans` in turn if they need to be modified
         """
-        return tuple([child.new_copy() for child in self.children])
+        return tuple([_copy_node(child, child.children) for child in self.children])
 
     def render(self):  # pragma: no cover
         """print out a visual representation of the tree (this node and its
         children)
         """
-        for pre, _, node in anytree.RenderTree(self):
+        # stack of (node, prefix of its line, prefix of its children's lines)
+        stack = [(self, "", "")]
+        while stack:
+            node, pre, children_pre = stack.pop()
+            for i, child in enumerate(reversed(node.children)):
+                if i == 0:
+                    stack.append((child, children_pre + "└── ", children_pre + "    "))
+                else:
+                    stack.append((child, children_pre + "├── ", children_pre + "│   "))
             if isinstance(node, pybamm.Scalar) and node.name != str(node.value):
                 print("{}{} = {}".format(pre, node.name, node.value))
             else:
@@ -286,8 +506,8 @@ class Symbol(anytree.NodeMixin):
         return new_node, counter
 
     def pre_order(self):
-        """returns an iterable that steps through the tree in pre-order
-        fashion
+        """returns an iterator that steps through the tree in pre-order
+        fashion (a node that appears several times in the tree is visited each time)
 
         Examples
         --------
@@ -302,7 +522,11 @@ class Symbol(anytree.NodeMixin):
         b
 
         """
-        return anytree.PreOrderIter(self)
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
 
     def __str__(self):
         """return a string representation of the node and its children"""
@@ -455,7 +679,7 @@ class Symbol(anytree.NodeMixin):
         """
         raise NotImplementedError
 
-    def _base_evaluate(self, t=None, y=None):
+    def _base_evaluate(self, t=None, y=None, u=None):
         """evaluate expression tree
 
         will raise a ``NotImplementedError`` if this member function has not
@@ -471,6 +695,9 @@ class Symbol(anytree.NodeMixin):
         y : numpy.array, optional
             array to evaluate when solving (default None)
 
+        u : dict, optional
+            dictionary of inputs to use when solving (default None)
+
         """
         raise NotImplementedError(
             """method self.evaluate() not implemented
@@ -479,7 +706,7 @@ class Symbol(anytree.NodeMixin):
             )
         )
 
-    def evaluate(self, t=None, y=None, known_evals=None):
+    def evaluate(self, t=None, y=None, u=None, known_evals=None):
         """Evaluate expression tree (wrapper to allow using dict of known values).
         If the dict 'known_evals' is provided, the dict is searched for self.id; if
         self.id is in the keys, return that value; otherwise, evaluate using
@@ -491,51 +718,78 @@ class Symbol(anytree.NodeMixin):
             time at which to evaluate (default None)
         y : numpy.array, optional
             array to evaluate when solving (default None)
+        u : dict, optional
+            dictionary of inputs to use when solving (default None)
         known_evals : dict, optional
             dictionary containing known values (default None)
 
         Returns
         -------
         number or array
-            the node evaluated at (t,y)
+            the node evaluated at (t,y,u)
         known_evals (if known_evals input is not None) : dict
             the dictionary of known values
         """
         if known_evals is not None:
             if self.id not in known_evals:
-                known_evals[self.id] = self._base_evaluate(t, y)
+                known_evals[self.id] = self._base_evaluate(t, y, u)
             return known_evals[self.id], known_evals
         else:
-            return self._base_evaluate(t, y)
+            return self._base_evaluate(t, y, u)
 
     def evaluate_for_shape(self):
         """Evaluate expression tree to find its shape. For symbols that cannot be
         evaluated directly (e.g. `Variable` or `Parameter`), a vector of the appropriate
         shape is returned instead, using the symbol's domain.
+        Nodes with children evaluate themselves from the placeholders of their children
+        (see :meth:`pybamm.Symbol.shape_placeholder()`), rather than from the whole
+        subtree.
         See :meth:`pybamm.Symbol.evaluate()`
         """
         return self.evaluate()
 
+    def shape_placeholder(self):
+        """
+        Object with the shape of the node, from which its parents find their shape:
+        the result of :meth:`evaluate_for_shape()` for leaves, and an object of the
+        saved shape (see :attr:`shape_for_testing`) otherwise.
+        """
+        if self.children:
+            return create_object_of_shape(self.shape_for_testing)
+        else:
+            return self.evaluate_for_shape()
+
     def is_constant(self):
-        """returns true if evaluating the expression is not dependent on `t` or `y`
+        """returns true if evaluating the expression is not dependent on `t`, `y` or
+        `u`
 
         See Also
         --------
         evaluate : evaluate the expression
 
         """
+        try:
+            return self._constant
+        except AttributeError:
+            pass
         # if any of the nodes are instances of any of these types, then the whole
-        # expression depends on either t or y
-        search_types = (pybamm.Variable, pybamm.StateVector, pybamm.IndependentVariable)
-
-        # do the search, return true if no relevent nodes are found
-        return not any((isinstance(n, search_types)) for n in self.pre_order())
+        # expression depends on either t, y or u
+        search_types = (
+            pybamm.Variable,
+            pybamm.StateVector,
+            pybamm.IndependentVariable,
+            pybamm.InputParameter,
+        )
+        self._constant = not self.has_symbol_of_classes(search_types)
+        return self._constant
 
     def evaluate_ignoring_errors(self):
         """
         Evaluates the expression. If a node exists in the tree that cannot be evaluated
         as a scalar or vectr (e.g. Parameter, Variable, StateVector), then None is
-        returned. Otherwise the result of the evaluation is given
+        returned. Otherwise the result of the evaluation is given. Any input parameters
+        are evaluated using placeholder values, so the result only has the correct
+        type and shape (use :meth:`is_constant()` to check for input parameters)
 
         See Also
         --------
@@ -543,7 +797,7 @@ class Symbol(anytree.NodeMixin):
 
         """
         try:
-            result = self.evaluate(t=0)
+            result = self.evaluate(t=0, u="shape test")
         except NotImplementedError:
             # return false if NotImplementedError is raised
             # (there is a e.g. Parameter, Variable, ... in the tree)
@@ -565,17 +819,31 @@ class Symbol(anytree.NodeMixin):
         is raised.
         !Not to be confused with isinstance(self, pybamm.Scalar)!
 
+        The result is saved, and only symbols with shape () are evaluated.
+
         See Also
         --------
         evaluate : evaluate the expression
 
         """
-        result = self.evaluate_ignoring_errors()
+        if self._saved_evaluates_to_number is not None:
+            return self._saved_evaluates_to_number
 
-        if isinstance(result, numbers.Number):
-            return True
-        else:
+        if self.has_symbol_of_classes((pybamm.StateVector, pybamm.Variable)):
+            # these cannot be evaluated (see :meth:`evaluate_ignoring_errors()`)
+            self._saved_evaluates_to_number = False
             return False
+        try:
+            shape = self.shape_for_testing
+        except Exception:
+            # evaluating the expression gives (or raises) the same as before
+            shape = ()
+        if shape == ():
+            result = self.evaluate_ignoring_errors()
+            self._saved_evaluates_to_number = isinstance(result, numbers.Number)
+        else:
+            self._saved_evaluates_to_number = False
+        return self._saved_evaluates_to_number
 
     def evaluates_on_edges(self):
         """
@@ -593,7 +861,9 @@ class Symbol(anytree.NodeMixin):
         symbol_classes : pybamm class or iterable of classes
             The classes to test the symbol against
         """
-        return any(isinstance(symbol, symbol_classes) for symbol in self.pre_order())
+        if not isinstance(symbol_classes, type):
+            symbol_classes = tuple(symbol_classes)
+        return any(issubclass(cls, symbol_classes) for cls in self._symbol_classes)
 
     def simplify(self, simplified_symbols=None):
         """ Simplify the expression tree. See :class:`pybamm.Simplification`. """
@@ -602,10 +872,26 @@ class Symbol(anytree.NodeMixin):
     def new_copy(self):
         """
         Make a new copy of a symbol, to avoid Tree corruption errors while bypassing
-        copy.deepcopy(), which is slow.
+        copy.deepcopy(), which is slow. Leaves define their own copy, and the nodes of
+        a tree are copied from the leaves up with :meth:`Symbol._copy_with_children()`
+        (see :func:`pybamm.post_order_rewrite`).
+        """
+        if not self.children:
+            raise NotImplementedError(
+                """method self.new_copy() not implemented
+                   for symbol {!s} of type {}""".format(
+                    self, type(self)
+                )
+            )
+        return pybamm.post_order_rewrite(self, _copy_node)
+
+    def _copy_with_children(self, children):
+        """
+        Make a new copy of a node that has children, with children `children`. See
+        :meth:`Symbol.new_copy()`.
         """
         raise NotImplementedError(
-            """method self.new_copy() not implemented
+            """method self._copy_with_children() not implemented
                for symbol {!s} of type {}""".format(
                 self, type(self)
             )
@@ -614,40 +900,17 @@ class Symbol(anytree.NodeMixin):
     @property
     def size(self):
         """
-        Size of an object, found by evaluating it with appropriate t and y
+        Size of an object, found from its shape
         """
         return np.prod(self.shape)
 
     @property
     def shape(self):
         """
-        Shape of an object, found by evaluating it with appropriate t and y.
+        Shape of an object, found from the shapes of its children (see
+        :attr:`shape_for_testing`).
         """
-        # Default behaviour is to try to evaluate the object directly
-        # Try with some large y, to avoid having to use pre_order (slow)
-        try:
-            y = np.linspace(0.1, 0.9, int(1e4))
-            evaluated_self = self.evaluate(0, y)
-        # If that fails, fall back to calculating how big y should really be
-        except ValueError:
-            state_vectors_in_node = [
-                x for x in self.pre_order() if isinstance(x, pybamm.StateVector)
-            ]
-            if state_vectors_in_node == []:
-                y = None
-            else:
-                min_y_size = max(
-                    len(x._evaluation_array) for x in state_vectors_in_node
-                )
-                # Pick a y that won't cause RuntimeWarnings
-                y = np.linspace(0.1, 0.9, min_y_size)
-            evaluated_self = self.evaluate(0, y)
-
-        # Return shape of evaluated object
-        if isinstance(evaluated_self, numbers.Number):
-            return ()
-        else:
-            return evaluated_self.shape
+        return self.shape_for_testing
 
     @property
     def size_for_testing(self):
@@ -662,12 +925,26 @@ class Symbol(anytree.NodeMixin):
         Shape of an object for cases where it cannot be evaluated directly. If a symbol
         cannot be evaluated directly (e.g. it is a `Variable` or `Parameter`), it is
         instead given an arbitrary domain-dependent shape.
+
+        The shape is found from the shapes of the children (see
+        :meth:`evaluate_for_shape()`), and saved, so that finding the shapes of all the
+        nodes of a tree only evaluates each node once.
         """
-        evaluated_self = self.evaluate_for_shape()
-        if isinstance(evaluated_self, numbers.Number):
-            return ()
-        else:
-            return evaluated_self.shape
+        if self._saved_shape is None:
+            evaluated_self = self.evaluate_for_shape()
+            if isinstance(evaluated_self, numbers.Number):
+                self._saved_shape = ()
+            else:
+                self._saved_shape = evaluated_self.shape
+        return self._saved_shape
+
+    def clear_saved_shape(self):
+        """
+        Forget the saved shape (and whether the node evaluates to a number), e.g. when
+        the domain of the node changes
+        """
+        self._saved_shape = None
+        self._saved_evaluates_to_number = None
 
     def test_shape(self):
         """
@@ -682,3 +959,10 @@ class Symbol(anytree.NodeMixin):
             self.shape_for_testing
         except ValueError as e:
             raise pybamm.ShapeError("Cannot find shape (original error: {})".format(e))
+
+
+def _copy_node(symbol, new_children):
+    """ Copy a single node of a tree. See :meth:`Symbol.new_copy()`. """
+    if symbol.children:
+        return symbol._copy_with_children(new_children)
+    return symbol.new_copy()
@@ -0,0 +1,824 @@
+#
+# Lower symbols to an evaluation tape
+#
+import autograd.numpy as anp
+import numbers
+import numpy as np
+import pybamm
+from autograd.tracer import Node, isbox, new_box, trace_stack
+from scipy import interpolate, sparse
+
+# Operation codes of the tape instructions. These must match the codes used by the
+# tape interpreter in the idaklu extension (pybamm/solvers/c_solvers/idaklu.cpp)
+CONSTANT, TIME, INPUT, STATE, UNARY, BINARY, LINEAR, SCATTER, REDUCE, PPOLY = range(10)
+UNARY_FUNCTIONS = [
+    "identity",
+    "negative",
+    "absolute",
+    "exp",
+    "log",
+    "log10",
+    "sin",
+    "cos",
+    "tan",
+    "sinh",
+    "cosh",
+    "tanh",
+    "arcsinh",
+    "arctan",
+    "sqrt",
+    "sign",
+]
+BINARY_OPERATORS = ["add", "subtract", "multiply", "divide", "power"]
+REDUCTIONS = ["min", "max"]
+
+# numpy (and autograd.numpy) functions that the tape evaluates natively
+_unary_functions = {}
+_reductions = {}
+for _module in [np, anp]:
+    for _name in UNARY_FUNCTIONS[2:]:
+        _unary_functions[getattr(_module, _name)] = _name
+    _unary_functions[_module.abs] = "absolute"
+    for _name in REDUCTIONS:
+        _reductions[getattr(_module, _name)] = _name
+        _reductions[getattr(_module, "a" + _name)] = _name
+
+
+class Tape(object):
+    """
+    Lowers a list of pybamm expression trees into a tape: a flat list of instructions
+    operating on registers of floats, which can be evaluated without any python (for
+    example, by the tape interpreter in the idaklu extension). Common subtrees are
+    evaluated once.
+
+    Each register holds the nonzero entries of the (dense or sparse) value of a node,
+    in CSR order; the sparsity pattern of each node is fixed when the tape is created,
+    by propagating the patterns of the constants and state vectors through the tree.
+    Every register has one extra slot, after its entries, which is always zero and is
+    read for entries outside its pattern.
+
+    Functions whose python function is not one of the numpy functions above are
+    traced with autograd, at the point (t, y, u), and lowered to the corresponding
+    elementary operations. This requires the function to be written with
+    (autograd) numpy operations, without branches that depend on the values of its
+    arguments. Interpolants are lowered to piecewise polynomials.
+
+    Parameters
+    ----------
+    symbols : list of :class:`pybamm.Symbol`
+        The symbols to evaluate. These should be discretised (i.e. only contain state
+        vectors, time, input parameters and constants as leaves).
+    t : float, optional
+        The time at which to trace functions. Default is 0.
+    y : array-like, optional
+        The state at which to trace functions. Default is a vector of ones.
+    u : dict, optional
+        The input parameters at which to trace functions. Default is 1 for all input
+        parameters.
+    input_names : list of str, optional
+        The names of the input parameters, in the order in which their values are
+        passed to the tape. Any other input parameters in the symbols are appended to
+        this list, so tapes created with the same list use the same order.
+
+    **Extends**: :class:`object`
+    """
+
+    def __init__(self, symbols, t=0, y=None, u=None, input_names=None):
+        if y is None:
+            y_size = 0
+            for symbol in symbols:
+                for node in symbol.pre_order():
+                    if isinstance(node, pybamm.StateVector):
+                        y_size = max(y_size, len(node.evaluation_array))
+            y = np.ones(y_size)
+        self._t = t
+        self._y = np.reshape(y, (-1, 1))
+        self._u = "shape test" if u is None else u
+        self._known_evals = {}
+
+        self._instructions = []
+        self._indices = []
+        self._number_of_indices = 0
+        self._coefficients = []
+        self._number_of_coefficients = 0
+        self.register_sizes = []
+        self.input_names = [] if input_names is None else input_names
+        self._registers = {}
+
+        self.outputs = []
+        self.output_patterns = []
+        self._output_types = []
+        for symbol in symbols:
+            register, pattern = self._lower(symbol)
+            if pattern.is_sparse:
+                self._output_types.append("sparse")
+            else:
+                # write the output as a dense array
+                register, pattern = self._densify(register, pattern)
+                if symbol.shape == ():
+                    self._output_types.append("number")
+                else:
+                    self._output_types.append("dense")
+            self.outputs.append(register)
+            self.output_patterns.append(pattern)
+
+        # flat arrays, as used by the tape interpreter
+        self.instructions = np.array(self._instructions, dtype=np.int64).reshape(-1, 9)
+        self.indices = np.array(
+            np.concatenate([np.zeros(0)] + self._indices), dtype=np.int64
+        )
+        self.coefficients = np.array(
+            np.concatenate([np.zeros(0)] + self._coefficients), dtype=float
+        )
+        self.register_sizes = np.array(self.register_sizes, dtype=np.int64)
+        self.outputs = np.array(self.outputs, dtype=np.int64)
+
+        # tracing values are not needed any more
+        self._known_evals = None
+        self._y = None
+
+    def _new_register(self, pattern):
+        self.register_sizes.append(pattern.nnz)
+        return len(self.register_sizes) - 1
+
+    def _add_indices(self, indices):
+        if indices is None:
+            return -1
+        offset = self._number_of_indices
+        self._indices.append(np.asarray(indices, dtype=np.int64))
+        self._number_of_indices += len(indices)
+        return offset
+
+    def _add_coefficients(self, coefficients):
+        offset = self._number_of_coefficients
+        self._coefficients.append(np.asarray(coefficients, dtype=float))
+        self._number_of_coefficients += len(coefficients)
+        return offset
+
+    def _add_instruction(
+        self,
+        opcode,
+        pattern,
+        a=-1,
+        b=-1,
+        indices_a=None,
+        indices_b=None,
+        coefficients=None,
+        parameter=0,
+        out=None,
+    ):
+        """
+        Add an instruction writing to a new register with the given pattern (or to
+        the existing register `out`), and return the register. Each instruction is
+        stored as (opcode, output register, register a, register b, length, offset of
+        the first index array, offset of the second index array, offset of the
+        coefficients, parameter).
+        """
+        if out is None:
+            out = self._new_register(pattern)
+        if indices_a is not None:
+            length = len(indices_a)
+        elif coefficients is not None:
+            length = len(coefficients)
+        else:
+            length = pattern.nnz
+        coefficient_offset = (
+            -1 if coefficients is None else self._add_coefficients(coefficients)
+        )
+        self._instructions.append(
+            [
+                opcode,
+                out,
+                a,
+                b,
+                length,
+                self._add_indices(indices_a),
+                self._add_indices(indices_b),
+                coefficient_offset,
+                parameter,
+            ]
+        )
+        return out
+
+    def _lower(self, symbol):
+        """Add the instructions to evaluate a symbol, returning its register and
+        pattern"""
+        if symbol.id not in self._registers:
+            if symbol.is_constant():
+                result = self._lower_constant(symbol.evaluate())
+            else:
+                result = self._lower_variable(symbol)
+            self._registers[symbol.id] = result
+        return self._registers[symbol.id]
+
+    def _lower_constant(self, value):
+        pattern, data = _Pattern.from_value(value)
+        return self._add_instruction(CONSTANT, pattern, coefficients=data), pattern
+
+    def _lower_variable(self, symbol):
+        if isinstance(symbol, pybamm.StateVector):
+            indices = np.flatnonzero(symbol.evaluation_array)
+            pattern = _Pattern.full((len(indices), 1))
+            return self._add_instruction(STATE, pattern, indices_a=indices), pattern
+
+        elif isinstance(symbol, pybamm.Time):
+            pattern = _Pattern.full((1, 1))
+            return self._add_instruction(TIME, pattern), pattern
+
+        elif isinstance(symbol, pybamm.InputParameter):
+            if symbol.name not in self.input_names:
+                self.input_names.append(symbol.name)
+            pattern = _Pattern.full((1, 1))
+            parameter = self.input_names.index(symbol.name)
+            return self._add_instruction(INPUT, pattern, parameter=parameter), pattern
+
+        elif isinstance(symbol, pybamm.Negate):
+            return self._unary("negative", *self._lower(symbol.child))
+
+        elif isinstance(symbol, pybamm.AbsoluteValue):
+            return self._unary("absolute", *self._lower(symbol.child))
+
+        elif isinstance(symbol, pybamm.Index):
+            register, pattern = self._lower(symbol.child)
+            rows = np.arange(pattern.shape[0])[symbol.slice]
+            return self._gather_rows(
+                [(register, pattern, rows)], (len(rows), pattern.shape[1])
+            )
+
+        elif isinstance(symbol, pybamm.MatrixMultiplication):
+            left, right = symbol.children
+            if not left.is_constant():
+                raise NotImplementedError(
+                    "Tape only implemented for matrix multiplication by a constant "
+                    "matrix"
+                )
+            return self._matmul(left.evaluate(), *self._lower(right))
+
+        elif isinstance(symbol, (pybamm.Outer, pybamm.Kron)):
+            # the outer product of two vectors is their kronecker product
+            left, right = symbol.children
+            return self._kron(
+                *self._lower(left),
+                *self._lower(right),
+                is_sparse=isinstance(symbol, pybamm.Kron)
+            )
+
+        elif isinstance(symbol, pybamm.BinaryOperator):
+            operator = {
+                pybamm.Addition: "add",
+                pybamm.Subtraction: "subtract",
+                pybamm.Multiplication: "multiply",
+                pybamm.Inner: "multiply",
+                pybamm.Division: "divide",
+                pybamm.Power: "power",
+            }[type(symbol)]
+            left, right = symbol.children
+            return self._binary(operator, *self._lower(left), *self._lower(right))
+
+        elif isinstance(symbol, pybamm.Concatenation):
+            return self._lower_concatenation(symbol)
+
+        elif isinstance(symbol, pybamm.Function):
+            function = symbol.function
+            if isinstance(function, interpolate.PPoly):
+                register, pattern = self._lower(symbol.children[0])
+                return self._ppoly(function, register, pattern)
+            elif len(symbol.children) == 1 and function in _unary_functions:
+                register, pattern = self._lower(symbol.children[0])
+                return self._unary(_unary_functions[function], register, pattern)
+            elif len(symbol.children) == 1 and function in _reductions:
+                register, pattern = self._lower(symbol.children[0])
+                return self._reduce(_reductions[function], register, pattern)
+            else:
+                return self._lower(self._trace_function(symbol))
+
+        raise NotImplementedError(
+            "Tape not implemented for a symbol of type '{}'".format(type(symbol))
+        )
+
+    def _lower_concatenation(self, symbol):
+        children = [self._lower(child) for child in symbol.children]
+        if isinstance(symbol, pybamm.DomainConcatenation):
+            # the rows of each child are written to the slices of each domain
+            out_rows = [[] for _ in children]
+            child_rows = [[] for _ in children]
+            for idx, slices in enumerate(symbol._children_slices):
+                for child_dom, child_slice in slices.items():
+                    for i, _slice in enumerate(child_slice):
+                        out_slice = symbol._slices[child_dom][i]
+                        out_rows[idx].append(np.arange(out_slice.start, out_slice.stop))
+                        child_rows[idx].append(np.arange(_slice.start, _slice.stop))
+            blocks = [
+                (register, pattern, np.concatenate(rows), np.concatenate(out))
+                for (register, pattern), rows, out in zip(
+                    children, child_rows, out_rows
+                )
+            ]
+            number_of_rows = symbol._size
+        else:
+            blocks = []
+            number_of_rows = 0
+            for register, pattern in children:
+                rows = np.arange(pattern.shape[0])
+                blocks.append((register, pattern, rows, rows + number_of_rows))
+                number_of_rows += pattern.shape[0]
+        number_of_columns = max(pattern.shape[1] for _, pattern in children)
+        return self._gather_rows(
+            blocks,
+            (number_of_rows, number_of_columns),
+            is_sparse=isinstance(symbol, pybamm.SparseStack),
+        )
+
+    def _gather_rows(self, blocks, shape, is_sparse=None):
+        """
+        Create a register whose rows are copied from rows of other registers. Each
+        block is (register, pattern, rows[, output rows]), where the output rows
+        default to 0, 1, ...
+        """
+        keys = []
+        sources = []
+        for block in blocks:
+            register, pattern, rows = block[:3]
+            out_rows = block[3] if len(block) > 3 else np.arange(len(rows))
+            entries, entry_rows = pattern.row_entries(rows)
+            keys.append(out_rows[entry_rows] * shape[1] + pattern.indices[entries])
+            sources.append((register, entries))
+        all_keys = np.concatenate([np.zeros(0, dtype=np.int64)] + keys)
+        if is_sparse is None:
+            is_sparse = any(block[1].is_sparse for block in blocks)
+        pattern = _Pattern.from_keys(shape, np.unique(all_keys), is_sparse)
+        if len(blocks) == 1:
+            register, entries = sources[0]
+            positions = pattern.lookup_keys(keys[0])
+            order = np.argsort(positions)
+            return (
+                self._add_instruction(
+                    UNARY,
+                    pattern,
+                    a=register,
+                    indices_a=entries[order],
+                    parameter=UNARY_FUNCTIONS.index("identity"),
+                ),
+                pattern,
+            )
+        # one scatter per block, all writing to the same register
+        out = self._new_register(pattern)
+        for (register, entries), block_keys in zip(sources, keys):
+            self._add_instruction(
+                SCATTER,
+                pattern,
+                a=register,
+                indices_a=entries,
+                indices_b=pattern.lookup_keys(block_keys),
+                out=out,
+            )
+        return out, pattern
+
+    def _densify(self, register, pattern):
+        """Write a register to a register with a full pattern"""
+        if pattern.is_full:
+            return register, pattern
+        full = _Pattern.full(pattern.shape)
+        rows, cols = full.rows, full.indices
+        indices = pattern.lookup(rows, cols)
+        out = self._add_instruction(
+            UNARY,
+            full,
+            a=register,
+            indices_a=indices,
+            parameter=UNARY_FUNCTIONS.index("identity"),
+        )
+        return out, full
+
+    def _unary(self, function, register, pattern):
+        with np.errstate(all="ignore"):
+            zero_to_zero = _evaluate_unary(function, np.zeros(1))[0] == 0
+        if zero_to_zero:
+            out_pattern = pattern
+            indices = np.arange(pattern.nnz)
+        else:
+            out_pattern = _Pattern.full(pattern.shape, pattern.is_sparse)
+            indices = pattern.lookup(out_pattern.rows, out_pattern.indices)
+        return (
+            self._add_instruction(
+                UNARY,
+                out_pattern,
+                a=register,
+                indices_a=indices,
+                parameter=UNARY_FUNCTIONS.index(function),
+            ),
+            out_pattern,
+        )
+
+    def _binary(self, operator, left, left_pattern, right, right_pattern):
+        shape = _broadcast_shape(left_pattern.shape, right_pattern.shape)
+        is_sparse = left_pattern.is_sparse or right_pattern.is_sparse
+        left_keys = left_pattern.broadcast_keys(shape)
+        right_keys = right_pattern.broadcast_keys(shape)
+        if operator in ["add", "subtract"]:
+            keys = np.union1d(left_keys, right_keys)
+        elif operator == "multiply":
+            keys = np.intersect1d(left_keys, right_keys, assume_unique=True)
+        elif operator == "divide":
+            keys = left_keys
+        else:
+            keys = np.arange(shape[0] * shape[1])
+        pattern = _Pattern.from_keys(shape, keys, is_sparse)
+        rows, cols = pattern.rows, pattern.indices
+        return (
+            self._add_instruction(
+                BINARY,
+                pattern,
+                a=left,
+                b=right,
+                indices_a=left_pattern.lookup(rows, cols),
+                indices_b=right_pattern.lookup(rows, cols),
+                parameter=BINARY_OPERATORS.index(operator),
+            ),
+            pattern,
+        )
+
+    def _matmul(self, matrix, register, pattern):
+        """Multiply a register by a constant matrix, as a list of (output entry,
+        coefficient, input entry) triplets"""
+        matrix = sparse.coo_matrix(matrix)
+        matrix.sum_duplicates()
+        matrix.eliminate_zeros()
+        shape = (matrix.shape[0], pattern.shape[1])
+        # each entry (i, k) of the matrix multiplies the entries in row k
+        entries, matrix_entries = pattern.row_entries(matrix.col)
+        keys = matrix.row[matrix_entries] * shape[1] + pattern.indices[entries]
+        out_pattern = _Pattern.from_keys(shape, np.unique(keys), pattern.is_sparse)
+        return (
+            self._add_instruction(
+                LINEAR,
+                out_pattern,
+                a=register,
+                indices_a=entries,
+                indices_b=out_pattern.lookup_keys(keys),
+                coefficients=matrix.data[matrix_entries],
+            ),
+            out_pattern,
+        )
+
+    def _kron(self, left, left_pattern, right, right_pattern, is_sparse):
+        """Kronecker product of two registers"""
+        (p, q), (r, s) = left_pattern.shape, right_pattern.shape
+        shape = (p * r, q * s)
+        left_entries = np.repeat(np.arange(left_pattern.nnz), right_pattern.nnz)
+        right_entries = np.tile(np.arange(right_pattern.nnz), left_pattern.nnz)
+        rows = left_pattern.rows[left_entries] * r + right_pattern.rows[right_entries]
+        cols = (
+            left_pattern.indices[left_entries] * s
+            + right_pattern.indices[right_entries]
+        )
+        keys = rows * shape[1] + cols
+        order = np.argsort(keys)
+        pattern = _Pattern.from_keys(shape, keys[order], is_sparse)
+        return (
+            self._add_instruction(
+                BINARY,
+                pattern,
+                a=left,
+                b=right,
+                indices_a=left_entries[order],
+                indices_b=right_entries[order],
+                parameter=BINARY_OPERATORS.index("multiply"),
+            ),
+            pattern,
+        )
+
+    def _reduce(self, reduction, register, pattern):
+        indices = np.arange(pattern.nnz)
+        if not pattern.is_full:
+            # the entries outside the pattern are zero
+            indices = np.append(indices, pattern.nnz)
+        out_pattern = _Pattern.full((1, 1))
+        return (
+            self._add_instruction(
+                REDUCE,
+                out_pattern,
+                a=register,
+                indices_a=indices,
+                parameter=REDUCTIONS.index(reduction),
+            ),
+            out_pattern,
+        )
+
+    def _ppoly(self, ppoly, register, pattern):
+        """Evaluate a piecewise polynomial (e.g. an interpolant or its derivative).
+        The coefficients are stored as (number of intervals, order, extrapolate,
+        breakpoints, coefficients)"""
+        order, number_of_intervals = ppoly.c.shape
+        coefficients = np.concatenate(
+            [
+                [number_of_intervals, order, float(bool(ppoly.extrapolate))],
+                ppoly.x,
+                ppoly.c.flatten(),
+            ]
+        )
+        out_pattern = _Pattern.full(pattern.shape, pattern.is_sparse)
+        return (
+            self._add_instruction(
+                PPOLY,
+                out_pattern,
+                a=register,
+                indices_a=pattern.lookup(out_pattern.rows, out_pattern.indices),
+                coefficients=coefficients,
+            ),
+            out_pattern,
+        )
+
+    def _trace_function(self, symbol):
+        """Trace a function with autograd, returning the equivalent symbol"""
+        children = symbol.children
+        with np.errstate(all="ignore"):
+            values = [
+                child.evaluate(self._t, self._y, self._u, self._known_evals)[0]
+                for child in children
+            ]
+            try:
+                with trace_stack.new_trace() as trace:
+                    boxes = [
+                        new_box(value, trace, _SymbolNode.new_root(child))
+                        for child, value in zip(children, values)
+                    ]
+                    output = symbol.function(*boxes)
+                if isbox(output) and output._trace == trace:
+                    traced_symbol = output._node.symbol
+                else:
+                    traced_symbol = _to_symbol(output)
+                expected = symbol.evaluate(self._t, self._y, self._u, self._known_evals)
+                value = traced_symbol.evaluate(self._t, self._y, self._u)
+            except Exception as error:
+                raise NotImplementedError(
+                    "Could not trace function '{}': {}".format(symbol.name, error)
+                )
+        if not np.allclose(value, expected[0], equal_nan=True):
+            raise NotImplementedError(
+                "Could not trace function '{}': traced function gives a different "
+                "result".format(symbol.name)
+            )
+        return traced_symbol
+
+    def evaluate(self, t=None, y=None, u=None):
+        """
+        Evaluate the tape (in python, as a reference for other tape interpreters),
+        returning the value of each symbol
+
+        Parameters
+        ----------
+        t : float, optional
+            The time at which to evaluate
+        y : array-like, optional
+            The state at which to evaluate
+        u : dict, optional
+            The input parameters
+
+        Returns
+        -------
+        list
+            The value of each symbol
+        """
+        inputs = [u[name] for name in self.input_names]
+        if y is not None:
+            y = np.reshape(y, -1)
+        registers = [np.zeros(size + 1) for size in self.register_sizes]
+        for opcode, out, a, b, n, i0, i1, c0, parameter in self.instructions:
+            result = registers[out]
+            ia = self.indices[i0 : i0 + n]
+            ib = self.indices[i1 : i1 + n]
+            if opcode == CONSTANT:
+                result[:n] = self.coefficients[c0 : c0 + n]
+            elif opcode == TIME:
+                result[0] = t
+            elif opcode == INPUT:
+                result[0] = inputs[parameter]
+            elif opcode == STATE:
+                result[:n] = y[ia]
+            elif opcode == UNARY:
+                result[:n] = _evaluate_unary(
+                    UNARY_FUNCTIONS[parameter], registers[a][ia]
+                )
+            elif opcode == BINARY:
+                result[:n] = _evaluate_binary(
+                    BINARY_OPERATORS[parameter], registers[a][ia], registers[b][ib]
+                )
+            elif opcode == LINEAR:
+                result[:] = 0
+                np.add.at(result, ib, self.coefficients[c0 : c0 + n] * registers[a][ia])
+            elif opcode == SCATTER:
+                result[ib] = registers[a][ia]
+            elif opcode == REDUCE:
+                result[0] = getattr(np, REDUCTIONS[parameter])(registers[a][ia])
+            elif opcode == PPOLY:
+                result[:n] = _evaluate_ppoly(self.coefficients[c0:], registers[a][ia])
+        return self.format_outputs(
+            [registers[register][:-1] for register in self.outputs]
+        )
+
+    def format_outputs(self, data):
+        """
+        Values of the symbols, given the entries of their output registers (e.g. as
+        computed by another tape interpreter)
+        """
+        return [
+            self._output_value(output_data, pattern, output_type)
+            for output_data, pattern, output_type in zip(
+                data, self.output_patterns, self._output_types
+            )
+        ]
+
+    def _output_value(self, data, pattern, output_type):
+        if output_type == "sparse":
+            return sparse.csr_matrix(
+                (data, pattern.indices, pattern.indptr), shape=pattern.shape
+            )
+        elif output_type == "number":
+            return data[0]
+        else:
+            return data.reshape(pattern.shape)
+
+
+class _Pattern(object):
+    """The sparsity pattern (in CSR format) of the value of a node"""
+
+    def __init__(self, shape, indptr, indices, is_sparse=False):
+        self.shape = shape
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.is_sparse = is_sparse
+        self.nnz = len(self.indices)
+        self.is_full = self.nnz == shape[0] * shape[1]
+        self.rows = np.repeat(np.arange(shape[0]), np.diff(self.indptr))
+        self.keys = self.rows * shape[1] + self.indices
+
+    @classmethod
+    def full(cls, shape, is_sparse=False):
+        return cls.from_keys(shape, np.arange(shape[0] * shape[1]), is_sparse)
+
+    @classmethod
+    def from_keys(cls, shape, keys, is_sparse=False):
+        """Pattern whose entries have the (sorted) keys row * number of columns +
+        column"""
+        keys = np.asarray(keys, dtype=np.int64)
+        rows = keys // shape[1]
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=shape[0]))])
+        return cls(shape, indptr, keys % shape[1], is_sparse)
+
+    @classmethod
+    def from_value(cls, value):
+        """Pattern and data of a constant value"""
+        if sparse.issparse(value):
+            matrix = sparse.csr_matrix(value)
+            matrix.sum_duplicates()
+            matrix.eliminate_zeros()
+            matrix.sort_indices()
+            pattern = cls(matrix.shape, matrix.indptr, matrix.indices, True)
+            return pattern, matrix.data
+        value = np.asarray(value, dtype=float)
+        if value.ndim < 2:
+            value = value.reshape(-1, 1)
+        rows, cols = np.nonzero(value)
+        pattern = cls.from_keys(value.shape, rows * value.shape[1] + cols)
+        return pattern, value[rows, cols]
+
+    def row_entries(self, rows):
+        """Indices of the entries in the given rows (in order), and the index (in
+        `rows`) of the row of each entry"""
+        rows = np.asarray(rows, dtype=np.int64)
+        counts = self.indptr[rows + 1] - self.indptr[rows]
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        entries = np.arange(offsets[-1]) + np.repeat(
+            self.indptr[rows] - offsets[:-1], counts
+        )
+        entry_rows = np.repeat(np.arange(len(rows)), counts)
+        return entries, entry_rows
+
+    def lookup_keys(self, keys):
+        """Index of the entries with the given keys, or nnz (the zero slot) for keys
+        outside the pattern"""
+        positions = np.searchsorted(self.keys, keys)
+        found = positions < self.nnz
+        found[found] = self.keys[positions[found]] == keys[found]
+        return np.where(found, positions, self.nnz)
+
+    def lookup(self, rows, cols):
+        """Like lookup_keys, for the entries (rows, cols) of an array that this
+        pattern is broadcast to"""
+        rows = rows if self.shape[0] > 1 else np.zeros_like(rows)
+        cols = cols if self.shape[1] > 1 else np.zeros_like(cols)
+        return self.lookup_keys(rows * self.shape[1] + cols)
+
+    def broadcast_keys(self, shape):
+        """Keys of the entries of the pattern when broadcast to a given shape"""
+        if self.shape == tuple(shape):
+            return self.keys
+        elif self.is_full:
+            return np.arange(shape[0] * shape[1])
+        rows = np.arange(shape[0]) if self.shape[0] == 1 else self.rows
+        cols = np.arange(shape[1]) if self.shape[1] == 1 else self.indices
+        if self.shape[0] == 1 and self.shape[1] == 1:
+            # an empty scalar
+            return np.zeros(0, dtype=np.int64)
+        # one of rows and cols is broadcast, the other has one value per entry
+        return np.unique(rows[:, np.newaxis] * shape[1] + cols[np.newaxis, :])
+
+
+class _SymbolNode(Node):
+    """Node of an autograd trace, which builds the symbol of each traced operation"""
+
+    __slots__ = ["symbol"]
+
+    def __init__(self, value, fun, args, kwargs, parent_argnums, parents):
+        operands = list(args)
+        for argnum, parent in zip(parent_argnums, parents):
+            operands[argnum] = parent.symbol
+        self.symbol = _primitive_to_symbol(fun.__name__, operands, kwargs, args)
+
+    def initialize_root(self, symbol):
+        self.symbol = symbol
+
+
+def _primitive_to_symbol(name, operands, kwargs, args):
+    """Symbol equivalent to applying an (autograd) numpy primitive to operands"""
+    if name in ["add", "mut_add"] and len(operands) == 3:
+        # vector space addition, whose first argument is the vector space
+        operands = operands[1:]
+    operands = [_to_symbol(operand) for operand in operands]
+    if name in ["add", "mut_add"]:
+        return operands[0] + operands[1]
+    elif name == "subtract":
+        return operands[0] - operands[1]
+    elif name == "multiply":
+        return operands[0] * operands[1]
+    elif name in ["divide", "true_divide"]:
+        return operands[0] / operands[1]
+    elif name == "power":
+        return operands[0] ** operands[1]
+    elif name == "negative":
+        return -operands[0]
+    elif name == "square":
+        return operands[0] ** 2
+    elif name == "reciprocal":
+        return 1 / operands[0]
+    elif name in ["absolute", "abs"]:
+        return abs(operands[0])
+    elif name in UNARY_FUNCTIONS[3:]:
+        return pybamm.Function(getattr(np, name), operands[0])
+    elif name == "sum" and np.shape(args[0]) == np.shape(np.sum(args[0], **kwargs)):
+        # summing over axes of size one (e.g. when autograd "unbroadcasts")
+        return operands[0]
+    raise NotImplementedError("numpy function '{}' not implemented".format(name))
+
+
+def _to_symbol(value):
+    if isinstance(value, pybamm.Symbol):
+        return value
+    elif isinstance(value, numbers.Number) or np.size(value) == 1:
+        return pybamm.Scalar(float(np.reshape(value, -1)[0]))
+    elif isinstance(value, np.ndarray) and value.ndim == 2:
+        return pybamm.Array(value)
+    raise NotImplementedError("cannot convert {} to a symbol".format(value))
+
+
+def _broadcast_shape(left, right):
+    shape = []
+    for left_size, right_size in zip(left, right):
+        if left_size == right_size or right_size == 1:
+            shape.append(left_size)
+        elif left_size == 1:
+            shape.append(right_size)
+        else:
+            raise pybamm.ShapeError(
+                "cannot broadcast shapes {} and {}".format(left, right)
+            )
+    return tuple(shape)
+
+
+def _evaluate_unary(function, x):
+    if function == "identity":
+        return x
+    return getattr(np, function)(x)
+
+
+def _evaluate_binary(operator, x, y):
+    return getattr(np, operator)(x, y)
+
+
+def _evaluate_ppoly(coefficients, x):
+    number_of_intervals, order, extrapolate = coefficients[:3].astype(int)
+    breakpoints = coefficients[3 : 4 + number_of_intervals]
+    c = coefficients[
+        4 + number_of_intervals : 4 + number_of_intervals * (order + 1)
+    ].reshape(order, number_of_intervals)
+    intervals = np.clip(
+        np.searchsorted(breakpoints, x, side="right") - 1, 0, number_of_intervals - 1
+    )
+    dx = x - breakpoints[intervals]
+    result = np.zeros_like(x)
+    for m in range(order):
+        result = result * dx + c[m, intervals]
+    if not extrapolate:
+        result[(x < breakpoints[0]) | (x > breakpoints[-1])] = np.nan
+    return result
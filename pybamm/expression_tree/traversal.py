@@ -0,0 +1,84 @@
+#
+# Non-recursive traversal of expression trees
+#
+
+
+def post_order_rewrite(symbol, visit, memo=None, children=None, enter=None):
+    """
+    Rewrite an expression tree from the leaves up, using an explicit stack instead
+    of recursion, so that the depth of the tree is not limited by Python's recursion
+    limit. This is the engine behind the passes that rebuild a tree node by node,
+    such as :meth:`pybamm.ParameterValues.process_symbol`,
+    :meth:`pybamm.Discretisation.process_symbol`, :class:`pybamm.Simplification`,
+    :class:`pybamm.Jacobian` and :func:`pybamm.find_symbols`.
+
+    Each node is visited once per id: the results are stored in `memo`, indexed by
+    the ids of the nodes, and nodes whose id is already in `memo` (e.g. subtrees
+    that are shared, or that were processed by a previous call with the same memo)
+    are not visited again. The nodes are visited in the same order as a recursive
+    depth-first traversal that processes the children from left to right.
+
+    **Example**
+
+    >>> import pybamm
+    >>> expr = pybamm.Parameter("a") + pybamm.Parameter("b")
+    >>> pybamm.post_order_rewrite(
+    ...     expr, lambda symbol, children: [symbol.name] + sum(children, [])
+    ... )
+    ['+', 'a', 'b']
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol`
+        The expression tree to rewrite
+    visit : callable
+        Function ``visit(symbol, new_children)`` returning the result for `symbol`,
+        given the list of results for its children
+    memo : dict, optional
+        Dictionary of node ids to results, which is read and updated. A new
+        dictionary is used if not given
+    children : callable, optional
+        Function ``children(symbol)`` returning the nodes whose results are passed
+        to `visit` for `symbol`. Default is the children of the node. This can be
+        used to stop the traversal at a node, by returning an empty list
+    enter : callable, optional
+        Function ``enter(symbol)`` called when a node is first reached, before its
+        children are visited (i.e. in pre-order)
+
+    Returns
+    -------
+    object
+        The result of `visit` for `symbol`
+    """
+    if memo is None:
+        memo = {}
+    try:
+        return memo[symbol.id]
+    except KeyError:
+        pass
+
+    # each entry of the stack is a node, with the nodes it depends on once these
+    # have been pushed on the stack (None before that)
+    stack = [(symbol, None)]
+    while stack:
+        node, node_children = stack[-1]
+        if node_children is None:
+            if node.id in memo:
+                # already reached through another (shared) subtree
+                stack.pop()
+                continue
+            if enter is not None:
+                enter(node)
+            node_children = node.children if children is None else children(node)
+            stack[-1] = (node, node_children)
+            # push the children in reverse order, so that the leftmost child is
+            # processed first
+            for child in reversed(node_children):
+                if child.id not in memo:
+                    stack.append((child, None))
+        else:
+            stack.pop()
+            if node.id not in memo:
+                memo[node.id] = visit(node, [memo[child.id] for child in node_children])
+
+    return memo[symbol.id]
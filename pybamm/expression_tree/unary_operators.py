@@ -37,10 +37,9 @@ class UnaryOperator(pybamm.Symbol):
         """ See :meth:`pybamm.Symbol.__str__()`. """
         return "{}({!s})".format(self.name, self.child)
 
-    def new_copy(self):
-        """ See :meth:`pybamm.Symbol.new_copy()`. """
-        new_child = self.child.new_copy()
-        return self._unary_new_copy(new_child)
+    def _copy_with_children(self, children):
+        """ See :meth:`pybamm.Symbol._copy_with_children()`. """
+        return self._unary_new_copy(children[0])
 
     def _unary_new_copy(self, child):
         """Make a new copy of the unary operator, with child `child`"""
@@ -63,15 +62,15 @@ class UnaryOperator(pybamm.Symbol):
         """Perform unary operation on a child. """
         raise NotImplementedError
 
-    def evaluate(self, t=None, y=None, known_evals=None):
+    def evaluate(self, t=None, y=None, u=None, known_evals=None):
         """ See :meth:`pybamm.Symbol.evaluate()`. """
         if known_evals is not None:
             if self.id not in known_evals:
-                child, known_evals = self.child.evaluate(t, y, known_evals)
+                child, known_evals = self.child.evaluate(t, y, u, known_evals)
                 known_evals[self.id] = self._unary_evaluate(child)
             return known_evals[self.id], known_evals
         else:
-            child = self.child.evaluate(t, y)
+            child = self.child.evaluate(t, y, u)
             return self._unary_evaluate(child)
 
     def evaluate_for_shape(self):
@@ -79,7 +78,7 @@ class UnaryOperator(pybamm.Symbol):
         Default behaviour: unary operator has same shape as child
         See :meth:`pybamm.Symbol.evaluate_for_shape()`
         """
-        return self.children[0].evaluate_for_shape()
+        return self.children[0].shape_placeholder()
 
     def evaluates_on_edges(self):
         """ See :meth:`pybamm.Symbol.evaluates_on_edges()`. """
@@ -208,7 +207,7 @@ class Index(UnaryOperator):
 
     def set_id(self):
         """ See :meth:`pybamm.Symbol.set_id()` """
-        self._id = hash(
+        self._id = pybamm.stable_hash(
             (
                 self.__class__,
                 self.name,
@@ -217,6 +216,7 @@ class Index(UnaryOperator):
                 self.children[0].id,
             )
             + tuple(self.domain)
+            + tuple([(k, tuple(v)) for k, v in self.auxiliary_domains.items()])
         )
 
     def _unary_evaluate(self, child):
@@ -229,7 +229,7 @@ class Index(UnaryOperator):
         return self.__class__(child, self.index, check_size=False)
 
     def evaluate_for_shape(self):
-        return self._unary_evaluate(self.children[0].evaluate_for_shape())
+        return self._unary_evaluate(self.children[0].shape_placeholder())
 
     def evaluates_on_edges(self):
         """ See :meth:`pybamm.Symbol.evaluates_on_edges()`. """
@@ -434,7 +434,7 @@ class Integral(SpatialOperator):
         """ See :meth:`pybamm.Symbol.set_id()` """
         if not isinstance(self.integration_variable, list):
             self.integration_variable = [self.integration_variable]
-        self._id = hash(
+        self._id = pybamm.stable_hash(
             (self.__class__, self.name)
             + tuple(
                 [
@@ -444,6 +444,7 @@ class Integral(SpatialOperator):
             )
             + (self.children[0].id,)
             + tuple(self.domain)
+            + tuple([(k, tuple(v)) for k, v in self.auxiliary_domains.items()])
         )
 
     def _unary_simplify(self, simplified_child):
@@ -504,7 +505,7 @@ class IndefiniteIntegral(Integral):
             self.name += " on {}".format(integration_variable.domain)
 
     def evaluate_for_shape(self):
-        return self.children[0].evaluate_for_shape()
+        return self.children[0].shape_placeholder()
 
 
 class DefiniteIntegralVector(SpatialOperator):
@@ -536,10 +537,11 @@ class DefiniteIntegralVector(SpatialOperator):
 
     def set_id(self):
         """ See :meth:`pybamm.Symbol.set_id()` """
-        self._id = hash(
+        self._id = pybamm.stable_hash(
             (self.__class__, self.name, self.vector_type)
             + (self.children[0].id,)
             + tuple(self.domain)
+            + tuple([(k, tuple(v)) for k, v in self.auxiliary_domains.items()])
         )
 
     def _unary_simplify(self, simplified_child):
@@ -599,8 +601,10 @@ class BoundaryIntegral(SpatialOperator):
 
     def set_id(self):
         """ See :meth:`pybamm.Symbol.set_id()` """
-        self._id = hash(
-            (self.__class__, self.name) + (self.children[0].id,) + tuple(self.domain)
+        self._id = pybamm.stable_hash(
+            (self.__class__, self.name, self.children[0].id)
+            + tuple(self.domain)
+            + tuple([(k, tuple(v)) for k, v in self.auxiliary_domains.items()])
         )
 
     def _unary_simplify(self, simplified_child):
@@ -645,7 +649,7 @@ class DeltaFunction(SpatialOperator):
 
     def set_id(self):
         """ See :meth:`pybamm.Symbol.set_id()` """
-        self._id = hash(
+        self._id = pybamm.stable_hash(
             (self.__class__, self.name, self.side, self.children[0].id)
             + tuple(self.domain)
             + tuple([(k, tuple(v)) for k, v in self.auxiliary_domains.items()])
@@ -708,7 +712,7 @@ class BoundaryOperator(SpatialOperator):
 
     def set_id(self):
         """ See :meth:`pybamm.Symbol.set_id()` """
-        self._id = hash(
+        self._id = pybamm.stable_hash(
             (self.__class__, self.name, self.side, self.children[0].id)
             + tuple(self.domain)
             + tuple([(k, tuple(v)) for k, v in self.auxiliary_domains.items()])
@@ -896,7 +900,6 @@ def x_average(symbol):
     # If symbol doesn't have a domain, its average value is itself
     if symbol.domain in [[], ["current collector"]]:
         new_symbol = symbol.new_copy()
-        new_symbol.parent = None
         return new_symbol
     # If symbol is a Broadcast, its average value is its child
     elif isinstance(symbol, pybamm.Broadcast):
@@ -965,7 +968,6 @@ def z_average(symbol):
     # If symbol doesn't have a domain, its average value is itself
     if symbol.domain == []:
         new_symbol = symbol.new_copy()
-        new_symbol.parent = None
         return new_symbol
     # If symbol is a Broadcast, its average value is its child
     elif isinstance(symbol, pybamm.Broadcast):
@@ -1001,7 +1003,6 @@ def yz_average(symbol):
     # If symbol doesn't have a domain, its average value is itself
     if symbol.domain == []:
         new_symbol = symbol.new_copy()
-        new_symbol.parent = None
         return new_symbol
     # If symbol is a Broadcast, its average value is its child
     elif isinstance(symbol, pybamm.Broadcast):
@@ -1033,7 +1034,6 @@ def boundary_value(symbol, side):
     # If symbol doesn't have a domain, its boundary value is itself
     if symbol.domain == []:
         new_symbol = symbol.new_copy()
-        new_symbol.parent = None
         return new_symbol
     # If symbol is a Broadcast, its boundary value is its child
     if isinstance(symbol, pybamm.Broadcast):
@@ -1059,7 +1059,6 @@ def r_average(symbol):
     # If symbol doesn't have a particle domain, its r-averaged value is itself
     if symbol.domain not in [["positive particle"], ["negative particle"]]:
         new_symbol = symbol.new_copy()
-        new_symbol.parent = None
         return new_symbol
     # If symbol is a Broadcast, its average value is its child
     elif isinstance(symbol, pybamm.Broadcast):
@@ -3,9 +3,15 @@
 #
 import pybamm
 
+import itertools
 import numbers
 import warnings
 
+# Global counter used to stamp model versions. Drawing from a single counter means a
+# version is never shared between two different models, even if one of them has been
+# garbage-collected and its memory reused
+_model_version_counter = itertools.count()
+
 
 class BaseModel(object):
     """Base model class for other models to extend.
@@ -73,9 +79,23 @@ class BaseModel(object):
         algebraic equations, Jacobain (if using) and events into pure python code
         that will calculate the result of calling `evaluate(t, y)` on the given
         expression tree (default is True)
+    convert_to_format : str
+        The format that the expression trees are converted to if `use_to_python` is
+        True: "python" (default) for python code (see :class:`pybamm.EvaluatorPython`)
+        or "numba" for functions compiled with numba (see
+        :class:`pybamm.EvaluatorNumba`), which are much faster to evaluate but take
+        longer to set up
+    version : int
+        A stamp that changes every time an attribute used by the solvers (equations,
+        initial conditions, events, mass matrix, the `use_*` flags or
+        `convert_to_format`) is set. Solvers use it to decide whether their cached
+        set-up is still valid. Changes made in place (e.g. `model.rhs[var] = ...`)
+        cannot be detected, so
+        :meth:`update_version` should be called after such changes.
     """
 
     def __init__(self, name="Unnamed model"):
+        self.update_version()
         self.name = name
         self.options = {}
 
@@ -97,6 +117,7 @@ class BaseModel(object):
         self.use_jacobian = True
         self.use_simplify = True
         self.use_to_python = True
+        self.convert_to_format = "python"
 
     def _set_dictionary(self, dict, name):
         """
@@ -136,6 +157,7 @@ class BaseModel(object):
 
     @rhs.setter
     def rhs(self, rhs):
+        self.update_version()
         self._rhs = self._set_dictionary(rhs, "rhs")
 
     @property
@@ -144,6 +166,7 @@ class BaseModel(object):
 
     @algebraic.setter
     def algebraic(self, algebraic):
+        self.update_version()
         self._algebraic = self._set_dictionary(algebraic, "algebraic")
 
     @property
@@ -152,6 +175,7 @@ class BaseModel(object):
 
     @initial_conditions.setter
     def initial_conditions(self, initial_conditions):
+        self.update_version()
         self._initial_conditions = self._set_dictionary(
             initial_conditions, "initial_conditions"
         )
@@ -194,6 +218,7 @@ class BaseModel(object):
 
     @events.setter
     def events(self, events):
+        self.update_version()
         self._events = events
 
     @property
@@ -202,6 +227,7 @@ class BaseModel(object):
 
     @concatenated_rhs.setter
     def concatenated_rhs(self, concatenated_rhs):
+        self.update_version()
         self._concatenated_rhs = concatenated_rhs
 
     @property
@@ -210,6 +236,7 @@ class BaseModel(object):
 
     @concatenated_algebraic.setter
     def concatenated_algebraic(self, concatenated_algebraic):
+        self.update_version()
         self._concatenated_algebraic = concatenated_algebraic
 
     @property
@@ -218,6 +245,7 @@ class BaseModel(object):
 
     @concatenated_initial_conditions.setter
     def concatenated_initial_conditions(self, concatenated_initial_conditions):
+        self.update_version()
         self._concatenated_initial_conditions = concatenated_initial_conditions
 
     @property
@@ -226,6 +254,7 @@ class BaseModel(object):
 
     @mass_matrix.setter
     def mass_matrix(self, mass_matrix):
+        self.update_version()
         self._mass_matrix = mass_matrix
 
     @property
@@ -252,6 +281,59 @@ class BaseModel(object):
     def jacobian_algebraic(self, jacobian_algebraic):
         self._jacobian_algebraic = jacobian_algebraic
 
+    @property
+    def use_jacobian(self):
+        return self._use_jacobian
+
+    @use_jacobian.setter
+    def use_jacobian(self, use_jacobian):
+        self.update_version()
+        self._use_jacobian = use_jacobian
+
+    @property
+    def use_simplify(self):
+        return self._use_simplify
+
+    @use_simplify.setter
+    def use_simplify(self, use_simplify):
+        self.update_version()
+        self._use_simplify = use_simplify
+
+    @property
+    def use_to_python(self):
+        return self._use_to_python
+
+    @use_to_python.setter
+    def use_to_python(self, use_to_python):
+        self.update_version()
+        self._use_to_python = use_to_python
+
+    @property
+    def convert_to_format(self):
+        return self._convert_to_format
+
+    @convert_to_format.setter
+    def convert_to_format(self, convert_to_format):
+        if convert_to_format not in ["python", "numba"]:
+            raise ValueError(
+                "convert_to_format '{}' not recognised".format(convert_to_format)
+            )
+        self.update_version()
+        self._convert_to_format = convert_to_format
+
+    @property
+    def version(self):
+        return self._version
+
+    def update_version(self):
+        """
+        Give the model a new version stamp, invalidating any solver set-up that has
+        been cached for the model. This is called automatically whenever one of the
+        model's equations is set, but must be called explicitly after modifying the
+        equations in place.
+        """
+        self._version = next(_model_version_counter)
+
     @property
     def set_of_parameters(self):
         return self._set_of_parameters
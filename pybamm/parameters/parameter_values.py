@@ -16,6 +16,8 @@ class ParameterValues(dict):
     values : dict or string
         Explicit set of parameters, or reference to a file of parameters
         If string, gets passed to read_parameters_csv to read a file.
+        Parameters with the value "[input]" are processed into a
+        :class:`pybamm.InputParameter`, whose value is only given when solving.
     chemistry : dict
         Dict of strings for default chemistries. Must be of the form:
         {"base chemistry": base_chemistry,
@@ -160,6 +162,10 @@ class ParameterValues(dict):
                         data = np.loadtxt(os.path.join(path, value[6:] + ".csv"))
                         # Save name and data
                         self[name] = (value[6:], data)
+                    # Input parameters are flagged with the string "[input]"
+                    # (their value is given when solving)
+                    elif value == "[input]":
+                        self[name] = value
                     # Anything else should be a converted to a float
                     else:
                         self[name] = float(value)
@@ -366,24 +372,26 @@ class ParameterValues(dict):
 
         """
 
-        try:
-            return self._processed_symbols[symbol.id]
-        except KeyError:
-            processed_symbol = self._process_symbol(symbol)
+        return pybamm.post_order_rewrite(
+            symbol, self._process_symbol, self._processed_symbols
+        )
 
-            self._processed_symbols[symbol.id] = processed_symbol
-            return processed_symbol
-
-    def _process_symbol(self, symbol):
-        """ See :meth:`ParameterValues.process_symbol()`. """
+    def _process_symbol(self, symbol, new_children):
+        """
+        See :meth:`ParameterValues.process_symbol()`. `new_children` are the processed
+        children of `symbol`.
+        """
 
         if isinstance(symbol, pybamm.Parameter):
             value = self[symbol.name]
+            # Input parameters are replaced by an InputParameter, whose value is only
+            # given when solving
+            if isinstance(value, str) and value == "[input]":
+                return pybamm.InputParameter(symbol.name)
             # Scalar inherits name (for updating parameters) and domain (for Broadcast)
             return pybamm.Scalar(value, name=symbol.name, domain=symbol.domain)
 
         elif isinstance(symbol, pybamm.FunctionParameter):
-            new_children = [self.process_symbol(child) for child in symbol.children]
             function_name = self[symbol.name]
 
             # if current setter, process any parameters that are symbols and
@@ -417,9 +425,7 @@ class ParameterValues(dict):
                 return function.diff(new_diff_variable)
 
         elif isinstance(symbol, pybamm.BinaryOperator):
-            # process children
-            new_left = self.process_symbol(symbol.left)
-            new_right = self.process_symbol(symbol.right)
+            new_left, new_right = new_children
             # make new symbol, ensure domain remains the same
             new_symbol = symbol.__class__(new_left, new_right)
             new_symbol.domain = symbol.domain
@@ -427,20 +433,17 @@ class ParameterValues(dict):
 
         # Unary operators
         elif isinstance(symbol, pybamm.UnaryOperator):
-            new_child = self.process_symbol(symbol.child)
-            new_symbol = symbol._unary_new_copy(new_child)
+            new_symbol = symbol._unary_new_copy(new_children[0])
             # ensure domain remains the same
             new_symbol.domain = symbol.domain
             return new_symbol
 
         # Functions
         elif isinstance(symbol, pybamm.Function):
-            new_children = [self.process_symbol(child) for child in symbol.children]
             return symbol._function_new_copy(new_children)
 
         # Concatenations
         elif isinstance(symbol, pybamm.Concatenation):
-            new_children = [self.process_symbol(child) for child in symbol.children]
             return symbol._concatenation_new_copy(new_children)
 
         else:
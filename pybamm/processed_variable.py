@@ -7,7 +7,9 @@ import pybamm
 import scipy.interpolate as interp
 
 
-def post_process_variables(variables, t_sol, u_sol, mesh=None, interp_kind="linear"):
+def post_process_variables(
+    variables, t_sol, u_sol, mesh=None, interp_kind="linear", inputs=None
+):
     """
     Post-process all variables in a model
 
@@ -25,6 +27,9 @@ def post_process_variables(variables, t_sol, u_sol, mesh=None, interp_kind="line
         interpolation
     interp_kind : str
         The method to use for interpolation
+    inputs : dict, optional
+        Any input parameters that were passed to the model when solving (see
+        :class:`pybamm.InputParameter`)
 
     Returns
     -------
@@ -36,7 +41,7 @@ def post_process_variables(variables, t_sol, u_sol, mesh=None, interp_kind="line
     for var, eqn in variables.items():
         pybamm.logger.debug("Post-processing {}".format(var))
         processed_variables[var] = ProcessedVariable(
-            eqn, t_sol, u_sol, mesh, interp_kind, known_evals
+            eqn, t_sol, u_sol, mesh, interp_kind, known_evals, inputs
         )
 
         for t in known_evals:
@@ -66,6 +71,11 @@ class ProcessedVariable(object):
         interpolation
     interp_kind : str
         The method to use for interpolation
+    known_evals : dict, optional
+        Dictionary of known evaluations, to be reused between variables
+    inputs : dict, optional
+        Any input parameters that were passed to the model when solving (see
+        :class:`pybamm.InputParameter`)
     """
 
     def __init__(
@@ -76,6 +86,7 @@ class ProcessedVariable(object):
         mesh=None,
         interp_kind="linear",
         known_evals=None,
+        inputs=None,
     ):
         self.base_variable = base_variable
         self.t_sol = t_sol
@@ -85,13 +96,17 @@ class ProcessedVariable(object):
         self.domain = base_variable.domain
         self.auxiliary_domains = base_variable.auxiliary_domains
         self.known_evals = known_evals
+        self.inputs = inputs or {}
 
         if self.known_evals:
             self.base_eval, self.known_evals[t_sol[0]] = base_variable.evaluate(
-                t_sol[0], u_sol[:, 0], self.known_evals[t_sol[0]]
+                t_sol[0],
+                u_sol[:, 0],
+                self.inputs,
+                known_evals=self.known_evals[t_sol[0]],
             )
         else:
-            self.base_eval = base_variable.evaluate(t_sol[0], u_sol[:, 0])
+            self.base_eval = base_variable.evaluate(t_sol[0], u_sol[:, 0], self.inputs)
 
         # handle 2D (in space) finite element variables differently
         if (
@@ -131,10 +146,12 @@ class ProcessedVariable(object):
             t = self.t_sol[idx]
             if self.known_evals:
                 entries[idx], self.known_evals[t] = self.base_variable.evaluate(
-                    t, self.u_sol[:, idx], self.known_evals[t]
+                    t, self.u_sol[:, idx], self.inputs, known_evals=self.known_evals[t]
                 )
             else:
-                entries[idx] = self.base_variable.evaluate(t, self.u_sol[:, idx])
+                entries[idx] = self.base_variable.evaluate(
+                    t, self.u_sol[:, idx], self.inputs
+                )
 
         # No discretisation provided, or variable has no domain (function of t only)
         self._interpolation_function = interp.interp1d(
@@ -158,12 +175,12 @@ class ProcessedVariable(object):
             u = self.u_sol[:, idx]
             if self.known_evals:
                 eval_and_known_evals = self.base_variable.evaluate(
-                    t, u, self.known_evals[t]
+                    t, u, self.inputs, known_evals=self.known_evals[t]
                 )
                 entries[:, idx] = eval_and_known_evals[0][:, 0]
                 self.known_evals[t] = eval_and_known_evals[1]
             else:
-                entries[:, idx] = self.base_variable.evaluate(t, u)[:, 0]
+                entries[:, idx] = self.base_variable.evaluate(t, u, self.inputs)[:, 0]
 
         # Process the discretisation to get x values
         nodes = self.mesh.combine_submeshes(*self.domain)[0].nodes
@@ -301,7 +318,7 @@ class ProcessedVariable(object):
             u = self.u_sol[:, idx]
             if self.known_evals:
                 eval_and_known_evals = self.base_variable.evaluate(
-                    t, u, self.known_evals[t]
+                    t, u, self.inputs, known_evals=self.known_evals[t]
                 )
                 entries[:, :, idx] = np.reshape(
                     eval_and_known_evals[0],
@@ -311,7 +328,7 @@ class ProcessedVariable(object):
                 self.known_evals[t] = eval_and_known_evals[1]
             else:
                 entries[:, :, idx] = np.reshape(
-                    self.base_variable.evaluate(t, u),
+                    self.base_variable.evaluate(t, u, self.inputs),
                     [first_dim_size, second_dim_size],
                     order=order,
                 )
@@ -338,7 +355,9 @@ class ProcessedVariable(object):
         len_z = len(z_sol)
 
         # Evaluate the base_variable
-        entries = np.reshape(self.base_variable.evaluate(0, self.u_sol), [len_y, len_z])
+        entries = np.reshape(
+            self.base_variable.evaluate(0, self.u_sol, self.inputs), [len_y, len_z]
+        )
 
         # assign attributes for reference
         self.entries = entries
@@ -366,13 +385,13 @@ class ProcessedVariable(object):
             u = self.u_sol[:, idx]
             if self.known_evals:
                 eval_and_known_evals = self.base_variable.evaluate(
-                    t, u, self.known_evals[t]
+                    t, u, self.inputs, known_evals=self.known_evals[t]
                 )
                 entries[:, :, idx] = np.reshape(eval_and_known_evals[0], [len_y, len_z])
                 self.known_evals[t] = eval_and_known_evals[1]
             else:
                 entries[:, :, idx] = np.reshape(
-                    self.base_variable.evaluate(t, u), [len_y, len_z]
+                    self.base_variable.evaluate(t, u, self.inputs), [len_y, len_z]
                 )
 
         # assign attributes for reference
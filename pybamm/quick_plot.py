@@ -184,7 +184,11 @@ class QuickPlot(object):
                     {var: model.variables[var] for var in variable_list}
                 )
             processed_variables[model] = pybamm.post_process_variables(
-                variables_to_process, solutions[i].t, solutions[i].y, meshes[i]
+                variables_to_process,
+                solutions[i].t,
+                solutions[i].y,
+                meshes[i],
+                inputs=solutions[i].inputs,
             )
 
         # Prepare dictionary of variables
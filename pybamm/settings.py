@@ -1,6 +1,7 @@
 #
 # Settings class for PyBaMM
 #
+import pybamm
 
 
 class Settings(object):
@@ -15,5 +16,20 @@ class Settings(object):
         assert isinstance(value, bool)
         self._debug_mode = value
 
+    _intern_table = None
+
+    @property
+    def intern_table(self):
+        """
+        Table used to share identical nodes of expression trees, or None (default)
+        to not share them (see :class:`pybamm.InternTable`)
+        """
+        return self._intern_table
+
+    @intern_table.setter
+    def intern_table(self, value):
+        assert value is None or isinstance(value, pybamm.InternTable)
+        self._intern_table = value
+
 
 settings = Settings()
@@ -4,26 +4,32 @@
 import pybamm
 import numpy as np
 from scipy import optimize
+from scipy.sparse import issparse
 
 
 class AlgebraicSolver(object):
-    """Solve a discretised model which contains only (time independent) algebraic
-    equations using a root finding algorithm.
-    Note: this solver could be extended for quasi-static models, or models in
-    which the time derivative is manually discretised and results in a (possibly
-    nonlinear) algebaric system at each time level.
+    """Solve a discretised model which contains only algebraic equations using a root
+    finding algorithm. Quasi-static models, whose algebraic equations depend on time
+    (or models in which the time derivative is manually discretised and results in a
+    (possibly nonlinear) algebraic system at each time level), can be solved by
+    marching through the time levels with :meth:`solve_quasi_static()`.
 
     Parameters
     ----------
     method : str, optional
-        The method to use to solve the system (default is "lm")
+        The method to use to solve the system (default is "newton", the damped Newton
+        method with sparse jacobians :func:`pybamm.newton_root`, which falls back to
+        "lm" for models without a jacobian). Can also be any method of
+        :func:`scipy.optimize.root` (e.g. "krylov", which does not need the
+        jacobian), in which case the jacobian is converted to a dense array.
     tolerance : float, optional
         The tolerance for the solver (default is 1e-6).
     """
 
-    def __init__(self, method="lm", tol=1e-6):
+    def __init__(self, method="newton", tol=1e-6):
         self.method = method
         self.tol = tol
+        self.constant_jacobian = False
 
     @property
     def method(self):
@@ -41,7 +47,7 @@ class AlgebraicSolver(object):
     def tol(self, value):
         self._tol = value
 
-    def solve(self, model):
+    def solve(self, model, inputs=None):
         """Calculate the solution of the model.
 
         Parameters
@@ -49,8 +55,35 @@ class AlgebraicSolver(object):
         model : :class:`pybamm.BaseModel`
             The model whose solution to calculate. Must only contain algebraic
             equations.
+        inputs : dict, optional
+            Any input parameters to pass to the model when solving (see
+            :class:`pybamm.InputParameter`)
 
         """
+        return self.solve_sequence(model, [inputs])[0]
+
+    def solve_sequence(self, model, inputs_list):
+        """
+        Calculate the solutions of the model along a path of values of its input
+        parameters (e.g. a sweep over a conductivity). The model is set up once, and
+        each solve is warm-started from the solution of the previous one (the first
+        one starts from the "initial conditions" set in the model), so that, for
+        small changes of the inputs, each solve only needs a few Newton iterations.
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel`
+            The model whose solution to calculate. Must only contain algebraic
+            equations.
+        inputs_list : list of dict
+            The input parameters for each solve, in order (see
+            :class:`pybamm.InputParameter`)
+
+        Returns
+        -------
+        list of :class:`pybamm.Solution`
+            The solution for each value of the inputs
+        """
         pybamm.logger.info("Start solving {}".format(model.name))
 
         # Set up
@@ -59,36 +92,110 @@ class AlgebraicSolver(object):
         concatenated_algebraic, jac = self.set_up(model)
         set_up_time = timer.time() - start_time
 
-        # Create function to evaluate algebraic
-        def algebraic(y):
-            return concatenated_algebraic.evaluate(0, y, known_evals={})[0][:, 0]
+        # Use "initial conditions" set in model as initial guess
+        y_guess = model.concatenated_initial_conditions
 
-        # Create function to evaluate jacobian
-        if jac is not None:
+        solutions = []
+        for inputs in inputs_list:
+            inputs = inputs or {}
+            solve_start_time = timer.time()
 
-            def jacobian(y):
-                # Note: we only use this solver for time independent algebraic
-                # systems, so jac is arbitrarily evaluated at t=0. Also, needs
-                # to be converted from sparse to dense, so in very large
-                # algebraic models it may be best to switch use_jacobian to False
-                # by default.
-                return jac.evaluate(0, y, known_evals={})[0].toarray()
+            # Note: the equations are time independent, so they are arbitrarily
+            # evaluated at t=0
+            algebraic, jacobian = self._model_functions(
+                concatenated_algebraic, jac, inputs
+            )
 
-        else:
-            jacobian = None
+            # Solve
+            pybamm.logger.info("Calling root finding algorithm")
+            solution = self.root(
+                lambda y: algebraic(0, y),
+                y_guess,
+                jacobian=None if jacobian is None else lambda y: jacobian(0, y),
+            )
+            y_guess = solution.y[:, 0]
 
-        # Use "initial conditions" set in model as initial guess
-        y0_guess = model.concatenated_initial_conditions
+            # Assign times and inputs
+            solution.solve_time = timer.time() - solve_start_time
+            solution.set_up_time = set_up_time
+            solution.total_time = set_up_time + timer.time() - solve_start_time
+            solution.inputs = inputs
+            solutions.append(solution)
 
-        # Solve
+        pybamm.logger.info("Finish solving {}".format(model.name))
+        pybamm.logger.info(
+            "Set-up time: {}, Solve time: {}, Total time: {}".format(
+                timer.format(set_up_time),
+                timer.format(sum(solution.solve_time for solution in solutions)),
+                timer.format(timer.time() - start_time),
+            )
+        )
+        return solutions
+
+    def solve_quasi_static(self, model, t_eval, inputs=None):
+        """
+        Calculate the solution of a quasi-static model, whose algebraic equations
+        depend on time, by solving them at each of the specified times in turn. Each
+        solve is warm-started from the solution at the previous time (the first one
+        starts from the "initial conditions" set in the model), and a jacobian that
+        depends on neither time nor the state is evaluated and factorised once for
+        the whole march.
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel`
+            The model whose solution to calculate. Must only contain algebraic
+            equations.
+        t_eval : numeric type
+            The times at which to compute the solution
+        inputs : dict, optional
+            Any input parameters to pass to the model when solving (see
+            :class:`pybamm.InputParameter`)
+
+        Returns
+        -------
+        :class:`pybamm.Solution`
+            The solution at the times `t_eval`, whose stats hold the total number of
+            iterations, evaluations and factorisations of the root finding, as far as
+            the method reports them
+        """
+        pybamm.logger.info(
+            "Start solving {} at {} times".format(model.name, len(t_eval))
+        )
+        inputs = inputs or {}
+
+        # Set up
+        timer = pybamm.Timer()
+        start_time = timer.time()
+        concatenated_algebraic, jac = self.set_up(model)
+        algebraic, jacobian = self._model_functions(concatenated_algebraic, jac, inputs)
+        set_up_time = timer.time() - start_time
+
+        # March through the times, using the "initial conditions" set in model as
+        # initial guess for the first one
         solve_start_time = timer.time()
-        pybamm.logger.info("Calling root finding algorithm")
-        solution = self.root(algebraic, y0_guess, jacobian=jacobian)
+        y_guess = model.concatenated_initial_conditions
+        y = np.empty((np.size(y_guess), len(t_eval)))
+        stats = {}
+        factorisations = {}
+        for i, t in enumerate(t_eval):
+            pybamm.logger.debug("Calling root finding algorithm at t={}".format(t))
+            solution = self.root(
+                lambda y: algebraic(t, y),
+                y_guess,
+                jacobian=None if jacobian is None else lambda y: jacobian(t, y),
+                factorisations=factorisations,
+            )
+            y[:, i] = y_guess = solution.y[:, 0]
+            for key, value in solution.stats.items():
+                stats[key] = stats.get(key, 0) + value
 
-        # Assign times
+        solution = pybamm.Solution(t_eval, y, None, None, "final time")
+        solution.stats = stats
         solution.solve_time = timer.time() - solve_start_time
-        solution.total_time = timer.time() - start_time
         solution.set_up_time = set_up_time
+        solution.total_time = timer.time() - start_time
+        solution.inputs = inputs
 
         pybamm.logger.info("Finish solving {}".format(model.name))
         pybamm.logger.info(
@@ -100,7 +207,33 @@ class AlgebraicSolver(object):
         )
         return solution
 
-    def root(self, algebraic, y0_guess, jacobian=None):
+    def _model_functions(self, concatenated_algebraic, jac, inputs):
+        """
+        Create the functions of t and y which evaluate the algebraic equations and
+        their jacobian (None if the model has no jacobian) with the given inputs. A
+        constant jacobian (see :meth:`set_up()`) is only evaluated once, and the same
+        object is returned by every call, so that its factorisation can be reused
+        """
+
+        def algebraic(t, y):
+            alg_eval, _ = concatenated_algebraic.evaluate(t, y, inputs, known_evals={})
+            return alg_eval[:, 0]
+
+        if jac is None:
+            return algebraic, None
+
+        jac_evals = []
+
+        def jacobian(t, y):
+            if not self.constant_jacobian:
+                return jac.evaluate(t, y, inputs, known_evals={})[0]
+            if not jac_evals:
+                jac_evals.append(jac.evaluate(t, y, inputs, known_evals={})[0])
+            return jac_evals[0]
+
+        return algebraic, jacobian
+
+    def root(self, algebraic, y0_guess, jacobian=None, factorisations=None):
         """
         Calculate the solution of the algebraic equations through root-finding
 
@@ -113,8 +246,19 @@ class AlgebraicSolver(object):
             Array of the user's guess for the solution, used to initialise
             the root finding algorithm
         jacobian : method, optional
-            A function that takes in t and y and returns the Jacobian. If
+            A function that takes in y and returns the (dense or sparse) Jacobian. If
             None, the solver will approximate the Jacobian if required.
+        factorisations : dict, optional
+            Dictionary in which the Newton method stores the factorised jacobian, so
+            that it is reused if `jacobian` returns the same object again (see
+            :func:`pybamm.newton_root`)
+
+        Returns
+        -------
+        :class:`pybamm.Solution`
+            The solution, whose stats hold the number of iterations and of
+            evaluations of the algebraic equations and of the jacobian, as far as the
+            method reports them
         """
 
         def root_fun(y0):
@@ -127,17 +271,48 @@ class AlgebraicSolver(object):
             )
             return out
 
-        if jacobian:
+        method = self.method
+        if method == "newton" and not jacobian:
+            pybamm.logger.info("No jacobian for the Newton method, using 'lm'")
+            method = "lm"
+
+        if method == "newton":
+            sol = pybamm.newton_root(
+                root_fun,
+                y0_guess,
+                jacobian,
+                tol=self.tol,
+                factorisations=factorisations,
+            )
+        elif jacobian:
+
+            def dense_jacobian(y):
+                jac_eval = jacobian(y)
+                if issparse(jac_eval):
+                    return jac_eval.toarray()
+                return jac_eval
+
             sol = optimize.root(
-                root_fun, y0_guess, method=self.method, tol=self.tol, jac=jacobian
+                root_fun, y0_guess, method=method, tol=self.tol, jac=dense_jacobian
             )
         else:
-            sol = optimize.root(root_fun, y0_guess, method=self.method, tol=self.tol)
+            sol = optimize.root(root_fun, y0_guess, method=method, tol=self.tol)
 
         if sol.success and np.all(sol.fun < self.tol * len(sol.x)):
             termination = "success"
             # Return solution object (no events, so pass None to t_event, y_event)
-            return pybamm.Solution([0], sol.x[:, np.newaxis], None, None, termination)
+            solution = pybamm.Solution(
+                [0], sol.x[:, np.newaxis], None, None, termination
+            )
+            for key, name in [
+                ("nit", "iterations"),
+                ("nfev", "function evaluations"),
+                ("njev", "jacobian evaluations"),
+                ("nfact", "jacobian factorisations"),
+            ]:
+                if key in sol:
+                    solution.stats[name] = sol[key]
+            return solution
         elif not sol.success:
             raise pybamm.SolverError(
                 "Could not find acceptable solution: {}".format(sol.message)
@@ -166,7 +341,9 @@ class AlgebraicSolver(object):
         concatenated_algebraic : :class:`pybamm.Concatenation`
             Algebraic equations, which should evaluate to zero
         jac : :class:`pybamm.SparseStack`
-            Jacobian matrix for the differential and algebraic equations
+            Jacobian matrix for the differential and algebraic equations. Whether it
+            depends on neither time nor the state (so that it is constant for given
+            inputs) is stored in :attr:`constant_jacobian`
 
         Raises
         ------
@@ -188,6 +365,12 @@ class AlgebraicSolver(object):
             pybamm.logger.info("Simplifying algebraic")
             concatenated_algebraic = simp.simplify(concatenated_algebraic)
 
+        # the format that the expression trees are converted to
+        if model.convert_to_format == "numba":
+            evaluator = pybamm.EvaluatorNumba
+        else:
+            evaluator = pybamm.EvaluatorPython
+
         if model.use_jacobian:
             # Create Jacobian from concatenated algebraic
             y = pybamm.StateVector(
@@ -197,22 +380,35 @@ class AlgebraicSolver(object):
             jacobian = pybamm.Jacobian()
             pybamm.logger.info("Calculating jacobian")
             jac = jacobian.jac(concatenated_algebraic, y)
+            pybamm.logger.debug(
+                "Jacobian: {} cache hits, {} misses".format(
+                    jacobian.hits, jacobian.misses
+                )
+            )
             model.jacobian = jac
             model.jacobian_algebraic = jac
 
             if model.use_simplify:
                 pybamm.logger.info("Simplifying jacobian")
                 jac = simp.simplify(jac)
+            self.constant_jacobian = not jac.has_symbol_of_classes(
+                (pybamm.StateVector, pybamm.Time)
+            )
 
             if model.use_to_python:
-                pybamm.logger.info("Converting jacobian to python")
-                jac = pybamm.EvaluatorPython(jac)
+                pybamm.logger.info(
+                    "Converting jacobian to {}".format(model.convert_to_format)
+                )
+                jac = evaluator(jac)
 
         else:
             jac = None
+            self.constant_jacobian = False
 
         if model.use_to_python:
-            pybamm.logger.info("Converting algebraic to python")
-            concatenated_algebraic = pybamm.EvaluatorPython(concatenated_algebraic)
+            pybamm.logger.info(
+                "Converting algebraic to {}".format(model.convert_to_format)
+            )
+            concatenated_algebraic = evaluator(concatenated_algebraic)
 
         return concatenated_algebraic, jac
@@ -2,7 +2,9 @@
 # Base solver class
 #
 import pybamm
+import json
 import numpy as np
+import os
 
 
 class BaseSolver(object):
@@ -20,6 +22,13 @@ class BaseSolver(object):
         self._method = method
         self._rtol = rtol
         self._atol = atol
+        # Identity and version of the model for which the set-up has been performed
+        self._set_up_key = None
+        # Values of the input parameters to use when solving
+        self.inputs = {}
+        # Number of evaluations of the model's functions during the current solve
+        self.reset_callback_counts()
+        self.cache = None
 
     @property
     def method(self):
@@ -45,10 +54,30 @@ class BaseSolver(object):
     def atol(self, value):
         self._atol = value
 
-    def solve(self, model, t_eval):
+    @property
+    def cache(self):
+        """
+        A :class:`pybamm.DiskCache` in which the set-up stores the evaluators that it
+        creates, when the model is converted to python (`model.use_to_python`). When a
+        model with the same (discretised) equations is set up again, e.g. in another
+        process, the evaluators are loaded from the cache instead, skipping the
+        simplification, the calculation of the jacobian and the conversion of the
+        equations. In that case `model.jacobian` is not set. Default is None (no
+        cache).
+        """
+        return self._cache
+
+    @cache.setter
+    def cache(self, cache):
+        self._cache = cache
+
+    def solve(self, model, t_eval, inputs=None):
         """
         Execute the solver setup and calculate the solution of the model at
-        specified times.
+        specified times. The setup is cached, and is only executed again if the
+        model has changed (as indicated by :attr:`pybamm.BaseModel.version`) or if
+        a different model is passed. Changing only the inputs does not require the
+        setup to be executed again.
 
         Parameters
         ----------
@@ -57,6 +86,9 @@ class BaseSolver(object):
             initial_conditions
         t_eval : numeric type
             The times at which to compute the solution
+        inputs : dict, optional
+            Any input parameters to pass to the model when solving (see
+            :class:`pybamm.InputParameter`)
 
         Raises
         ------
@@ -70,19 +102,20 @@ class BaseSolver(object):
         if len(model.rhs) == 0 and len(model.algebraic) == 0:
             raise pybamm.ModelError("Cannot solve empty model")
 
-        # Set up
+        # Set up, unless this model (in its current version) has already been set up
         timer = pybamm.Timer()
         start_time = timer.time()
-        self.set_up(model)
+        self.set_up_if_changed(model, inputs or {})
         set_up_time = timer.time() - start_time
 
         # Solve
         solution, solve_time, termination = self.compute_solution(model, t_eval)
 
-        # Assign times
+        # Assign times and inputs
         solution.solve_time = solve_time
         solution.total_time = timer.time() - start_time
         solution.set_up_time = set_up_time
+        solution.inputs = self.inputs
 
         pybamm.logger.info("Finish solving {} ({})".format(model.name, termination))
         pybamm.logger.info(
@@ -94,7 +127,7 @@ class BaseSolver(object):
         )
         return solution
 
-    def step(self, model, dt, npts=2):
+    def step(self, model, dt, npts=2, inputs=None):
         """
         Step the solution of the model forward by a given time increment. The
         first time this method is called it executes the necessary setup by
@@ -110,6 +143,9 @@ class BaseSolver(object):
         npts : int, optional
             The number of points at which the solution will be returned during
             the step dt. default is 2 (returns the solution at t0 and t0 + dt).
+        inputs : dict, optional
+            Any input parameters to pass to the model when solving (see
+            :class:`pybamm.InputParameter`)
 
         Raises
         ------
@@ -121,25 +157,31 @@ class BaseSolver(object):
         if len(model.rhs) == 0 and len(model.algebraic) == 0:
             raise pybamm.ModelError("Cannot step empty model")
 
+        inputs = inputs or {}
+
         # Set timer
         timer = pybamm.Timer()
 
         # Run set up on first step
         if not hasattr(self, "y0"):
             start_time = timer.time()
+            self.inputs = inputs
             self.set_up(model)
             self.t = 0.0
             set_up_time = timer.time() - start_time
         else:
             set_up_time = None
+            if inputs != self.inputs:
+                self.set_inputs(model, inputs)
 
         # Step
         pybamm.logger.info("Start stepping {}".format(model.name))
         t_eval = np.linspace(self.t, self.t + dt, npts)
-        solution, solve_time, termination = self.compute_solution(model, t_eval)
+        solution, solve_time, termination = self.compute_step(model, t_eval)
 
-        # Assign times
+        # Assign times and inputs
         solution.solve_time = solve_time
+        solution.inputs = self.inputs
         if set_up_time:
             solution.total_time = timer.time() - start_time
             solution.set_up_time = set_up_time
@@ -147,6 +189,9 @@ class BaseSolver(object):
         # Set self.t and self.y0 to their values at the final step
         self.t = solution.t[-1]
         self.y0 = solution.y[:, -1]
+        # self.y0 no longer holds the initial conditions of the model, so any
+        # subsequent call to solve must set up again
+        self._set_up_key = None
 
         pybamm.logger.info("Finish stepping {} ({})".format(model.name, termination))
         if set_up_time:
@@ -178,6 +223,77 @@ class BaseSolver(object):
         """
         raise NotImplementedError
 
+    def compute_step(self, model, t_eval):
+        """Calculate the solution of the model over a step, from the current time
+        and state (`self.t` and `self.y0`). By default, this is the same as
+        :meth:`compute_solution()`; solvers that can keep their integrator between
+        steps override it. Note: this does *not* execute the solver setup.
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel`
+            The model whose solution to calculate. Must have attributes rhs and
+            initial_conditions
+        t_eval : numeric type
+            The times at which to compute the solution, starting at `self.t`
+
+        """
+        return self.compute_solution(model, t_eval)
+
+    def reset_callback_counts(self):
+        """
+        Reset the counts of the evaluations of the functions created by the solver
+        setup (rhs or residuals, jacobian, and individual events), which are reported
+        in :attr:`pybamm.Solution.stats`.
+        """
+        self.callback_counts = {
+            "function evaluations": 0,
+            "jacobian evaluations": 0,
+            "event evaluations": 0,
+        }
+
+    def set_up_if_changed(self, model, inputs):
+        """
+        Execute the solver setup, unless it has already been executed for this model
+        (in its current version), and set the values of the input parameters.
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel`
+            The model whose solution to calculate. Must have attributes rhs and
+            initial_conditions
+        inputs : dict
+            Any input parameters to pass to the model when solving (see
+            :class:`pybamm.InputParameter`)
+
+        """
+        set_up_key = (id(model), model.version)
+        if set_up_key != self._set_up_key:
+            self.inputs = inputs
+            self.set_up(model)
+            self._set_up_key = set_up_key
+        else:
+            pybamm.logger.info("Reusing set-up for {}".format(model.name))
+            if inputs != self.inputs:
+                self.set_inputs(model, inputs)
+
+    def set_inputs(self, model, inputs):
+        """
+        Set the values of the input parameters to use when solving, for a model that
+        has already been set up.
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel`
+            The model whose solution to calculate. Must have attributes rhs and
+            initial_conditions
+        inputs : dict
+            Any input parameters to pass to the model when solving (see
+            :class:`pybamm.InputParameter`)
+
+        """
+        self.inputs = inputs
+
     def set_up(self, model):
         """Unpack model, perform checks, simplify and calculate jacobian.
 
@@ -196,13 +312,203 @@ class BaseSolver(object):
         """
         raise NotImplementedError
 
-    def get_termination_reason(self, solution, events):
+    def convert_to_evaluators(self, model, expressions):
+        """
+        Convert expressions to evaluators, in the format given by
+        :attr:`pybamm.BaseModel.convert_to_format`.
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel`
+            The model that is being set up
+        expressions : dict
+            The expressions to convert (symbols, or lists of symbols that are
+            evaluated together), by name. Expressions that are None or empty lists
+            are skipped.
+
+        Returns
+        -------
+        dict
+            The evaluators, by name
+        """
+        if model.convert_to_format == "numba":
+            evaluator = pybamm.EvaluatorNumba
+        else:
+            evaluator = pybamm.EvaluatorPython
+
+        evaluators = {}
+        for name, expression in expressions.items():
+            if expression is None or (isinstance(expression, list) and not expression):
+                continue
+            pybamm.logger.info(
+                "Converting {} to {}".format(name, model.convert_to_format)
+            )
+            evaluators[name] = evaluator(expression)
+        return evaluators
+
+    def _set_up_cache_key(self, model, kind):
+        """
+        Key of the entry of the cache in which the evaluators created by setting up
+        the model are stored, or None if the set-up cannot be cached
+        """
+        if self.cache is None or not model.use_to_python:
+            return None
+        try:
+            return self.cache.key(
+                "set-up",
+                kind,
+                model.use_simplify,
+                model.use_jacobian,
+                model.convert_to_format,
+                model.concatenated_rhs,
+                model.concatenated_algebraic,
+                list(model.events.items()),
+                model.concatenated_initial_conditions.shape,
+            )
+        except TypeError as error:
+            pybamm.logger.warning("Cannot cache set-up: {}".format(error))
+            return None
+
+    def load_set_up(self, model, kind):
+        """
+        Load the evaluators created by setting up the model from the cache (see
+        :attr:`cache`). This must be called before setting up the model, since the
+        set-up modifies the model's expressions (e.g. when simplifying them).
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel`
+            The model to set up
+        kind : str
+            The kind of set-up (e.g. "ode" or "dae"), which determines the evaluators
+
+        Returns
+        -------
+        str
+            The key of the set-up in the cache, to store the evaluators with (see
+            :meth:`store_set_up`), or None if the set-up cannot be cached
+        dict
+            The evaluators, by name, or None if they are not in the cache
+        """
+        key = self._set_up_cache_key(model, kind)
+        path = None if key is None else self.cache.load(key)
+        if path is None:
+            return key, None
+        pybamm.logger.info("Loading set-up of {} from cache".format(model.name))
+        try:
+            return key, self._load_evaluators(path)
+        except Exception as error:
+            # e.g. an entry written by a different version of a dependency
+            pybamm.logger.warning(
+                "Could not load set-up from cache ({}), setting up again".format(error)
+            )
+            self.cache.remove(key)
+            return key, None
+
+    def store_set_up(self, key, evaluators):
+        """
+        Store the evaluators created by setting up a model in the cache (see
+        :attr:`cache`).
+
+        Parameters
+        ----------
+        key : str
+            The key of the set-up, as returned by :meth:`load_set_up` (if None, the
+            evaluators are not stored)
+        evaluators : dict
+            The evaluators, by name
+
+        Returns
+        -------
+        dict
+            The evaluators to use: the stored evaluators, loaded back from the cache
+            (so that compiled evaluators are compiled from, and cached in, the entry),
+            or the given evaluators if they are not stored
+        """
+        if key is None:
+            return evaluators
+
+        def write(directory):
+            classes = {}
+            for name, evaluator in evaluators.items():
+                evaluator.save(directory, name)
+                classes[name] = type(evaluator).__name__
+            with open(os.path.join(directory, "evaluators.json"), "w") as f:
+                json.dump(classes, f)
+
+        try:
+            path = self.cache.store(key, write)
+            return self._load_evaluators(path)
+        except Exception as error:
+            # e.g. a function in the equations that cannot be pickled
+            pybamm.logger.warning("Could not cache set-up: {}".format(error))
+            return evaluators
+
+    def _load_evaluators(self, path):
+        with open(os.path.join(path, "evaluators.json")) as f:
+            classes = json.load(f)
+        return {
+            name: getattr(pybamm, cls).load(path, name) for name, cls in classes.items()
+        }
+
+    def _events_evaluator(self, events):
+        """
+        Create a function that evaluates all the events together, sharing the known
+        evaluations between them (used when the model is not converted to python).
+
+        Parameters
+        ----------
+        events : dict
+            Dictionary of events
+
+        Returns
+        -------
+        method
+            A function that takes in t, y and u and returns the list of the values of
+            the events
+        """
+
+        def events_evaluate(t, y, u):
+            known_evals = {}
+            values = []
+            for event in events.values():
+                value, known_evals = event.evaluate(t, y, u, known_evals)
+                values.append(value)
+            return values
+
+        return events_evaluate
+
+    def _events_vector(self, values):
+        """
+        Turn the values of the events, as returned by the events evaluator, into a
+        one-dimensional array, as required by the integrators.
+        """
+        return np.concatenate([np.ravel(value) for value in values])
+
+    def _events_function(self, events, t0, y0):
+        """
+        Get a function that evaluates all the events as a vector, and the number of
+        events, from the events passed to an integrator (either such a function, or a
+        list of functions that each evaluate one event).
+        """
+        if callable(events):
+            return events, len(events(t0, y0))
+        elif events is None or len(events) == 0:
+            return None, 0
+        else:
+
+            def events_function(t, y):
+                return self._events_vector([event(t, y) for event in events])
+
+            return events_function, len(events)
+
+    def get_termination_reason(self, solution, events, inputs=None):
         """
         Identify the cause for termination. In particular, if the solver terminated
-        due to an event, (try to) pinpoint which event was responsible.
-        Note that the current approach (evaluating all the events and then finding which
-        one is smallest at the final timestep) is pretty crude, but is the easiest one
-        that works for all the different solvers.
+        due to an event, pinpoint which event was responsible. Solvers that report
+        which event was triggered set :attr:`pybamm.Solution.event_index`; otherwise,
+        all the events are evaluated at the final timestep and the smallest one is
+        taken to be responsible (which is pretty crude, but works for all solvers).
 
         Parameters
         ----------
@@ -210,17 +516,26 @@ class BaseSolver(object):
             The solution object
         events : dict
             Dictionary of events
+        inputs : dict, optional
+            The input parameters to evaluate the events with. Default is the solver's
+            current inputs.
         """
+        inputs = self.inputs if inputs is None else inputs
         if solution.termination == "final time":
             return "the solver successfully reached the end of the integration interval"
         elif solution.termination == "event":
-            # Get final event value
-            final_event_values = {}
-            for name, event in events.items():
-                final_event_values[name] = abs(
-                    event.evaluate(solution.t_event, solution.y_event)
+            if solution.event_index is not None:
+                termination_event = list(events.keys())[solution.event_index]
+            else:
+                # Get final event value
+                final_event_values = {}
+                for name, event in events.items():
+                    final_event_values[name] = abs(
+                        event.evaluate(solution.t_event, solution.y_event, inputs)
+                    )
+                termination_event = min(
+                    final_event_values, key=final_event_values.get
                 )
-            termination_event = min(final_event_values, key=final_event_values.get)
             # Add the event to the solution object
             solution.termination = "event: {}".format(termination_event)
             return "the termination event '{}' occurred".format(termination_event)
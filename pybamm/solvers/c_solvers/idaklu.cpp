@@ -1,6 +1,20 @@
 #include <math.h>
 #include <stdio.h>
-
+#include <stdlib.h>
+
+#include <algorithm>
+#include <cmath>
+#include <atomic>
+#include <limits>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <stdexcept>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include <cvode/cvode.h>             /* prototypes for CVODE fcts., consts.  */
 #include <ida/ida.h>                 /* prototypes for IDA fcts., consts.    */
 #include <nvector/nvector_serial.h>  /* access to serial N_Vector            */
 #include <sundials/sundials_math.h>  /* defs. of SUNRabs, SUNRexp, etc.      */
@@ -11,6 +25,7 @@
 #include <pybind11/functional.h>
 #include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
 namespace py = pybind11;
 
 using residual_type = std::function<py::array_t<double>(
@@ -20,345 +35,1605 @@ using jacobian_type =
 using event_type =
     std::function<py::array_t<double>(double, py::array_t<double>)>;
 using np_array = py::array_t<double>;
+using np_array_2d = py::array_t<double, py::array::c_style | py::array::forcecast>;
 
-using jac_get_type = std::function<np_array()>;
+using stats_type = std::map<std::string, long int>;
+using np_array_int =
+    py::array_t<int64_t, py::array::c_style | py::array::forcecast>;
 
-class PybammFunctions
+// The functions defining the problem, as called by the sundials callbacks below
+class ProblemFunctions
 {
 public:
   int number_of_states;
   int number_of_events;
+  // message of any error raised while evaluating the functions, which is
+  // reported once the integration has stopped
+  std::string error;
+
+  ProblemFunctions(int n_s, int n_e)
+      : number_of_states(n_s), number_of_events(n_e)
+  {
+  }
+
+  virtual ~ProblemFunctions() {}
+
+  virtual int residual(realtype t, realtype *y, realtype *yp,
+                       realtype *r) = 0;
+
+  virtual int jacobian(realtype t, realtype cj, realtype *y,
+                       SUNMatrix JJ) = 0;
+
+  virtual int events(realtype t, realtype *y, realtype *events) = 0;
 
+  // set the values of the input parameters, for functions that hold them
+  virtual void set_inputs(const std::vector<double> &inputs)
+  {
+    throw std::invalid_argument(
+        "the problem functions do not hold the input parameters");
+  }
+};
+
+// The integration itself runs without holding the GIL, so that several
+// integrations (e.g. the members of an ensemble) can run on different threads.
+// Every call back into python must hold a PythonLock, which serialises the
+// calls (the python functions, e.g. EvaluatorPython, are not thread-safe) and
+// then acquires the GIL. The mutex is always locked before the GIL is
+// acquired, to avoid deadlocks.
+std::mutex python_mutex;
+
+class PythonLock
+{
+public:
+  PythonLock() : lock(python_mutex), gil() {}
+
+private:
+  std::lock_guard<std::mutex> lock;
+  py::gil_scoped_acquire gil;
+};
+
+// Problem defined by python functions. The jacobian has a fixed sparsity
+// pattern (CSR), so python only returns its data.
+class PybammFunctions : public ProblemFunctions
+{
+public:
   PybammFunctions(const residual_type &res, const jacobian_type &jac,
-                  const jac_get_type &get_jac_data_in,
-                  const jac_get_type &get_jac_row_vals_in,
-                  const jac_get_type &get_jac_col_ptrs_in,
+                  const std::vector<int64_t> &jac_indices_in,
+                  const std::vector<int64_t> &jac_indptr_in,
                   const event_type &event, const int n_s, int n_e)
-      : number_of_states(n_s), number_of_events(n_e), py_res(res), py_jac(jac),
-        py_event(event), py_get_jac_data(get_jac_data_in),
-        py_get_jac_row_vals(get_jac_row_vals_in),
-        py_get_jac_col_ptrs(get_jac_col_ptrs_in)
+      : ProblemFunctions(n_s, n_e), py_res(res), py_jac(jac),
+        py_event(event), jac_indices(jac_indices_in),
+        jac_indptr(jac_indptr_in)
   {
   }
 
-  py::array_t<double> operator()(double t, py::array_t<double> y,
-                                 py::array_t<double> yp)
+  int residual(realtype t, realtype *yval, realtype *ypval,
+               realtype *rval) override
   {
-    return py_res(t, y, yp);
+    int n = number_of_states;
+
+    PythonLock lock;
+    try
+    {
+      py::array_t<double> y_np = py::array_t<double>(n, yval);
+      py::array_t<double> yp_np = py::array_t<double>(n, ypval);
+
+      py::array_t<double> r_np;
+
+      r_np = py_res(t, y_np, yp_np);
+
+      auto r_np_ptr = r_np.unchecked<1>();
+
+      // just copying data
+      int i;
+      for (i = 0; i < n; i++)
+      {
+        rval[i] = r_np_ptr[i];
+      }
+    }
+    catch (std::exception &e)
+    {
+      // unrecoverable failure
+      error = e.what();
+      return -1;
+    }
+    return 0;
   }
 
-  py::array_t<double> res(double t, py::array_t<double> y,
-                          py::array_t<double> yp)
+  int jacobian(realtype t, realtype cj, realtype *yval, SUNMatrix JJ) override
   {
-    return py_res(t, y, yp);
+    int n = number_of_states;
+
+    // create pointer to jac data, column pointers, and row values
+    sunindextype *jac_colptrs = SUNSparseMatrix_IndexPointers(JJ);
+    sunindextype *jac_rowvals = SUNSparseMatrix_IndexValues(JJ);
+    realtype *jac_data = SUNSparseMatrix_Data(JJ);
+
+    PythonLock lock;
+    try
+    {
+      py::array_t<double> y_np = py::array_t<double>(n, yval);
+
+      // the data of the jacobian, on the fixed pattern
+      np_array jac_np_data = py_jac(t, y_np, cj);
+      auto jac_np_data_ptr = jac_np_data.unchecked<1>();
+      if (static_cast<size_t>(jac_np_data_ptr.shape(0)) != jac_indices.size())
+      {
+        throw std::runtime_error(
+            "the jacobian data does not match its sparsity pattern");
+      }
+
+      size_t k;
+      for (k = 0; k < jac_indices.size(); k++)
+      {
+        jac_data[k] = jac_np_data_ptr[k];
+        jac_rowvals[k] = jac_indices[k];
+      }
+      for (k = 0; k < jac_indptr.size(); k++)
+      {
+        jac_colptrs[k] = jac_indptr[k];
+      }
+    }
+    catch (std::exception &e)
+    {
+      // unrecoverable failure
+      error = e.what();
+      return -1;
+    }
+
+    return (0);
   }
 
-  void jac(double t, py::array_t<double> y, double cj)
+  int events(realtype t, realtype *yval, realtype *events_ptr) override
   {
-    // this function evaluates the jacobian and sets it to be the attribute
-    // of a python class which can then be called by get_jac_data,
-    // get_jac_col_ptr, etc
-    py_jac(t, y, cj);
-  }
+    PythonLock lock;
+    try
+    {
+      py::array_t<double> y_np =
+          py::array_t<double>(number_of_states, yval);
+
+      py::array_t<double> events_np_array;
 
-  np_array get_jac_data() { return py_get_jac_data(); }
+      events_np_array = py_event(t, y_np);
 
-  np_array get_jac_row_vals() { return py_get_jac_row_vals(); }
+      auto events_np_data_ptr = events_np_array.unchecked<1>();
 
-  np_array get_jac_col_ptrs() { return py_get_jac_col_ptrs(); }
+      // just copying data (figure out how to pass pointers later)
+      int i;
+      for (i = 0; i < number_of_events; i++)
+      {
+        events_ptr[i] = events_np_data_ptr[i];
+      }
+    }
+    catch (std::exception &e)
+    {
+      // unrecoverable failure
+      error = e.what();
+      return -1;
+    }
 
-  np_array events(double t, np_array y) { return py_event(t, y); }
+    return (0);
+  }
 
 private:
   residual_type py_res;
   jacobian_type py_jac;
   event_type py_event;
-  jac_get_type py_get_jac_data;
-  jac_get_type py_get_jac_row_vals;
-  jac_get_type py_get_jac_col_ptrs;
+  std::vector<int64_t> jac_indices;
+  std::vector<int64_t> jac_indptr;
 };
 
-int residual(realtype tres, N_Vector yy, N_Vector yp, N_Vector rr,
-             void *user_data)
+template <typename T, typename A> std::vector<T> to_std_vector(const A &array_np)
 {
-  PybammFunctions *python_functions_ptr =
-      static_cast<PybammFunctions *>(user_data);
-  PybammFunctions python_functions = *python_functions_ptr;
-
-  realtype *yval, *ypval, *rval;
-  yval = N_VGetArrayPointer(yy);
-  ypval = N_VGetArrayPointer(yp);
-  rval = N_VGetArrayPointer(rr);
-
-  int n = python_functions.number_of_states;
-  py::array_t<double> y_np = py::array_t<double>(n, yval);
-  py::array_t<double> yp_np = py::array_t<double>(n, ypval);
-
-  py::array_t<double> r_np;
+  auto array = array_np.template unchecked<1>();
+  std::vector<T> vec(array.shape(0));
+  for (size_t i = 0; i < vec.size(); i++)
+  {
+    vec[i] = array(i);
+  }
+  return vec;
+}
 
-  r_np = python_functions.res(tres, y_np, yp_np);
+// Interpreter of the tapes created by pybamm.Tape. The opcodes and function
+// codes must match those in pybamm/expression_tree/tape.py
+enum TapeOpcode
+{
+  TAPE_CONSTANT,
+  TAPE_TIME,
+  TAPE_INPUT,
+  TAPE_STATE,
+  TAPE_UNARY,
+  TAPE_BINARY,
+  TAPE_LINEAR,
+  TAPE_SCATTER,
+  TAPE_REDUCE,
+  TAPE_PPOLY
+};
 
-  auto r_np_ptr = r_np.unchecked<1>();
+const int TAPE_INSTRUCTION_SIZE = 9;
 
-  // just copying data
-  int i;
-  for (i = 0; i < n; i++)
+double tape_unary(int64_t function, double x)
+{
+  switch (function)
   {
-    rval[i] = r_np_ptr[i];
+  case 0:
+    return x;
+  case 1:
+    return -x;
+  case 2:
+    return std::fabs(x);
+  case 3:
+    return std::exp(x);
+  case 4:
+    return std::log(x);
+  case 5:
+    return std::log10(x);
+  case 6:
+    return std::sin(x);
+  case 7:
+    return std::cos(x);
+  case 8:
+    return std::tan(x);
+  case 9:
+    return std::sinh(x);
+  case 10:
+    return std::cosh(x);
+  case 11:
+    return std::tanh(x);
+  case 12:
+    return std::asinh(x);
+  case 13:
+    return std::atan(x);
+  case 14:
+    return std::sqrt(x);
+  case 15:
+    return std::isnan(x) ? x : (x > 0) - (x < 0);
   }
-  return 0;
+  throw std::invalid_argument("unknown unary function in tape");
 }
 
-int jacobian(realtype tt, realtype cj, N_Vector yy, N_Vector yp,
-             N_Vector resvec, SUNMatrix JJ, void *user_data, N_Vector tempv1,
-             N_Vector tempv2, N_Vector tempv3)
+double tape_binary(int64_t op, double x, double y)
 {
-  realtype *yval;
-  yval = N_VGetArrayPointer(yy);
+  switch (op)
+  {
+  case 0:
+    return x + y;
+  case 1:
+    return x - y;
+  case 2:
+    return x * y;
+  case 3:
+    return x / y;
+  case 4:
+    return std::pow(x, y);
+  }
+  throw std::invalid_argument("unknown binary operator in tape");
+}
 
-  PybammFunctions *python_functions_ptr =
-      static_cast<PybammFunctions *>(user_data);
-  PybammFunctions python_functions = *python_functions_ptr;
+class Tape
+{
+public:
+  Tape(np_array_int instructions_np, np_array_int indices_np,
+       np_array coefficients_np, np_array_int register_sizes_np,
+       np_array_int outputs_np)
+  {
+    auto instructions_ptr = instructions_np.unchecked<2>();
+    if (instructions_np.shape(0) > 0 &&
+        instructions_np.shape(1) != TAPE_INSTRUCTION_SIZE)
+    {
+      throw std::invalid_argument("tape instructions have the wrong shape");
+    }
+    for (py::ssize_t i = 0; i < instructions_np.shape(0); i++)
+    {
+      for (int j = 0; j < TAPE_INSTRUCTION_SIZE; j++)
+      {
+        instructions.push_back(instructions_ptr(i, j));
+      }
+    }
+    indices = to_std_vector<int64_t>(indices_np);
+    coefficients = to_std_vector<double>(coefficients_np);
+    register_sizes = to_std_vector<int64_t>(register_sizes_np);
+    outputs = to_std_vector<int64_t>(outputs_np);
+
+    // each register is followed by a slot that is always zero
+    workspace_size = 0;
+    for (int64_t size : register_sizes)
+    {
+      register_offsets.push_back(workspace_size);
+      workspace_size += size + 1;
+    }
+  }
 
-  int n = python_functions.number_of_states;
-  py::array_t<double> y_np = py::array_t<double>(n, yval);
+  // registers for evaluating the tape, with the constants written
+  std::vector<double> new_workspace() const
+  {
+    std::vector<double> workspace(workspace_size, 0.0);
+    for (size_t i = 0; i < instructions.size(); i += TAPE_INSTRUCTION_SIZE)
+    {
+      const int64_t *instruction = &instructions[i];
+      if (instruction[0] == TAPE_CONSTANT)
+      {
+        double *out = &workspace[register_offsets[instruction[1]]];
+        const double *c = &coefficients[instruction[7]];
+        for (int64_t k = 0; k < instruction[4]; k++)
+        {
+          out[k] = c[k];
+        }
+      }
+    }
+    return workspace;
+  }
 
-  // create pointer to jac data, column pointers, and row values
-  sunindextype *jac_colptrs = SUNSparseMatrix_IndexPointers(JJ);
-  sunindextype *jac_rowvals = SUNSparseMatrix_IndexValues(JJ);
-  realtype *jac_data = SUNSparseMatrix_Data(JJ);
+  void evaluate(double t, const double *y, const double *inputs,
+                std::vector<double> &workspace) const
+  {
+    double *registers = workspace.data();
+    for (size_t i = 0; i < instructions.size(); i += TAPE_INSTRUCTION_SIZE)
+    {
+      const int64_t *instruction = &instructions[i];
+      double *out = registers + register_offsets[instruction[1]];
+      const double *a =
+          instruction[2] < 0 ? nullptr
+                             : registers + register_offsets[instruction[2]];
+      const double *b =
+          instruction[3] < 0 ? nullptr
+                             : registers + register_offsets[instruction[3]];
+      int64_t n = instruction[4];
+      const int64_t *ia =
+          instruction[5] < 0 ? nullptr : indices.data() + instruction[5];
+      const int64_t *ib =
+          instruction[6] < 0 ? nullptr : indices.data() + instruction[6];
+      const double *c =
+          instruction[7] < 0 ? nullptr : coefficients.data() + instruction[7];
+      int64_t parameter = instruction[8];
+      int64_t k;
+
+      switch (instruction[0])
+      {
+      case TAPE_CONSTANT:
+        // written when the workspace is created
+        break;
+      case TAPE_TIME:
+        out[0] = t;
+        break;
+      case TAPE_INPUT:
+        out[0] = inputs[parameter];
+        break;
+      case TAPE_STATE:
+        for (k = 0; k < n; k++)
+        {
+          out[k] = y[ia[k]];
+        }
+        break;
+      case TAPE_UNARY:
+        for (k = 0; k < n; k++)
+        {
+          out[k] = tape_unary(parameter, a[ia[k]]);
+        }
+        break;
+      case TAPE_BINARY:
+        for (k = 0; k < n; k++)
+        {
+          out[k] = tape_binary(parameter, a[ia[k]], b[ib[k]]);
+        }
+        break;
+      case TAPE_LINEAR:
+        std::fill(out, out + register_sizes[instruction[1]], 0.0);
+        for (k = 0; k < n; k++)
+        {
+          out[ib[k]] += c[k] * a[ia[k]];
+        }
+        break;
+      case TAPE_SCATTER:
+        for (k = 0; k < n; k++)
+        {
+          out[ib[k]] = a[ia[k]];
+        }
+        break;
+      case TAPE_REDUCE:
+        out[0] = reduce(parameter, a, ia, n);
+        break;
+      case TAPE_PPOLY:
+        for (k = 0; k < n; k++)
+        {
+          out[k] = ppoly(c, a[ia[k]]);
+        }
+        break;
+      default:
+        throw std::invalid_argument("unknown opcode in tape");
+      }
+    }
+  }
 
-  py::array_t<double> jac_np_array;
+  const double *output(const std::vector<double> &workspace, int i) const
+  {
+    return workspace.data() + register_offsets[outputs[i]];
+  }
 
-  python_functions.jac(tt, y_np, cj);
+  int64_t output_size(int i) const { return register_sizes[outputs[i]]; }
 
-  np_array jac_np_data = python_functions.get_jac_data();
-  int n_data = jac_np_data.request().size;
-  auto jac_np_data_ptr = jac_np_data.unchecked<1>();
+  int number_of_outputs() const { return outputs.size(); }
 
-  // just copy across data
-  int i;
-  for (i = 0; i < n_data; i++)
+  // evaluate from python (e.g. to compare with the python interpreter)
+  std::vector<np_array> evaluate_py(double t, np_array y_np,
+                                    np_array inputs_np) const
   {
-    jac_data[i] = jac_np_data_ptr[i];
+    std::vector<double> y = to_std_vector<double>(y_np);
+    std::vector<double> inputs = to_std_vector<double>(inputs_np);
+    std::vector<double> workspace = new_workspace();
+    evaluate(t, y.data(), inputs.data(), workspace);
+    std::vector<np_array> values;
+    for (int i = 0; i < number_of_outputs(); i++)
+    {
+      values.push_back(np_array(output_size(i), output(workspace, i)));
+    }
+    return values;
   }
 
-  np_array jac_np_row_vals = python_functions.get_jac_row_vals();
-  int n_row_vals = jac_np_row_vals.request().size;
-  auto jac_np_row_vals_ptr = jac_np_row_vals.unchecked<1>();
-
-  // just copy across row vals (this might be unneeded)
-  for (i = 0; i < n_row_vals; i++)
+private:
+  std::vector<int64_t> instructions;
+  std::vector<int64_t> indices;
+  std::vector<double> coefficients;
+  std::vector<int64_t> register_sizes;
+  std::vector<int64_t> register_offsets;
+  std::vector<int64_t> outputs;
+  int64_t workspace_size;
+
+  static double reduce(int64_t reduction, const double *a, const int64_t *ia,
+                       int64_t n)
   {
-    jac_rowvals[i] = jac_np_row_vals_ptr[i];
+    double result = a[ia[0]];
+    for (int64_t k = 1; k < n; k++)
+    {
+      double x = a[ia[k]];
+      if (std::isnan(x) || (reduction == 0 ? x < result : x > result))
+      {
+        result = x;
+      }
+      if (std::isnan(result))
+      {
+        break;
+      }
+    }
+    return result;
   }
 
-  np_array jac_np_col_ptrs = python_functions.get_jac_col_ptrs();
-  int n_col_ptrs = jac_np_col_ptrs.request().size;
-  auto jac_np_col_ptrs_ptr = jac_np_col_ptrs.unchecked<1>();
-
-  // just copy across col ptrs (this might be unneeded)
-  for (i = 0; i < n_col_ptrs; i++)
+  // piecewise polynomial, stored as (number of intervals, order, extrapolate,
+  // breakpoints, coefficients)
+  static double ppoly(const double *c, double x)
   {
-    jac_colptrs[i] = jac_np_col_ptrs_ptr[i];
+    int64_t number_of_intervals = c[0];
+    int64_t order = c[1];
+    bool extrapolate = c[2] != 0;
+    const double *breakpoints = c + 3;
+    const double *coefficients = breakpoints + number_of_intervals + 1;
+    if (!extrapolate &&
+        (x < breakpoints[0] || x > breakpoints[number_of_intervals]))
+    {
+      return std::numeric_limits<double>::quiet_NaN();
+    }
+    int64_t interval =
+        std::upper_bound(breakpoints, breakpoints + number_of_intervals + 1,
+                         x) -
+        breakpoints - 1;
+    interval = std::max<int64_t>(
+        0, std::min<int64_t>(interval, number_of_intervals - 1));
+    double dx = x - breakpoints[interval];
+    double result = 0;
+    for (int64_t m = 0; m < order; m++)
+    {
+      result = result * dx + coefficients[m * number_of_intervals + interval];
+    }
+    return result;
   }
+};
 
-  return (0);
-}
-
-int events(realtype t, N_Vector yy, N_Vector yp, realtype *events_ptr,
-           void *user_data)
+// The tapes and sparse matrices of a model, shared (read-only) by all the
+// integrations of the model
+class NativeModel
 {
-  realtype *yval;
-  yval = N_VGetArrayPointer(yy);
+public:
+  NativeModel(const Tape &residual_tape_in, const Tape &jacobian_tape_in,
+              const Tape &events_tape_in, np_array mass_data_np,
+              np_array_int mass_indices_np, np_array_int mass_indptr_np,
+              np_array_int jac_indices_np, np_array_int jac_indptr_np,
+              np_array_int jac_positions_np, np_array_int mass_positions_np)
+      : residual_tape(residual_tape_in), jacobian_tape(jacobian_tape_in),
+        events_tape(events_tape_in)
+  {
+    mass_data = to_std_vector<double>(mass_data_np);
+    mass_indices = to_std_vector<int64_t>(mass_indices_np);
+    mass_indptr = to_std_vector<int64_t>(mass_indptr_np);
+    jac_indices = to_std_vector<int64_t>(jac_indices_np);
+    jac_indptr = to_std_vector<int64_t>(jac_indptr_np);
+    jac_positions = to_std_vector<int64_t>(jac_positions_np);
+    mass_positions = to_std_vector<int64_t>(mass_positions_np);
+
+    number_of_states = mass_indptr.size() - 1;
+    number_of_events = events_tape.number_of_outputs();
+    int64_t residual_size = 0;
+    for (int i = 0; i < residual_tape.number_of_outputs(); i++)
+    {
+      residual_size += residual_tape.output_size(i);
+    }
+    if (residual_size != number_of_states ||
+        jacobian_tape.number_of_outputs() != 1 ||
+        static_cast<size_t>(jacobian_tape.output_size(0)) !=
+            jac_positions.size() ||
+        mass_positions.size() != mass_data.size() ||
+        jac_indptr.size() != mass_indptr.size())
+    {
+      throw std::invalid_argument("inconsistent sizes in native model");
+    }
+  }
 
-  PybammFunctions *python_functions_ptr =
-      static_cast<PybammFunctions *>(user_data);
-  PybammFunctions python_functions = *python_functions_ptr;
+  Tape residual_tape;
+  Tape jacobian_tape;
+  Tape events_tape;
+  std::vector<double> mass_data;
+  std::vector<int64_t> mass_indices;
+  std::vector<int64_t> mass_indptr;
+  // pattern (CSR) of the jacobian of the residuals, and the positions of the
+  // entries of the jacobian tape output and of the mass matrix in it
+  std::vector<int64_t> jac_indices;
+  std::vector<int64_t> jac_indptr;
+  std::vector<int64_t> jac_positions;
+  std::vector<int64_t> mass_positions;
+  int number_of_states;
+  int number_of_events;
 
-  int number_of_events = python_functions.number_of_events;
-  int number_of_states = python_functions.number_of_states;
-  py::array_t<double> y_np = py::array_t<double>(number_of_states, yval);
+  int nnz() const { return jac_indices.size(); }
+};
 
-  py::array_t<double> events_np_array;
+// Problem defined by the tapes of a native model, evaluated without python.
+// Each integration has its own workspaces, so that integrations can run
+// concurrently.
+class TapeFunctions : public ProblemFunctions
+{
+public:
+  TapeFunctions(const NativeModel &model_in, const std::vector<double> &inputs_in)
+      : ProblemFunctions(model_in.number_of_states, model_in.number_of_events),
+        model(model_in), inputs(inputs_in),
+        residual_workspace(model_in.residual_tape.new_workspace()),
+        jacobian_workspace(model_in.jacobian_tape.new_workspace()),
+        events_workspace(model_in.events_tape.new_workspace())
+  {
+  }
+
+  int residual(realtype t, realtype *yval, realtype *ypval,
+               realtype *rval) override
+  {
+    try
+    {
+      const Tape &tape = model.residual_tape;
+      tape.evaluate(t, yval, inputs.data(), residual_workspace);
+      // concatenate the outputs (rhs and algebraic)
+      int64_t i = 0;
+      for (int output = 0; output < tape.number_of_outputs(); output++)
+      {
+        const double *value = tape.output(residual_workspace, output);
+        for (int64_t k = 0; k < tape.output_size(output); k++)
+        {
+          rval[i++] = value[k];
+        }
+      }
+      // subtract the mass matrix times yp
+      for (i = 0; i < number_of_states; i++)
+      {
+        for (int64_t k = model.mass_indptr[i]; k < model.mass_indptr[i + 1];
+             k++)
+        {
+          rval[i] -= model.mass_data[k] * ypval[model.mass_indices[k]];
+        }
+      }
+    }
+    catch (std::exception &e)
+    {
+      error = e.what();
+      return -1;
+    }
+    return 0;
+  }
 
-  events_np_array = python_functions.events(t, y_np);
+  int jacobian(realtype t, realtype cj, realtype *yval, SUNMatrix JJ) override
+  {
+    try
+    {
+      sunindextype *jac_colptrs = SUNSparseMatrix_IndexPointers(JJ);
+      sunindextype *jac_rowvals = SUNSparseMatrix_IndexValues(JJ);
+      realtype *jac_data = SUNSparseMatrix_Data(JJ);
+
+      // jacobian of the residuals, dr/dy - cj dr/dyp
+      const Tape &tape = model.jacobian_tape;
+      tape.evaluate(t, yval, inputs.data(), jacobian_workspace);
+      const double *value = tape.output(jacobian_workspace, 0);
+      size_t k;
+      for (k = 0; k < model.jac_indices.size(); k++)
+      {
+        jac_data[k] = 0;
+        jac_rowvals[k] = model.jac_indices[k];
+      }
+      for (k = 0; k < model.jac_indptr.size(); k++)
+      {
+        jac_colptrs[k] = model.jac_indptr[k];
+      }
+      for (k = 0; k < model.jac_positions.size(); k++)
+      {
+        jac_data[model.jac_positions[k]] += value[k];
+      }
+      for (k = 0; k < model.mass_positions.size(); k++)
+      {
+        jac_data[model.mass_positions[k]] -= cj * model.mass_data[k];
+      }
+    }
+    catch (std::exception &e)
+    {
+      error = e.what();
+      return -1;
+    }
+    return 0;
+  }
 
-  auto events_np_data_ptr = events_np_array.unchecked<1>();
+  int events(realtype t, realtype *yval, realtype *events_ptr) override
+  {
+    try
+    {
+      const Tape &tape = model.events_tape;
+      tape.evaluate(t, yval, inputs.data(), events_workspace);
+      for (int i = 0; i < number_of_events; i++)
+      {
+        events_ptr[i] = tape.output(events_workspace, i)[0];
+      }
+    }
+    catch (std::exception &e)
+    {
+      error = e.what();
+      return -1;
+    }
+    return 0;
+  }
 
-  // just copying data (figure out how to pass pointers later)
-  int i;
-  for (i = 0; i < number_of_events; i++)
+  void set_inputs(const std::vector<double> &inputs_in) override
   {
-    events_ptr[i] = events_np_data_ptr[i];
+    if (inputs_in.size() != inputs.size())
+    {
+      throw std::invalid_argument("inputs do not match the native model");
+    }
+    inputs = inputs_in;
   }
 
-  return (0);
+private:
+  const NativeModel &model;
+  std::vector<double> inputs;
+  std::vector<double> residual_workspace;
+  std::vector<double> jacobian_workspace;
+  std::vector<double> events_workspace;
+};
+
+int residual(realtype tres, N_Vector yy, N_Vector yp, N_Vector rr,
+             void *user_data)
+{
+  ProblemFunctions &functions = *static_cast<ProblemFunctions *>(user_data);
+  return functions.residual(tres, N_VGetArrayPointer(yy),
+                            N_VGetArrayPointer(yp), N_VGetArrayPointer(rr));
+}
+
+int jacobian(realtype tt, realtype cj, N_Vector yy, N_Vector yp,
+             N_Vector resvec, SUNMatrix JJ, void *user_data, N_Vector tempv1,
+             N_Vector tempv2, N_Vector tempv3)
+{
+  ProblemFunctions &functions = *static_cast<ProblemFunctions *>(user_data);
+  return functions.jacobian(tt, cj, N_VGetArrayPointer(yy), JJ);
+}
+
+int events(realtype t, N_Vector yy, N_Vector yp, realtype *events_ptr,
+           void *user_data)
+{
+  ProblemFunctions &functions = *static_cast<ProblemFunctions *>(user_data);
+  return functions.events(t, N_VGetArrayPointer(yy), events_ptr);
 }
 
 class Solution
 {
 public:
-  Solution(int retval, np_array t_np, np_array y_np)
-      : flag(retval), t(t_np), y(y_np)
+  Solution(int retval, np_array t_np, np_array y_np, std::string msg,
+           stats_type stats_in, int event)
+      : flag(retval), t(t_np), y(y_np), message(msg), stats(stats_in),
+        event_index(event)
   {
   }
 
   int flag;
   np_array t;
   np_array y;
+  std::string message;
+  stats_type stats;
+  int event_index;
 };
 
-/* main program */
-Solution solve(np_array t_np, np_array y0_np, np_array yp0_np,
-               residual_type res, jacobian_type jac, jac_get_type gjd,
-               jac_get_type gjrv, jac_get_type gjcp, int nnz, event_type event,
-               int number_of_events, int use_jacobian, np_array rhs_alg_id,
-               double abs_tol, double rel_tol)
+class EnsembleSolution
 {
-  auto t = t_np.unchecked<1>();
-  auto y0 = y0_np.unchecked<1>();
-  auto yp0 = yp0_np.unchecked<1>();
+public:
+  EnsembleSolution(py::array_t<int> retvals, py::array_t<int> n_t,
+                   np_array t_np, np_array y_np,
+                   std::vector<std::string> msgs,
+                   std::vector<stats_type> stats_in,
+                   py::array_t<int> events)
+      : flags(retvals), number_of_timesteps(n_t), t(t_np), y(y_np),
+        messages(msgs), stats(stats_in), event_indices(events)
+  {
+  }
+
+  py::array_t<int> flags;
+  py::array_t<int> number_of_timesteps;
+  np_array t;
+  np_array y;
+  std::vector<std::string> messages;
+  std::vector<stats_type> stats;
+  py::array_t<int> event_indices;
+};
+
+// result of a single integration, held in plain C++ containers so that it can
+// be created without holding the GIL
+struct IntegrationResult
+{
+  int flag;
+  std::vector<double> t;
+  std::vector<double> y;
+  std::string message;
+  stats_type stats;
+  // index of the event that stopped the integration, or -1
+  int event_index;
+};
+
+std::vector<double> to_vector(np_array array_np)
+{
+  return to_std_vector<double>(array_np);
+}
+
+// A persistent IDA integrator. The IDA memory, the KLU linear solver and the
+// sparse jacobian matrix are created once, and each call to integrate
+// continues the integration from where the previous call stopped, so that
+// stepping through a simulation does not set up the integrator again at every
+// step. The integration is restarted from new values (e.g. after a
+// discontinuous change of the inputs) by reinit, which only calls IDAReInit.
+// The problem functions must outlive the integrator.
+class IDAIntegrator
+{
+public:
+  IDAIntegrator(double t0, const double *y0, const double *yp0,
+                ProblemFunctions &problem_functions_in, int nnz,
+                int use_jacobian, const std::vector<double> &rhs_alg_id,
+                double abs_tol, double rel_tol)
+      : problem_functions(problem_functions_in),
+        number_of_states(problem_functions_in.number_of_states), t(t0)
+  {
+    int i;
+
+    // allocate vectors
+    yy = N_VNew_Serial(number_of_states);
+    yp = N_VNew_Serial(number_of_states);
+    avtol = N_VNew_Serial(number_of_states);
+    id = N_VNew_Serial(number_of_states);
+
+    // set initial value
+    set_state(y0, yp0);
+
+    // allocate memory for solver
+    ida_mem = IDACreate();
+
+    // initialise solver
+    IDAInit(ida_mem, residual, RCONST(t0), yy, yp);
+
+    // set tolerances
+    realtype *atval = N_VGetArrayPointer(avtol);
+    for (i = 0; i < number_of_states; i++)
+    {
+      atval[i] =
+          RCONST(abs_tol); // nb: this can be set differently for each state
+    }
+    IDASVtolerances(ida_mem, RCONST(rel_tol), avtol);
+
+    // set events
+    IDARootInit(ida_mem, problem_functions.number_of_events, events);
+
+    // set problem functions by passing pointer to it
+    IDASetUserData(ida_mem, &problem_functions);
+
+    // set linear solver
+    J = SUNSparseMatrix(number_of_states, number_of_states, nnz, CSR_MAT);
+    LS = SUNLinSol_KLU(yy, J);
+    IDASetLinearSolver(ida_mem, LS, J);
+
+    if (use_jacobian == 1)
+    {
+      IDASetJacFn(ida_mem, jacobian);
+    }
+
+    // differential and algebraic variables, for the consistent initial
+    // conditions
+    realtype *id_val = N_VGetArrayPointer(id);
+    for (i = 0; i < number_of_states; i++)
+    {
+      id_val[i] = rhs_alg_id[i];
+    }
+    IDASetId(ida_mem, id);
+  }
+
+  // owns the sundials memory
+  IDAIntegrator(const IDAIntegrator &) = delete;
+  IDAIntegrator &operator=(const IDAIntegrator &) = delete;
+
+  ~IDAIntegrator()
+  {
+    /* Free memory */
+    IDAFree(&ida_mem);
+    SUNLinSolFree(LS);
+    SUNMatDestroy(J);
+    N_VDestroy(avtol);
+    N_VDestroy(yp);
+    N_VDestroy(yy);
+    N_VDestroy(id);
+  }
+
+  // the time that the integration has reached
+  double time() const { return t; }
+
+  // restart the integration from y0, yp0 at t0, keeping the linear solver
+  void reinit(double t0, const double *y0, const double *yp0)
+  {
+    set_state(y0, yp0);
+    IDAReInit(ida_mem, RCONST(t0), yy, yp);
+    t = t0;
+    need_initial_conditions = true;
+    // IDAReInit resets the statistics of the integrator
+    previous_stats.clear();
+  }
 
+  // Integrate over the times t, which start at the time reached so far. Must
+  // be called *without* holding the GIL: the python functions acquire it when
+  // they need it.
+  IntegrationResult integrate(const std::vector<double> &t_eval)
+  {
+    int number_of_timesteps = t_eval.size();
+    int number_of_events = problem_functions.number_of_events;
+    realtype *yval = N_VGetArrayPointer(yy);
+    int retval, i;
+
+    // set return vectors
+    IntegrationResult result;
+    result.t.reserve(number_of_timesteps);
+    result.y.reserve(number_of_timesteps * number_of_states);
+
+    result.t.push_back(t_eval[0]);
+    result.y.insert(result.y.end(), yval, yval + number_of_states);
+
+    // calculate consistent initial conditions, after (re)initialisation only
+    problem_functions.error.clear();
+    if (need_initial_conditions)
+    {
+      IDACalcIC(ida_mem, IDA_YA_YDP_INIT, t_eval[1]);
+      need_initial_conditions = false;
+    }
+
+    int t_i = 1;
+    realtype tret = t;
+    realtype t_next;
+    realtype t_final = t_eval[number_of_timesteps - 1];
+
+    while (true)
+    {
+      t_next = t_eval[t_i];
+      IDASetStopTime(ida_mem, t_next);
+      retval = IDASolve(ida_mem, t_final, &tret, yy, yp, IDA_NORMAL);
+
+      if (retval == IDA_TSTOP_RETURN)
+      {
+        result.t.push_back(tret);
+        result.y.insert(result.y.end(), yval, yval + number_of_states);
+        t_i += 1;
+        if (t_i == number_of_timesteps)
+        {
+          // reached the final time
+          retval = IDA_SUCCESS;
+          break;
+        }
+      }
+      else if (retval == IDA_SUCCESS || retval == IDA_ROOT_RETURN)
+      {
+        result.t.push_back(tret);
+        result.y.insert(result.y.end(), yval, yval + number_of_states);
+        break;
+      }
+      else if (retval < 0)
+      {
+        // solver failure
+        break;
+      }
+    }
+    t = tret;
+
+    result.flag = retval;
+    result.event_index = -1;
+    if (retval == IDA_ROOT_RETURN)
+    {
+      // find which of the events has a root
+      std::vector<int> roots_found(number_of_events);
+      IDAGetRootInfo(ida_mem, roots_found.data());
+      for (i = 0; i < number_of_events; i++)
+      {
+        if (roots_found[i] != 0)
+        {
+          result.event_index = i;
+          break;
+        }
+      }
+    }
+    if (retval < 0)
+    {
+      if (problem_functions.error.empty())
+      {
+        char *flag_name = IDAGetReturnFlagName(retval);
+        result.message = std::string("IDA failed with flag ") + flag_name;
+        free(flag_name);
+      }
+      else
+      {
+        result.message = problem_functions.error;
+      }
+    }
+
+    // get the integrator statistics, which accumulate from the last
+    // (re)initialisation, and report those of this integration
+    long int n_steps, n_res, n_jac, n_setups, n_iters, n_roots, n_etf, n_ncf;
+    IDAGetNumSteps(ida_mem, &n_steps);
+    IDAGetNumResEvals(ida_mem, &n_res);
+    IDAGetNumJacEvals(ida_mem, &n_jac);
+    IDAGetNumLinSolvSetups(ida_mem, &n_setups);
+    IDAGetNumNonlinSolvIters(ida_mem, &n_iters);
+    IDAGetNumGEvals(ida_mem, &n_roots);
+    IDAGetNumErrTestFails(ida_mem, &n_etf);
+    IDAGetNumNonlinSolvConvFails(ida_mem, &n_ncf);
+    stats_type stats;
+    stats["steps"] = n_steps;
+    stats["function evaluations"] = n_res;
+    stats["jacobian evaluations"] = n_jac;
+    stats["linear solver setups"] = n_setups;
+    // with a direct linear solver, each newton iteration is one linear solve
+    stats["linear solves"] = n_iters;
+    stats["event evaluations"] = n_roots * number_of_events;
+    stats["error test failures"] = n_etf;
+    stats["nonlinear convergence failures"] = n_ncf;
+    for (auto &stat : stats)
+    {
+      result.stats[stat.first] = stat.second - previous_stats[stat.first];
+    }
+    previous_stats = stats;
+
+    return result;
+  }
+
+private:
+  void set_state(const double *y0, const double *yp0)
+  {
+    realtype *yval = N_VGetArrayPointer(yy);
+    realtype *ypval = N_VGetArrayPointer(yp);
+    for (int i = 0; i < number_of_states; i++)
+    {
+      yval[i] = y0[i];
+      ypval[i] = yp0[i];
+    }
+  }
+
+  ProblemFunctions &problem_functions;
   int number_of_states;
-  number_of_states = y0_np.request().size;
-  int number_of_timesteps;
-  number_of_timesteps = t_np.request().size;
+  // time reached by the integration
+  double t;
+  bool need_initial_conditions = true;
+  stats_type previous_stats;
 
-  void *ida_mem;          // pointer to memory
-  N_Vector yy, yp, avtol; // y, y', and absolute tolerance
-  realtype rtol, *yval, *ypval, *atval;
-  int retval;
+  void *ida_mem;             // pointer to memory
+  N_Vector yy, yp, avtol, id; // y, y', absolute tolerance and variable ids
   SUNMatrix J;
   SUNLinearSolver LS;
+};
+
+// Integrate from y0, yp0 over the times t. Must be called *without* holding
+// the GIL: the python functions acquire it when they need it.
+IntegrationResult integrate(const std::vector<double> &t, const double *y0,
+                            const double *yp0,
+                            ProblemFunctions &problem_functions, int nnz,
+                            int use_jacobian,
+                            const std::vector<double> &rhs_alg_id,
+                            double abs_tol, double rel_tol)
+{
+  IDAIntegrator integrator(t[0], y0, yp0, problem_functions, nnz,
+                           use_jacobian, rhs_alg_id, abs_tol, rel_tol);
+  return integrator.integrate(t);
+}
+
+// Create a solution from the result of an integration (holding the GIL)
+Solution to_solution(const IntegrationResult &result)
+{
+  py::array_t<double> t_ret =
+      py::array_t<double>(result.t.size(), result.t.data());
+  py::array_t<double> y_ret =
+      py::array_t<double>(result.y.size(), result.y.data());
+
+  return Solution(result.flag, t_ret, y_ret, result.message, result.stats,
+                  result.event_index);
+}
+
+// The problem functions of a model define an ODE, dy/dt = f(t, y), through
+// its residuals f(t, y) - dy/dt: the right-hand side f is the residuals with
+// dy/dt = 0, and its jacobian is the jacobian of the residuals with cj = 0.
+// CVODE shares the problem functions of IDA this way.
+struct OdeFunctions
+{
+  ProblemFunctions &functions;
+  std::vector<double> zeros;
+};
+
+int ode_rhs(realtype t, N_Vector y, N_Vector ydot, void *user_data)
+{
+  OdeFunctions &ode = *static_cast<OdeFunctions *>(user_data);
+  return ode.functions.residual(t, N_VGetArrayPointer(y), ode.zeros.data(),
+                                N_VGetArrayPointer(ydot));
+}
+
+int ode_jacobian(realtype t, N_Vector y, N_Vector fy, SUNMatrix JJ,
+                 void *user_data, N_Vector tmp1, N_Vector tmp2, N_Vector tmp3)
+{
+  OdeFunctions &ode = *static_cast<OdeFunctions *>(user_data);
+  return ode.functions.jacobian(t, 0.0, N_VGetArrayPointer(y), JJ);
+}
+
+int ode_events(realtype t, N_Vector y, realtype *events_ptr, void *user_data)
+{
+  OdeFunctions &ode = *static_cast<OdeFunctions *>(user_data);
+  return ode.functions.events(t, N_VGetArrayPointer(y), events_ptr);
+}
+
+// Integrate the ODE from y0 over the times t with CVODE (BDF, with the KLU
+// linear solver). The pattern of the jacobian (nnz entries) must include the
+// diagonal, so that CVODE's linear systems, I - gamma J, keep this pattern.
+// Must be called *without* holding the GIL.
+IntegrationResult integrate_ode(const std::vector<double> &t,
+                                const double *y0,
+                                ProblemFunctions &problem_functions, int nnz,
+                                double abs_tol, double rel_tol)
+{
+  int number_of_states = problem_functions.number_of_states;
+  int number_of_events = problem_functions.number_of_events;
+  int number_of_timesteps = t.size();
+  int retval, i;
+
+  OdeFunctions ode{problem_functions,
+                   std::vector<double>(number_of_states, 0.0)};
 
   // allocate vectors
-  yy = N_VNew_Serial(number_of_states);
-  yp = N_VNew_Serial(number_of_states);
-  avtol = N_VNew_Serial(number_of_states);
+  N_Vector yy = N_VNew_Serial(number_of_states);
+  N_Vector avtol = N_VNew_Serial(number_of_states);
 
   // set initial value
-  yval = N_VGetArrayPointer(yy);
-  ypval = N_VGetArrayPointer(yp);
-  int i;
+  realtype *yval = N_VGetArrayPointer(yy);
   for (i = 0; i < number_of_states; i++)
   {
     yval[i] = y0[i];
-    ypval[i] = yp0[i];
   }
 
-  // allocate memory for solver
-  ida_mem = IDACreate();
-
-  // initialise solver
-  realtype t0 = RCONST(t(0));
-  IDAInit(ida_mem, residual, t0, yy, yp);
+  // allocate memory for solver, and initialise it
+  void *cvode_mem = CVodeCreate(CV_BDF);
+  CVodeInit(cvode_mem, ode_rhs, RCONST(t[0]), yy);
 
   // set tolerances
-  rtol = RCONST(rel_tol);
-  atval = N_VGetArrayPointer(avtol);
-
+  realtype *atval = N_VGetArrayPointer(avtol);
   for (i = 0; i < number_of_states; i++)
   {
     atval[i] =
         RCONST(abs_tol); // nb: this can be set differently for each state
   }
+  CVodeSVtolerances(cvode_mem, RCONST(rel_tol), avtol);
 
-  IDASVtolerances(ida_mem, rtol, avtol);
-
-  // set events
-  IDARootInit(ida_mem, number_of_events, events);
-
-  // set pybamm functions by passing pointer to it
-  PybammFunctions pybamm_functions(res, jac, gjd, gjrv, gjcp, event,
-                                   number_of_states, number_of_events);
-  void *user_data = &pybamm_functions;
-  IDASetUserData(ida_mem, user_data);
+  // set events and problem functions
+  CVodeRootInit(cvode_mem, number_of_events, ode_events);
+  CVodeSetUserData(cvode_mem, &ode);
 
   // set linear solver
-  J = SUNSparseMatrix(number_of_states, number_of_states, nnz, CSR_MAT);
+  SUNMatrix J =
+      SUNSparseMatrix(number_of_states, number_of_states, nnz, CSR_MAT);
+  SUNLinearSolver LS = SUNLinSol_KLU(yy, J);
+  CVodeSetLinearSolver(cvode_mem, LS, J);
+  CVodeSetJacFn(cvode_mem, ode_jacobian);
 
-  LS = SUNLinSol_KLU(yy, J);
-  IDASetLinearSolver(ida_mem, LS, J);
+  // set return vectors
+  IntegrationResult result;
+  result.t.reserve(number_of_timesteps);
+  result.y.reserve(number_of_timesteps * number_of_states);
 
-  if (use_jacobian == 1)
-  {
-    IDASetJacFn(ida_mem, jacobian);
-  }
+  result.t.push_back(t[0]);
+  result.y.insert(result.y.end(), yval, yval + number_of_states);
 
   int t_i = 1;
   realtype tret;
-  realtype t_next;
-  realtype t_final = t(number_of_timesteps - 1);
+  realtype t_final = t[number_of_timesteps - 1];
 
-  // set return vectors
-  std::vector<double> t_return(number_of_timesteps);
-  std::vector<double> y_return(number_of_timesteps * number_of_states);
+  while (true)
+  {
+    CVodeSetStopTime(cvode_mem, t[t_i]);
+    retval = CVode(cvode_mem, t_final, yy, &tret, CV_NORMAL);
 
-  t_return[0] = t(0);
-  int j;
-  for (j = 0; j < number_of_states; j++)
+    if (retval == CV_TSTOP_RETURN)
+    {
+      result.t.push_back(tret);
+      result.y.insert(result.y.end(), yval, yval + number_of_states);
+      t_i += 1;
+      if (t_i == number_of_timesteps)
+      {
+        // reached the final time
+        retval = CV_SUCCESS;
+        break;
+      }
+    }
+    else if (retval == CV_SUCCESS || retval == CV_ROOT_RETURN)
+    {
+      result.t.push_back(tret);
+      result.y.insert(result.y.end(), yval, yval + number_of_states);
+      break;
+    }
+    else if (retval < 0)
+    {
+      // solver failure
+      break;
+    }
+  }
+
+  // the flags of CVODE for success, events and failures (negative) have the
+  // same meaning as those of IDA
+  result.flag = retval;
+  result.event_index = -1;
+  if (retval == CV_ROOT_RETURN)
+  {
+    // find which of the events has a root
+    std::vector<int> roots_found(number_of_events);
+    CVodeGetRootInfo(cvode_mem, roots_found.data());
+    for (i = 0; i < number_of_events; i++)
+    {
+      if (roots_found[i] != 0)
+      {
+        result.event_index = i;
+        break;
+      }
+    }
+  }
+  if (retval < 0)
   {
-    y_return[j] = yval[j];
+    if (problem_functions.error.empty())
+    {
+      char *flag_name = CVodeGetReturnFlagName(retval);
+      result.message = std::string("CVODE failed with flag ") + flag_name;
+      free(flag_name);
+    }
+    else
+    {
+      result.message = problem_functions.error;
+    }
   }
 
-  // calculate consistent initial conditions
-  N_Vector id;
-  auto id_np_val = rhs_alg_id.unchecked<1>();
-  id = N_VNew_Serial(number_of_states);
-  realtype *id_val;
-  id_val = N_VGetArrayPointer(id);
+  // get the integrator statistics
+  long int n_steps, n_rhs, n_jac, n_setups, n_iters, n_roots, n_etf, n_ncf;
+  CVodeGetNumSteps(cvode_mem, &n_steps);
+  CVodeGetNumRhsEvals(cvode_mem, &n_rhs);
+  CVodeGetNumJacEvals(cvode_mem, &n_jac);
+  CVodeGetNumLinSolvSetups(cvode_mem, &n_setups);
+  CVodeGetNumNonlinSolvIters(cvode_mem, &n_iters);
+  CVodeGetNumGEvals(cvode_mem, &n_roots);
+  CVodeGetNumErrTestFails(cvode_mem, &n_etf);
+  CVodeGetNumNonlinSolvConvFails(cvode_mem, &n_ncf);
+  result.stats["steps"] = n_steps;
+  result.stats["function evaluations"] = n_rhs;
+  result.stats["jacobian evaluations"] = n_jac;
+  result.stats["linear solver setups"] = n_setups;
+  // with a direct linear solver, each newton iteration is one linear solve
+  result.stats["linear solves"] = n_iters;
+  result.stats["event evaluations"] = n_roots * number_of_events;
+  result.stats["error test failures"] = n_etf;
+  result.stats["nonlinear convergence failures"] = n_ncf;
 
-  int ii;
-  for (ii = 0; ii < number_of_states; ii++)
+  /* Free memory */
+  CVodeFree(&cvode_mem);
+  SUNLinSolFree(LS);
+  SUNMatDestroy(J);
+  N_VDestroy(avtol);
+  N_VDestroy(yy);
+
+  return result;
+}
+
+/* main program */
+Solution solve(np_array t_np, np_array y0_np, np_array yp0_np,
+               residual_type res, jacobian_type jac,
+               np_array_int jac_indices_np, np_array_int jac_indptr_np,
+               event_type event, int number_of_events, int use_jacobian,
+               np_array rhs_alg_id, double rel_tol, double abs_tol)
+{
+  int number_of_states;
+  number_of_states = y0_np.request().size;
+
+  std::vector<double> t = to_vector(t_np);
+  std::vector<double> y0 = to_vector(y0_np);
+  std::vector<double> yp0 = to_vector(yp0_np);
+  std::vector<double> id = to_vector(rhs_alg_id);
+
+  std::vector<int64_t> jac_indices = to_std_vector<int64_t>(jac_indices_np);
+  std::vector<int64_t> jac_indptr = to_std_vector<int64_t>(jac_indptr_np);
+  int nnz = jac_indices.size();
+
+  PybammFunctions pybamm_functions(res, jac, jac_indices, jac_indptr, event,
+                                   number_of_states, number_of_events);
+
+  IntegrationResult result;
   {
-    id_val[ii] = id_np_val[ii];
+    py::gil_scoped_release release;
+    result = integrate(t, y0.data(), yp0.data(), pybamm_functions, nnz,
+                       use_jacobian, id, abs_tol, rel_tol);
   }
 
-  IDASetId(ida_mem, id);
-  IDACalcIC(ida_mem, IDA_YA_YDP_INIT, t(1));
+  return to_solution(result);
+}
 
-  while (true)
+/* solve an ODE with CVODE, with python functions */
+Solution solve_ode(np_array t_np, np_array y0_np, residual_type rhs,
+                   jacobian_type jac, np_array_int jac_indices_np,
+                   np_array_int jac_indptr_np, event_type event,
+                   int number_of_events, double rel_tol, double abs_tol)
+{
+  int number_of_states = y0_np.request().size;
+
+  std::vector<double> t = to_vector(t_np);
+  std::vector<double> y0 = to_vector(y0_np);
+
+  std::vector<int64_t> jac_indices = to_std_vector<int64_t>(jac_indices_np);
+  std::vector<int64_t> jac_indptr = to_std_vector<int64_t>(jac_indptr_np);
+  int nnz = jac_indices.size();
+
+  PybammFunctions pybamm_functions(rhs, jac, jac_indices, jac_indptr, event,
+                                   number_of_states, number_of_events);
+
+  IntegrationResult result;
   {
-    t_next = t(t_i);
-    IDASetStopTime(ida_mem, t_next);
-    retval = IDASolve(ida_mem, t_final, &tret, yy, yp, IDA_NORMAL);
+    py::gil_scoped_release release;
+    result = integrate_ode(t, y0.data(), pybamm_functions, nnz, abs_tol,
+                           rel_tol);
+  }
+
+  return to_solution(result);
+}
 
-    if (retval == IDA_TSTOP_RETURN)
+// copy a two-dimensional array of initial conditions, one row per member
+std::vector<double> to_vector_2d(np_array_2d array_np)
+{
+  auto array = array_np.unchecked<2>();
+  std::vector<double> vec(array.shape(0) * array.shape(1));
+  for (py::ssize_t i = 0; i < array.shape(0); i++)
+  {
+    for (py::ssize_t j = 0; j < array.shape(1); j++)
     {
-      t_return[t_i] = tret;
-      for (j = 0; j < number_of_states; j++)
+      vec[i * array.shape(1) + j] = array(i, j);
+    }
+  }
+  return vec;
+}
+
+// Integrate each member of an ensemble on a pool of threads, and stack the
+// results. Must be called while holding the GIL.
+EnsembleSolution
+integrate_ensemble(const std::vector<double> &t, const std::vector<double> &y0,
+                   const std::vector<double> &yp0,
+                   std::vector<ProblemFunctions *> &problem_functions,
+                   int nnz, int use_jacobian,
+                   const std::vector<double> &id, double abs_tol,
+                   double rel_tol, int number_of_threads)
+{
+  int number_of_members = problem_functions.size();
+  int number_of_states = id.size();
+  int number_of_timesteps = t.size();
+  int i, j;
+
+  if (number_of_threads <= 0)
+  {
+    number_of_threads = std::thread::hardware_concurrency();
+  }
+  number_of_threads =
+      std::max(1, std::min(number_of_threads, number_of_members));
+
+  std::vector<IntegrationResult> results(number_of_members);
+  {
+    py::gil_scoped_release release;
+
+    // each thread takes the next member that has not been integrated yet
+    std::atomic<int> next_member(0);
+    auto worker = [&]() {
+      int member;
+      while ((member = next_member++) < number_of_members)
       {
-        y_return[t_i * number_of_states + j] = yval[j];
+        results[member] =
+            integrate(t, &y0[member * number_of_states],
+                      &yp0[member * number_of_states],
+                      *problem_functions[member], nnz, use_jacobian, id,
+                      abs_tol, rel_tol);
       }
-      t_i += 1;
+    };
+
+    std::vector<std::thread> threads;
+    for (i = 0; i < number_of_threads; i++)
+    {
+      threads.emplace_back(worker);
+    }
+    for (auto &thread : threads)
+    {
+      thread.join();
     }
+  }
 
-    if (retval == IDA_SUCCESS || retval == IDA_ROOT_RETURN)
+  // stack the results, padding with NaN after the last time of members that
+  // stopped early (e.g. at an event)
+  py::array_t<int> flags(number_of_members);
+  py::array_t<int> number_of_timesteps_ret(number_of_members);
+  np_array t_ret({number_of_members, number_of_timesteps});
+  np_array y_ret({number_of_members, number_of_timesteps, number_of_states});
+  auto flags_ptr = flags.mutable_unchecked<1>();
+  auto number_of_timesteps_ptr = number_of_timesteps_ret.mutable_unchecked<1>();
+  auto t_ret_ptr = t_ret.mutable_unchecked<2>();
+  auto y_ret_ptr = y_ret.mutable_unchecked<3>();
+  std::vector<std::string> messages(number_of_members);
+  std::vector<stats_type> stats(number_of_members);
+  py::array_t<int> event_indices(number_of_members);
+  auto event_indices_ptr = event_indices.mutable_unchecked<1>();
+
+  const double nan = std::numeric_limits<double>::quiet_NaN();
+  int k;
+  for (i = 0; i < number_of_members; i++)
+  {
+    const IntegrationResult &result = results[i];
+    int n_t = result.t.size();
+    flags_ptr(i) = result.flag;
+    number_of_timesteps_ptr(i) = n_t;
+    messages[i] = result.message;
+    stats[i] = result.stats;
+    event_indices_ptr(i) = result.event_index;
+    for (j = 0; j < number_of_timesteps; j++)
     {
-      t_return[t_i] = tret;
-      for (j = 0; j < number_of_states; j++)
+      t_ret_ptr(i, j) = j < n_t ? result.t[j] : nan;
+      for (k = 0; k < number_of_states; k++)
       {
-        y_return[t_i * number_of_states + j] = yval[j];
+        y_ret_ptr(i, j, k) =
+            j < n_t ? result.y[j * number_of_states + k] : nan;
       }
-      break;
     }
   }
 
-  /* Free memory */
-  IDAFree(&ida_mem);
-  SUNLinSolFree(LS);
-  SUNMatDestroy(J);
-  N_VDestroy(avtol);
-  N_VDestroy(yp);
+  return EnsembleSolution(flags, number_of_timesteps_ret, t_ret, y_ret,
+                          messages, stats, event_indices);
+}
 
-  py::array_t<double> t_ret = py::array_t<double>((t_i + 1), &t_return[0]);
-  py::array_t<double> y_ret =
-      py::array_t<double>((t_i + 1) * number_of_states, &y_return[0]);
+/* solve an ensemble of integrations concurrently */
+EnsembleSolution
+solve_ensemble(np_array t_np, np_array_2d y0s_np, np_array_2d yp0s_np,
+               std::vector<residual_type> res, std::vector<jacobian_type> jac,
+               np_array_int jac_indices_np, np_array_int jac_indptr_np,
+               std::vector<event_type> event, int number_of_events,
+               int use_jacobian, np_array rhs_alg_id, double rel_tol,
+               double abs_tol, int number_of_threads)
+{
+  if (y0s_np.ndim() != 2 || yp0s_np.ndim() != 2)
+  {
+    throw std::invalid_argument("y0 and yp0 must be two-dimensional");
+  }
+  int number_of_members = y0s_np.shape(0);
+  int number_of_states = y0s_np.shape(1);
+  size_t n_members = number_of_members;
+  if (yp0s_np.shape(0) != number_of_members ||
+      yp0s_np.shape(1) != number_of_states || res.size() != n_members ||
+      jac.size() != n_members || event.size() != n_members)
+  {
+    throw std::invalid_argument(
+        "inconsistent number of members in the ensemble");
+  }
 
-  Solution sol(retval, t_ret, y_ret);
+  // the members share the pattern of the jacobian
+  std::vector<int64_t> jac_indices = to_std_vector<int64_t>(jac_indices_np);
+  std::vector<int64_t> jac_indptr = to_std_vector<int64_t>(jac_indptr_np);
+  int nnz = jac_indices.size();
 
-  return sol;
+  // python functions for each member (copied while holding the GIL)
+  std::vector<PybammFunctions> pybamm_functions;
+  std::vector<ProblemFunctions *> problem_functions;
+  pybamm_functions.reserve(number_of_members);
+  for (int i = 0; i < number_of_members; i++)
+  {
+    pybamm_functions.emplace_back(res[i], jac[i], jac_indices, jac_indptr,
+                                  event[i], number_of_states,
+                                  number_of_events);
+    problem_functions.push_back(&pybamm_functions.back());
+  }
+
+  return integrate_ensemble(to_vector(t_np), to_vector_2d(y0s_np),
+                            to_vector_2d(yp0s_np), problem_functions, nnz,
+                            use_jacobian, to_vector(rhs_alg_id), abs_tol,
+                            rel_tol,
+                            number_of_threads);
+}
+
+/* solve with the native model, without calling python during the integration */
+Solution solve_native(np_array t_np, np_array y0_np, np_array yp0_np,
+                      const NativeModel &model, np_array inputs_np,
+                      np_array rhs_alg_id, double rel_tol, double abs_tol)
+{
+  if (y0_np.request().size != model.number_of_states)
+  {
+    throw std::invalid_argument("y0 does not match the native model");
+  }
+
+  std::vector<double> t = to_vector(t_np);
+  std::vector<double> y0 = to_vector(y0_np);
+  std::vector<double> yp0 = to_vector(yp0_np);
+  std::vector<double> id = to_vector(rhs_alg_id);
+
+  TapeFunctions tape_functions(model, to_vector(inputs_np));
+
+  IntegrationResult result;
+  {
+    py::gil_scoped_release release;
+    result = integrate(t, y0.data(), yp0.data(), tape_functions, model.nnz(),
+                       1, id, abs_tol, rel_tol);
+  }
+
+  return to_solution(result);
+}
+
+/* solve an ensemble with the native model, fully in parallel */
+EnsembleSolution
+solve_ensemble_native(np_array t_np, np_array_2d y0s_np, np_array_2d yp0s_np,
+                      const NativeModel &model, np_array_2d inputs_np,
+                      np_array rhs_alg_id, double rel_tol, double abs_tol,
+                      int number_of_threads)
+{
+  if (y0s_np.ndim() != 2 || yp0s_np.ndim() != 2 || inputs_np.ndim() != 2)
+  {
+    throw std::invalid_argument("y0, yp0 and inputs must be two-dimensional");
+  }
+  int number_of_members = y0s_np.shape(0);
+  if (yp0s_np.shape(0) != number_of_members ||
+      inputs_np.shape(0) != number_of_members ||
+      y0s_np.shape(1) != model.number_of_states ||
+      yp0s_np.shape(1) != model.number_of_states)
+  {
+    throw std::invalid_argument(
+        "inconsistent number of members in the ensemble");
+  }
+
+  std::vector<double> inputs = to_vector_2d(inputs_np);
+  int number_of_inputs = inputs_np.shape(1);
+
+  std::vector<TapeFunctions> tape_functions;
+  std::vector<ProblemFunctions *> problem_functions;
+  tape_functions.reserve(number_of_members);
+  for (int i = 0; i < number_of_members; i++)
+  {
+    tape_functions.emplace_back(
+        model, std::vector<double>(inputs.begin() + i * number_of_inputs,
+                                   inputs.begin() + (i + 1) * number_of_inputs));
+    problem_functions.push_back(&tape_functions.back());
+  }
+
+  return integrate_ensemble(to_vector(t_np), to_vector_2d(y0s_np),
+                            to_vector_2d(yp0s_np), problem_functions,
+                            model.nnz(), 1, to_vector(rhs_alg_id), abs_tol,
+                            rel_tol,
+                            number_of_threads);
+}
+
+// A stepping session, which keeps the problem functions and the IDA integrator
+// alive between steps, so that each step continues the integration of the
+// previous one
+class Session
+{
+public:
+  Session(std::unique_ptr<ProblemFunctions> functions_in, double t0,
+          const std::vector<double> &y0, const std::vector<double> &yp0,
+          int nnz, int use_jacobian, const std::vector<double> &rhs_alg_id,
+          double rel_tol, double abs_tol)
+      : functions(std::move(functions_in)),
+        integrator(t0, y0.data(), yp0.data(), *functions, nnz, use_jacobian,
+                   rhs_alg_id, abs_tol, rel_tol)
+  {
+  }
+
+  double time() const { return integrator.time(); }
+
+  // integrate over the times t, which must start at the time reached so far
+  Solution step(np_array t_np)
+  {
+    std::vector<double> t = to_vector(t_np);
+    if (t.size() < 2 || t[0] != integrator.time())
+    {
+      throw std::invalid_argument(
+          "the times must start at the time reached by the session");
+    }
+
+    IntegrationResult result;
+    {
+      py::gil_scoped_release release;
+      result = integrator.integrate(t);
+    }
+    return to_solution(result);
+  }
+
+  // restart the integration from y0, yp0 at t0
+  void reinit(double t0, np_array y0_np, np_array yp0_np)
+  {
+    std::vector<double> y0 = to_vector(y0_np);
+    std::vector<double> yp0 = to_vector(yp0_np);
+    if (y0.size() != static_cast<size_t>(functions->number_of_states) ||
+        yp0.size() != y0.size())
+    {
+      throw std::invalid_argument("y0 and yp0 do not match the session");
+    }
+    integrator.reinit(t0, y0.data(), yp0.data());
+  }
+
+  // set the input parameters of a native model (the integration should then
+  // be restarted with reinit, as they may change discontinuously)
+  void set_inputs(np_array inputs_np)
+  {
+    functions->set_inputs(to_vector(inputs_np));
+  }
+
+private:
+  // declared before the integrator, which uses them
+  std::unique_ptr<ProblemFunctions> functions;
+  IDAIntegrator integrator;
+};
+
+/* start a stepping session with python functions */
+std::unique_ptr<Session>
+create_session(double t0, np_array y0_np, np_array yp0_np, residual_type res,
+               jacobian_type jac, np_array_int jac_indices_np,
+               np_array_int jac_indptr_np, event_type event,
+               int number_of_events, int use_jacobian, np_array rhs_alg_id,
+               double rel_tol, double abs_tol)
+{
+  int number_of_states = y0_np.request().size;
+  std::vector<int64_t> jac_indices = to_std_vector<int64_t>(jac_indices_np);
+  std::vector<int64_t> jac_indptr = to_std_vector<int64_t>(jac_indptr_np);
+  int nnz = jac_indices.size();
+
+  std::unique_ptr<ProblemFunctions> functions(
+      new PybammFunctions(res, jac, jac_indices, jac_indptr, event,
+                          number_of_states, number_of_events));
+  return std::unique_ptr<Session>(
+      new Session(std::move(functions), t0, to_vector(y0_np),
+                  to_vector(yp0_np), nnz, use_jacobian, to_vector(rhs_alg_id),
+                  rel_tol, abs_tol));
+}
+
+/* start a stepping session with the native model */
+std::unique_ptr<Session>
+create_session_native(double t0, np_array y0_np, np_array yp0_np,
+                      const NativeModel &model, np_array inputs_np,
+                      np_array rhs_alg_id, double rel_tol, double abs_tol)
+{
+  if (y0_np.request().size != model.number_of_states)
+  {
+    throw std::invalid_argument("y0 does not match the native model");
+  }
+
+  std::unique_ptr<ProblemFunctions> functions(
+      new TapeFunctions(model, to_vector(inputs_np)));
+  return std::unique_ptr<Session>(new Session(
+      std::move(functions), t0, to_vector(y0_np), to_vector(yp0_np),
+      model.nnz(), 1, to_vector(rhs_alg_id), rel_tol, abs_tol));
 }
 
 PYBIND11_MODULE(idaklu, m)
@@ -366,14 +1641,95 @@ PYBIND11_MODULE(idaklu, m)
   m.doc() = "sundials solvers"; // optional module docstring
 
   m.def("solve", &solve, "The solve function", py::arg("t"), py::arg("y0"),
-        py::arg("yp0"), py::arg("res"), py::arg("jac"), py::arg("get_jac_data"),
-        py::arg("get_jac_row_vals"), py::arg("get_jac_col_ptr"), py::arg("nnz"),
+        py::arg("yp0"), py::arg("res"), py::arg("jac"), py::arg("jac_indices"),
+        py::arg("jac_indptr"), py::arg("events"), py::arg("number_of_events"), py::arg("use_jacobian"),
+        py::arg("rhs_alg_id"), py::arg("rtol"), py::arg("atol"),
+        py::return_value_policy::take_ownership);
+
+  m.def("solve_ode", &solve_ode, "Solve an ODE with CVODE", py::arg("t"),
+        py::arg("y0"), py::arg("rhs"), py::arg("jac"), py::arg("jac_indices"),
+        py::arg("jac_indptr"), py::arg("events"), py::arg("number_of_events"),
+        py::arg("rtol"), py::arg("atol"),
+        py::return_value_policy::take_ownership);
+
+  m.def("solve_ensemble", &solve_ensemble,
+        "Solve an ensemble of problems concurrently, on a pool of threads",
+        py::arg("t"), py::arg("y0"), py::arg("yp0"), py::arg("res"),
+        py::arg("jac"), py::arg("jac_indices"), py::arg("jac_indptr"),
         py::arg("events"), py::arg("number_of_events"), py::arg("use_jacobian"),
         py::arg("rhs_alg_id"), py::arg("rtol"), py::arg("atol"),
+        py::arg("number_of_threads") = 0,
+        py::return_value_policy::take_ownership);
+
+  m.def("solve_native", &solve_native,
+        "Solve with the native model, without calling python", py::arg("t"),
+        py::arg("y0"), py::arg("yp0"), py::arg("model"), py::arg("inputs"),
+        py::arg("rhs_alg_id"), py::arg("rtol"), py::arg("atol"),
+        py::return_value_policy::take_ownership);
+
+  m.def("solve_ensemble_native", &solve_ensemble_native,
+        "Solve an ensemble with the native model, on a pool of threads",
+        py::arg("t"), py::arg("y0"), py::arg("yp0"), py::arg("model"),
+        py::arg("inputs"), py::arg("rhs_alg_id"), py::arg("rtol"),
+        py::arg("atol"), py::arg("number_of_threads") = 0,
         py::return_value_policy::take_ownership);
 
+  m.def("session", &create_session,
+        "Start a stepping session, which keeps the integrator between steps",
+        py::arg("t0"), py::arg("y0"), py::arg("yp0"), py::arg("res"),
+        py::arg("jac"), py::arg("jac_indices"), py::arg("jac_indptr"),
+        py::arg("events"), py::arg("number_of_events"), py::arg("use_jacobian"),
+        py::arg("rhs_alg_id"), py::arg("rtol"), py::arg("atol"));
+
+  // the session refers to the native model, so keep it alive
+  m.def("session_native", &create_session_native,
+        "Start a stepping session with the native model", py::arg("t0"),
+        py::arg("y0"), py::arg("yp0"), py::arg("model"), py::arg("inputs"),
+        py::arg("rhs_alg_id"), py::arg("rtol"), py::arg("atol"),
+        py::keep_alive<0, 4>());
+
+  py::class_<Session>(m, "session_type")
+      .def_property_readonly("t", &Session::time)
+      .def("step", &Session::step, py::arg("t"),
+           py::return_value_policy::take_ownership)
+      .def("reinit", &Session::reinit, py::arg("t0"), py::arg("y0"),
+           py::arg("yp0"))
+      .def("set_inputs", &Session::set_inputs, py::arg("inputs"));
+
+  py::class_<Tape>(m, "tape")
+      .def(py::init<np_array_int, np_array_int, np_array, np_array_int,
+                    np_array_int>(),
+           py::arg("instructions"), py::arg("indices"),
+           py::arg("coefficients"), py::arg("register_sizes"),
+           py::arg("outputs"))
+      .def("evaluate", &Tape::evaluate_py, py::arg("t"), py::arg("y"),
+           py::arg("inputs"));
+
+  py::class_<NativeModel>(m, "native_model")
+      .def(py::init<const Tape &, const Tape &, const Tape &, np_array,
+                    np_array_int, np_array_int, np_array_int, np_array_int,
+                    np_array_int, np_array_int>(),
+           py::arg("residuals"), py::arg("jacobian"), py::arg("events"),
+           py::arg("mass_data"), py::arg("mass_indices"),
+           py::arg("mass_indptr"), py::arg("jac_indices"),
+           py::arg("jac_indptr"), py::arg("jac_positions"),
+           py::arg("mass_positions"));
+
   py::class_<Solution>(m, "solution")
       .def_readwrite("t", &Solution::t)
       .def_readwrite("y", &Solution::y)
-      .def_readwrite("flag", &Solution::flag);
+      .def_readwrite("flag", &Solution::flag)
+      .def_readwrite("message", &Solution::message)
+      .def_readwrite("stats", &Solution::stats)
+      .def_readwrite("event_index", &Solution::event_index);
+
+  py::class_<EnsembleSolution>(m, "ensemble_solution")
+      .def_readwrite("t", &EnsembleSolution::t)
+      .def_readwrite("y", &EnsembleSolution::y)
+      .def_readwrite("flags", &EnsembleSolution::flags)
+      .def_readwrite("number_of_timesteps",
+                     &EnsembleSolution::number_of_timesteps)
+      .def_readwrite("messages", &EnsembleSolution::messages)
+      .def_readwrite("stats", &EnsembleSolution::stats)
+      .def_readwrite("event_indices", &EnsembleSolution::event_indices);
 }
@@ -4,7 +4,7 @@
 import pybamm
 import numpy as np
 from scipy import optimize
-from scipy.sparse import issparse
+from scipy.sparse import csc_matrix, issparse
 
 
 class DaeSolver(pybamm.BaseSolver):
@@ -17,7 +17,10 @@ class DaeSolver(pybamm.BaseSolver):
     atol : float, optional
         The absolute tolerance for the solver (default is 1e-6).
     root_method : str, optional
-        The method to use to find initial conditions (default is "lm")
+        The method to use to find initial conditions (default is "newton", the damped
+        Newton method with sparse jacobians :func:`pybamm.newton_root`, which falls
+        back to "lm" for models without a jacobian). Can also be any method of
+        :func:`scipy.optimize.root`.
     root_tol : float, optional
         The tolerance for the initial-condition solver (default is 1e-6).
     max_steps: int, optional
@@ -30,7 +33,7 @@ class DaeSolver(pybamm.BaseSolver):
         method=None,
         rtol=1e-6,
         atol=1e-6,
-        root_method="lm",
+        root_method="newton",
         root_tol=1e-6,
         max_steps=1000,
     ):
@@ -38,6 +41,7 @@ class DaeSolver(pybamm.BaseSolver):
         self.root_method = root_method
         self.root_tol = root_tol
         self.max_steps = max_steps
+        self.root_stats = {}
 
     @property
     def root_method(self):
@@ -45,6 +49,8 @@ class DaeSolver(pybamm.BaseSolver):
 
     @root_method.setter
     def root_method(self, method):
+        # the consistent initial conditions depend on this, so set up again
+        self._set_up_key = None
         self._root_method = method
 
     @property
@@ -53,6 +59,8 @@ class DaeSolver(pybamm.BaseSolver):
 
     @root_tol.setter
     def root_tol(self, tol):
+        # the consistent initial conditions depend on this, so set up again
+        self._set_up_key = None
         self._root_tol = tol
 
     @property
@@ -79,15 +87,18 @@ class DaeSolver(pybamm.BaseSolver):
 
         solve_start_time = timer.time()
         pybamm.logger.info("Calling DAE solver")
+        self.reset_callback_counts()
         solution = self.integrate(
             self.residuals,
             self.y0,
             t_eval,
-            events=self.event_funs,
+            events=self.event_values,
             mass_matrix=model.mass_matrix.entries,
             jacobian=self.jacobian,
         )
         solve_time = timer.time() - solve_start_time
+        # statistics reported by the integrator take precedence
+        solution.stats = dict(self.callback_counts, **solution.stats)
 
         # Identify the event that caused termination
         termination = self.get_termination_reason(solution, self.events)
@@ -109,69 +120,118 @@ class DaeSolver(pybamm.BaseSolver):
             If the model contains any algebraic equations (in which case a DAE solver
             should be used instead)
         """
-        # create simplified rhs, algebraic and event expressions
-        concatenated_rhs = model.concatenated_rhs
-        concatenated_algebraic = model.concatenated_algebraic
-        events = model.events
-
-        if model.use_simplify:
-            # set up simplification object, for re-use of dict
-            simp = pybamm.Simplification()
-            pybamm.logger.info("Simplifying RHS")
-            concatenated_rhs = simp.simplify(concatenated_rhs)
-            pybamm.logger.info("Simplifying algebraic")
-            concatenated_algebraic = simp.simplify(concatenated_algebraic)
-            pybamm.logger.info("Simplifying events")
-            events = {name: simp.simplify(event) for name, event in events.items()}
-
-        if model.use_jacobian:
-            # Create Jacobian from concatenated rhs and algebraic
-            y = pybamm.StateVector(
-                slice(0, np.size(model.concatenated_initial_conditions))
-            )
-            # set up Jacobian object, for re-use of dict
-            jacobian = pybamm.Jacobian()
-            pybamm.logger.info("Calculating jacobian")
-            jac_rhs = jacobian.jac(concatenated_rhs, y)
-            jac_algebraic = jacobian.jac(concatenated_algebraic, y)
-            jac = pybamm.SparseStack(jac_rhs, jac_algebraic)
-            model.jacobian = jac
-            model.jacobian_rhs = jac_rhs
-            model.jacobian_algebraic = jac_algebraic
+        cache_key, evaluators = self.load_set_up(model, "dae")
+        if evaluators is not None:
+            # the evaluators of the simplified expressions were cached, so only the
+            # names of the events are needed
+            events = model.events
+            expressions = None
+        else:
+            # create simplified rhs, algebraic and event expressions
+            concatenated_rhs = model.concatenated_rhs
+            concatenated_algebraic = model.concatenated_algebraic
+            events = model.events
 
             if model.use_simplify:
-                pybamm.logger.info("Simplifying jacobian")
-                jac_algebraic = simp.simplify(jac_algebraic)
-                jac = simp.simplify(jac)
+                # set up simplification object, for re-use of dict
+                simp = pybamm.Simplification()
+                pybamm.logger.info("Simplifying RHS")
+                concatenated_rhs = simp.simplify(concatenated_rhs)
+                pybamm.logger.info("Simplifying algebraic")
+                concatenated_algebraic = simp.simplify(concatenated_algebraic)
+                pybamm.logger.info("Simplifying events")
+                events = {name: simp.simplify(event) for name, event in events.items()}
+
+            if model.use_jacobian:
+                # Create Jacobian from concatenated rhs and algebraic
+                y = pybamm.StateVector(
+                    slice(0, np.size(model.concatenated_initial_conditions))
+                )
+                # set up Jacobian object, for re-use of dict
+                jacobian = pybamm.Jacobian()
+                pybamm.logger.info("Calculating jacobian")
+                jac_rhs = jacobian.jac(concatenated_rhs, y)
+                jac_algebraic = jacobian.jac(concatenated_algebraic, y)
+                pybamm.logger.debug(
+                    "Jacobian: {} cache hits, {} misses".format(
+                        jacobian.hits, jacobian.misses
+                    )
+                )
+                jac = pybamm.SparseStack(jac_rhs, jac_algebraic)
+                model.jacobian = jac
+                model.jacobian_rhs = jac_rhs
+                model.jacobian_algebraic = jac_algebraic
+
+                if model.use_simplify:
+                    pybamm.logger.info("Simplifying jacobian")
+                    jac_algebraic = simp.simplify(jac_algebraic)
+                    jac = simp.simplify(jac)
+            else:
+                jac = None
+                jac_algebraic = None
+
+            # Keep the (simplified) expression trees, e.g. for solvers that evaluate
+            # them without python
+            expressions = {
+                "rhs": concatenated_rhs,
+                "algebraic": concatenated_algebraic,
+                "jacobian": jac,
+                "events": events,
+            }
 
             if model.use_to_python:
-                pybamm.logger.info("Converting jacobian to python")
-                jac_algebraic = pybamm.EvaluatorPython(jac_algebraic)
-                jac = pybamm.EvaluatorPython(jac)
+                # The rhs and algebraic equations use a single evaluator, so that
+                # their shared subexpressions are only converted and evaluated once,
+                # and all the events use a single evaluator
+                evaluators = self.convert_to_evaluators(
+                    model,
+                    {
+                        "jacobian": jac,
+                        "jacobian_algebraic": jac_algebraic,
+                        "rhs_algebraic": [concatenated_rhs, concatenated_algebraic],
+                        "events": list(events.values()),
+                    },
+                )
+                evaluators = self.store_set_up(cache_key, evaluators)
 
-            def jac_alg_fn(t, y):
-                return jac_algebraic.evaluate(t, y)
+        if model.use_to_python:
+            rhs_algebraic = evaluators["rhs_algebraic"].evaluate
+            jac = evaluators.get("jacobian")
+            jac_algebraic = evaluators.get("jacobian_algebraic")
+            if events:
+                events_evaluate = evaluators["events"].evaluate
+        else:
+            events_evaluate = self._events_evaluator(events)
+
+            def rhs_algebraic(t, y, u):
+                # share the known evaluations between the rhs and algebraic equations
+                rhs_eval, known_evals = concatenated_rhs.evaluate(
+                    t, y, u, known_evals={}
+                )
+                alg_eval = concatenated_algebraic.evaluate(
+                    t, y, u, known_evals=known_evals
+                )[0]
+                return rhs_eval, alg_eval
+
+        if jac_algebraic is not None:
+
+            def jac_alg_fn(t, y, inputs=None):
+                inputs = self.inputs if inputs is None else inputs
+                return jac_algebraic.evaluate(t, y, inputs)
 
         else:
-            jac = None
             jac_alg_fn = None
 
-        if model.use_to_python:
-            pybamm.logger.info("Converting RHS to python")
-            concatenated_rhs = pybamm.EvaluatorPython(concatenated_rhs)
-            pybamm.logger.info("Converting algebraic to python")
-            concatenated_algebraic = pybamm.EvaluatorPython(concatenated_algebraic)
-            pybamm.logger.info("Converting events to python")
-            events = {
-                name: pybamm.EvaluatorPython(event) for name, event in events.items()
-            }
-
         # Calculate consistent initial conditions for the algebraic equations
-        def rhs(t, y):
-            return concatenated_rhs.evaluate(t, y, known_evals={})[0][:, 0]
+        # Note: the functions below use the solver's inputs, unless other inputs are
+        # passed explicitly (e.g. when solving an ensemble)
+        def rhs(t, y, inputs=None):
+            inputs = self.inputs if inputs is None else inputs
+            return rhs_algebraic(t, y, inputs)[0][:, 0]
 
-        def algebraic(t, y):
-            return concatenated_algebraic.evaluate(t, y, known_evals={})[0][:, 0]
+        def algebraic(t, y, inputs=None):
+            inputs = self.inputs if inputs is None else inputs
+            return rhs_algebraic(t, y, inputs)[1][:, 0]
 
         if len(model.algebraic) > 0:
             y0 = self.calculate_consistent_initial_conditions(
@@ -182,14 +242,14 @@ class DaeSolver(pybamm.BaseSolver):
             y0 = model.concatenated_initial_conditions[:, 0]
 
         # Create functions to evaluate residuals
-        def residuals(t, y, ydot):
+        def residuals(t, y, ydot, inputs=None):
             pybamm.logger.debug(
                 "Evaluating residuals for {} at t={}".format(model.name, t)
             )
+            self.callback_counts["function evaluations"] += 1
+            inputs = self.inputs if inputs is None else inputs
             y = y[:, np.newaxis]
-            rhs_eval, known_evals = concatenated_rhs.evaluate(t, y, known_evals={})
-            # reuse known_evals
-            alg_eval = concatenated_algebraic.evaluate(t, y, known_evals=known_evals)[0]
+            rhs_eval, alg_eval = rhs_algebraic(t, y, inputs)
             # turn into 1D arrays
             rhs_eval = rhs_eval[:, 0]
             alg_eval = alg_eval[:, 0]
@@ -197,20 +257,24 @@ class DaeSolver(pybamm.BaseSolver):
                 np.concatenate((rhs_eval, alg_eval)) - model.mass_matrix.entries @ ydot
             )
 
-        # Create event-dependent function to evaluate events
-        def event_fun(event):
-            def eval_event(t, y):
-                return event.evaluate(t, y)
+        # Create function to evaluate all the events as a vector
+        if events:
 
-            return eval_event
+            def event_values(t, y, inputs=None):
+                self.callback_counts["event evaluations"] += len(events)
+                inputs = self.inputs if inputs is None else inputs
+                return self._events_vector(events_evaluate(t, y, inputs))
 
-        event_funs = [event_fun(event) for event in events.values()]
+        else:
+            event_values = None
 
         # Create function to evaluate jacobian
         if jac is not None:
 
-            def jacobian(t, y):
-                return jac.evaluate(t, y, known_evals={})[0]
+            def jacobian(t, y, inputs=None):
+                self.callback_counts["jacobian evaluations"] += 1
+                inputs = self.inputs if inputs is None else inputs
+                return jac.evaluate(t, y, inputs, known_evals={})[0]
 
         else:
             jacobian = None
@@ -221,10 +285,26 @@ class DaeSolver(pybamm.BaseSolver):
         self.y0 = y0
         self.rhs = rhs
         self.algebraic = algebraic
+        self.jacobian_algebraic = jac_alg_fn
         self.residuals = residuals
         self.events = events
-        self.event_funs = event_funs
+        self.event_values = event_values
         self.jacobian = jacobian
+        self.expressions = expressions
+
+    def set_inputs(self, model, inputs):
+        """
+        Set the values of the input parameters to use when solving, and recalculate
+        the consistent initial conditions, which depend on these values.
+        See :meth:`pybamm.BaseSolver.set_inputs()`.
+        """
+        super().set_inputs(model, inputs)
+        if len(model.algebraic) > 0:
+            # use the current initial conditions (consistent with the previous
+            # inputs) as the initial guess
+            self.y0 = self.calculate_consistent_initial_conditions(
+                self.rhs, self.algebraic, self.y0, self.jacobian_algebraic
+            )
 
     def calculate_consistent_initial_conditions(
         self, rhs, algebraic, y0_guess, jac=None
@@ -253,8 +333,15 @@ class DaeSolver(pybamm.BaseSolver):
         y0_consistent : array-like, same shape as y0_guess
             Initial conditions that are consistent with the algebraic equations (roots
             of the algebraic equations)
+
+        Notes
+        -----
+        The statistics of the root finding (number of iterations, evaluations of the
+        algebraic equations and of the jacobian, and time) are stored in
+        :attr:`root_stats`.
         """
         pybamm.logger.info("Start calculating consistent initial conditions")
+        timer = pybamm.Timer()
 
         # Split y0_guess into differential and algebraic
         len_rhs = rhs(0, y0_guess).shape[0]
@@ -271,7 +358,26 @@ class DaeSolver(pybamm.BaseSolver):
             )
             return out
 
-        if jac:
+        root_method = self.root_method
+        if root_method == "newton" and not jac:
+            pybamm.logger.info("No jacobian for the Newton method, using 'lm'")
+            root_method = "lm"
+
+        if root_method == "newton":
+
+            def jac_fn(y0_alg):
+                """
+                Evaluates the (sparse) jacobian using y0_diff (fixed) and y0_alg
+                (varying)
+                """
+                y0 = np.concatenate([y0_diff, y0_alg])
+                jac_eval = jac(0, y0)
+                if issparse(jac_eval):
+                    # column slices are cheapest in CSC format
+                    return csc_matrix(jac_eval)[:, len_rhs:]
+                return jac_eval[:, len_rhs:]
+
+        elif jac:
             if issparse(jac(0, y0_guess)):
 
                 def jac_fn(y0_alg):
@@ -293,18 +399,37 @@ class DaeSolver(pybamm.BaseSolver):
         else:
             jac_fn = None
         # Find the values of y0_alg that are roots of the algebraic equations
-        sol = optimize.root(
-            root_fun,
-            y0_alg_guess,
-            jac=jac_fn,
-            method=self.root_method,
-            tol=self.root_tol,
-        )
+        if root_method == "newton":
+            sol = pybamm.newton_root(root_fun, y0_alg_guess, jac_fn, tol=self.root_tol)
+        else:
+            sol = optimize.root(
+                root_fun,
+                y0_alg_guess,
+                jac=jac_fn,
+                method=root_method,
+                tol=self.root_tol,
+            )
         # Return full set of consistent initial conditions (y0_diff unchanged)
         y0_consistent = np.concatenate([y0_diff, sol.x])
+        self.root_stats = {
+            "iterations": sol.get("nit"),
+            "function evaluations": sol.get("nfev"),
+            "jacobian evaluations": sol.get("njev"),
+            "time": timer.time(),
+        }
 
         if sol.success and np.all(sol.fun < self.root_tol * len(sol.x)):
-            pybamm.logger.info("Finish calculating consistent initial conditions")
+            pybamm.logger.info(
+                "Finish calculating consistent initial conditions with '{}' "
+                "({} iterations, {} function evaluations, {} jacobian evaluations) "
+                "in {}".format(
+                    root_method,
+                    self.root_stats["iterations"],
+                    self.root_stats["function evaluations"],
+                    self.root_stats["jacobian evaluations"],
+                    timer.format(self.root_stats["time"]),
+                )
+            )
             return y0_consistent
         elif not sol.success:
             raise pybamm.SolverError(
@@ -0,0 +1,296 @@
+#
+# Content-addressed cache on disk
+#
+import pybamm
+import hashlib
+import numbers
+import numpy as np
+import os
+import pickle
+import scipy.sparse
+import shutil
+import tempfile
+import types
+
+
+class DiskCache(object):
+    """
+    A content-addressed cache on disk, in which each entry is a directory of files,
+    identified by a key: a digest of the objects (e.g. expression trees) that
+    determine its contents. The total size of the cache is capped, by deleting the
+    least recently used entries. Several processes can share the same directory.
+
+    Solvers use a cache to store the evaluators created when setting up a model (see
+    :attr:`pybamm.BaseSolver.cache`).
+
+    Parameters
+    ----------
+    directory : str, optional
+        The directory of the cache (default is "~/.cache/pybamm")
+    max_size : int, optional
+        The maximum total size of the entries, in bytes (default is 1 GB)
+    """
+
+    # changing the layout of the entries (or of the keys) invalidates all of them
+    format_version = 3
+
+    def __init__(self, directory=None, max_size=2 ** 30):
+        if directory is None:
+            directory = os.path.join(os.path.expanduser("~"), ".cache", "pybamm")
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, *objects):
+        """
+        Deterministic digest of the objects, as a hexadecimal string. Expression trees
+        are digested from the contents of their nodes (so that equal trees have equal
+        keys, in any process), numpy arrays and sparse matrices from their entries,
+        and functions from their code.
+
+        Raises
+        ------
+        TypeError
+            If one of the objects cannot be digested
+        """
+        digest = _Digest()
+        digest.update(("pybamm disk cache", self.format_version, pybamm.__version__))
+        digest.update(objects)
+        return digest.hexdigest()
+
+    def path(self, key):
+        """The directory of the entry with the given key"""
+        return os.path.join(self.directory, key)
+
+    def load(self, key):
+        """
+        Return the directory of the entry with the given key, and mark it as the most
+        recently used entry, or return None if there is no such entry
+        """
+        path = self.path(key)
+        try:
+            os.utime(os.path.join(path, "last_used"))
+        except OSError:
+            return None
+        return path
+
+    def store(self, key, write):
+        """
+        Create the entry with the given key, by calling `write(directory)` to write
+        its files, and return its directory. The entry only appears in the cache once
+        it is complete, and if an entry with that key already exists (e.g. stored by
+        another process in the meantime) it is kept. Least recently used entries are
+        then deleted if the cache is too large (see :meth:`evict`).
+        """
+        directory = tempfile.mkdtemp(prefix=".tmp-", dir=self.directory)
+        try:
+            write(directory)
+            open(os.path.join(directory, "last_used"), "w").close()
+            os.rename(directory, self.path(key))
+        except OSError:
+            # the entry already exists
+            shutil.rmtree(directory, ignore_errors=True)
+            if self.load(key) is None:
+                raise
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        self.evict(keep=key)
+        return self.path(key)
+
+    def remove(self, key):
+        """Delete the entry with the given key, if it exists"""
+        shutil.rmtree(self.path(key), ignore_errors=True)
+
+    def entries(self):
+        """
+        The keys of the entries, from the least to the most recently used, with their
+        sizes (in bytes)
+        """
+        entries = []
+        for key in os.listdir(self.directory):
+            path = self.path(key)
+            try:
+                last_used = os.stat(os.path.join(path, "last_used")).st_mtime
+            except OSError:
+                # not a (complete) entry
+                continue
+            entries.append((last_used, key, _directory_size(path)))
+        return [(key, size) for _, key, size in sorted(entries)]
+
+    @property
+    def size(self):
+        """The total size of the entries, in bytes"""
+        return sum(size for _, size in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Delete the least recently used entries (except the entry with the key `keep`)
+        until the total size of the cache is at most :attr:`max_size`
+        """
+        entries = self.entries()
+        size = sum(entry_size for _, entry_size in entries)
+        for key, entry_size in entries:
+            if size <= self.max_size:
+                break
+            if key != keep:
+                self.remove(key)
+                size -= entry_size
+
+    def clear(self):
+        """Delete all the entries"""
+        for key, _ in self.entries():
+            self.remove(key)
+
+
+def _directory_size(path):
+    size = 0
+    for root, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                size += os.path.getsize(os.path.join(root, filename))
+            except OSError:
+                pass
+    return size
+
+
+class _Digest(object):
+    """
+    Incremental blake2b digest of python objects, in which every value is tagged with
+    its type and length so that different objects cannot produce the same stream.
+    Symbols are digested once, however many times they appear in the trees.
+    """
+
+    # attributes of the nodes that do not affect their value: the tree structure
+    # (digested through the children), the attributes derived from it (e.g. the saved
+    # shape) and the mesh, which a node only uses through other attributes (e.g. the
+    # slices of a domain concatenation)
+    skipped_attributes = {
+        "__dict__",
+        "_children",
+        "_id",
+        "_symbol_classes",
+        "_constant",
+        "_saved_shape",
+        "_saved_evaluates_to_number",
+        "_mesh",
+    }
+
+    def __init__(self):
+        self._hash = hashlib.blake2b(digest_size=32)
+        self._symbols = {}
+        # objects being digested, to detect cycles
+        self._active = set()
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def _write(self, tag, data=b""):
+        self._hash.update(
+            tag.encode() + b":" + str(len(data)).encode() + b":" + data + b";"
+        )
+
+    def _write_name(self, tag, obj):
+        """Write the qualified name of a class or function"""
+        name = "{}.{}".format(
+            getattr(obj, "__module__", None), getattr(obj, "__qualname__", obj.__name__)
+        )
+        self._write(tag, name.encode())
+
+    def update(self, obj):
+        if obj is None or isinstance(obj, (bool, numbers.Number, str, bytes)):
+            self._write(type(obj).__name__, repr(obj).encode())
+        elif isinstance(obj, pybamm.Symbol):
+            self._write("symbol", self._symbol_digest(obj))
+        elif isinstance(obj, np.ndarray):
+            if obj.dtype == object:
+                self._write("object array", repr(obj.shape).encode())
+                self.update(obj.ravel().tolist())
+            else:
+                self._write("array", "{} {}".format(obj.dtype, obj.shape).encode())
+                self._write("data", np.ascontiguousarray(obj).tobytes())
+        elif scipy.sparse.issparse(obj):
+            matrix = obj.tocsr()
+            self._write("sparse", "{} {}".format(obj.format, obj.shape).encode())
+            for array in [matrix.data, matrix.indices, matrix.indptr]:
+                self.update(array)
+        elif isinstance(obj, slice):
+            self._write("slice")
+            self.update((obj.start, obj.stop, obj.step))
+        elif isinstance(obj, (list, tuple)):
+            self._write(type(obj).__name__, str(len(obj)).encode())
+            for item in obj:
+                self.update(item)
+        elif isinstance(obj, (dict, set, frozenset)):
+            self._write(type(obj).__name__, str(len(obj)).encode())
+            # digest the items independently, so that their order does not matter
+            items = obj.items() if isinstance(obj, dict) else [(item,) for item in obj]
+            item_digests = []
+            for item in items:
+                digest = self._subdigest()
+                digest.update(item)
+                item_digests.append(digest.hexdigest())
+            for item_digest in sorted(item_digests):
+                self._write("item", item_digest.encode())
+        elif isinstance(obj, types.FunctionType):
+            # from its code, default arguments and closure (see pybamm.stable_hash)
+            self._write("function", str(pybamm.stable_hash(obj)).encode())
+        elif isinstance(
+            obj, (np.ufunc, types.BuiltinFunctionType, types.ModuleType, type)
+        ):
+            self._write_name(type(obj).__name__, obj)
+        elif isinstance(obj, types.MethodType):
+            self._write("method")
+            self.update((obj.__self__, obj.__func__))
+        elif hasattr(obj, "__dict__"):
+            self._object(obj, self._instance)
+        else:
+            try:
+                data = pickle.dumps(obj, protocol=4)
+            except Exception:
+                raise TypeError("Cannot digest object {!r}".format(obj))
+            self._write("pickle", data)
+
+    def _subdigest(self):
+        """A separate digest, sharing the digests of the symbols"""
+        digest = _Digest()
+        digest._symbols = self._symbols
+        digest._active = self._active
+        return digest
+
+    def _object(self, obj, update):
+        """Digest an object that may (indirectly) refer to itself"""
+        if id(obj) in self._active:
+            self._write("cycle")
+            return
+        self._active.add(id(obj))
+        try:
+            update(obj)
+        finally:
+            self._active.discard(id(obj))
+
+    def _instance(self, obj):
+        self._write_name("object", type(obj))
+        self.update(vars(obj))
+
+    def _symbol_digest(self, symbol):
+        try:
+            return self._symbols[id(symbol)][1]
+        except KeyError:
+            pass
+        digest = self._subdigest()
+        digest._write_name("class", type(symbol))
+        attributes = dict(vars(symbol))
+        for cls in type(symbol).__mro__:
+            for name in getattr(cls, "__slots__", []):
+                if hasattr(symbol, name):
+                    attributes[name] = getattr(symbol, name)
+        for name, value in sorted(attributes.items()):
+            if name not in self.skipped_attributes:
+                digest._write("attribute", name.encode())
+                digest.update(value)
+        digest.update(list(symbol.children))
+        result = digest._hash.digest()
+        # keep a reference to the symbol, so that its id is not reused
+        self._symbols[id(symbol)] = (symbol, result)
+        return result
@@ -1,11 +1,12 @@
 #
-# Solver class using sundials with the KLU sparse linear solver
+# Solver classes using sundials with the KLU sparse linear solver
 #
 import pybamm
 import numpy as np
 import scipy.sparse as sparse
 
 import importlib
+from functools import partial
 
 idaklu_spec = importlib.util.find_spec("idaklu")
 if idaklu_spec is not None:
@@ -17,7 +18,173 @@ def have_idaklu():
     return idaklu_spec is None
 
 
-class IDAKLU(pybamm.DaeSolver):
+class _KLUSolver(object):
+    """
+    Methods shared by :class:`IDAKLU` and :class:`CVODEKLU`, which evaluate the
+    jacobian of the residuals on a fixed sparsity pattern and the events in the form
+    required by the sundials KLU extension, and create solutions from its results.
+    Both write the residuals as F(t, y, dy/dt), with the jacobian dF/dy - cj * M:
+    for ODE models, F = f(t, y) - dy/dt and CVODE evaluates the jacobian at cj = 0.
+    The methods only use the events function of :class:`pybamm.BaseSolver` and
+    :attr:`jacobian_keys`, the pattern of the jacobian found when setting up a model
+    (if any, see :meth:`jacobian_pattern()`), not the state of the DAE or ODE solver.
+    """
+
+    jacobian_keys = None
+
+    def jacobian_pattern(self, jacobian, y0, mass_matrix):
+        """
+        Find the sparsity pattern (in CSR format) of the jacobian of the residuals,
+        J - cj * M, which is the union of the patterns of J and of the mass matrix M.
+        The pattern is fixed for the whole integration, so that each evaluation of
+        the jacobian only writes its data (see :meth:`_sundials_jacobian()`), and KLU
+        only analyses the pattern once.
+
+        The pattern of J is the one found from the jacobian expression when the model
+        was set up, which holds every entry that can be nonzero. Otherwise, it is the
+        pattern of the jacobian evaluated with NaN time and states, which holds every
+        entry that depends on them.
+
+        Parameters
+        ----------
+        jacobian : method
+            A function that takes in t and y and returns the jacobian J
+        y0 : numeric type
+            The initial conditions
+        mass_matrix : array_like
+            The (sparse) mass matrix
+
+        Returns
+        -------
+        dict
+            The keys (row * number of columns + column), column indices ("indices")
+            and row pointers ("indptr") of the pattern, the mass matrix (in CSR
+            format) and the positions of its entries in the pattern
+        """
+        size = y0.size
+        jac_keys = self.jacobian_keys
+        if jac_keys is None:
+            with np.errstate(all="ignore"):
+                jac_nan = jacobian(np.nan, np.full(size, np.nan))
+            if sparse.issparse(jac_nan):
+                jac_nan = sparse.coo_matrix(jac_nan)
+                jac_keys = np.unique(jac_nan.row * size + jac_nan.col)
+            else:
+                jac_keys = np.flatnonzero(np.asarray(jac_nan).reshape(size, size))
+
+        mass_matrix = sparse.csr_matrix(mass_matrix)
+        mass_matrix.sum_duplicates()
+        mass_matrix.sort_indices()
+        mass_rows = np.repeat(np.arange(size), np.diff(mass_matrix.indptr))
+        mass_keys = mass_rows * size + mass_matrix.indices
+        keys = np.union1d(jac_keys, mass_keys)
+        return {
+            "keys": keys,
+            "indices": keys % size,
+            "indptr": np.concatenate(
+                [[0], np.cumsum(np.bincount(keys // size, minlength=size))]
+            ),
+            "mass_matrix": mass_matrix,
+            "mass_positions": np.searchsorted(keys, mass_keys),
+        }
+
+    def _sundials_jacobian(self, jacobian, pattern):
+        """
+        Create an object which evaluates the jacobian of the residuals, and writes its
+        data on the (fixed) sparsity pattern given by :meth:`jacobian_pattern()`, in
+        the form required by the sundials KLU solver.
+        """
+        keys = pattern["keys"]
+        size = len(pattern["indptr"]) - 1
+        mass_data = pattern["mass_matrix"].data
+        mass_positions = pattern["mass_positions"]
+
+        class SundialsJacobian:
+            def __init__(self):
+                # the data is written into the same array at each evaluation
+                self.data = np.zeros(len(keys))
+                # pattern of the last evaluation of the jacobian and the positions of
+                # its entries in the pattern of the residuals' jacobian
+                self.indptr = None
+                self.indices = None
+                self.positions = None
+
+            def jac_res(self, t, y, cj):
+                # must be of form j_res = (dr/dy) - (cj) (dr/dy')
+                # cj is just the input parameter
+                # see p68 of the ida_guide.pdf for more details
+                jac = jacobian(t, y)
+                if sparse.issparse(jac):
+                    jac = sparse.csr_matrix(jac)
+                    jac.sum_duplicates()
+                    if not (
+                        np.array_equal(jac.indptr, self.indptr)
+                        and np.array_equal(jac.indices, self.indices)
+                    ):
+                        self.find_positions(jac)
+                    self.data[:] = 0
+                    self.data[self.positions] = jac.data
+                else:
+                    self.data[:] = np.asarray(jac).reshape(-1)[keys]
+                self.data[mass_positions] -= cj * mass_data
+                return self.data
+
+            def find_positions(self, jac):
+                rows = np.repeat(np.arange(size), np.diff(jac.indptr))
+                jac_keys = rows * size + jac.indices
+                positions = np.searchsorted(keys, jac_keys)
+                if np.any(positions >= len(keys)) or np.any(
+                    keys[positions] != jac_keys
+                ):
+                    raise pybamm.SolverError(
+                        "The jacobian has entries outside its sparsity pattern"
+                    )
+                self.indptr = jac.indptr.copy()
+                self.indices = jac.indices.copy()
+                self.positions = positions
+
+        return SundialsJacobian()
+
+    def _sundials_rootfn(self, events, t0, y0):
+        """
+        Create a function which evaluates all the events, in the form required by the
+        sundials KLU solver, and get the number of events.
+        """
+        events_function, num_of_events = self._events_function(events, t0, y0)
+
+        def rootfn(t, y):
+            if events_function is None:
+                return np.ones((0,))
+            return events_function(t, y)
+
+        return rootfn, num_of_events
+
+    def _solution(self, sol, number_of_states):
+        """Create a solution from the result of an idaklu integration"""
+        t = sol.t
+        number_of_timesteps = t.size
+        y_out = sol.y.reshape((number_of_timesteps, number_of_states))
+
+        # return solution, we need to tranpose y to match scipy's interface
+        if sol.flag in [0, 2]:
+            # 0 = solved for all t_eval
+            if sol.flag == 0:
+                termination = "final time"
+            # 2 = found root(s)
+            elif sol.flag == 2:
+                termination = "event"
+            solution = pybamm.Solution(
+                sol.t, np.transpose(y_out), t[-1], np.transpose(y_out[-1]), termination
+            )
+            solution.stats = sol.stats
+            if sol.event_index >= 0:
+                solution.event_index = sol.event_index
+            return solution
+        else:
+            raise pybamm.SolverError(sol.message)
+
+
+class IDAKLU(_KLUSolver, pybamm.DaeSolver):
     """Solve a discretised model, using sundials with the KLU sparse linear solver.
 
      Parameters
@@ -27,22 +194,278 @@ class IDAKLU(pybamm.DaeSolver):
     atol : float, optional
         The absolute tolerance for the solver (default is 1e-6).
     root_method : str, optional
-        The method to use to find initial conditions (default is "lm")
+        The method to use to find initial conditions (default is "newton", see
+        :class:`pybamm.DaeSolver`)
     root_tol : float, optional
         The tolerance for the initial-condition solver (default is 1e-8).
     max_steps: int, optional
         The maximum number of steps the solver will take before terminating
         (default is 1000).
+    callbacks : str, optional
+        How the residuals, jacobian and events are evaluated during the integration.
+        Can be "python" (default), which calls the python functions created by the
+        solver setup, or "native", which lowers the model to tapes (see
+        :class:`pybamm.Tape`) that are evaluated in C++, so that python is only
+        called before and after the integration. "native" requires the model's
+        jacobian (`model.use_jacobian = True`).
     """
 
     def __init__(
-        self, rtol=1e-6, atol=1e-6, root_method="lm", root_tol=1e-6, max_steps=1000
+        self,
+        rtol=1e-6,
+        atol=1e-6,
+        root_method="newton",
+        root_tol=1e-6,
+        max_steps=1000,
+        callbacks="python",
     ):
 
         if idaklu_spec is None:
             raise ImportError("KLU is not installed")
 
         super().__init__("ida", rtol, atol, root_method, root_tol, max_steps)
+        self.callbacks = callbacks
+        self.jacobian_keys = None
+        self.session = None
+
+    @property
+    def callbacks(self):
+        return self._callbacks
+
+    @callbacks.setter
+    def callbacks(self, callbacks):
+        if callbacks not in ["python", "native"]:
+            raise ValueError("callbacks '{}' not recognised".format(callbacks))
+        # the native model is created by the setup, so set up again
+        self._set_up_key = None
+        self.session = None
+        self._callbacks = callbacks
+
+    def set_up(self, model):
+        """
+        Unpack model, perform checks, simplify and calculate jacobian. With native
+        callbacks, also lower the model to tapes; with python callbacks, find the
+        sparsity pattern of the jacobian (see :meth:`jacobian_pattern()`).
+        See :meth:`pybamm.DaeSolver.set_up()`.
+        """
+        # the stepping session integrates the previous set-up
+        self.session = None
+        super().set_up(model)
+        if self.callbacks == "native":
+            self.set_up_native(model)
+        else:
+            self.jacobian_keys = self._expression_jacobian_keys()
+
+    def _expression_jacobian_keys(self):
+        """
+        Keys (row * number of columns + column) of the entries of the jacobian that
+        can be nonzero, found by propagating the sparsity patterns of the constants
+        and state vectors through the jacobian expression (see :class:`pybamm.Tape`),
+        or None if the expression is not available (e.g. the set-up was loaded from
+        the cache) or cannot be lowered to a tape
+        """
+        if self.expressions is None or self.expressions["jacobian"] is None:
+            return None
+        try:
+            tape = pybamm.Tape([self.expressions["jacobian"]], 0, self.y0, self.inputs)
+        except NotImplementedError:
+            return None
+        return tape.output_patterns[0].keys
+
+    def load_set_up(self, model, kind):
+        """
+        Load the set-up from the cache, except with native callbacks, which are
+        created from the (simplified) expression trees rather than the evaluators.
+        See :meth:`pybamm.BaseSolver.load_set_up()`.
+        """
+        if self.callbacks == "native":
+            return None, None
+        return super().load_set_up(model, kind)
+
+    def set_up_native(self, model):
+        """
+        Lower the residuals, jacobian and events of a model that has been set up to
+        tapes, and create the native model that the idaklu extension integrates
+        without calling python. Functions are traced at the initial conditions (see
+        :class:`pybamm.Tape`).
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel`
+            The model, which has been set up by :meth:`set_up()`
+
+        Raises
+        ------
+        :class:`pybamm.SolverError`
+            If the model's jacobian has not been calculated, or an event does not
+            evaluate to a number
+        """
+        if self.expressions["jacobian"] is None:
+            raise pybamm.SolverError(
+                "Native callbacks require the jacobian (model.use_jacobian = True)"
+            )
+        pybamm.logger.info("Lowering {} to tapes".format(model.name))
+
+        # the tapes share the order of the input parameters
+        input_names = []
+        tapes = []
+        for symbols in [
+            [self.expressions["rhs"], self.expressions["algebraic"]],
+            [self.expressions["jacobian"]],
+            list(self.expressions["events"].values()),
+        ]:
+            tapes.append(pybamm.Tape(symbols, 0, self.y0, self.inputs, input_names))
+        residuals_tape, jacobian_tape, events_tape = tapes
+        for name, register in zip(self.expressions["events"], events_tape.outputs):
+            if events_tape.register_sizes[register] != 1:
+                raise pybamm.SolverError(
+                    "Event '{}' does not evaluate to a number".format(name)
+                )
+
+        # The jacobian of the residuals is J - cj * M
+        self.jacobian_keys = jacobian_tape.output_patterns[0].keys
+        pattern = self.jacobian_pattern(None, self.y0, model.mass_matrix.entries)
+        mass_matrix = pattern["mass_matrix"]
+
+        self.input_names = input_names
+        self.native_model = idaklu.native_model(
+            *[
+                idaklu.tape(
+                    tape.instructions,
+                    tape.indices,
+                    tape.coefficients,
+                    tape.register_sizes,
+                    tape.outputs,
+                )
+                for tape in tapes
+            ],
+            mass_data=mass_matrix.data,
+            mass_indices=mass_matrix.indices,
+            mass_indptr=mass_matrix.indptr,
+            jac_indices=pattern["indices"],
+            jac_indptr=pattern["indptr"],
+            jac_positions=np.searchsorted(pattern["keys"], self.jacobian_keys),
+            mass_positions=pattern["mass_positions"],
+        )
+
+    def native_inputs(self, inputs):
+        """The values of the input parameters, in the order used by the tapes"""
+        return np.array([inputs[name] for name in self.input_names], dtype=float)
+
+    def compute_solution(self, model, t_eval):
+        """
+        Calculate the solution of the model at specified times.
+        See :meth:`pybamm.DaeSolver.compute_solution()`.
+        """
+        if self.callbacks == "python":
+            return super().compute_solution(model, t_eval)
+
+        timer = pybamm.Timer()
+
+        solve_start_time = timer.time()
+        pybamm.logger.info("Calling DAE solver with native callbacks")
+        sol = idaklu.solve_native(
+            t_eval,
+            self.y0,
+            np.zeros_like(self.y0),
+            self.native_model,
+            self.native_inputs(self.inputs),
+            self._rhs_alg_id(self.y0),
+            rtol=self._rtol,
+            atol=self._atol,
+        )
+        solution = self._solution(sol, self.y0.size)
+        solve_time = timer.time() - solve_start_time
+
+        # Identify the event that caused termination
+        termination = self.get_termination_reason(solution, self.events)
+
+        return solution, solve_time, termination
+
+    def compute_step(self, model, t_eval):
+        """
+        Calculate the solution of the model over a step, continuing the integration
+        of the previous step. The integrator (with its memory, linear solver and the
+        sparsity pattern of the jacobian) is kept between steps in a stepping session
+        (:attr:`session`), which is created at the first step and restarted from the
+        current state with `IDAReInit` only if the state or the inputs have changed
+        (discontinuously) since the previous step.
+        See :meth:`pybamm.BaseSolver.compute_step()`.
+        """
+        timer = pybamm.Timer()
+
+        solve_start_time = timer.time()
+        self.reset_callback_counts()
+        t0 = t_eval[0]
+        if self.session is None:
+            pybamm.logger.info("Starting stepping session")
+            self.session = self._create_session(model, t0)
+        elif not (
+            self.session.t == t0
+            and self._session_inputs == self.inputs
+            and np.array_equal(self._session_y, self.y0)
+        ):
+            pybamm.logger.info("Restarting stepping session")
+            if self.callbacks == "native":
+                self.session.set_inputs(self.native_inputs(self.inputs))
+            self.session.reinit(t0, self.y0, np.zeros_like(self.y0))
+        self._session_inputs = dict(self.inputs)
+
+        pybamm.logger.info("Calling DAE solver in stepping session")
+        sol = self.session.step(t_eval)
+        try:
+            solution = self._solution(sol, self.y0.size)
+        except pybamm.SolverError:
+            # the integrator cannot continue after a failure
+            self.session = None
+            raise
+        self._session_y = solution.y[:, -1]
+        solve_time = timer.time() - solve_start_time
+        # statistics reported by the integrator take precedence
+        solution.stats = dict(self.callback_counts, **solution.stats)
+
+        # Identify the event that caused termination
+        termination = self.get_termination_reason(solution, self.events)
+
+        return solution, solve_time, termination
+
+    def _create_session(self, model, t0):
+        """Create the stepping session of the idaklu extension, starting at t0 from
+        the current initial conditions"""
+        y0 = self.y0
+        ydot0 = np.zeros_like(y0)
+        if self.callbacks == "native":
+            return idaklu.session_native(
+                t0,
+                y0,
+                ydot0,
+                self.native_model,
+                self.native_inputs(self.inputs),
+                self._rhs_alg_id(y0),
+                rtol=self._rtol,
+                atol=self._atol,
+            )
+
+        if self.jacobian is None:
+            raise pybamm.SolverError("KLU requires the Jacobian to be provided")
+        pattern = self.jacobian_pattern(self.jacobian, y0, model.mass_matrix.entries)
+        jac_class = self._sundials_jacobian(self.jacobian, pattern)
+        rootfn, num_of_events = self._sundials_rootfn(self.event_values, t0, y0)
+        return idaklu.session(
+            t0,
+            y0,
+            ydot0,
+            self.residuals,
+            jac_class.jac_res,
+            pattern["indices"],
+            pattern["indptr"],
+            rootfn,
+            num_of_events,
+            1,
+            self._rhs_alg_id(y0),
+            rtol=self._rtol,
+            atol=self._atol,
+        )
 
     def integrate(self, residuals, y0, t_eval, events, mass_matrix, jacobian):
         """
@@ -57,9 +480,10 @@ class IDAKLU(pybamm.DaeSolver):
             The initial conditions
         t_eval : numeric type
             The times at which to compute the solution
-        events : method,
-            A function that takes in t and y and returns conditions for the solver to
-            stop
+        events : method or list of methods
+            A function that takes in t and y and returns the values of the conditions
+            for the solver to stop (as a vector), or a list of functions that each
+            return the value of one condition
         mass_matrix : array_like,
             The (sparse) mass matrix for the chosen spatial method.
         jacobian : method,
@@ -69,69 +493,20 @@ class IDAKLU(pybamm.DaeSolver):
         """
 
         if jacobian is None:
-            pybamm.SolverError("KLU requires the Jacobian to be provided")
-
-        if events is None:
-            pybamm.SolverError("KLU requires events to be provided")
+            raise pybamm.SolverError("KLU requires the Jacobian to be provided")
 
         rtol = self._rtol
         atol = self._atol
 
-        if jacobian:
-            jac_y0_t0 = jacobian(t_eval[0], y0)
-            if sparse.issparse(jac_y0_t0):
-
-                def jacfn(t, y, cj):
-                    j = jacobian(t, y) - cj * mass_matrix
-                    return j
-
-            else:
-
-                def jacfn(t, y, cj):
-                    jac_eval = jacobian(t, y) - cj * mass_matrix
-                    return sparse.csr_matrix(jac_eval)
-
-        class SundialsJacobian:
-            def __init__(self):
-                self.J = None
-
-                random = np.random.random(size=y0.size)
-                J = jacfn(10, random, 20)
-                self.nnz = J.nnz  # hoping nnz remains constant...
-
-            def jac_res(self, t, y, cj):
-                # must be of form j_res = (dr/dy) - (cj) (dr/dy')
-                # cj is just the input parameter
-                # see p68 of the ida_guide.pdf for more details
-                self.J = jacfn(t, y, cj)
-
-            def get_jac_data(self):
-                return self.J.data
-
-            def get_jac_row_vals(self):
-                return self.J.indices
-
-            def get_jac_col_ptrs(self):
-                return self.J.indptr
+        pattern = self.jacobian_pattern(jacobian, y0, mass_matrix)
+        jac_class = self._sundials_jacobian(jacobian, pattern)
 
         # solver works with ydot0 set to zero
         ydot0 = np.zeros_like(y0)
 
-        jac_class = SundialsJacobian()
-
-        num_of_events = len(events)
         use_jac = 1
 
-        def rootfn(t, y):
-            return_root = np.ones((num_of_events,))
-            return_root[:] = [event(t, y) for event in events]
-
-            return return_root
-
-        # get ids of rhs and algebraic variables
-        rhs_ids = np.ones(self.rhs(0, y0).shape)
-        alg_ids = np.zeros(self.algebraic(0, y0).shape)
-        ids = np.concatenate((rhs_ids, alg_ids))
+        rootfn, num_of_events = self._sundials_rootfn(events, t_eval[0], y0)
 
         # solve
         sol = idaklu.solve(
@@ -140,33 +515,276 @@ class IDAKLU(pybamm.DaeSolver):
             ydot0,
             self.residuals,
             jac_class.jac_res,
-            jac_class.get_jac_data,
-            jac_class.get_jac_row_vals,
-            jac_class.get_jac_col_ptrs,
-            jac_class.nnz,
+            pattern["indices"],
+            pattern["indptr"],
             rootfn,
             num_of_events,
             use_jac,
-            ids,
-            rtol,
-            atol,
+            self._rhs_alg_id(y0),
+            rtol=rtol,
+            atol=atol,
         )
+        return self._solution(sol, y0.size)
 
-        t = sol.t
-        number_of_timesteps = t.size
-        number_of_states = y0.size
-        y_out = sol.y.reshape((number_of_timesteps, number_of_states))
+    def _rhs_alg_id(self, y0):
+        """The ids of the rhs (1) and algebraic (0) variables"""
+        rhs_ids = np.ones(self.rhs(0, y0).shape)
+        alg_ids = np.zeros(self.algebraic(0, y0).shape)
+        return np.concatenate((rhs_ids, alg_ids))
 
-        # return solution, we need to tranpose y to match scipy's interface
-        if sol.flag in [0, 2]:
-            # 0 = solved for all t_eval
-            if sol.flag == 0:
-                termination = "final time"
-            # 2 = found root(s)
-            elif sol.flag == 2:
-                termination = "event"
-            return pybamm.Solution(
-                sol.t, np.transpose(y_out), t[-1], np.transpose(y_out[-1]), termination
+    def solve_ensemble(
+        self, model, t_eval, inputs_list=None, y0_list=None, number_of_threads=0
+    ):
+        """
+        Calculate the solutions of an ensemble of copies of a model, which differ in
+        their input parameters and/or initial conditions, at specified times. The
+        members of the ensemble are integrated concurrently on a pool of threads (with
+        python callbacks, the calls to the python functions that evaluate the model
+        are serialised, but the rest of the integration, including the linear solves,
+        runs in parallel; with native callbacks, the integrations are fully parallel).
+        The solver setup is cached as in :meth:`pybamm.BaseSolver.solve()`.
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel`
+            The model whose solution to calculate. Must have attributes rhs and
+            initial_conditions
+        t_eval : numeric type
+            The times at which to compute the solution
+        inputs_list : list of dict, optional
+            The input parameters for each member of the ensemble (see
+            :class:`pybamm.InputParameter`)
+        y0_list : list of array-like, optional
+            The initial conditions for each member of the ensemble (for models with
+            algebraic equations, the algebraic part is only used as an initial guess
+            for the consistent initial conditions). Default is the initial conditions
+            of the model.
+        number_of_threads : int, optional
+            The number of threads to use. Default (0) uses one thread per core.
+
+        Returns
+        -------
+        list of :class:`pybamm.Solution`
+            The solution of each member of the ensemble
+
+        Raises
+        ------
+        :class:`pybamm.ModelError`
+            If an empty model is passed (`model.rhs = {}` and `model.algebraic={}`)
+        :class:`pybamm.SolverError`
+            If the integration of any member of the ensemble fails
+        """
+        pybamm.logger.info("Start solving ensemble of {}".format(model.name))
+
+        # Make sure model isn't empty
+        if len(model.rhs) == 0 and len(model.algebraic) == 0:
+            raise pybamm.ModelError("Cannot solve empty model")
+
+        # Get the number of members
+        if inputs_list is None and y0_list is None:
+            raise ValueError("At least one of inputs_list and y0_list must be given")
+        elif inputs_list is None:
+            inputs_list = [{}] * len(y0_list)
+        elif y0_list is not None and len(y0_list) != len(inputs_list):
+            raise ValueError("inputs_list and y0_list must have the same length")
+        number_of_members = len(inputs_list)
+
+        # Set up, unless this model (in its current version) has already been set up
+        timer = pybamm.Timer()
+        start_time = timer.time()
+        self.set_up_if_changed(model, inputs_list[0])
+
+        # Create the initial conditions and the functions for each member, with the
+        # member's inputs
+        if self.callbacks == "python":
+            if self.jacobian is None:
+                raise pybamm.SolverError("KLU requires the Jacobian to be provided")
+            # the members share the pattern of the jacobian
+            pattern = self.jacobian_pattern(
+                partial(self.jacobian, inputs=inputs_list[0]),
+                self.y0,
+                model.mass_matrix.entries,
+            )
+        y0s = np.empty((number_of_members, self.y0.size))
+        residuals = []
+        jac_classes = []
+        rootfns = []
+        for i, inputs in enumerate(inputs_list):
+            if y0_list is None:
+                y0_guess = model.concatenated_initial_conditions[:, 0]
+            else:
+                y0_guess = np.array(y0_list[i], dtype=float).flatten()
+            if len(model.algebraic) > 0:
+                if self.jacobian_algebraic is None:
+                    jac_algebraic = None
+                else:
+                    jac_algebraic = partial(self.jacobian_algebraic, inputs=inputs)
+                y0s[i] = self.calculate_consistent_initial_conditions(
+                    partial(self.rhs, inputs=inputs),
+                    partial(self.algebraic, inputs=inputs),
+                    y0_guess,
+                    jac_algebraic,
+                )
+            else:
+                y0s[i] = y0_guess
+
+            if self.callbacks == "native":
+                # the native model evaluates the functions with each member's inputs
+                continue
+            residuals.append(partial(self.residuals, inputs=inputs))
+            jacobian = partial(self.jacobian, inputs=inputs)
+            jac_classes.append(self._sundials_jacobian(jacobian, pattern))
+            if self.event_values is None:
+                events = None
+            else:
+                events = partial(self.event_values, inputs=inputs)
+            rootfns.append(self._sundials_rootfn(events, t_eval[0], y0s[i])[0])
+        set_up_time = timer.time() - start_time
+
+        # solve
+        solve_start_time = timer.time()
+        pybamm.logger.info("Calling DAE solver on {} threads".format(number_of_threads))
+        if self.callbacks == "native":
+            sol = idaklu.solve_ensemble_native(
+                t_eval,
+                y0s,
+                np.zeros_like(y0s),
+                self.native_model,
+                np.array(
+                    [self.native_inputs(inputs) for inputs in inputs_list]
+                ).reshape(number_of_members, -1),
+                self._rhs_alg_id(self.y0),
+                rtol=self._rtol,
+                atol=self._atol,
+                number_of_threads=number_of_threads,
             )
         else:
-            raise pybamm.SolverError(sol.message)
+            sol = idaklu.solve_ensemble(
+                t_eval,
+                y0s,
+                np.zeros_like(y0s),
+                residuals,
+                [jac_class.jac_res for jac_class in jac_classes],
+                pattern["indices"],
+                pattern["indptr"],
+                rootfns,
+                len(self.events),
+                1,
+                self._rhs_alg_id(self.y0),
+                rtol=self._rtol,
+                atol=self._atol,
+                number_of_threads=number_of_threads,
+            )
+        solve_time = timer.time() - solve_start_time
+
+        # The solutions of the members are stacked (and padded with NaN after the
+        # final time of members that stopped early), so split them up again
+        solutions = []
+        for i, inputs in enumerate(inputs_list):
+            if sol.flags[i] not in [0, 2]:
+                raise pybamm.SolverError(
+                    "Member {} of the ensemble failed: {}".format(i, sol.messages[i])
+                )
+            number_of_timesteps = sol.number_of_timesteps[i]
+            t = sol.t[i, :number_of_timesteps]
+            y = np.transpose(sol.y[i, :number_of_timesteps, :])
+            # 0 = solved for all t_eval, 2 = found root(s)
+            termination = "final time" if sol.flags[i] == 0 else "event"
+            solution = pybamm.Solution(t, y, t[-1], y[:, -1], termination)
+            solution.inputs = inputs
+            solution.stats = sol.stats[i]
+            if sol.event_indices[i] >= 0:
+                solution.event_index = sol.event_indices[i]
+            self.get_termination_reason(solution, self.events, inputs)
+
+            # Assign times
+            solution.solve_time = solve_time
+            solution.set_up_time = set_up_time
+            solution.total_time = timer.time() - start_time
+            solutions.append(solution)
+
+        pybamm.logger.info("Finish solving ensemble of {}".format(model.name))
+        pybamm.logger.info(
+            "Set-up time: {}, Solve time: {}".format(
+                timer.format(set_up_time), timer.format(solve_time)
+            )
+        )
+        return solutions
+
+
+class CVODEKLU(_KLUSolver, pybamm.OdeSolver):
+    """Solve a discretised ODE model, using the BDF integrator CVODE of sundials with
+    the KLU sparse linear solver (from the same extension as :class:`IDAKLU`).
+
+    The model's sparse jacobian and events are evaluated as for :class:`IDAKLU`: the
+    jacobian's data is written on a fixed sparsity pattern (see
+    :meth:`jacobian_pattern()`), which includes the diagonal (the pattern of
+    the identity mass matrix of ODE models), so that KLU only analyses the pattern
+    of CVODE's linear systems, I - gamma * J, once.
+
+    Parameters
+    ----------
+    rtol : float, optional
+        The relative tolerance for the solver (default is 1e-6).
+    atol : float, optional
+        The absolute tolerance for the solver (default is 1e-6).
+    """
+
+    def __init__(self, rtol=1e-6, atol=1e-6):
+
+        if idaklu_spec is None:
+            raise ImportError("KLU is not installed")
+
+        super().__init__("cvode", rtol, atol)
+        self.jacobian_keys = None
+
+    def integrate(
+        self, derivs, y0, t_eval, events=None, mass_matrix=None, jacobian=None
+    ):
+        """
+        Solve a model defined by dydt with initial conditions y0.
+
+        Parameters
+        ----------
+        derivs : method
+            A function that takes in t and y and returns the time-derivative dydt
+        y0 : numeric type
+            The initial conditions
+        t_eval : numeric type
+            The times at which to compute the solution
+        events : method or list of methods, optional
+            A function that takes in t and y and returns the values of the conditions
+            for the solver to stop (as a vector), or a list of functions that each
+            return the value of one condition
+        mass_matrix : array_like, optional
+            The (sparse) mass matrix for the chosen spatial method, which is the
+            identity for ODE models (default)
+        jacobian : method
+            A function that takes in t and y and returns the Jacobian
+        """
+        if jacobian is None:
+            raise pybamm.SolverError("KLU requires the Jacobian to be provided")
+        if mass_matrix is None:
+            mass_matrix = sparse.eye(y0.size)
+
+        pattern = self.jacobian_pattern(jacobian, y0, mass_matrix)
+        jac_class = self._sundials_jacobian(jacobian, pattern)
+        rootfn, num_of_events = self._sundials_rootfn(events, t_eval[0], y0)
+
+        # the right-hand side is the residuals with dy/dt = 0
+        def rhs(t, y, ydot):
+            return derivs(t, y)
+
+        sol = idaklu.solve_ode(
+            t_eval,
+            y0,
+            rhs,
+            jac_class.jac_res,
+            pattern["indices"],
+            pattern["indptr"],
+            rootfn,
+            num_of_events,
+            rtol=self._rtol,
+            atol=self._atol,
+        )
+        return self._solution(sol, y0.size)
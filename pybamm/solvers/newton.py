@@ -0,0 +1,153 @@
+#
+# Damped Newton method with sparse jacobians
+#
+import pybamm
+import numpy as np
+from scipy import linalg, optimize, sparse
+from scipy.sparse import linalg as sparse_linalg
+
+
+def newton_root(
+    fun, x0, jac, tol=1e-6, max_iterations=100, min_step=1e-4, factorisations=None
+):
+    """
+    Find a root of a system of equations with a damped Newton method. At each
+    iteration, the jacobian is factorised once (with a sparse LU decomposition if it
+    is sparse, so that the cost scales with its number of nonzeros rather than the
+    cube of its size), and the Newton step is scaled back by a backtracking line
+    search until the squared norm of the residuals decreases sufficiently (Armijo
+    condition). The iterations stop when both the residuals and the Newton step are
+    small (the last step is then taken in full), so that the root is also found
+    accurately when the jacobian is (nearly) singular there.
+
+    **Example**
+
+    >>> import pybamm
+    >>> import numpy as np
+    >>> from scipy.sparse import diags
+    >>> def fun(x):
+    ...     return x ** 2 - 4
+    >>> sol = pybamm.newton_root(fun, np.ones(3), lambda x: diags(2 * x))
+    >>> sol.success, np.allclose(sol.x, 2)
+    (True, True)
+
+    Parameters
+    ----------
+    fun : method
+        Function that takes in x and returns the residuals (a vector of the same
+        size as x)
+    x0 : array-like
+        The initial guess
+    jac : method
+        Function that takes in x and returns the (dense or sparse) jacobian of `fun`
+    tol : float, optional
+        The tolerance: the iterations stop when the largest absolute residual and
+        the largest absolute entry of the Newton step are below it (default is 1e-6)
+    max_iterations : int, optional
+        The maximum number of iterations (default is 100)
+    min_step : float, optional
+        The smallest fraction of the Newton step tried by the line search, before
+        the iterations stop (default is 1e-4)
+    factorisations : dict, optional
+        Dictionary in which the last factorised jacobian and its factorisation are
+        stored. If `jac` returns the same object again (e.g. a constant jacobian),
+        the factorisation is reused instead of being computed again. It can be
+        shared between calls.
+
+    Returns
+    -------
+    :class:`scipy.optimize.OptimizeResult`
+        The result, in the format of :func:`scipy.optimize.root`, with the solution
+        `x`, the residuals `fun`, `success` and `message`, and the number of
+        iterations (`nit`), of evaluations of the function (`nfev`) and of the
+        jacobian (`njev`), and of factorisations of the jacobian (`nfact`)
+    """
+    timer = pybamm.Timer()
+    x = np.array(x0, dtype=float).flatten()
+    f = fun(x)
+    nfev = 1
+    njev = 0
+    nfact = 0
+    if factorisations is None:
+        factorisations = {}
+    success = False
+    message = "The maximum number of iterations ({}) was reached".format(
+        max_iterations
+    )
+    for nit in range(max_iterations + 1):
+        norm = np.max(np.abs(f), initial=0)
+        pybamm.logger.debug(
+            "Newton iteration {}: largest residual is {}".format(nit, norm)
+        )
+        small_residuals = norm < tol
+        if norm == 0 or nit == max_iterations:
+            success = small_residuals
+            break
+
+        # Newton step, with the jacobian factorised once
+        jac_eval = jac(x)
+        njev += 1
+        if factorisations.get("jacobian") is not jac_eval:
+            try:
+                factorisations["solve"] = _factorise(jac_eval)
+            except (RuntimeError, ValueError, linalg.LinAlgError):
+                factorisations["solve"] = None
+            factorisations["jacobian"] = jac_eval
+            nfact += 1
+        solve = factorisations["solve"]
+        step = None if solve is None else -solve(f)
+        if step is None or not np.all(np.isfinite(step)):
+            # the residuals may already be small enough
+            success = small_residuals
+            message = "The jacobian is singular"
+            break
+        if small_residuals and np.max(np.abs(step)) <= tol:
+            success = True
+            x = x + step
+            f = fun(x)
+            nfev += 1
+            break
+
+        # backtracking line search on half the squared norm of the residuals, whose
+        # directional derivative along the Newton step is -f.f
+        merit = np.dot(f, f) / 2
+        fraction = 1
+        while fraction >= min_step:
+            x_new = x + fraction * step
+            f_new = fun(x_new)
+            nfev += 1
+            merit_new = np.dot(f_new, f_new) / 2
+            if np.isfinite(merit_new) and merit_new <= (1 - 2e-4 * fraction) * merit:
+                break
+            fraction /= 2
+        else:
+            success = small_residuals
+            message = "The line search could not decrease the residuals"
+            break
+        x, f = x_new, f_new
+
+    if success:
+        message = "The residuals and the Newton step are below the tolerance"
+    pybamm.logger.debug(
+        "Newton method: {} iterations, {} function evaluations, {} jacobian "
+        "evaluations in {}".format(nit, nfev, njev, timer.format(timer.time()))
+    )
+    return optimize.OptimizeResult(
+        x=x,
+        fun=f,
+        success=success,
+        message=message,
+        nit=nit,
+        nfev=nfev,
+        njev=njev,
+        nfact=nfact,
+    )
+
+
+def _factorise(matrix):
+    """LU factorisation of a (dense or sparse) matrix, as a function that solves the
+    linear systems with this matrix"""
+    if sparse.issparse(matrix):
+        return sparse_linalg.splu(sparse.csc_matrix(matrix)).solve
+    lu_and_piv = linalg.lu_factor(matrix)
+    return lambda b: linalg.lu_solve(lu_and_piv, b)
@@ -35,15 +35,18 @@ class OdeSolver(pybamm.BaseSolver):
 
         solve_start_time = timer.time()
         pybamm.logger.info("Calling ODE solver")
+        self.reset_callback_counts()
         solution = self.integrate(
             self.dydt,
             self.y0,
             t_eval,
-            events=self.event_funs,
+            events=self.event_values,
             mass_matrix=model.mass_matrix.entries,
             jacobian=self.jacobian,
         )
         solve_time = timer.time() - solve_start_time
+        # statistics reported by the integrator take precedence
+        solution.stats = dict(self.callback_counts, **solution.stats)
 
         # Identify the event that caused termination
         termination = self.get_termination_reason(solution, self.events)
@@ -72,71 +75,94 @@ class OdeSolver(pybamm.BaseSolver):
                 """Cannot use ODE solver to solve model with DAEs"""
             )
 
-        # create simplified rhs and event expressions
-        concatenated_rhs = model.concatenated_rhs
-        events = model.events
-
-        if model.use_simplify:
-            # set up simplification object, for re-use of dict
-            simp = pybamm.Simplification()
-            # create simplified rhs and event expressions
-            pybamm.logger.info("Simplifying RHS")
-            concatenated_rhs = simp.simplify(concatenated_rhs)
-
-            pybamm.logger.info("Simplifying events")
-            events = {name: simp.simplify(event) for name, event in events.items()}
-
         y0 = model.concatenated_initial_conditions[:, 0]
 
-        if model.use_jacobian:
-            # Create Jacobian from concatenated rhs
-            y = pybamm.StateVector(slice(0, np.size(y0)))
-            # set up Jacobian object, for re-use of dict
-            jacobian = pybamm.Jacobian()
-            pybamm.logger.info("Calculating jacobian")
-            jac_rhs = jacobian.jac(concatenated_rhs, y)
-            model.jacobian = jac_rhs
-            model.jacobian_rhs = jac_rhs
+        cache_key, evaluators = self.load_set_up(model, "ode")
+        if evaluators is not None:
+            # the evaluators of the simplified expressions were cached, so only the
+            # names of the events are needed
+            events = model.events
+        else:
+            # create simplified rhs and event expressions
+            concatenated_rhs = model.concatenated_rhs
+            events = model.events
 
             if model.use_simplify:
-                pybamm.logger.info("Simplifying jacobian")
-                jac_rhs = simp.simplify(jac_rhs)
+                # set up simplification object, for re-use of dict
+                simp = pybamm.Simplification()
+                # create simplified rhs and event expressions
+                pybamm.logger.info("Simplifying RHS")
+                concatenated_rhs = simp.simplify(concatenated_rhs)
+
+                pybamm.logger.info("Simplifying events")
+                events = {name: simp.simplify(event) for name, event in events.items()}
+
+            if model.use_jacobian:
+                # Create Jacobian from concatenated rhs
+                y = pybamm.StateVector(slice(0, np.size(y0)))
+                # set up Jacobian object, for re-use of dict
+                jacobian = pybamm.Jacobian()
+                pybamm.logger.info("Calculating jacobian")
+                jac_rhs = jacobian.jac(concatenated_rhs, y)
+                pybamm.logger.debug(
+                    "Jacobian: {} cache hits, {} misses".format(
+                        jacobian.hits, jacobian.misses
+                    )
+                )
+                model.jacobian = jac_rhs
+                model.jacobian_rhs = jac_rhs
+
+                if model.use_simplify:
+                    pybamm.logger.info("Simplifying jacobian")
+                    jac_rhs = simp.simplify(jac_rhs)
+            else:
+                jac_rhs = None
 
             if model.use_to_python:
-                pybamm.logger.info("Converting jacobian to python")
-                jac_rhs = pybamm.EvaluatorPython(jac_rhs)
-        else:
-            jac_rhs = None
+                # All the events use a single evaluator, so that they are evaluated
+                # together (and their shared subexpressions only once)
+                evaluators = self.convert_to_evaluators(
+                    model,
+                    {
+                        "jacobian": jac_rhs,
+                        "rhs": concatenated_rhs,
+                        "events": list(events.values()),
+                    },
+                )
+                evaluators = self.store_set_up(cache_key, evaluators)
 
         if model.use_to_python:
-            pybamm.logger.info("Converting RHS to python")
-            concatenated_rhs = pybamm.EvaluatorPython(concatenated_rhs)
-            pybamm.logger.info("Converting events to python")
-            events = {
-                name: pybamm.EvaluatorPython(event) for name, event in events.items()
-            }
+            concatenated_rhs = evaluators["rhs"]
+            jac_rhs = evaluators.get("jacobian")
+            if events:
+                events_evaluate = evaluators["events"].evaluate
+        else:
+            events_evaluate = self._events_evaluator(events)
 
         # Create function to evaluate rhs
         def dydt(t, y):
             pybamm.logger.debug("Evaluating RHS for {} at t={}".format(model.name, t))
+            self.callback_counts["function evaluations"] += 1
             y = y[:, np.newaxis]
-            dy = concatenated_rhs.evaluate(t, y, known_evals={})[0]
+            dy = concatenated_rhs.evaluate(t, y, self.inputs, known_evals={})[0]
             return dy[:, 0]
 
-        # Create event-dependent function to evaluate events
-        def event_fun(event):
-            def eval_event(t, y):
-                return event.evaluate(t, y)
+        # Create function to evaluate all the events as a vector
+        if events:
 
-            return eval_event
+            def event_values(t, y):
+                self.callback_counts["event evaluations"] += len(events)
+                return self._events_vector(events_evaluate(t, y, self.inputs))
 
-        event_funs = [event_fun(event) for event in events.values()]
+        else:
+            event_values = None
 
         # Create function to evaluate jacobian
         if jac_rhs is not None:
 
             def jacobian(t, y):
-                return jac_rhs.evaluate(t, y, known_evals={})[0]
+                self.callback_counts["jacobian evaluations"] += 1
+                return jac_rhs.evaluate(t, y, self.inputs, known_evals={})[0]
 
         else:
             jacobian = None
@@ -147,7 +173,7 @@ class OdeSolver(pybamm.BaseSolver):
         self.y0 = y0
         self.dydt = dydt
         self.events = events
-        self.event_funs = event_funs
+        self.event_values = event_values
         self.jacobian = jacobian
 
     def integrate(
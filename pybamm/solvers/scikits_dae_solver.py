@@ -27,7 +27,8 @@ class ScikitsDaeSolver(pybamm.DaeSolver):
     atol : float, optional
         The absolute tolerance for the solver (default is 1e-6).
     root_method : str, optional
-        The method to use to find initial conditions (default is "lm")
+        The method to use to find initial conditions (default is "newton", see
+        :class:`pybamm.DaeSolver`)
     root_tol : float, optional
         The tolerance for the initial-condition solver (default is 1e-6).
     max_steps: int, optional
@@ -40,7 +41,7 @@ class ScikitsDaeSolver(pybamm.DaeSolver):
         method="ida",
         rtol=1e-6,
         atol=1e-6,
-        root_method="lm",
+        root_method="newton",
         root_tol=1e-6,
         max_steps=1000,
     ):
@@ -64,9 +65,10 @@ class ScikitsDaeSolver(pybamm.DaeSolver):
             The initial conditions
         t_eval : numeric type
             The times at which to compute the solution
-        events : method, optional
-            A function that takes in t and y and returns conditions for the solver to
-            stop
+        events : method or list of methods, optional
+            A function that takes in t and y and returns the values of the conditions
+            for the solver to stop (as a vector), or a list of functions that each
+            return the value of one condition
         mass_matrix : array_like, optional
             The (sparse) mass matrix for the chosen spatial method.
         jacobian : method, optional
@@ -78,8 +80,12 @@ class ScikitsDaeSolver(pybamm.DaeSolver):
         def eqsres(t, y, ydot, return_residuals):
             return_residuals[:] = residuals(t, y, ydot)
 
+        events_function, number_of_events = self._events_function(
+            events, t_eval[0], y0
+        )
+
         def rootfn(t, y, ydot, return_root):
-            return_root[:] = [event(t, y) for event in events]
+            return_root[:] = events_function(t, y)
 
         extra_options = {
             "old_api": False,
@@ -104,8 +110,8 @@ class ScikitsDaeSolver(pybamm.DaeSolver):
 
             extra_options.update({"jacfn": jacfn})
 
-        if events:
-            extra_options.update({"rootfn": rootfn, "nr_rootfns": len(events)})
+        if number_of_events > 0:
+            extra_options.update({"rootfn": rootfn, "nr_rootfns": number_of_events})
 
         # solver works with ydot0 set to zero
         ydot0 = np.zeros_like(y0)
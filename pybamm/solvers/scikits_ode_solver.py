@@ -55,9 +55,10 @@ class ScikitsOdeSolver(pybamm.OdeSolver):
             The initial conditions
         t_eval : numeric type
             The times at which to compute the solution
-        events : method, optional
-            A function that takes in t and y and returns conditions for the solver to
-            stop
+        events : method or list of methods, optional
+            A function that takes in t and y and returns the values of the conditions
+            for the solver to stop (as a vector), or a list of functions that each
+            return the value of one condition
         mass_matrix : array_like, optional
             The (sparse) mass matrix for the chosen spatial method.
         jacobian : method, optional
@@ -70,8 +71,12 @@ class ScikitsOdeSolver(pybamm.OdeSolver):
         def eqsydot(t, y, return_ydot):
             return_ydot[:] = derivs(t, y)
 
+        events_function, number_of_events = self._events_function(
+            events, t_eval[0], y0
+        )
+
         def rootfn(t, y, return_root):
-            return_root[:] = [event(t, y) for event in events]
+            return_root[:] = events_function(t, y)
 
         if jacobian:
             jac_y0_t0 = jacobian(t_eval[0], y0)
@@ -116,8 +121,8 @@ class ScikitsOdeSolver(pybamm.OdeSolver):
                     }
                 )
 
-        if events:
-            extra_options.update({"rootfn": rootfn, "nr_rootfns": len(events)})
+        if number_of_events > 0:
+            extra_options.update({"rootfn": rootfn, "nr_rootfns": number_of_events})
 
         ode_solver = scikits_odes.ode(self.method, eqsydot, **extra_options)
         sol = ode_solver.solve(t_eval, y0)
@@ -130,12 +135,21 @@ class ScikitsOdeSolver(pybamm.OdeSolver):
             # 2 = found root(s)
             elif sol.flag == 2:
                 termination = "event"
-            return pybamm.Solution(
+            solution = pybamm.Solution(
                 sol.values.t,
                 np.transpose(sol.values.y),
                 sol.roots.t,
                 np.transpose(sol.roots.y),
                 termination,
             )
+            info = ode_solver.get_info()
+            for key, name in [
+                ("steps", "NumSteps"),
+                ("linear solver setups", "NumLinSolvSetups"),
+                ("error test failures", "NumErrTestFails"),
+            ]:
+                if name in info:
+                    solution.stats[key] = info[name]
+            return solution
         else:
             raise pybamm.SolverError(sol.message)
@@ -38,9 +38,10 @@ class ScipySolver(pybamm.OdeSolver):
             The initial conditions
         t_eval : :class:`numpy.array`, size (k,)
             The times at which to compute the solution
-        events : method, optional
-            A function that takes in t and y and returns conditions for the solver to
-            stop
+        events : method or list of methods, optional
+            A function that takes in t and y and returns the values of the conditions
+            for the solver to stop (as a vector), or a list of functions that each
+            return the value of one condition
         mass_matrix : array_like, optional
             The (sparse) mass matrix for the chosen spatial method.
         jacobian : method, optional
@@ -61,6 +62,9 @@ class ScipySolver(pybamm.OdeSolver):
             if jacobian:
                 extra_options.update({"jac": jacobian})
 
+        if callable(events):
+            events = self._split_events(events, t_eval[0], y0)
+
         # make events terminal so that the solver stops when they are reached
         if events:
             for event in events:
@@ -81,16 +85,50 @@ class ScipySolver(pybamm.OdeSolver):
             # Set the reason for termination
             if sol.message == "A termination event occurred.":
                 termination = "event"
-                t_event = []
-                for time in sol.t_events:
-                    if time:
-                        t_event = np.append(t_event, np.max(time))
-                t_event = np.array([np.max(t_event)])
+                # the event that stopped the integration is the one found last
+                last_times = [
+                    np.max(time) if len(time) > 0 else -np.inf
+                    for time in sol.t_events
+                ]
+                event_index = int(np.argmax(last_times))
+                t_event = np.array([last_times[event_index]])
                 y_event = sol.sol(t_event)
             elif sol.message.startswith("The solver successfully reached the end"):
                 termination = "final time"
+                event_index = None
                 t_event = None
                 y_event = np.array(None)
-            return pybamm.Solution(sol.t, sol.y, t_event, y_event, termination)
+            solution = pybamm.Solution(sol.t, sol.y, t_event, y_event, termination)
+            solution.event_index = event_index
+            # the dense output has one segment per step
+            solution.stats = {
+                "steps": len(sol.sol.ts) - 1,
+                "function evaluations": sol.nfev,
+                "jacobian evaluations": sol.njev,
+                "linear solver setups": sol.nlu,
+            }
+            return solution
         else:
             raise pybamm.SolverError(sol.message)
+
+    def _split_events(self, events, t0, y0):
+        """
+        Split a function that evaluates all the events as a vector into a function
+        for each event, as required by solve_ivp. solve_ivp evaluates the events one
+        after the other at the same time and state, so the vector of events is only
+        evaluated once for each time and state.
+        """
+        last = {"t": None, "y": None, "values": None}
+
+        def event_values(t, y):
+            if t != last["t"] or not np.array_equal(y, last["y"]):
+                last["t"], last["y"], last["values"] = t, np.copy(y), events(t, y)
+            return last["values"]
+
+        def event_fun(i):
+            def eval_event(t, y):
+                return event_values(t, y)[i]
+
+            return eval_event
+
+        return [event_fun(i) for i in range(len(event_values(t0, y0)))]
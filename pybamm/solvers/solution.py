@@ -32,6 +32,14 @@ class Solution(object):
         self.t_event = t_event
         self.y_event = y_event
         self.termination = termination
+        # Values of the input parameters used to calculate the solution
+        self.inputs = {}
+        # Statistics of the integration (e.g. "steps", "function evaluations",
+        # "jacobian evaluations"), as far as the solver reports them
+        self.stats = {}
+        # Index of the event (in the model's events) that caused termination, if the
+        # solver reports it
+        self.event_index = None
 
     @property
     def t(self):
@@ -93,3 +101,5 @@ class Solution(object):
         """
         self.t = np.concatenate((self.t, solution.t[1:]))
         self.y = np.concatenate((self.y, solution.y[:, 1:]), axis=1)
+        for key, value in solution.stats.items():
+            self.stats[key] = self.stats.get(key, 0) + value
@@ -2,6 +2,7 @@
 # Finite Volume discretisation class
 #
 import pybamm
+import copy
 
 from scipy.sparse import (
     diags,
@@ -416,9 +417,10 @@ class FiniteVolume(pybamm.SpatialMethod):
         right_sub_matrix[0][0] = 1
         right_matrix = pybamm.Matrix(csr_matrix(kron(eye(sec_pts), right_sub_matrix)))
 
-        # Remove domains to avoid clash
-        left_domain = left_symbol_disc.domain
-        right_domain = right_symbol_disc.domain
+        # Remove domains to avoid clash (from copies, as the discretised symbols may
+        # be shared with other trees)
+        left_symbol_disc = copy.copy(left_symbol_disc)
+        right_symbol_disc = copy.copy(right_symbol_disc)
         left_symbol_disc.domain = []
         right_symbol_disc.domain = []
 
@@ -426,10 +428,6 @@ class FiniteVolume(pybamm.SpatialMethod):
         dy = right_matrix @ right_symbol_disc - left_matrix @ left_symbol_disc
         dx = right_mesh[0].nodes[0] - left_mesh[0].nodes[-1]
 
-        # Change domains back
-        left_symbol_disc.domain = left_domain
-        right_symbol_disc.domain = right_domain
-
         return dy / dx
 
     def indefinite_integral_matrix_nodes(self, domain):
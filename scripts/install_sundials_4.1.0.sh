@@ -23,7 +23,7 @@ cmake -DBLAS_ENABLE=ON\
       -DLAPACK_ENABLE=ON\
       -DSUNDIALS_INDEX_SIZE=32\
       -DBUILD_ARKODE=OFF\
-      -DBUILD_CVODE=OFF\
+      -DBUILD_CVODE=ON\
       -DBUILD_CVODES=OFF\
       -DBUILD_IDAS=OFF\
       -DBUILD_KINSOL=OFF\
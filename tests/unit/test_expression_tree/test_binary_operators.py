@@ -45,6 +45,12 @@ class TestBinaryOperators(unittest.TestCase):
         self.assertEqual(sum.children[0].name, a.name)
         self.assertEqual(sum.children[1].name, b.name)
 
+        # scalars can be added to sparse matrices when finding the shape
+        c = pybamm.Matrix(coo_matrix(np.ones((3, 2))))
+        d = 2 * pybamm.Parameter("d")
+        self.assertEqual((d + c).shape, (3, 2))
+        self.assertEqual((c - d).shape, (3, 2))
+
     def test_power(self):
         a = pybamm.Symbol("a")
         b = pybamm.Symbol("b")
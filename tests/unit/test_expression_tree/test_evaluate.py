@@ -5,8 +5,10 @@ import pybamm
 
 from tests import get_discretisation_for_testing, get_1p1d_discretisation_for_testing
 import unittest
+import autograd.numpy as auto_np
 import numpy as np
 import scipy.sparse
+import tempfile
 from collections import OrderedDict
 
 
@@ -286,13 +288,129 @@ class TestEvaluate(unittest.TestCase):
         expr = a + b
         constant_str, variable_str = pybamm.to_python(expr)
         expected_str = (
-            "self\.var_[0-9m]+ = y\[:1\]\[\[True\]\].*\\n"
-            "self\.var_[0-9m]+ = y\[:2\]\[\[False, True\]\].*\\n"
-            "self\.var_[0-9m]+ = self\.var_[0-9m]+ \+ self\.var_[0-9m]+"
+            "var_[0-9m]+ = y\[0:1\].*\\n"
+            "var_[0-9m]+ = y\[1:2\].*\\n"
+            "var_[0-9m]+ = var_[0-9m]+ \+ var_[0-9m]+"
         )
 
         self.assertRegex(variable_str, expected_str)
 
+    def test_eliminate_common_subexpressions(self):
+        a = pybamm.StateVector(slice(0, 1))
+        b = pybamm.StateVector(slice(1, 2))
+        y_tests = [np.array([[2], [3]]), np.array([[1], [3]])]
+
+        # identical subtrees with different domains (and hence ids)
+        a_neg = pybamm.StateVector(slice(0, 1), domain="negative electrode")
+        a_pos = pybamm.StateVector(slice(0, 1), domain="positive electrode")
+        self.assertNotEqual(a_neg.id, a_pos.id)
+        exprs = [pybamm.exp(a_neg), pybamm.exp(a_pos)]
+        report = {}
+        constants, variable_str = pybamm.to_python(exprs, report=report)
+        self.assertEqual(report["lines"], 4)
+        # the second exponential is assigned the value of the first one
+        self.assertEqual(report["lines after elimination"], 3)
+        self.assertEqual(report["constants"], 2)
+        self.assertEqual(report["constants after elimination"], 1)
+        self.assertEqual(report["flops saved"], 2)
+        self.assertEqual(variable_str.count(" = y[0:1]"), 1)
+        evaluator = pybamm.EvaluatorPython(exprs)
+        for y in y_tests:
+            self.assertEqual(evaluator.evaluate(y=y), (np.exp(y[0]), np.exp(y[0])))
+
+        # commutative operators, and equal matrices created separately
+        A = pybamm.Matrix(np.array([[1, 2], [3, 4]]))
+        B = pybamm.Matrix(np.array([[1, 2], [3, 4]]), name="B")
+        c = pybamm.StateVector(slice(0, 2))
+        expr = a * b - b * a + A @ c + B @ c
+        report = {}
+        constants, variable_str = pybamm.to_python(expr, report=report)
+        self.assertEqual(len(constants), 1)
+        self.assertEqual(report["lines"] - report["lines after elimination"], 2)
+        self.assertEqual(variable_str.count("@"), 1)
+
+        evaluator = pybamm.EvaluatorPython(expr)
+        for y in y_tests:
+            np.testing.assert_allclose(evaluator.evaluate(y=y), expr.evaluate(y=y))
+
+        # state vectors that select the same entries, with contiguous entries
+        # selected by a slice
+        b_long = pybamm.StateVector(
+            slice(1, 2), evaluation_array=[False, True, False, False]
+        )
+        expr = 2 * b + 3 * b_long
+        constants, variable_str = pybamm.to_python(expr)
+        self.assertEqual(variable_str.count(" = y[1:2]"), 1)
+        evaluator = pybamm.EvaluatorPython(expr)
+        for y in y_tests:
+            np.testing.assert_allclose(evaluator.evaluate(y=y), [5 * y[1]])
+
+        # an output whose own line is eliminated
+        evaluator = pybamm.EvaluatorPython([a + b, b + a, pybamm.Scalar(2)])
+        self.assertEqual(evaluator.evaluate(y=y_tests[0]), (5, 5, 2))
+
+        # equal constants that are outputs are not merged
+        evaluator = pybamm.EvaluatorPython(
+            [pybamm.Vector(np.ones((2, 1)), name="c"), pybamm.Vector(np.ones((2, 1)))]
+        )
+        for result in evaluator.evaluate(y=y_tests[0]):
+            np.testing.assert_array_equal(result, np.ones((2, 1)))
+        evaluator = pybamm.EvaluatorPython([2 * a, pybamm.Scalar(2, name="two")])
+        self.assertEqual(evaluator.evaluate(y=y_tests[0]), (4, 2))
+
+        # lines only needed by other symbols are removed
+        constants = OrderedDict()
+        variable_symbols = OrderedDict()
+        pybamm.find_symbols(a * b, constants, variable_symbols)
+        pybamm.find_symbols(2 * a, constants, variable_symbols)
+        constants, lines = pybamm.eliminate_common_subexpressions(
+            [a * b], constants, variable_symbols
+        )
+        self.assertEqual(len(constants), 0)
+        self.assertEqual(list(lines.keys()), [a.id, b.id, (a * b).id])
+
+    def test_type_specialised_code(self):
+        a = pybamm.StateVector(slice(0, 2))
+        b = pybamm.StateVector(slice(2, 4))
+        y_tests = [np.array([[2], [3], [4], [5]]), np.array([[1], [3], [-1], [2]])]
+        A = pybamm.Matrix(scipy.sparse.csr_matrix(np.array([[1, 0], [0, 4]])))
+        jac = a.jac(a)
+
+        # the types of the children are found by a dummy evaluation
+        known_evals = pybamm.dummy_evaluate([A * a])
+        self.assertTrue(scipy.sparse.issparse(known_evals[A.id]))
+        self.assertFalse(scipy.sparse.issparse(known_evals[a.id]))
+        self.assertIsNone(pybamm.dummy_evaluate([pybamm.Variable("c")]))
+
+        for expr in [
+            A * a,
+            a * A,
+            a * b,
+            A / b,
+            a / b,
+            jac * b + pybamm.Inner(A, a) + pybamm.Inner(a, jac) + pybamm.Inner(a, b),
+        ]:
+            # the generated code does not check the types
+            constants, variable_str = pybamm.to_python(expr)
+            self.assertNotIn("issparse", variable_str)
+            evaluator = pybamm.EvaluatorPython(expr)
+            for y in y_tests:
+                result = evaluator.evaluate(y=y)
+                expected = expr.evaluate(y=y)
+                self.assertEqual(
+                    scipy.sparse.issparse(result), scipy.sparse.issparse(expected)
+                )
+                if scipy.sparse.issparse(expected):
+                    result = result.toarray()
+                    expected = expected.toarray()
+                np.testing.assert_allclose(result, expected)
+
+        # without the types, the generated code checks them
+        constant_symbols = OrderedDict()
+        variable_symbols = OrderedDict()
+        pybamm.find_symbols(A * a, constant_symbols, variable_symbols)
+        self.assertIn("issparse", list(variable_symbols.values())[-1])
+
     def test_evaluator_python(self):
         a = pybamm.StateVector(slice(0, 1))
         b = pybamm.StateVector(slice(1, 2))
@@ -393,6 +511,153 @@ class TestEvaluate(unittest.TestCase):
         result = evaluator.evaluate()
         np.testing.assert_allclose(result, expr.evaluate())
 
+        # test input parameter
+        a = pybamm.StateVector(slice(0, 1))
+        p = pybamm.InputParameter("p")
+        expr = p * a + pybamm.Scalar(2)
+        evaluator = pybamm.EvaluatorPython(expr)
+        for t, y in zip(t_tests, y_tests):
+            for u in [{"p": 1}, {"p": -3}]:
+                result = evaluator.evaluate(t=t, y=y, u=u)
+                self.assertEqual(result, expr.evaluate(t=t, y=y, u=u))
+
+    def test_evaluator_python_multiple_symbols(self):
+        a = pybamm.StateVector(slice(0, 1))
+        b = pybamm.StateVector(slice(1, 2))
+        shared = pybamm.Function(test_function, a * b)
+        expr1 = shared + a
+        expr2 = shared * b
+        expr3 = pybamm.Scalar(2)
+
+        # the shared subexpression is only evaluated once
+        constant_str, variable_str = pybamm.to_python([expr1, expr2, expr3])
+        shared_var = pybamm.id_to_python_variable(shared.id)
+        self.assertEqual(variable_str.count(shared_var + " = "), 1)
+
+        evaluator = pybamm.EvaluatorPython([expr1, expr2, expr3])
+        for y in [np.array([[2], [3]]), np.array([[1], [3]])]:
+            result = evaluator.evaluate(t=None, y=y)
+            self.assertIsInstance(result, tuple)
+            self.assertEqual(len(result), 3)
+            for value, expr in zip(result, [expr1, expr2, expr3]):
+                self.assertEqual(value, expr.evaluate(t=None, y=y))
+
+        # single symbol in a list
+        evaluator = pybamm.EvaluatorPython([expr1])
+        self.assertEqual(evaluator.evaluate(y=np.array([[2], [3]])), (14,))
+
+    def test_evaluator_python_save_load(self):
+        y = pybamm.StateVector(slice(0, 3))
+        csr = pybamm.Matrix(scipy.sparse.csr_matrix(np.array([[1, 0, 2], [0, 3, 0]])))
+        csc = pybamm.Matrix(scipy.sparse.csc_matrix(np.array([[0, 1, 0], [4, 0, 0]])))
+        exprs = [
+            csr @ y,
+            csc @ pybamm.exp(y),
+            pybamm.Vector(np.array([1, 2, 3])) * y,
+            pybamm.Function(test_function, y).diff(y),
+            pybamm.Function(auto_np.arcsinh, y),
+            y.jac(y),
+        ]
+        evaluator = pybamm.EvaluatorPython(exprs)
+        with tempfile.TemporaryDirectory() as directory:
+            evaluator.save(directory, "exprs")
+            loaded = pybamm.EvaluatorPython.load(directory, "exprs")
+        self.assertEqual(loaded.source, evaluator.source)
+        y_test = np.array([[1], [2], [0.5]])
+        for value, expected in zip(loaded.evaluate(y=y_test), exprs):
+            expected = expected.evaluate(y=y_test)
+            self.assertEqual(type(value), type(expected))
+            if scipy.sparse.issparse(expected):
+                value, expected = value.toarray(), expected.toarray()
+            np.testing.assert_allclose(value, expected)
+
+        # functions that cannot be pickled
+        evaluator = pybamm.EvaluatorPython(pybamm.Function(lambda x: 2 * x, y))
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(Exception):
+                evaluator.save(directory, "lambda")
+
+    @unittest.skipUnless(pybamm.have_numba(), "numba is not installed")
+    def test_evaluator_numba(self):
+        y = pybamm.StateVector(slice(0, 3))
+        z = pybamm.StateVector(slice(3, 4))
+        a = pybamm.InputParameter("a")
+        y_tests = [np.array([1, 2, 3, 4]), np.array([[0.1], [0.5], [4], [2]])]
+        matrix = pybamm.Matrix(
+            scipy.sparse.csr_matrix(np.array([[1, 0, 0], [0, 0, 2], [0, 3, 0]]))
+        )
+        x = np.linspace(0, 1, 10)[:, np.newaxis]
+        interp = pybamm.Interpolant(np.hstack([x, np.sin(x)]), y)
+        symbols = [
+            y + z,
+            -y * pybamm.Vector(np.array([0, 1, 2])),
+            abs(y) ** z / (z + 1),
+            a * y + pybamm.t,
+            y[1:3],
+            matrix @ y,
+            matrix * z + matrix,
+            y.jac(y) * z,
+            pybamm.SparseStack(matrix * z, matrix),
+            pybamm.NumpyConcatenation(y, z, pybamm.t),
+            pybamm.Kron(pybamm.Matrix(scipy.sparse.eye(2)), y.jac(y)),
+            pybamm.exp(y) + pybamm.sinh(z),
+            pybamm.min(y),
+            pybamm.max(y * z),
+            interp,
+            pybamm.Scalar(3),
+        ]
+        evaluator = pybamm.EvaluatorNumba(symbols)
+        for t, y_test in zip([1, 2], y_tests):
+            results = evaluator.evaluate(t, y_test, {"a": 3})
+            self.assertIsInstance(results, tuple)
+            for symbol, result in zip(symbols, results):
+                expected = symbol.evaluate(t, np.reshape(y_test, (-1, 1)), {"a": 3})
+                if scipy.sparse.issparse(expected):
+                    self.assertTrue(scipy.sparse.issparse(result))
+                    expected = expected.toarray()
+                    result = result.toarray()
+                np.testing.assert_allclose(result, expected)
+
+        # single symbol, and known_evals
+        expr = pybamm.exp(2 * y) + 1
+        evaluator = pybamm.EvaluatorNumba(expr)
+        result, known_evals = evaluator.evaluate(y=y_tests[0], known_evals={})
+        np.testing.assert_allclose(result, expr.evaluate(y=y_tests[0]))
+        self.assertEqual(known_evals, {})
+        # the elementwise operations are fused into one loop
+        self.assertEqual(evaluator.source.count("for k in range"), 1)
+
+        # save and load
+        a = pybamm.InputParameter("a")
+        exprs = [interp * a, y.jac(y) * z, pybamm.min(y)]
+        evaluator = pybamm.EvaluatorNumba(exprs)
+        with tempfile.TemporaryDirectory() as directory:
+            evaluator.save(directory, "exprs")
+            loaded = pybamm.EvaluatorNumba.load(directory, "exprs")
+            values = loaded.evaluate(1, y_tests[1], {"a": 2})
+        for value, expected in zip(values, evaluator.evaluate(1, y_tests[1], {"a": 2})):
+            self.assertEqual(type(value), type(expected))
+            if scipy.sparse.issparse(expected):
+                value, expected = value.toarray(), expected.toarray()
+            np.testing.assert_array_equal(value, expected)
+
+        # domain concatenation
+        disc = get_discretisation_for_testing()
+        mesh = disc.mesh
+        a_pts = mesh["separator"][0].npts
+        b_pts = mesh["negative electrode"][0].npts + mesh["positive electrode"][0].npts
+        c = pybamm.StateVector(slice(0, a_pts), domain=["separator"])
+        d = pybamm.StateVector(
+            slice(a_pts, a_pts + b_pts),
+            domain=["negative electrode", "positive electrode"],
+        )
+        expr = pybamm.DomainConcatenation([c, 2 * d], mesh)
+        evaluator = pybamm.EvaluatorNumba(expr)
+        y_test = np.arange(a_pts + b_pts, dtype=float)
+        np.testing.assert_allclose(
+            evaluator.evaluate(y=y_test), expr.evaluate(y=y_test[:, np.newaxis])
+        )
+
 
 if __name__ == "__main__":
     print("Add -v for more debug output")
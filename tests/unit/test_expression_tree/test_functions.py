@@ -6,6 +6,7 @@ import pybamm
 import unittest
 import numpy as np
 import autograd.numpy as auto_np
+import pickle
 from scipy.interpolate import interp1d
 
 
@@ -69,6 +70,65 @@ class TestFunction(unittest.TestCase):
         func = pybamm.Function(test_multi_var_function, 4 * a, 3 * a)
         self.assertEqual(func.diff(a).evaluate(y=y), 7)
 
+        # the derivatives can be pickled
+        func = pybamm.Function(test_function, a).diff(a)
+        func = next(node for node in func.pre_order() if node.name.startswith("func"))
+        self.assertEqual(
+            func.name, "function (elementwise_grad_of_test_function_wrt_argnum_0)"
+        )
+        derivative = pickle.loads(pickle.dumps(func.function))
+        self.assertEqual(derivative(np.array([5.0])), 2)
+        self.assertEqual(pybamm.Function(derivative, a).diff(a).evaluate(y=y), 0)
+
+    def test_registered_derivatives(self):
+        a = pybamm.StateVector(slice(0, 1))
+        y = np.array([[0.5]])
+
+        # closed-form derivatives of numpy functions are symbolic expressions
+        for function, derivative in [
+            (auto_np.exp, np.exp),
+            (np.log, lambda x: 1 / x),
+            (auto_np.sinh, np.cosh),
+            (np.tanh, lambda x: 1 - np.tanh(x) ** 2),
+            (auto_np.sqrt, lambda x: 1 / (2 * np.sqrt(x))),
+            (np.arctan, lambda x: 1 / (1 + x ** 2)),
+        ]:
+            diff = pybamm.Function(function, a).diff(a)
+            self.assertFalse(
+                any("elementwise_grad" in node.name for node in diff.pre_order())
+            )
+            np.testing.assert_array_almost_equal(diff.evaluate(y=y), derivative(y))
+
+        # declared derivatives
+        def cube(x):
+            return x ** 3
+
+        def cube_derivative(x):
+            return 3 * x ** 2
+
+        pybamm.register_derivative(cube, cube_derivative)
+        diff = pybamm.Function(cube, 2 * a).diff(a)
+        self.assertIn("function (cube_derivative)", [n.name for n in diff.pre_order()])
+        self.assertEqual(diff.evaluate(y=y), 6)
+        jac = pybamm.Function(cube, 2 * a).jac(a)
+        self.assertEqual(jac.evaluate(y=y), 6)
+
+        # derivatives that are not declared fall back to autograd
+        b = pybamm.StateVector(slice(1, 2))
+        y = np.array([2.0, 3.0])
+
+        def product(x, z):
+            return x * z ** 2
+
+        pybamm.register_derivative(product, lambda x, z: z ** 2)
+        func = pybamm.Function(product, a, b)
+        self.assertEqual(func.diff(a).evaluate(y=y), 9)
+        self.assertEqual(func.diff(b).evaluate(y=y), 12)
+        np.testing.assert_array_equal(
+            func.jac(pybamm.StateVector(slice(0, 2))).evaluate(y=y).toarray(),
+            [[9, 12]],
+        )
+
     def test_function_of_multiple_variables(self):
         a = pybamm.Variable("a")
         b = pybamm.Parameter("b")
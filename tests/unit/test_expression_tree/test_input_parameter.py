@@ -0,0 +1,71 @@
+#
+# Tests for the InputParameter class
+#
+import numbers
+import numpy as np
+import pybamm
+import unittest
+
+
+class TestInputParameter(unittest.TestCase):
+    def test_input_parameter_init(self):
+        a = pybamm.InputParameter("a")
+        self.assertEqual(a.name, "a")
+        self.assertEqual(a.domain, [])
+        self.assertEqual(a.evaluate(u={"a": 1}), 1)
+        self.assertEqual(a.evaluate(u={"a": 5}), 5)
+        self.assertEqual(a.new_copy().id, a.id)
+
+    def test_evaluate_for_shape(self):
+        a = pybamm.InputParameter("a")
+        self.assertIsInstance(a.evaluate_for_shape(), numbers.Number)
+        self.assertEqual(a.shape, ())
+
+    def test_errors(self):
+        a = pybamm.InputParameter("a")
+        with self.assertRaises(TypeError):
+            a.evaluate(u="not a dictionary")
+        with self.assertRaisesRegex(KeyError, "Input parameter 'a' not found"):
+            a.evaluate(u={"b": 1})
+        with self.assertRaisesRegex(KeyError, "Input parameter 'a' not found"):
+            a.evaluate()
+
+    def test_expression(self):
+        a = pybamm.InputParameter("a")
+        y = pybamm.StateVector(slice(0, 2))
+        expr = a * y + pybamm.Scalar(2)
+        self.assertFalse(a.is_constant())
+        self.assertFalse(expr.is_constant())
+        self.assertTrue(a.evaluates_to_number())
+        y_eval = np.array([1, 2])
+        np.testing.assert_array_equal(
+            expr.evaluate(y=y_eval, u={"a": 3}), np.array([[5], [8]])
+        )
+        # known evals
+        value, known_evals = expr.evaluate(y=y_eval, u={"a": 3}, known_evals={})
+        np.testing.assert_array_equal(value, np.array([[5], [8]]))
+        self.assertEqual(known_evals[a.id], 3)
+
+        # simplification keeps the input parameter
+        expr_simp = expr.simplify()
+        self.assertIn(a.id, [node.id for node in expr_simp.pre_order()])
+        np.testing.assert_array_equal(
+            expr_simp.evaluate(y=y_eval, u={"a": 3}), np.array([[5], [8]])
+        )
+
+        # jacobian
+        self.assertEqual(a.jac(y).evaluate(), 0)
+        jac = expr.jac(y)
+        np.testing.assert_array_equal(
+            jac.evaluate(y=y_eval, u={"a": 3}).toarray(), 3 * np.eye(2)
+        )
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    pybamm.settings.debug_mode = True
+    unittest.main()
@@ -0,0 +1,109 @@
+#
+# Tests for the InternTable class
+#
+import pybamm
+import gc
+import numpy as np
+import unittest
+
+
+class TestInternTable(unittest.TestCase):
+    def tearDown(self):
+        pybamm.settings.intern_table = None
+
+    def test_intern(self):
+        table = pybamm.InternTable()
+        a = pybamm.Parameter("a")
+        self.assertIs(table.intern(a), a)
+        self.assertIs(table.intern(a), a)
+        self.assertIs(table.intern(pybamm.Parameter("a")), a)
+        b = pybamm.Parameter("b")
+        self.assertIs(table.intern(b), b)
+        self.assertEqual(len(table), 2)
+        self.assertEqual((table.hits, table.misses), (1, 2))
+
+        # nodes with different domains are not shared
+        c = pybamm.Variable("c", domain="negative electrode")
+        d = pybamm.Variable("c", domain="separator")
+        self.assertIs(table.intern(d), d)
+        self.assertIsNot(table.intern(c), d)
+
+        table.clear()
+        self.assertEqual(len(table), 0)
+        self.assertEqual((table.hits, table.misses), (0, 0))
+
+    def test_weak_references(self):
+        table = pybamm.InternTable()
+        table.intern(pybamm.Parameter("a"))
+        gc.collect()
+        self.assertEqual(len(table), 0)
+
+    def test_shared_children(self):
+        # without a table, identical children are distinct objects
+        expr = (pybamm.Parameter("a") + 1) * (pybamm.Parameter("a") + 1)
+        self.assertIsNot(expr.children[0], expr.children[1])
+
+        table = pybamm.InternTable()
+        pybamm.settings.intern_table = table
+        expr = (pybamm.Parameter("a") + 1) * (pybamm.Parameter("a") + 1)
+        self.assertIs(expr.children[0], expr.children[1])
+        self.assertGreater(table.hits, 0)
+
+        with self.assertRaises(AssertionError):
+            pybamm.settings.intern_table = {}
+
+    def test_functions(self):
+        # nodes of different functions with the same name are not shared
+        pybamm.settings.intern_table = pybamm.InternTable()
+        y = pybamm.StateVector(slice(0, 1))
+        expr = pybamm.Function(lambda v: 2 * v, y) + pybamm.Function(
+            lambda v: 3 * v, y
+        )
+        self.assertIsNot(expr.children[0], expr.children[1])
+        self.assertEqual(expr.evaluate(y=np.array([1])), 5)
+
+        # nor are interpolants of different data with the same name
+        x = np.linspace(0, 1, 10)
+        expr = pybamm.Interpolant(np.column_stack([x, x]), y, "f") + pybamm.Interpolant(
+            np.column_stack([x, 3 * x]), y, "f"
+        )
+        self.assertIsNot(expr.children[0], expr.children[1])
+        self.assertAlmostEqual(expr.evaluate(y=np.array([0.5]))[0, 0], 2)
+
+        # but nodes of the same function are
+        expr = pybamm.exp(y) + pybamm.exp(y)
+        self.assertIs(expr.children[0], expr.children[1])
+
+    def test_model(self):
+        # interning does not change the discretised model
+        def discretised_rhs():
+            model = pybamm.lithium_ion.SPM()
+            geometry = model.default_geometry
+            param = model.default_parameter_values
+            param.process_model(model)
+            param.process_geometry(geometry)
+            mesh = pybamm.Mesh(
+                geometry, model.default_submesh_types, model.default_var_pts
+            )
+            disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+            disc.process_model(model)
+            return model.concatenated_rhs
+
+        rhs = discretised_rhs()
+        pybamm.settings.intern_table = pybamm.InternTable()
+        interned_rhs = discretised_rhs()
+        self.assertEqual(rhs.id, interned_rhs.id)
+        self.assertLess(
+            len({id(node) for node in interned_rhs.pre_order()}),
+            len({id(node) for node in rhs.pre_order()}),
+        )
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    pybamm.settings.debug_mode = True
+    unittest.main()
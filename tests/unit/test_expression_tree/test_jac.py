@@ -316,6 +316,34 @@ class TestJacobian(unittest.TestCase):
         ):
             conc.jac(y)
 
+    def test_known_jacs(self):
+        y = pybamm.StateVector(slice(0, 4))
+        u = pybamm.StateVector(slice(0, 2))
+        v = pybamm.StateVector(slice(2, 4))
+        shared = pybamm.exp(u) * u
+        conc = pybamm.NumpyConcatenation(shared, shared + v)
+
+        # shared subtrees, including those under concatenations, are only
+        # differentiated once
+        jacobian = pybamm.Jacobian()
+        jac = jacobian.jac(conc, y)
+        self.assertEqual((jacobian.hits, jacobian.misses), (2, 6))
+        jacobian.jac(shared, y)
+        self.assertEqual((jacobian.hits, jacobian.misses), (3, 6))
+
+        y0 = np.array([1, 2, 3, 4])
+        du_dy = np.hstack([np.eye(2), np.zeros((2, 2))])
+        dv_dy = np.hstack([np.zeros((2, 2)), np.eye(2)])
+        dshared_dy = np.diag(np.exp(y0[:2]) * (y0[:2] + 1)) @ du_dy
+        np.testing.assert_array_almost_equal(
+            jac.evaluate(y=y0).toarray(), np.vstack([dshared_dy, dshared_dy + dv_dy])
+        )
+
+        # the known Jacobians are stored in the given dictionary
+        known_jacs = {}
+        conc.jac(y, known_jacs)
+        self.assertIn(shared.id, known_jacs)
+
 
 if __name__ == "__main__":
     print("Add -v for more debug output")
@@ -3,6 +3,7 @@
 #
 import pybamm
 import numpy as np
+import scipy.sparse
 
 import unittest
 
@@ -42,6 +43,27 @@ class TestArray(unittest.TestCase):
         arr = pybamm.Array(np.array([1, 2, 3]))
         self.assertEqual(arr.name, "Array of shape (3, 1)")
 
+    def test_id(self):
+        # large matrices that only differ in the middle have different ids
+        entries = np.arange(10000.0)
+        other = entries.copy()
+        other[5000] = -1
+        for convert in [np.diag, scipy.sparse.diags]:
+            self.assertNotEqual(
+                pybamm.Matrix(convert(entries)).id, pybamm.Matrix(convert(other)).id
+            )
+            self.assertEqual(
+                pybamm.Matrix(convert(entries)).id, pybamm.Matrix(convert(entries)).id
+            )
+        # the shape and the format of the entries are also part of the id
+        self.assertNotEqual(
+            pybamm.Array(np.ones((2, 3))).id, pybamm.Array(np.ones((3, 2))).id
+        )
+        matrix = scipy.sparse.eye(3)
+        self.assertNotEqual(
+            pybamm.Matrix(matrix.tocsr()).id, pybamm.Matrix(matrix.tocsc()).id
+        )
+
 
 if __name__ == "__main__":
     print("Add -v for more debug output")
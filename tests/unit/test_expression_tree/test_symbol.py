@@ -6,6 +6,9 @@ import pybamm
 import unittest
 import numpy as np
 import os
+import subprocess
+import sys
+from scipy.sparse import issparse
 
 
 class TestSymbol(unittest.TestCase):
@@ -14,27 +17,28 @@ class TestSymbol(unittest.TestCase):
         self.assertEqual(sym.name, "a symbol")
         self.assertEqual(str(sym), "a symbol")
 
-    def test_cached_children(self):
+    def test_children(self):
         symc1 = pybamm.Symbol("child1")
         symc2 = pybamm.Symbol("child2")
-        symc3 = pybamm.Symbol("child3")
         symp = pybamm.Symbol("parent", children=[symc1, symc2])
 
-        # test tuples of children for equality based on their name
-        def check_are_equal(children1, children2):
-            self.assertEqual(len(children1), len(children2))
-            for i in range(len(children1)):
-                self.assertEqual(children1[i].name, children2[i].name)
+        # children are stored as a tuple, without copying them
+        self.assertIsInstance(symp.children, tuple)
+        self.assertIs(symp.children[0], symc1)
+        self.assertIs(symp.children[1], symc2)
 
-        check_are_equal(symp.children, super(pybamm.Symbol, symp).children)
-        check_are_equal(symp.children, (symc1, symc2))
-
-        # update children, since we cache the children they will be unchanged
-        symc3.parent = symp
-        check_are_equal(symp.children, (symc1, symc2))
+        # children can be shared by several nodes
+        symp2 = pybamm.Symbol("parent2", children=[symc1, symc1])
+        self.assertIs(symp2.children[0], symp2.children[1])
+        self.assertEqual(
+            [node.name for node in pybamm.Symbol("root", [symp, symp2]).pre_order()],
+            ["root", "parent", "child1", "child2", "parent2", "child1", "child1"],
+        )
 
-        # check that the *actual* children are updated
-        check_are_equal(super(pybamm.Symbol, symp).children, (symc1, symc2, symc3))
+        # nodes only store their slots and subclass attributes
+        self.assertEqual(vars(symp), {})
+        with self.assertRaises(AttributeError):
+            symp.children = (symc1,)
 
     def test_symbol_domains(self):
         a = pybamm.Symbol("a", domain="test")
@@ -59,6 +63,16 @@ class TestSymbol(unittest.TestCase):
         with self.assertRaises(TypeError):
             a = pybamm.Symbol("a", domain=1)
 
+        # changing the auxiliary domains changes the id
+        for b in [
+            pybamm.Symbol("a", domain="test"),
+            pybamm.StateVector(slice(0, 1), domain="test"),
+            pybamm.Vector(np.ones(1), domain="test"),
+        ]:
+            b_id = b.id
+            b.auxiliary_domains = {"secondary": ["sec"]}
+            self.assertNotEqual(b.id, b_id)
+
     def test_symbol_methods(self):
         a = pybamm.Symbol("a")
         b = pybamm.Symbol("b")
@@ -211,6 +225,34 @@ class TestSymbol(unittest.TestCase):
         a = 3 * pybamm.t + 2
         self.assertTrue(a.evaluates_to_number())
 
+    def test_structural_flags(self):
+        a = pybamm.Parameter("a")
+        b = pybamm.StateVector(slice(0, 1))
+        expr = 2 * a + pybamm.Function(np.exp, b)
+        self.assertTrue(expr.has_symbol_of_classes(pybamm.StateVector))
+        self.assertTrue(expr.has_symbol_of_classes([pybamm.Variable, pybamm.Function]))
+        self.assertTrue(expr.has_symbol_of_classes(pybamm.BinaryOperator))
+        self.assertFalse(expr.has_symbol_of_classes(pybamm.Variable))
+        self.assertFalse(expr.children[0].has_symbol_of_classes(pybamm.StateVector))
+
+        # nodes share the set of classes of a child when it is the same
+        a2 = a + a
+        self.assertIs((a + a2)._symbol_classes, a2._symbol_classes)
+
+        # the flags are saved, and not found again from the children
+        self.assertFalse(expr.is_constant())
+        self.assertTrue(expr.children[0].is_constant())
+        self.assertFalse(expr.evaluates_to_number())
+        expr._symbol_classes = frozenset()
+        self.assertFalse(expr.is_constant())
+        self.assertFalse(expr.evaluates_to_number())
+
+        # the saved flags are forgotten when the domain changes
+        scalar = pybamm.Scalar(1) + 2
+        self.assertTrue(scalar.evaluates_to_number())
+        scalar.domain = "test"
+        self.assertIsNone(scalar._saved_evaluates_to_number)
+
     def test_symbol_repr(self):
         """
         test that __repr___ returns the string
@@ -329,17 +371,78 @@ class TestSymbol(unittest.TestCase):
         self.assertFalse(algebraic_eqn.has_symbol_of_classes(pybamm.Gradient))
         self.assertFalse(algebraic_eqn.has_symbol_of_classes(pybamm.Divergence))
 
+    def test_id_is_stable(self):
+        # the ids (and domain sizes) are the same in every process, whatever the seed
+        # of the built-in hash
+        code = (
+            "import pybamm; import numpy as np; "
+            "a = pybamm.Variable('a', domain=['test']); "
+            "expr = pybamm.Matrix(np.eye(2)) @ pybamm.grad(a) + pybamm.Scalar(2) * a; "
+            "f = (lambda module: lambda x: module.exp(x))(np); "
+            "print(expr.id, pybamm.domain_size(['test']), pybamm.Function(f, a).id)"
+        )
+        outputs = set()
+        for seed in ["1", "2"]:
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            outputs.add(subprocess.check_output([sys.executable, "-c", code], env=env))
+        self.assertEqual(len(outputs), 1)
+
+        # symbols with the same contents have the same id
+        a = pybamm.Variable("a", domain=["test"])
+        expr = pybamm.Matrix(np.eye(2)) @ pybamm.grad(a) + pybamm.Scalar(2) * a
+        self.assertEqual(
+            outputs.pop().split()[:2],
+            [str(expr.id).encode(), str(pybamm.domain_size(["test"])).encode()],
+        )
+
+    def test_stable_hash(self):
+        self.assertEqual(pybamm.stable_hash(("a", 1)), pybamm.stable_hash(("a", 1)))
+        for other in [("a", 2), ("a", 1.0), ("a", True), ("a", "1"), (("a", 1),)]:
+            self.assertNotEqual(pybamm.stable_hash(("a", 1)), pybamm.stable_hash(other))
+        # strings are delimited
+        self.assertNotEqual(
+            pybamm.stable_hash(("ab", "c")), pybamm.stable_hash(("a", "bc"))
+        )
+        self.assertNotEqual(
+            pybamm.stable_hash((pybamm.Scalar, None)),
+            pybamm.stable_hash((pybamm.Vector, None)),
+        )
+        with self.assertRaisesRegex(TypeError, "Cannot hash"):
+            pybamm.stable_hash(x for x in [])
+
+        # functions are hashed from their code, default arguments and closures
+        def scale(factor):
+            return lambda x, offset=0: factor * x + offset
+
+        self.assertEqual(pybamm.stable_hash(scale(2)), pybamm.stable_hash(scale(2)))
+        self.assertNotEqual(pybamm.stable_hash(scale(2)), pybamm.stable_hash(scale(3)))
+        self.assertNotEqual(
+            pybamm.stable_hash(lambda x: 2 * x), pybamm.stable_hash(lambda x: 3 * x)
+        )
+        self.assertNotEqual(pybamm.stable_hash(np.sin), pybamm.stable_hash(np.cos))
+        self.assertNotEqual(
+            pybamm.stable_hash({"a": np.array([1, 2])}),
+            pybamm.stable_hash({"a": np.array([1, 3])}),
+        )
+
     def test_orphans(self):
         a = pybamm.Scalar(1)
         b = pybamm.Scalar(2)
         sum = a + b
 
         a_orp, b_orp = sum.orphans
-        self.assertIsNone(a_orp.parent)
-        self.assertIsNone(b_orp.parent)
+        self.assertIsNot(a, a_orp)
+        self.assertIsNot(b, b_orp)
         self.assertEqual(a.id, a_orp.id)
         self.assertEqual(b.id, b_orp.id)
 
+        # only the children are copied, the rest of the tree is shared
+        expr = 2 * sum
+        sum_orp = expr.orphans[1]
+        self.assertIsNot(sum_orp, sum)
+        self.assertEqual(sum_orp.id, sum.id)
+        self.assertIs(sum_orp.children[0], a)
+
     def test_shape(self):
         scal = pybamm.Scalar(1)
         self.assertEqual(scal.shape, ())
@@ -393,6 +496,31 @@ class TestSymbol(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             sym.shape_for_testing
 
+    def test_saved_shape(self):
+        var = pybamm.Variable("var", domain="negative electrode")
+        expr = pybamm.Function(np.exp, 2 * var)
+        self.assertEqual(expr.shape_for_testing, var.shape_for_testing)
+
+        # the shapes are saved, and parents only use the shapes of their children
+        def fail():
+            raise AssertionError("evaluated")
+
+        var.evaluate_for_shape = fail
+        self.assertEqual((expr + 1).shape_for_testing, expr.shape_for_testing)
+        self.assertEqual(expr.shape_placeholder().shape, expr.shape_for_testing)
+
+        # changing the domain forgets the saved shape
+        del var.evaluate_for_shape
+        var.domain = "separator"
+        self.assertEqual(var.shape_for_testing, (pybamm.domain_size("separator"), 1))
+        var.auxiliary_domains = {"secondary": ["current collector"]}
+        size = pybamm.domain_size("separator") * pybamm.domain_size("current collector")
+        self.assertEqual(var.shape_for_testing, (size, 1))
+
+        # matrices are represented by sparse placeholders
+        self.assertTrue(np.isnan(pybamm.create_object_of_shape(())))
+        self.assertTrue(issparse(pybamm.create_object_of_shape((3, 4))))
+
     def test_test_shape(self):
         # right shape, passes
         y1 = pybamm.StateVector(slice(0, 10))
@@ -405,7 +533,6 @@ class TestSymbol(unittest.TestCase):
 
 if __name__ == "__main__":
     print("Add -v for more debug output")
-    import sys
 
     if "-v" in sys.argv:
         debug = True
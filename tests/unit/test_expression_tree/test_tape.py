@@ -0,0 +1,204 @@
+#
+# Tests for the Tape class
+#
+import pybamm
+
+from tests import get_discretisation_for_testing
+import unittest
+import numpy as np
+import scipy.sparse
+import autograd.numpy as anp
+
+
+def test_function(arg):
+    return 2 * anp.exp(arg) / (1 + arg ** 2) - arg
+
+
+def test_multi_var_function(arg1, arg2):
+    return arg1 * arg2 + anp.tanh(arg2)
+
+
+def test_untraceable_function(arg):
+    return np.vectorize(lambda x: x if x > 0 else 0)(arg)
+
+
+class TestTape(unittest.TestCase):
+    def assert_tape_matches(self, symbols, y_list, u=None):
+        tape = pybamm.Tape(symbols, t=1, y=y_list[0], u=u)
+        for t, y in zip([1, 2, 3], y_list):
+            values = tape.evaluate(t, y, u)
+            for symbol, value in zip(symbols, values):
+                expected = symbol.evaluate(t, y, u)
+                if scipy.sparse.issparse(expected):
+                    self.assertTrue(scipy.sparse.issparse(value))
+                    expected = expected.toarray()
+                    value = value.toarray()
+                np.testing.assert_allclose(
+                    np.reshape(value, np.shape(expected)), expected, rtol=1e-12
+                )
+        return tape
+
+    def test_leaves(self):
+        y = pybamm.StateVector(slice(0, 3))
+        y_list = [np.array([1, 2, 3]), np.array([-1, 0.5, 4])]
+        a = pybamm.InputParameter("a")
+        self.assert_tape_matches(
+            [y, pybamm.t, pybamm.Scalar(2), pybamm.Vector(np.array([1, 0, 2])), a],
+            y_list,
+            {"a": 4},
+        )
+        # state vector with a non-contiguous evaluation array
+        y_skip = pybamm.StateVector(slice(0, 1), slice(2, 3))
+        self.assert_tape_matches([y_skip], y_list)
+
+    def test_operators(self):
+        y = pybamm.StateVector(slice(0, 3))
+        z = pybamm.StateVector(slice(3, 4))
+        a = pybamm.InputParameter("a")
+        y_list = [np.array([1, 2, 3, 4]), np.array([-1, 0.5, 4, 2])]
+        v = pybamm.Vector(np.array([0, 1, 2]))
+        symbols = [
+            y + z,
+            y - v,
+            -y * v,
+            y / (z + 1),
+            abs(y) ** z,
+            2 ** z,
+            a * y + pybamm.t,
+            y[1:3],
+        ]
+        self.assert_tape_matches(symbols, y_list, {"a": 3})
+
+    def test_sparse(self):
+        y = pybamm.StateVector(slice(0, 3))
+        z = pybamm.StateVector(slice(3, 4))
+        y_list = [np.array([1, 2, 3, 4]), np.array([-1, 0.5, 4, 2])]
+        matrix = pybamm.Matrix(
+            scipy.sparse.csr_matrix(np.array([[1, 0, 0], [0, 0, 2], [0, 3, 0]]))
+        )
+        dense = pybamm.Matrix(np.array([[1, 2, 0], [0, 0, 0]]))
+        symbols = [
+            matrix @ y,
+            dense @ (y * z),
+            matrix * z,
+            matrix + matrix * z,
+            matrix / (z + 1),
+            y.jac(y) * z,
+            pybamm.SparseStack(matrix * z, matrix),
+        ]
+        tape = self.assert_tape_matches(symbols, y_list)
+
+        # sparse outputs keep their sparsity pattern
+        self.assertEqual(tape.output_patterns[2].nnz, 3)
+        self.assertEqual(tape.output_patterns[5].nnz, 3)
+
+    def test_concatenations(self):
+        y = pybamm.StateVector(slice(0, 3))
+        z = pybamm.StateVector(slice(3, 4))
+        y_list = [np.array([1, 2, 3, 4]), np.array([-1, 0.5, 4, 2])]
+        symbols = [
+            pybamm.NumpyConcatenation(y, z, pybamm.t),
+            pybamm.NumpyConcatenation(z),
+        ]
+        self.assert_tape_matches(symbols, y_list)
+
+    def test_domain_concatenation(self):
+        disc = get_discretisation_for_testing()
+        mesh = disc.mesh
+        a_dom = ["separator"]
+        b_dom = ["negative electrode", "positive electrode"]
+        a_pts = mesh[a_dom[0]][0].npts
+        b_pts = mesh[b_dom[0]][0].npts + mesh[b_dom[1]][0].npts
+        a = pybamm.StateVector(slice(0, a_pts), domain=a_dom)
+        b = pybamm.StateVector(slice(a_pts, a_pts + b_pts), domain=b_dom)
+        y = np.arange(a_pts + b_pts, dtype=float)
+        self.assert_tape_matches(
+            [pybamm.DomainConcatenation([a, 2 * b], mesh)], [y, y ** 2]
+        )
+
+    def test_kron(self):
+        y = pybamm.StateVector(slice(0, 3))
+        z = pybamm.StateVector(slice(3, 5))
+        y_list = [np.array([1, 2, 3, 4, 5]), np.array([-1, 0.5, 4, 2, 0])]
+        symbols = [
+            pybamm.Kron(z, y),
+            pybamm.Kron(pybamm.Matrix(scipy.sparse.eye(2)), y.jac(y)),
+        ]
+        self.assert_tape_matches(symbols, y_list)
+
+    def test_functions(self):
+        y = pybamm.StateVector(slice(0, 3))
+        z = pybamm.StateVector(slice(3, 4))
+        y_list = [np.array([1, 2, 3, 4]), np.array([0.1, 0.5, 4, 2])]
+        symbols = [
+            pybamm.exp(y),
+            pybamm.log(y),
+            pybamm.sinh(z) + pybamm.cos(y),
+            pybamm.Function(np.sqrt, y),
+            pybamm.Function(np.tanh, y),
+            pybamm.min(y),
+            pybamm.max(y * z),
+            # traced functions
+            pybamm.Function(test_function, y),
+            pybamm.Function(test_multi_var_function, y, z),
+            pybamm.Function(test_function, y).diff(y),
+        ]
+        tape = self.assert_tape_matches(symbols, y_list)
+        self.assertEqual(tape.output_patterns[5].shape, (1, 1))
+
+    def test_interpolant(self):
+        x = np.linspace(0, 1, 10)[:, np.newaxis]
+        data = np.hstack([x, np.sin(x)])
+        y = pybamm.StateVector(slice(0, 3))
+        y_list = [np.array([0.1, 0.55, 0.9]), np.array([0, 1, 1.5])]
+        for interpolator in ["pchip", "cubic spline"]:
+            interp = pybamm.Interpolant(data, y, interpolator=interpolator)
+            self.assert_tape_matches([interp], y_list)
+
+        # without extrapolation
+        interp = pybamm.Interpolant(data, y, extrapolate=False)
+        tape = pybamm.Tape([interp])
+        np.testing.assert_array_equal(
+            tape.evaluate(y=np.array([0.5, 2, -1]))[0][1:, 0], [np.nan, np.nan]
+        )
+
+    def test_untraceable_function(self):
+        y = pybamm.StateVector(slice(0, 3))
+        with self.assertRaisesRegex(NotImplementedError, "Could not trace"):
+            pybamm.Tape([pybamm.Function(test_untraceable_function, y)])
+
+    def test_input_names(self):
+        y = pybamm.StateVector(slice(0, 1))
+        a = pybamm.InputParameter("a")
+        b = pybamm.InputParameter("b")
+        input_names = []
+        tape_b = pybamm.Tape([b * y], input_names=input_names)
+        tape_ab = pybamm.Tape([a + b], input_names=input_names)
+        self.assertEqual(input_names, ["b", "a"])
+        self.assertIs(tape_b.input_names, tape_ab.input_names)
+        self.assertEqual(tape_ab.evaluate(u={"a": 1, "b": 2})[0], 3)
+
+    def test_discretised_model(self):
+        model = pybamm.lithium_ion.SPMe()
+        geometry = model.default_geometry
+        param = model.default_parameter_values
+        param.process_model(model)
+        param.process_geometry(geometry)
+        mesh = pybamm.Mesh(geometry, model.default_submesh_types, model.default_var_pts)
+        disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+        disc.process_model(model)
+
+        rhs = model.concatenated_rhs
+        y0 = model.concatenated_initial_conditions[:, 0]
+        jac = rhs.jac(pybamm.StateVector(slice(0, y0.size)))
+        self.assert_tape_matches([rhs, jac], [y0, 1.01 * y0])
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    pybamm.settings.debug_mode = True
+    unittest.main()
@@ -0,0 +1,78 @@
+#
+# Tests for the non-recursive traversal of expression trees
+#
+import pybamm
+import unittest
+from collections import OrderedDict
+
+
+class TestPostOrderRewrite(unittest.TestCase):
+    def test_order(self):
+        a = pybamm.Parameter("a")
+        b = pybamm.Parameter("b")
+        expr = (a + b) * pybamm.exp(a + b) - b
+        entered = []
+        visited = []
+
+        def visit(symbol, children):
+            visited.append(symbol.name)
+            return "{}({})".format(symbol.name, ",".join(children))
+
+        result = pybamm.post_order_rewrite(
+            expr, visit, enter=lambda symbol: entered.append(symbol.name)
+        )
+        self.assertEqual(result, "-(*(+(a(),b()),function (exp)(+(a(),b()))),b())")
+        # shared subtrees (by id) are visited once, in depth-first order
+        self.assertEqual(entered, ["-", "*", "+", "a", "b", "function (exp)"])
+        self.assertEqual(visited, ["a", "b", "+", "function (exp)", "*", "-"])
+
+    def test_memo_and_children(self):
+        a = pybamm.Parameter("a")
+        expr = pybamm.exp(a) + a
+
+        def count(symbol, children):
+            return 1 + sum(children)
+
+        memo = {a.id: 10}
+        self.assertEqual(pybamm.post_order_rewrite(expr, count, memo), 22)
+        self.assertEqual(memo[expr.children[0].id], 11)
+        self.assertEqual(pybamm.post_order_rewrite(expr, count, memo), 22)
+        self.assertEqual(pybamm.post_order_rewrite(a, count), 1)
+
+        # stop at functions
+        result = pybamm.post_order_rewrite(
+            expr,
+            count,
+            children=lambda symbol: []
+            if isinstance(symbol, pybamm.Function)
+            else symbol.children,
+        )
+        self.assertEqual(result, 3)
+
+    def test_deep_tree(self):
+        # deeper than the recursion limit
+        x = pybamm.Variable("x")
+        expr = x
+        for i in range(3000):
+            expr = pybamm.exp(expr) if i % 2 else expr * pybamm.Parameter("p")
+
+        self.assertEqual(expr.new_copy().id, expr.id)
+        expr = pybamm.ParameterValues({"p": 2}).process_symbol(expr)
+        disc = pybamm.Discretisation()
+        disc.y_slices = {x.id: [slice(0, 1)]}
+        expr = disc.process_symbol(expr)
+        expr = expr.simplify()
+        expr.jac(pybamm.StateVector(slice(0, 1)))
+        variable_symbols = OrderedDict()
+        pybamm.find_symbols(expr, OrderedDict(), variable_symbols)
+        self.assertEqual(len(variable_symbols), 3001)
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    pybamm.settings.debug_mode = True
+    unittest.main()
@@ -98,6 +98,37 @@ class TestBaseModel(unittest.TestCase):
         model.jacobian = "test"
         self.assertEqual(model.jacobian, "test")
 
+    def test_convert_to_format(self):
+        model = pybamm.BaseModel()
+        self.assertEqual(model.convert_to_format, "python")
+        model.convert_to_format = "numba"
+        self.assertEqual(model.convert_to_format, "numba")
+        with self.assertRaisesRegex(ValueError, "convert_to_format 'bla'"):
+            model.convert_to_format = "bla"
+
+    def test_version(self):
+        model = pybamm.BaseModel()
+        version = model.version
+        # Setting the equations changes the version
+        c = pybamm.Variable("c")
+        model.rhs = {c: -c}
+        self.assertNotEqual(model.version, version)
+        version = model.version
+        model.use_simplify = False
+        self.assertNotEqual(model.version, version)
+        version = model.version
+        model.convert_to_format = "numba"
+        self.assertNotEqual(model.version, version)
+        version = model.version
+        model.update_version()
+        self.assertNotEqual(model.version, version)
+        # Outputs of the solver set-up do not change the version
+        version = model.version
+        model.jacobian = "test"
+        self.assertEqual(model.version, version)
+        # Versions are never shared between models
+        self.assertNotEqual(pybamm.BaseModel().version, model.version)
+
     def test_model_dict_behaviour(self):
         model = pybamm.BaseModel()
         key = pybamm.Symbol("c")
@@ -4,6 +4,7 @@
 import pybamm
 import unittest
 import numpy as np
+from scipy.sparse import csr_matrix
 from tests import get_discretisation_for_testing
 
 
@@ -83,6 +84,14 @@ class TestAlgebraicSolver(unittest.TestCase):
         np.testing.assert_array_almost_equal(solution_no_jac.y, sol)
         np.testing.assert_array_almost_equal(solution_with_jac.y, sol)
 
+        # sparse jacobian (the equations are linear, so one Newton step is enough)
+        solution = solver.root(algebraic, y0, jacobian=lambda y: csr_matrix(A))
+        np.testing.assert_array_almost_equal(solution.y, sol)
+        self.assertEqual(solution.stats["jacobian evaluations"], 1)
+        solver.method = "hybr"
+        solution = solver.root(algebraic, y0, jacobian=lambda y: csr_matrix(A))
+        np.testing.assert_array_almost_equal(solution.y, sol)
+
     def test_model_solver(self):
         # Create model
         model = pybamm.BaseModel()
@@ -122,6 +131,91 @@ class TestAlgebraicSolver(unittest.TestCase):
             model.variables["var2"].evaluate(t=None, y=solution_no_jac.y), sol[100:]
         )
 
+    def test_model_solver_with_inputs(self):
+        # Create model
+        model = pybamm.BaseModel()
+        var = pybamm.Variable("var")
+        model.algebraic = {var: var - pybamm.InputParameter("value")}
+        model.initial_conditions = {var: 1}
+        disc = pybamm.Discretisation()
+        disc.process_model(model)
+
+        # Solve
+        solver = pybamm.AlgebraicSolver()
+        for value in [2, 5]:
+            solution = solver.solve(model, inputs={"value": value})
+            np.testing.assert_array_almost_equal(solution.y, [[value]])
+            self.assertEqual(solution.inputs, {"value": value})
+
+    def test_solve_sequence(self):
+        model = pybamm.BaseModel()
+        var = pybamm.Variable("var")
+        model.algebraic = {var: var ** 2 - pybamm.InputParameter("value")}
+        model.initial_conditions = {var: 1}
+        disc = pybamm.Discretisation()
+        disc.process_model(model)
+
+        solver = pybamm.AlgebraicSolver()
+        inputs_list = [{"value": value} for value in [100, 101, 102]]
+        solutions = solver.solve_sequence(model, inputs_list)
+        for solution, inputs in zip(solutions, inputs_list):
+            np.testing.assert_array_almost_equal(solution.y, [[inputs["value"] ** 0.5]])
+            self.assertEqual(solution.inputs, inputs)
+            self.assertEqual(solution.set_up_time, solutions[0].set_up_time)
+
+        # each solve starts from the previous solution
+        cold_solution = solver.solve(model, inputs_list[1])
+        self.assertLess(
+            solutions[1].stats["iterations"], cold_solution.stats["iterations"]
+        )
+
+    def test_solve_quasi_static(self):
+        model = pybamm.BaseModel()
+        var1 = pybamm.Variable("var1")
+        var2 = pybamm.Variable("var2")
+        model.algebraic = {var1: 2 * var1 - pybamm.t, var2: var1 + var2 - 1}
+        model.initial_conditions = {var1: 0, var2: 0}
+        disc = pybamm.Discretisation()
+        disc.process_model(model)
+
+        t_eval = np.linspace(0, 1, 11)
+        for method in ["newton", "lm"]:
+            solver = pybamm.AlgebraicSolver(method=method)
+            solution = solver.solve_quasi_static(model, t_eval)
+            self.assertTrue(solver.constant_jacobian)
+            np.testing.assert_array_equal(solution.t, t_eval)
+            np.testing.assert_array_almost_equal(solution.y[0], t_eval / 2)
+            np.testing.assert_array_almost_equal(solution.y[1], 1 - t_eval / 2)
+        # the constant jacobian is evaluated and factorised once
+        solver = pybamm.AlgebraicSolver()
+        solution = solver.solve_quasi_static(model, t_eval)
+        self.assertEqual(solution.stats["jacobian factorisations"], 1)
+        self.assertGreater(solution.stats["jacobian evaluations"], 1)
+
+        # nonlinear, time-dependent equations with inputs
+        model = pybamm.BaseModel()
+        var = pybamm.Variable("var")
+        model.algebraic = {var: var ** 2 - pybamm.InputParameter("value") - pybamm.t}
+        model.initial_conditions = {var: 1}
+        disc = pybamm.Discretisation()
+        disc.process_model(model)
+
+        solver = pybamm.AlgebraicSolver()
+        solution = solver.solve_quasi_static(model, t_eval, inputs={"value": 1})
+        self.assertFalse(solver.constant_jacobian)
+        np.testing.assert_array_almost_equal(solution.y[0], (1 + t_eval) ** 0.5)
+        self.assertEqual(solution.inputs, {"value": 1})
+        self.assertEqual(
+            solution.stats["jacobian factorisations"],
+            solution.stats["jacobian evaluations"],
+        )
+
+        # without jacobian
+        model.use_jacobian = False
+        solution = solver.solve_quasi_static(model, t_eval, inputs={"value": 1})
+        self.assertFalse(solver.constant_jacobian)
+        np.testing.assert_array_almost_equal(solution.y[0], (1 + t_eval) ** 0.5)
+
 
 if __name__ == "__main__":
     print("Add -v for more debug output")
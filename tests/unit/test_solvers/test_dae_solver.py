@@ -53,6 +53,18 @@ class TestDaeSolver(unittest.TestCase):
             rhs, algebraic, y0, jac_sparse
         )
         np.testing.assert_array_almost_equal(init_cond, vec)
+        self.assertEqual(
+            solver.root_stats["jacobian evaluations"],
+            solver.root_stats["iterations"] + 1,
+        )
+
+        # the scipy methods can still be used
+        solver = pybamm.DaeSolver(root_method="lm")
+        init_cond = solver.calculate_consistent_initial_conditions(
+            rhs, algebraic, y0, jac_sparse
+        )
+        np.testing.assert_array_almost_equal(init_cond, vec)
+        self.assertGreater(solver.root_stats["function evaluations"], 0)
 
     def test_fail_consistent_initial_conditions(self):
         def rhs(t, y):
@@ -77,6 +89,30 @@ class TestDaeSolver(unittest.TestCase):
         ):
             solver.calculate_consistent_initial_conditions(rhs, algebraic, y0)
 
+    def test_set_inputs_consistent_initial_conditions(self):
+        model = pybamm.BaseModel()
+        var1 = pybamm.Variable("var1")
+        var2 = pybamm.Variable("var2")
+        model.rhs = {var1: -var1}
+        model.algebraic = {var2: pybamm.InputParameter("p") * var1 - var2}
+        model.initial_conditions = {var1: 1, var2: 0}
+        disc = pybamm.Discretisation()
+        disc.process_model(model)
+
+        solver = pybamm.DaeSolver()
+        solver.inputs = {"p": 2}
+        solver.set_up(model)
+        np.testing.assert_array_almost_equal(solver.y0, [1, 2])
+        np.testing.assert_array_almost_equal(solver.rhs(0, np.array([1, 1])), [-1])
+        np.testing.assert_array_almost_equal(
+            solver.algebraic(0, np.array([1, 1])), [1]
+        )
+
+        # changing the inputs recalculates the consistent initial conditions
+        solver.set_inputs(model, {"p": 3})
+        self.assertEqual(solver.inputs, {"p": 3})
+        np.testing.assert_array_almost_equal(solver.y0, [1, 3])
+
 
 if __name__ == "__main__":
     print("Add -v for more debug output")
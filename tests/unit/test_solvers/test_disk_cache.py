@@ -0,0 +1,120 @@
+#
+# Tests for the DiskCache class
+#
+import pybamm
+import numpy as np
+import os
+import scipy.sparse
+import tempfile
+import threading
+import time
+import unittest
+
+
+def test_function(arg):
+    return 2 * arg
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = pybamm.DiskCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, contents, size=0):
+        def write(directory):
+            with open(os.path.join(directory, "contents"), "w") as f:
+                f.write(contents + " " * size)
+
+        return write
+
+    def read(self, path):
+        with open(os.path.join(path, "contents")) as f:
+            return f.read().strip()
+
+    def test_store_load(self):
+        self.assertIsNone(self.cache.load("a"))
+        path = self.cache.store("a", self.write("first"))
+        self.assertEqual(path, self.cache.load("a"))
+        self.assertEqual(self.read(path), "first")
+
+        # an existing entry is kept
+        self.cache.store("a", self.write("second"))
+        self.assertEqual(self.read(self.cache.load("a")), "first")
+
+        # failed writes leave no entry
+        def fail(directory):
+            raise ValueError("failed")
+
+        with self.assertRaisesRegex(ValueError, "failed"):
+            self.cache.store("b", fail)
+        self.assertIsNone(self.cache.load("b"))
+        self.assertEqual(os.listdir(self.directory.name), ["a"])
+
+        self.cache.remove("a")
+        self.assertIsNone(self.cache.load("a"))
+        self.assertEqual(self.cache.size, 0)
+
+    def test_evict(self):
+        for key in ["a", "b", "c"]:
+            self.cache.store(key, self.write(key, size=100))
+            time.sleep(0.01)
+        self.assertEqual([key for key, _ in self.cache.entries()], ["a", "b", "c"])
+        self.assertGreaterEqual(self.cache.size, 300)
+
+        # loading an entry makes it the most recently used
+        self.cache.load("a")
+        self.assertEqual([key for key, _ in self.cache.entries()], ["b", "c", "a"])
+
+        # the least recently used entries are evicted
+        self.cache.max_size = 250
+        self.cache.evict()
+        self.assertEqual([key for key, _ in self.cache.entries()], ["c", "a"])
+
+        # the new entry is kept, even if it is larger than the cache
+        self.cache.store("d", self.write("d", size=300))
+        self.assertEqual([key for key, _ in self.cache.entries()], ["d"])
+
+        self.cache.clear()
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_key(self):
+        def expression():
+            y = pybamm.StateVector(slice(0, 3))
+            matrix = pybamm.Matrix(scipy.sparse.eye(3, format="csr"))
+            return {
+                "rhs": matrix @ pybamm.Function(test_function, y) + pybamm.Scalar(2),
+                "vector": pybamm.Vector(np.array([1, 2, 3])) * y[1:2],
+            }
+
+        # equal trees have the same key
+        key = self.cache.key(expression(), 1)
+        self.assertEqual(key, self.cache.key(expression(), 1))
+        self.assertEqual(len(key), 64)
+
+        # any difference changes the key
+        self.assertNotEqual(key, self.cache.key(expression(), 2))
+        y = pybamm.StateVector(slice(0, 3))
+        for rhs in [
+            pybamm.Function(test_function, y) + pybamm.Scalar(2),
+            pybamm.Function(np.exp, y) + pybamm.Scalar(2),
+            pybamm.Function(test_function, y) + pybamm.Scalar(3),
+            pybamm.Function(test_function, pybamm.StateVector(slice(1, 4))),
+        ]:
+            self.assertNotEqual(key, self.cache.key(dict(expression(), rhs=rhs), 1))
+
+        # objects that cannot be digested
+        with self.assertRaisesRegex(TypeError, "Cannot digest"):
+            self.cache.key(threading.Lock())
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    pybamm.settings.debug_mode = True
+    unittest.main()
@@ -66,6 +66,7 @@ class TestIDAKLUSolver(unittest.TestCase):
 
         # test that final value is the event value
         np.testing.assert_array_almost_equal(solution.y[0, -1], 0.2)
+        self.assertEqual(solution.event_index, 0)
 
         # test that y[1] remains constant
         np.testing.assert_array_almost_equal(
@@ -76,6 +77,259 @@ class TestIDAKLUSolver(unittest.TestCase):
         true_solution = 0.1 * solution.t
         np.testing.assert_array_almost_equal(solution.y[0, :], true_solution)
 
+        # test the statistics reported by IDA
+        self.assertGreater(solution.stats["steps"], 0)
+        self.assertGreater(solution.stats["function evaluations"], 0)
+        self.assertGreater(solution.stats["jacobian evaluations"], 0)
+        self.assertGreater(solution.stats["linear solves"], 0)
+        self.assertEqual(solution.stats["event evaluations"] % 2, 0)
+
+    def test_jacobian_pattern(self):
+        # the entry (1, 0) is zero at y[0] = 0, but is in the pattern
+        def jac(t, y):
+            return sparse.csr_matrix(np.array([[-1.0, 0.0], [y[0], -1.0]]))
+
+        mass_matrix = sparse.csr_matrix(np.array([[1.0, 0.0], [0.0, 0.0]]))
+        solver = pybamm.IDAKLU()
+        pattern = solver.jacobian_pattern(jac, np.zeros(2), mass_matrix)
+        np.testing.assert_array_equal(pattern["indptr"], [0, 1, 3])
+        np.testing.assert_array_equal(pattern["indices"], [0, 0, 1])
+
+        # the data is written on the pattern
+        jac_class = solver._sundials_jacobian(jac, pattern)
+        np.testing.assert_array_equal(
+            jac_class.jac_res(0, np.array([0.0, 1.0]), 2), [-3, 0, -1]
+        )
+        np.testing.assert_array_equal(
+            jac_class.jac_res(0, np.array([5.0, 1.0]), 2), [-3, 5, -1]
+        )
+
+        # dense jacobians
+        pattern = solver.jacobian_pattern(
+            lambda t, y: jac(t, y).toarray(), np.zeros(2), mass_matrix
+        )
+        np.testing.assert_array_equal(pattern["indices"], [0, 0, 1])
+
+        # entries outside the pattern
+        pattern = solver.jacobian_pattern(
+            lambda t, y: sparse.eye(2), np.zeros(2), mass_matrix
+        )
+        jac_class = solver._sundials_jacobian(jac, pattern)
+        with self.assertRaisesRegex(pybamm.SolverError, "outside its sparsity"):
+            jac_class.jac_res(0, np.array([5.0, 1.0]), 2)
+
+    def test_solve_ensemble(self):
+        model = pybamm.BaseModel()
+        var1 = pybamm.Variable("var1")
+        var2 = pybamm.Variable("var2")
+        rate = pybamm.InputParameter("rate")
+        model.rhs = {var1: -rate * var1}
+        model.algebraic = {var2: 2 * var1 - var2}
+        model.initial_conditions = {var1: 1, var2: 2}
+        model.events = {"var1 = 0.5": pybamm.min(var1 - 0.5)}
+        disc = pybamm.Discretisation()
+        disc.process_model(model)
+
+        solver = pybamm.IDAKLU(rtol=1e-8, atol=1e-8)
+        t_eval = np.linspace(0, 1, 50)
+        inputs_list = [{"rate": 0.1}, {"rate": 0.5}, {"rate": 1}]
+        solutions = solver.solve_ensemble(
+            model, t_eval, inputs_list=inputs_list, number_of_threads=2
+        )
+        self.assertEqual(len(solutions), 3)
+        for solution, inputs in zip(solutions, inputs_list):
+            self.assertEqual(solution.inputs, inputs)
+            np.testing.assert_allclose(
+                solution.y[0], np.exp(-inputs["rate"] * solution.t), rtol=1e-5
+            )
+            np.testing.assert_allclose(solution.y[1], 2 * solution.y[0], rtol=1e-5)
+            # same as solving the members one at a time
+            single_solution = solver.solve(model, t_eval, inputs=inputs)
+            np.testing.assert_array_almost_equal(solution.t, single_solution.t)
+            np.testing.assert_array_almost_equal(solution.y, single_solution.y)
+            self.assertEqual(solution.stats["steps"], single_solution.stats["steps"])
+        # only the fastest decay reaches the event
+        self.assertEqual(solutions[0].termination, "final time")
+        self.assertEqual(solutions[2].termination, "event: var1 = 0.5")
+        self.assertIsNone(solutions[0].event_index)
+        self.assertEqual(solutions[2].event_index, 0)
+        np.testing.assert_array_almost_equal(solutions[2].t[-1], np.log(2))
+
+        # different initial conditions
+        solutions = solver.solve_ensemble(
+            model, t_eval, inputs_list=[{"rate": 0.1}] * 2, y0_list=[[1, 2], [0.9, 0]]
+        )
+        np.testing.assert_allclose(
+            solutions[1].y[0], 0.9 * np.exp(-0.1 * solutions[1].t), rtol=1e-5
+        )
+        # the algebraic part of y0 is only an initial guess
+        np.testing.assert_allclose(solutions[1].y[1], 2 * solutions[1].y[0], rtol=1e-5)
+
+        # errors
+        with self.assertRaisesRegex(ValueError, "At least one"):
+            solver.solve_ensemble(model, t_eval)
+        with self.assertRaisesRegex(ValueError, "same length"):
+            solver.solve_ensemble(
+                model, t_eval, inputs_list=[{"rate": 0.1}], y0_list=[[1, 2], [1, 2]]
+            )
+
+    def test_tolerances(self):
+        # with a large solution, the absolute tolerance is much tighter than the
+        # relative tolerance, so the solution is only accurate if they are not swapped
+        model = pybamm.BaseModel()
+        var1 = pybamm.Variable("var1")
+        var2 = pybamm.Variable("var2")
+        model.rhs = {var1: -var1}
+        model.algebraic = {var2: 2 * var1 - var2}
+        model.initial_conditions = {var1: 1e6, var2: 2e6}
+        disc = pybamm.Discretisation()
+        disc.process_model(model)
+
+        t_eval = np.linspace(0, 1, 20)
+        for callbacks in ["python", "native"]:
+            solver = pybamm.IDAKLU(rtol=1e-9, atol=1e-1, callbacks=callbacks)
+            solution = solver.solve(model, t_eval)
+            np.testing.assert_allclose(
+                solution.y[0], 1e6 * np.exp(-solution.t), rtol=1e-5
+            )
+
+    def test_model_step(self):
+        model = pybamm.BaseModel()
+        var1 = pybamm.Variable("var1")
+        var2 = pybamm.Variable("var2")
+        rate = pybamm.InputParameter("rate")
+        model.rhs = {var1: -rate * var1}
+        model.algebraic = {var2: 2 * var1 - var2}
+        model.initial_conditions = {var1: 1, var2: 2}
+        disc = pybamm.Discretisation()
+        disc.process_model(model)
+
+        dt = 0.1
+        for callbacks in ["python", "native"]:
+            solver = pybamm.IDAKLU(rtol=1e-8, atol=1e-8, callbacks=callbacks)
+            step_sol = solver.step(model, dt, inputs={"rate": 0.1})
+            np.testing.assert_allclose(
+                step_sol.y[0], np.exp(-0.1 * step_sol.t), rtol=1e-6
+            )
+            session = solver.session
+            self.assertEqual(session.t, dt)
+
+            # the next step continues the integration in the same session
+            step_sol_2 = solver.step(model, dt, npts=5, inputs={"rate": 0.1})
+            self.assertIs(solver.session, session)
+            np.testing.assert_array_equal(step_sol_2.t, np.linspace(dt, 2 * dt, 5))
+            np.testing.assert_allclose(
+                step_sol_2.y[0], np.exp(-0.1 * step_sol_2.t), rtol=1e-6
+            )
+            np.testing.assert_allclose(step_sol_2.y[1], 2 * step_sol_2.y[0], rtol=1e-6)
+            self.assertGreater(step_sol_2.stats["steps"], 0)
+
+            # changing the inputs restarts the session from the current state
+            step_sol_3 = solver.step(model, dt, inputs={"rate": 1})
+            self.assertIs(solver.session, session)
+            np.testing.assert_allclose(
+                step_sol_3.y[0],
+                step_sol_2.y[0, -1] * np.exp(-(step_sol_3.t - 2 * dt)),
+                rtol=1e-6,
+            )
+
+            # solving sets up again, so the next step starts a new session
+            solver.solve(model, np.linspace(0, 1), inputs={"rate": 1})
+            self.assertIsNone(solver.session)
+
+    def test_cvodeklu(self):
+        model = pybamm.BaseModel()
+        var1 = pybamm.Variable("var1")
+        var2 = pybamm.Variable("var2")
+        model.rhs = {var1: -0.1 * var1, var2: var1 - var2}
+        model.initial_conditions = {var1: 1, var2: 0}
+        model.events = {"var1 = 0.5": pybamm.min(var1 - 0.5)}
+        disc = pybamm.Discretisation()
+        disc.process_model(model)
+
+        solver = pybamm.CVODEKLU(rtol=1e-8, atol=1e-8)
+        t_eval = np.linspace(0, 10, 50)
+        solution = solver.solve(model, t_eval)
+        np.testing.assert_allclose(solution.y[0], np.exp(-0.1 * solution.t), rtol=1e-6)
+        np.testing.assert_allclose(
+            solution.y[1],
+            (np.exp(-0.1 * solution.t) - np.exp(-solution.t)) / 0.9,
+            rtol=1e-6,
+            atol=1e-8,
+        )
+        self.assertEqual(solution.termination, "event: var1 = 0.5")
+        self.assertEqual(solution.event_index, 0)
+        np.testing.assert_array_almost_equal(solution.t[-1], 10 * np.log(2))
+        self.assertGreater(solution.stats["steps"], 0)
+        self.assertGreater(solution.stats["jacobian evaluations"], 0)
+
+        # errors
+        model.use_jacobian = False
+        with self.assertRaisesRegex(pybamm.SolverError, "requires the Jacobian"):
+            solver.solve(model, t_eval)
+        model.algebraic = {var2: var1 - var2}
+        model.rhs = {var1: -0.1 * var1}
+        disc.process_model(model)
+        with self.assertRaisesRegex(pybamm.SolverError, "Cannot use ODE solver"):
+            solver.solve(model, t_eval)
+
+    def test_native_callbacks(self):
+        model = pybamm.lithium_ion.SPMe()
+        geometry = model.default_geometry
+        param = model.default_parameter_values
+        param.update({"Cation transference number": "[input]"})
+        param.process_model(model)
+        param.process_geometry(geometry)
+        mesh = pybamm.Mesh(geometry, model.default_submesh_types, model.default_var_pts)
+        disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+        disc.process_model(model)
+
+        t_eval = np.linspace(0, 0.2, 50)
+        python_solver = pybamm.IDAKLU()
+        native_solver = pybamm.IDAKLU(callbacks="native")
+        for inputs in [{"Cation transference number": 0.3}]:
+            python_solution = python_solver.solve(model, t_eval, inputs=inputs)
+            native_solution = native_solver.solve(model, t_eval, inputs=inputs)
+            np.testing.assert_array_almost_equal(native_solution.t, python_solution.t)
+            np.testing.assert_allclose(
+                native_solution.y, python_solution.y, rtol=1e-5, atol=1e-8
+            )
+            self.assertEqual(native_solution.termination, python_solution.termination)
+
+        # ensembles are fully parallel
+        inputs_list = [
+            {"Cation transference number": 0.3},
+            {"Cation transference number": 0.4},
+        ]
+        solutions = native_solver.solve_ensemble(
+            model, t_eval, inputs_list=inputs_list, number_of_threads=2
+        )
+        for solution, inputs in zip(solutions, inputs_list):
+            single_solution = python_solver.solve(model, t_eval, inputs=inputs)
+            np.testing.assert_allclose(
+                solution.y, single_solution.y, rtol=1e-5, atol=1e-8
+            )
+
+        # changing the callbacks sets up the model again
+        python_solver.callbacks = "native"
+        python_solver.solve(model, t_eval, inputs=inputs_list[0])
+        self.assertEqual(python_solver.input_names, ["Cation transference number"])
+
+    def test_native_callbacks_errors(self):
+        with self.assertRaisesRegex(ValueError, "callbacks 'bla' not recognised"):
+            pybamm.IDAKLU(callbacks="bla")
+
+        model = pybamm.BaseModel()
+        var = pybamm.Variable("var")
+        model.rhs = {var: -var}
+        model.initial_conditions = {var: 1}
+        model.use_jacobian = False
+        disc = pybamm.Discretisation()
+        disc.process_model(model)
+        solver = pybamm.IDAKLU(callbacks="native")
+        with self.assertRaisesRegex(pybamm.SolverError, "require the jacobian"):
+            solver.solve(model, np.linspace(0, 1))
+
 
 if __name__ == "__main__":
     print("Add -v for more debug output")
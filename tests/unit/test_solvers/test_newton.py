@@ -0,0 +1,87 @@
+#
+# Tests for the damped Newton method
+#
+import pybamm
+import unittest
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+
+
+class TestNewtonRoot(unittest.TestCase):
+    def test_newton_root(self):
+        def fun(x):
+            return x ** 3 - np.array([1.0, 8.0, 27.0])
+
+        # sparse and dense jacobians
+        for jac in [lambda x: diags(3 * x ** 2), lambda x: np.diag(3 * x ** 2)]:
+            sol = pybamm.newton_root(fun, np.ones(3), jac)
+            self.assertTrue(sol.success)
+            np.testing.assert_array_almost_equal(sol.x, [1, 2, 3])
+            self.assertLess(np.max(np.abs(sol.fun)), 1e-6)
+            self.assertEqual(sol.njev, sol.nit + 1)
+
+        # already a root
+        sol = pybamm.newton_root(fun, np.array([1.0, 2.0, 3.0]), None)
+        self.assertTrue(sol.success)
+        self.assertEqual((sol.nit, sol.nfev, sol.njev), (0, 1, 0))
+
+    def test_line_search(self):
+        # the full Newton step overshoots from x = 2
+        sol = pybamm.newton_root(
+            np.arctan, np.array([2.0]), lambda x: csr_matrix(1 / (1 + x ** 2))
+        )
+        self.assertTrue(sol.success)
+        np.testing.assert_array_almost_equal(sol.x, [0])
+        self.assertGreater(sol.nfev, sol.njev + 1)
+
+    def test_failures(self):
+        # no root
+        def fun(x):
+            return x ** 2 + 1
+
+        sol = pybamm.newton_root(fun, np.array([2.0]), lambda x: np.diag(2 * x))
+        self.assertFalse(sol.success)
+
+        sol = pybamm.newton_root(
+            fun, np.array([0.0]), lambda x: csr_matrix(np.diag(2 * x))
+        )
+        self.assertFalse(sol.success)
+        self.assertEqual(sol.message, "The jacobian is singular")
+
+        sol = pybamm.newton_root(
+            lambda x: x - 1, np.array([0.0]), lambda x: np.eye(1), max_iterations=0
+        )
+        self.assertFalse(sol.success)
+        self.assertIn("maximum number of iterations", sol.message)
+
+    def test_factorisations(self):
+        # a constant jacobian is factorised once, across calls
+        A = csr_matrix(np.array([[2.0, 1.0], [1.0, 3.0]]))
+        factorisations = {}
+        for b in [np.array([1.0, 2.0]), np.array([3.0, 4.0])]:
+            sol = pybamm.newton_root(
+                lambda x: A @ x - b,
+                np.zeros(2),
+                lambda x: A,
+                factorisations=factorisations,
+            )
+            self.assertTrue(sol.success)
+            np.testing.assert_array_almost_equal(A @ sol.x, b)
+        self.assertEqual(sol.nfact, 0)
+        self.assertIs(factorisations["jacobian"], A)
+
+        # a new jacobian is factorised at each iteration
+        sol = pybamm.newton_root(
+            lambda x: x ** 3 - 8, np.ones(1), lambda x: np.diag(3 * x ** 2)
+        )
+        self.assertEqual(sol.nfact, sol.njev)
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    pybamm.settings.debug_mode = True
+    unittest.main()
@@ -411,6 +411,11 @@ class TestScikitsSolvers(unittest.TestCase):
         np.testing.assert_array_equal(solution.t, t_eval)
         np.testing.assert_allclose(solution.y[0], np.exp(0.1 * solution.t))
 
+        # Test statistics
+        self.assertGreater(solution.stats["steps"], 0)
+        self.assertGreater(solution.stats["function evaluations"], 0)
+        self.assertEqual(solution.stats["event evaluations"], 0)
+
         # Test time
         self.assertGreater(
             solution.total_time, solution.solve_time + solution.set_up_time
@@ -437,6 +442,7 @@ class TestScikitsSolvers(unittest.TestCase):
         np.testing.assert_allclose(solution.y[0], np.exp(0.1 * solution.t))
         np.testing.assert_array_less(solution.y[0], 1.5)
         np.testing.assert_array_less(solution.y[0], 1.25)
+        self.assertEqual(solution.termination, "event: 2 * var = 2.5")
 
     def test_model_solver_ode_jacobian(self):
         # Create model
@@ -508,6 +514,10 @@ class TestScikitsSolvers(unittest.TestCase):
         np.testing.assert_allclose(solution.y[0], np.exp(0.1 * solution.t))
         np.testing.assert_allclose(solution.y[-1], 2 * np.exp(0.1 * solution.t))
 
+        # Test statistics
+        self.assertGreater(solution.stats["function evaluations"], 0)
+        self.assertEqual(solution.stats["jacobian evaluations"], 0)
+
         # Test time
         self.assertGreater(
             solution.total_time, solution.solve_time + solution.set_up_time
@@ -557,6 +567,7 @@ class TestScikitsSolvers(unittest.TestCase):
         np.testing.assert_array_less(solution.y[-1], 2.5)
         np.testing.assert_allclose(solution.y[0], np.exp(0.1 * solution.t))
         np.testing.assert_allclose(solution.y[-1], 2 * np.exp(0.1 * solution.t))
+        self.assertEqual(solution.termination, "event: var2 = 2.5")
 
     def test_model_solver_dae_with_jacobian(self):
         # Create simple test model
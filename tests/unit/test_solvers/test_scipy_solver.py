@@ -5,6 +5,7 @@ import pybamm
 import unittest
 import numpy as np
 from tests import get_mesh_for_testing
+import tempfile
 import warnings
 
 
@@ -94,6 +95,22 @@ class TestScipySolver(unittest.TestCase):
         np.testing.assert_allclose(solution.t_event, np.log(5 / 2), rtol=1e-6)
         np.testing.assert_allclose(solution.y_event[0], 5 / 2, rtol=1e-6)
         np.testing.assert_allclose(solution.y_event[1], 5, rtol=1e-6)
+        self.assertEqual(solution.event_index, 0)
+
+        # Events given by a single function that returns all of them as a vector
+        def events(t, y):
+            return np.array([np.max(y - 5), t - 1])
+
+        solution = solver.integrate(exponential_growth, y0, t_eval, events=events)
+        np.testing.assert_allclose(solution.t_event, np.log(5 / 2), rtol=1e-6)
+        self.assertEqual(solution.event_index, 0)
+
+        def events(t, y):
+            return np.array([np.max(y - 5), t - 0.5])
+
+        solution = solver.integrate(exponential_growth, y0, t_eval, events=events)
+        np.testing.assert_allclose(solution.t_event, 0.5, rtol=1e-6)
+        self.assertEqual(solution.event_index, 1)
 
     def test_ode_integrate_with_jacobian(self):
         # Linear
@@ -158,6 +175,171 @@ class TestScipySolver(unittest.TestCase):
             solution.total_time, solution.solve_time + solution.set_up_time
         )
 
+    def test_model_solver_reuse_set_up(self):
+        # Create model
+        model = pybamm.BaseModel()
+        domain = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=domain)
+        model.rhs = {var: 0.1 * var}
+        model.initial_conditions = {var: 1}
+        # No need to set parameters; can use base discretisation (no spatial operators)
+
+        # create discretisation
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        disc.process_model(model)
+
+        # Count the number of times the solver is set up
+        solver = pybamm.ScipySolver(rtol=1e-8, atol=1e-8, method="RK45")
+        set_up = solver.set_up
+        set_up_calls = []
+
+        def counting_set_up(model):
+            set_up_calls.append(model)
+            set_up(model)
+
+        solver.set_up = counting_set_up
+
+        # Solving again with different times reuses the set-up
+        solution = solver.solve(model, np.linspace(0, 1, 100))
+        solution_2 = solver.solve(model, np.linspace(0, 2, 50))
+        self.assertEqual(len(set_up_calls), 1)
+        np.testing.assert_allclose(solution.y[0], np.exp(0.1 * solution.t))
+        np.testing.assert_allclose(solution_2.y[0], np.exp(0.1 * solution_2.t))
+
+        # Changing the model triggers a new set-up
+        model.concatenated_initial_conditions = (
+            2 * model.concatenated_initial_conditions
+        )
+        solution = solver.solve(model, np.linspace(0, 1, 100))
+        self.assertEqual(len(set_up_calls), 2)
+        np.testing.assert_allclose(solution.y[0], 2 * np.exp(0.1 * solution.t))
+
+        # Explicit invalidation, e.g. after an in-place change to the model
+        model.update_version()
+        solver.solve(model, np.linspace(0, 1, 100))
+        self.assertEqual(len(set_up_calls), 3)
+
+        # A different model is always set up
+        model_2 = pybamm.BaseModel()
+        model_2.rhs = {var: 0.1 * var}
+        model_2.initial_conditions = {var: 1}
+        disc.process_model(model_2)
+        solver.solve(model_2, np.linspace(0, 1, 100))
+        self.assertEqual(len(set_up_calls), 4)
+
+    def test_model_solver_with_inputs(self):
+        # Create model
+        model = pybamm.BaseModel()
+        domain = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=domain)
+        model.rhs = {var: -pybamm.InputParameter("rate") * var}
+        model.initial_conditions = {var: 1}
+        model.events = {"var=0.5": pybamm.min(var - 0.5)}
+        model.variables = {"var": var}
+        # No need to set parameters; can use base discretisation (no spatial operators)
+
+        # create discretisation
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        disc.process_model(model)
+
+        # Count the number of times the solver is set up
+        solver = pybamm.ScipySolver(rtol=1e-8, atol=1e-8, method="RK45")
+        set_up = solver.set_up
+        set_up_calls = []
+
+        def counting_set_up(model):
+            set_up_calls.append(model)
+            set_up(model)
+
+        solver.set_up = counting_set_up
+
+        # Solve with different inputs, reusing the set-up
+        t_eval = np.linspace(0, 10, 100)
+        for rate in [0.1, 0.2]:
+            solution = solver.solve(model, t_eval, inputs={"rate": rate})
+            self.assertLess(len(solution.t), len(t_eval))
+            np.testing.assert_allclose(solution.y[0], np.exp(-rate * solution.t))
+            self.assertEqual(solution.inputs, {"rate": rate})
+            self.assertEqual(solution.termination, "event: var=0.5")
+        self.assertEqual(len(set_up_calls), 1)
+
+        # Post-process with the inputs
+        processed_var = pybamm.ProcessedVariable(
+            model.variables["var"], solution.t, solution.y, mesh, inputs={"rate": 0.2}
+        )
+        np.testing.assert_allclose(processed_var.entries[0], solution.y[0])
+
+        # Missing inputs
+        with self.assertRaises(KeyError):
+            solver.solve(model, t_eval)
+
+    @unittest.skipUnless(pybamm.have_numba(), "numba is not installed")
+    def test_model_solver_numba(self):
+        # Create model
+        model = pybamm.BaseModel()
+        domain = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=domain)
+        model.rhs = {var: -pybamm.InputParameter("rate") * pybamm.exp(var) * var}
+        model.initial_conditions = {var: 1}
+        model.events = {"var=0.5": pybamm.min(var - 0.5)}
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        disc.process_model(model)
+
+        # Solve with python and numba evaluators
+        t_eval = np.linspace(0, 10, 100)
+        solutions = {}
+        for convert_to_format in ["python", "numba"]:
+            model.convert_to_format = convert_to_format
+            solver = pybamm.ScipySolver(rtol=1e-8, atol=1e-8)
+            solutions[convert_to_format] = solver.solve(
+                model, t_eval, inputs={"rate": 0.1}
+            )
+        np.testing.assert_array_equal(solutions["numba"].t, solutions["python"].t)
+        np.testing.assert_allclose(solutions["numba"].y, solutions["python"].y)
+        self.assertEqual(solutions["numba"].termination, "event: var=0.5")
+
+    def test_model_solver_with_cache(self):
+        def get_model(rate, function=np.arcsinh):
+            model = pybamm.BaseModel()
+            domain = ["negative electrode", "separator", "positive electrode"]
+            var = pybamm.Variable("var", domain=domain)
+            model.rhs = {var: -rate * pybamm.Function(function, var)}
+            model.initial_conditions = {var: 1}
+            model.events = {"var=0.5": pybamm.min(var - 0.5)}
+            mesh = get_mesh_for_testing()
+            spatial_methods = {"macroscale": pybamm.FiniteVolume}
+            disc = pybamm.Discretisation(mesh, spatial_methods)
+            disc.process_model(model)
+            return model
+
+        t_eval = np.linspace(0, 10, 100)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = pybamm.DiskCache(directory)
+            solutions = []
+            for rate in [0.1, 0.1, 0.2]:
+                solver = pybamm.ScipySolver(rtol=1e-8, atol=1e-8)
+                solver.cache = cache
+                solutions.append(solver.solve(get_model(rate), t_eval))
+            # a model with the same equations reuses the set-up
+            self.assertEqual(len(cache.entries()), 2)
+            np.testing.assert_array_equal(solutions[1].t, solutions[0].t)
+            np.testing.assert_array_equal(solutions[1].y, solutions[0].y)
+            self.assertEqual(solutions[1].termination, "event: var=0.5")
+            self.assertNotEqual(solutions[2].t[-1], solutions[0].t[-1])
+
+            # models whose evaluators cannot be stored are still solved
+            cache.clear()
+            model = get_model(0.1, function=lambda x: np.arcsinh(x))
+            solution = solver.solve(model, t_eval)
+            self.assertEqual(cache.entries(), [])
+            np.testing.assert_allclose(solution.y, solutions[0].y)
+
     def test_model_solver_with_event(self):
         # Create model
         model = pybamm.BaseModel()
@@ -181,6 +363,42 @@ class TestScipySolver(unittest.TestCase):
         np.testing.assert_array_equal(solution.t, t_eval[: len(solution.t)])
         np.testing.assert_allclose(solution.y[0], np.exp(-0.1 * solution.t))
 
+        # Statistics
+        self.assertGreater(solution.stats["steps"], 0)
+        self.assertGreater(solution.stats["function evaluations"], 0)
+        self.assertEqual(solution.stats["jacobian evaluations"], 0)
+        self.assertEqual(solution.stats["linear solver setups"], 0)
+        self.assertGreater(solution.stats["event evaluations"], 0)
+
+    def test_model_solver_with_multiple_events(self):
+        # Create model
+        model = pybamm.BaseModel()
+        domain = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=domain)
+        model.rhs = {var: -0.1 * var}
+        model.initial_conditions = {var: 1}
+        model.events = {
+            "var=0.5": pybamm.min(var - 0.5),
+            "var=0.8": pybamm.min(var - 0.8),
+            "t=8": pybamm.t - 8,
+        }
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        disc.process_model(model)
+
+        # Solve, with the events evaluated together with or without python
+        for use_to_python in [True, False]:
+            model.use_to_python = use_to_python
+            solver = pybamm.ScipySolver(rtol=1e-8, atol=1e-8)
+            t_eval = np.linspace(0, 10, 100)
+            solution = solver.solve(model, t_eval)
+            self.assertEqual(solution.event_index, 1)
+            self.assertEqual(solution.termination, "event: var=0.8")
+            np.testing.assert_allclose(solution.t_event, -10 * np.log(0.8), rtol=1e-6)
+            # each evaluation of the events counts every event
+            self.assertEqual(solution.stats["event evaluations"] % 3, 0)
+
     def test_model_solver_ode_with_jacobian(self):
         # Create model
         model = pybamm.BaseModel()
@@ -232,6 +450,14 @@ class TestScipySolver(unittest.TestCase):
             np.ones((N, T.size)) * (T[np.newaxis, :] - np.exp(T[np.newaxis, :])),
         )
 
+        # Statistics: the jacobian is evaluated by the closure created by the setup
+        self.assertGreater(solution.stats["jacobian evaluations"], 0)
+        self.assertGreater(solution.stats["linear solver setups"], 0)
+        self.assertEqual(
+            solver.callback_counts["jacobian evaluations"],
+            solution.stats["jacobian evaluations"],
+        )
+
     def test_model_step(self):
         # Create model
         model = pybamm.BaseModel()
@@ -261,7 +487,11 @@ class TestScipySolver(unittest.TestCase):
         np.testing.assert_allclose(step_sol_2.y[0], np.exp(0.1 * step_sol_2.t))
 
         # append solutions
+        stats = step_sol.stats.copy()
         step_sol.append(step_sol_2)
+        self.assertEqual(
+            step_sol.stats["steps"], stats["steps"] + step_sol_2.stats["steps"]
+        )
 
         # Check steps give same solution as solve
         t_eval = step_sol.t